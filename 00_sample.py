@@ -8,7 +8,8 @@ This script demonstrates how to test connectivity and basic interaction between
 Usage:
 - Ensure you have a valid OCI config file with API key credentials.
 - Update the compartment OCID and config profile as needed.
-- Run this script to send a sample prompt to the OCI Generative AI endpoint and print the model's response.
+- Run this script to send a sample prompt to the OCI Generative AI endpoint and print the model's response
+  (or `python cli.py chat --prompt "..."`). Importing it sends nothing.
 
 Purpose:
 - Validate network and authentication setup from your local environment to OCI Generative AI.
@@ -19,6 +20,9 @@ Purpose:
 import os
 import oci
 from dotenv import load_dotenv
+from context_budget import estimate_tokens, fit_max_tokens
+from resilience import inference_retry_strategy
+from admission import admission_controller
 
 # Load environment variables
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
@@ -30,44 +34,60 @@ OCI_CONFIG_PATH = os.getenv("OCI_CONFIG_PATH", os.path.join(os.path.dirname(__fi
 MODEL_ID = os.getenv("MODEL_ID", "ocid1.generativeaimodel.oc1.us-chicago-1.amaaaaaask7dceyanrlpnq5ybfu5hnzarg7jomak3q6kyhkzjsl4qj24fyoq")
 ENDPOINT = os.getenv("OCI_GENAI_ENDPOINT", "https://inference.generativeai.us-chicago-1.oci.oraclecloud.com")
 
-config = oci.config.from_file(
-    OCI_CONFIG_PATH,
-    CONFIG_PROFILE
-)
-
-# Initialize Generative AI client
-generative_ai_inference_client = oci.generative_ai_inference.GenerativeAiInferenceClient(
-    config=config,
-    service_endpoint=ENDPOINT,
-    retry_strategy=oci.retry.NoneRetryStrategy(),
-    timeout=(10, 240)
-)
-
-# Prepare chat request
-chat_detail = oci.generative_ai_inference.models.ChatDetails()
-chat_request = oci.generative_ai_inference.models.CohereChatRequest()
-chat_request.message = os.getenv("PROMPT", "what is oracle cloud in 1 line")
-chat_request.max_tokens = int(os.getenv("MAX_TOKENS", 600))
-chat_request.temperature = float(os.getenv("TEMPERATURE", 0))
-chat_request.frequency_penalty = float(os.getenv("FREQUENCY_PENALTY", 1))
-chat_request.top_p = float(os.getenv("TOP_P", 0.75))
-chat_request.top_k = int(os.getenv("TOP_K", 0))
-
-# Specify model and compartment
-chat_detail.serving_mode = oci.generative_ai_inference.models.OnDemandServingMode(
-    model_id=MODEL_ID
-)
-chat_detail.chat_request = chat_request
-chat_detail.compartment_id = compartment_id
-
-# Send chat request and print response
-chat_response = generative_ai_inference_client.chat(chat_detail)
-
-print("**************************Chat Result**************************")
-try:
-    print("Text:", chat_response.data.chat_response.text)
-    print("Finish Reason:", chat_response.data.chat_response.finish_reason)
-    print("Total Tokens Used:", chat_response.data.chat_response.usage.total_tokens)
-except Exception as e:
-    print("Error extracting chat result:", e)
-    print("Raw data:", chat_response.data)
+def main():
+    config = oci.config.from_file(
+        OCI_CONFIG_PATH,
+        CONFIG_PROFILE
+    )
+
+    # Initialize Generative AI client
+    generative_ai_inference_client = oci.generative_ai_inference.GenerativeAiInferenceClient(
+        config=config,
+        service_endpoint=ENDPOINT,
+        # Backoff on throttling, circuit breaking and hedging of slow calls (see resilience.py)
+        retry_strategy=inference_retry_strategy(),
+        timeout=(10, 240)
+    )
+
+    # Wait for quota instead of hitting the tenancy's limits when OCI_GENAI_RPM/OCI_GENAI_TPM are set (see admission.py)
+    controller = admission_controller()
+    if controller is not None:
+        controller.guard_inference(generative_ai_inference_client)
+
+    # Prepare chat request
+    chat_detail = oci.generative_ai_inference.models.ChatDetails()
+    chat_request = oci.generative_ai_inference.models.CohereChatRequest()
+    chat_request.message = os.getenv("PROMPT", "what is oracle cloud in 1 line")
+    # Never ask for more completion tokens than the context window has room for after the prompt
+    chat_request.max_tokens = fit_max_tokens(
+        estimate_tokens(chat_request.message),
+        int(os.getenv("MAX_TOKENS", 600)),
+        int(os.getenv("MODEL_CONTEXT_TOKENS", 128000)),
+    )
+    chat_request.temperature = float(os.getenv("TEMPERATURE", 0))
+    chat_request.frequency_penalty = float(os.getenv("FREQUENCY_PENALTY", 1))
+    chat_request.top_p = float(os.getenv("TOP_P", 0.75))
+    chat_request.top_k = int(os.getenv("TOP_K", 0))
+
+    # Specify model and compartment
+    chat_detail.serving_mode = oci.generative_ai_inference.models.OnDemandServingMode(
+        model_id=MODEL_ID
+    )
+    chat_detail.chat_request = chat_request
+    chat_detail.compartment_id = compartment_id
+
+    # Send chat request and print response
+    chat_response = generative_ai_inference_client.chat(chat_detail)
+
+    print("**************************Chat Result**************************")
+    try:
+        print("Text:", chat_response.data.chat_response.text)
+        print("Finish Reason:", chat_response.data.chat_response.finish_reason)
+        print("Total Tokens Used:", chat_response.data.chat_response.usage.total_tokens)
+    except Exception as e:
+        print("Error extracting chat result:", e)
+        print("Raw data:", chat_response.data)
+
+
+if __name__ == "__main__":
+    main()
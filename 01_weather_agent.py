@@ -30,6 +30,9 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 OCI_AI_AGENT_ENDPOINT_ID = os.getenv("OCI_AI_AGENT_ENDPOINT_ID")
 OCI_CONFIG_PROFILE= os.getenv("OCI_CONFIG_PROFILE", "DEFAULT")
 OCI_REGION = os.getenv("OCI_REGION", "us-chicago-1")
+# Optional endpoint overrides, e.g. to point at mock_genai_server.py (region is used when unset)
+OCI_AGENT_RUNTIME_ENDPOINT = os.getenv("OCI_AGENT_RUNTIME_ENDPOINT")
+OCI_AGENT_MANAGEMENT_ENDPOINT = os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT")
 
 # Use @tool to signal that this Python function is a function tool.
 # Apply standard docstring to provide function and parameter descriptions.
@@ -51,6 +54,8 @@ def main():
         auth_type="api_key",
         profile=OCI_CONFIG_PROFILE,
         region=OCI_REGION,
+        runtime_endpoint=OCI_AGENT_RUNTIME_ENDPOINT,
+        management_endpoint=OCI_AGENT_MANAGEMENT_ENDPOINT,
     )
 
     # Create a local agent object with the client, instructions, and tools.
@@ -9,6 +9,7 @@ Features:
 - Registers the AgenticRagTool, which enables the agent to answer questions using the specified knowledge base.
 - Sets up the agent with instructions and the RAG tool, and syncs them to the remote agent endpoint.
 - Runs the agent with a sample user input and prints the response.
+- Answers repeated and paraphrased questions from a SemanticCache (see semantic_cache.py) instead of a new agent run.
 
 Usage:
 1. Set up your `.env` file with the following variables:
@@ -23,6 +24,7 @@ Usage:
 from oci.addons.adk import Agent, AgentClient
 from oci.addons.adk.tool.prebuilt import AgenticRagTool
 from dotenv import load_dotenv
+from semantic_cache import SemanticCache, SemanticCachedAgent
 import os
 
 
@@ -37,7 +39,9 @@ def main():
     client = AgentClient(
         auth_type="api_key",
         profile=OCI_CONFIG_PROFILE,
-        region=OCI_REGION
+        region=OCI_REGION,
+        runtime_endpoint=os.getenv("OCI_AGENT_RUNTIME_ENDPOINT"),
+        management_endpoint=os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT"),
     )
 
     # Assuming the knowledge base is already provisioned
@@ -62,10 +66,14 @@ def main():
     # Set up the agent once
     agent.setup()
 
+    # Questions similar to an earlier one are answered from the cache (per endpoint and knowledge base)
+    cached_agent = SemanticCachedAgent(agent, SemanticCache())
+
     # Run the agent with a user query
     input = "Tell me about Oracle Cloud Infrastructure."
-    response = agent.run(input)
+    response = cached_agent.run(input)
     response.pretty_print()
+    print(cached_agent.cache.stats())
 
 
 if __name__ == "__main__":
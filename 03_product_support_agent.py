@@ -10,6 +10,11 @@ Features:
     - AccountToolkit: Custom function tool to fetch user and organization information.
 - Sets up the agent with instructions and tools, and syncs them to the remote agent endpoint.
 - Demonstrates a multi-turn conversation, including context passing and session management.
+- Runs the tool calls of one step (e.g. user and org lookups) concurrently with ParallelAgent (see parallel_tools.py).
+- Keeps the user's session in a SessionPool (see session_pool.py), which deletes it when done.
+- Sends the client-provided context once per session instead of on every turn (see context_budget.py).
+- Looks up the user and org info for account questions from the client-provided context while the session
+  is acquired, and sends it with the question, saving the agent two tool steps (see context_prefetch.py).
 
 Usage:
 1. Set up your `.env` file with the following variables:
@@ -22,11 +27,15 @@ Usage:
 
 """
 
-from oci.addons.adk import Agent, AgentClient
+from oci.addons.adk import AgentClient
 from oci.addons.adk.tool.prebuilt import AgenticRagTool
 from custom_function_tools import AccountToolkit
 from dotenv import load_dotenv
 import os
+from session_pool import SessionPool
+from parallel_tools import ParallelAgent
+from context_budget import ContextBudget
+from context_prefetch import PrefetchAgent
 
 def main():
     # Load environment variables from .env file
@@ -41,7 +50,9 @@ def main():
     client = AgentClient(
         auth_type="api_key",
         profile=profile,
-        region=region
+        region=region,
+        runtime_endpoint=os.getenv("OCI_AGENT_RUNTIME_ENDPOINT"),
+        management_endpoint=os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT"),
     )
 
     instructions = """
@@ -51,7 +62,8 @@ def main():
     Only orgs of Enterprise plan can use Responses API.
     """
 
-    agent = Agent(
+    # Same arguments as Agent; tool calls requested together in one step run concurrently
+    agent = ParallelAgent(
         client=client,
         agent_endpoint_id=agent_endpoint_id,
         instructions=instructions,
@@ -64,19 +76,26 @@ def main():
     agent.setup()
 
     # This is a context your existing code is best at producing (e.g., fetching the authenticated user id)
-    client_provided_context = "[Context: The logged in user ID is: user_123] "
-
-    # Handle the first user turn of the conversation
-    input = "Tell me about Oracle Cloud?"
-    input = client_provided_context + " " + input
-    response = agent.run(input)
-    response.pretty_print()
-
-    # Handle the second user turn of the conversation
-    input = "Is my user account eligible for the Responses API?"
-    input = client_provided_context + " " + input
-    response = agent.run(input, session_id=response.session_id)
-    response.pretty_print()
+    client_provided_context = {"user": "The logged in user ID is: user_123"}
+
+    # The session remembers earlier turns, so the context is only sent again when it changes
+    budget = ContextBudget(max_input_tokens=1500)
+
+    # Account questions get the user's info and their org's info looked up ahead of the run
+    prefetching = PrefetchAgent(agent, budget=budget)
+
+    # Sessions are keyed by the logged in user, so every turn of theirs continues the same session
+    with SessionPool(agent) as sessions:
+        for input in ["Tell me about Oracle Cloud?", "Is my user account eligible for the Responses API?"]:
+            prefetched = prefetching.prefetch(input, client_provided_context)
+            with sessions.session("user_123") as session_id:
+                response = prefetching.run(input, session_id=session_id, context=client_provided_context,
+                                           prefetched=prefetched)
+            response.pretty_print()
+
+    print("Context tokens saved:", budget.stats()["tokens_saved"])
+    stats = prefetching.stats()
+    print("Tool lookups prefetched:", stats["not_repeated"], "- repeated by the agent:", stats["repeated"])
 
 
 if __name__ == "__main__":
@@ -10,6 +10,8 @@ Features:
 - Registers the prebuilt CalculatorToolkit as a tool for the agent.
 - Sets up the agent with instructions and tools, and syncs them to the remote agent endpoint.
 - Demonstrates a multi-turn conversation, maintaining session context between turns.
+- Keeps the conversation's session in a SessionPool (see session_pool.py), which deletes it when done.
+- Answers plain arithmetic questions locally through FastPathAgent (see fast_path.py); follow-ups go to the agent.
 
 Usage:
 1. Set up your `.env` file with the following variables:
@@ -22,6 +24,8 @@ Usage:
 from oci.addons.adk import Agent, AgentClient
 from oci.addons.adk.tool.prebuilt import CalculatorToolkit
 from dotenv import load_dotenv
+from session_pool import SessionPool
+from fast_path import FastPathAgent
 import os
 
 
@@ -38,7 +42,9 @@ def main():
     client = AgentClient(
         auth_type="api_key",
         profile=profile,
-        region=region
+        region=region,
+        runtime_endpoint=os.getenv("OCI_AGENT_RUNTIME_ENDPOINT"),
+        management_endpoint=os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT"),
     )
 
     # Create the agent with the CalculatorToolkit tool
@@ -52,15 +58,20 @@ def main():
     # Sync local instructions and tools to the remote agent resource
     agent.setup()
 
-    # First turn (start a new session)
-    input = "What is the square root of 256?"
-    response = agent.run(input, max_steps=3)
-    response.pretty_print()
+    # The pool maps a conversation key to its session and deletes the session on close
+    # "What is the square root of 256?" is answered by CalculatorToolkit directly, without the remote loop
+    fast_agent = FastPathAgent(agent)
 
-    # Second turn (continue the same session using session_id)
-    input = "do the same thing for 81"
-    response = agent.run(input, session_id=response.session_id, max_steps=3)
-    response.pretty_print()
+    with SessionPool(fast_agent) as sessions:
+        # First turn (start a new session)
+        input = "What is the square root of 256?"
+        response = sessions.run("user_123", input, max_steps=3)
+        response.pretty_print()
+
+        # Second turn (continue the same session for the same conversation key)
+        input = "do the same thing for 81"
+        response = sessions.run("user_123", input, max_steps=3)
+        response.pretty_print()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
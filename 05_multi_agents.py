@@ -12,12 +12,17 @@ Features:
 - Shows how a supervisor agent can coordinate the workflow between collaborator agents and tools.
 
 Usage:
-- Update agent endpoint OCIDs, profile, and region as needed (or replace with environment variables for production).
+- Update agent endpoint OCIDs as needed. The profile, region and service endpoints are read from
+  OCI_CONFIG_PROFILE, OCI_REGION, OCI_AGENT_RUNTIME_ENDPOINT and OCI_AGENT_MANAGEMENT_ENDPOINT (.env file).
 - Run this script to see multi-agent collaboration in action.
 """
 
 import json
+import os
+
+from dotenv import load_dotenv
 from oci.addons.adk import Agent, AgentClient, tool
+from agent_setup import setup_agents
 
 # Define a tool for trending keyword analysis
 @tool
@@ -35,11 +40,16 @@ def send_email(recipient, subject, body):
     return "Sent!"
 
 def main():
+    # Load environment variables from .env file
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
     # Create a shared AgentClient for all agents
     client = AgentClient(
         auth_type="api_key",
-        profile="DEFAULT",
-        region="us-chicago-1"
+        profile=os.getenv("OCI_CONFIG_PROFILE", "DEFAULT"),
+        region=os.getenv("OCI_REGION", "us-chicago-1"),
+        runtime_endpoint=os.getenv("OCI_AGENT_RUNTIME_ENDPOINT"),
+        management_endpoint=os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT"),
     )
 
     # Define the trend analyzer collaborator agent
@@ -84,9 +94,9 @@ def main():
     )
 
     # Set up the agents once (register instructions and tools with the remote endpoints)
-    trend_analyzer.setup()
-    content_writer.setup()
-    marketing_director.setup()
+    # Agents whose instructions and tools are unchanged since their last sync are skipped,
+    # and the ones that do need a sync are set up concurrently
+    setup_agents(trend_analyzer, content_writer, marketing_director)
 
     # Use the supervisor agent to process the end user request
     input = "Produce a blog post about current trends in the AI industry."
@@ -10,14 +10,28 @@ Features:
 - Shows how to combine non-agentic and agentic steps in a workflow.
 - Uses two collaborating agents (Researcher and Writer) to process user preferences, research trending keywords, and generate a blog post.
 - Demonstrates how to pass outputs from one step as inputs to the next, maintaining full control over the workflow.
+- Declares the steps as a DAG (see workflow.py): each topic is researched in parallel, and completed steps are
+  checkpointed so a rerun after a failure resumes from the last completed step.
+- `blog_post_job` runs the pipeline for one user's preferences as a job_queue.py handler, so every user in the
+  preferences DB can be processed by a pool of worker processes.
 
 Usage:
-- Update agent endpoint OCIDs, profile, and region as needed (or replace with environment variables for production).
+- Update agent endpoint OCIDs as needed. The profile, region and service endpoints are read from
+  OCI_CONFIG_PROFILE, OCI_REGION, OCI_AGENT_RUNTIME_ENDPOINT and OCI_AGENT_MANAGEMENT_ENDPOINT (.env file).
 - Run this script to see a deterministic, multi-step workflow with agentic and non-agentic steps.
+- For every user: write one preferences JSON object per line to users.jsonl, then
+    python job_queue.py enqueue --handler 06_multi_step_workflow_agents:blog_post_job --jsonl users.jsonl --key-field email
+    python job_queue.py work --processes 4 --threads 8
 """
 
+import os
+import threading
+
+from dotenv import load_dotenv
 from oci.addons.adk import Agent, AgentClient
 from custom_functon_tools_v1 import ResearcherToolkit, WriterToolkit
+from agent_setup import setup_agents
+from workflow import Workflow, agent_step
 
 """
 This examples shows how you can build "deterministically orchestrated workflows with agentic steps".
@@ -32,12 +46,16 @@ def get_user_preferences():
         "topics": ["ai"]
     }
 
-def main():
+def create_agents():
+    # Load environment variables from .env file
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
     client = AgentClient(
         auth_type="api_key",
-        profile="DEFAULT",
-        region="us-chicago-1"
+        profile=os.getenv("OCI_CONFIG_PROFILE", "DEFAULT"),
+        region=os.getenv("OCI_REGION", "us-chicago-1"),
+        runtime_endpoint=os.getenv("OCI_AGENT_RUNTIME_ENDPOINT"),
+        management_endpoint=os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT"),
     )
 
     researcher = Agent(
@@ -56,26 +74,59 @@ def main():
         tools=[WriterToolkit()]
     )
 
-    researcher.setup()
-    writer.setup()
+    # Sync only the agents whose instructions or tools changed since the last run
+    setup_agents(researcher, writer)
+    return researcher, writer
+
+def build_workflow(researcher, writer, preferences_fn=get_user_preferences):
+    workflow = Workflow("blog_post")
 
     # Step 1: Fetch user preferences or any pre-processing information. (non-agentic step)
-    user_preferences = get_user_preferences()
+    workflow.step("user_preferences", preferences_fn, checkpoint=False)
 
     # Step 2: Research trending keywords using outputs from the previous steps as input. (agentic step)
-    topics = user_preferences['topics']
-    researcher_prompt = f"Research trending keywords for the following topics: {topics}"
-    last_run_response = researcher.run(researcher_prompt)
+    # One researcher run per topic, in parallel
+    workflow.step(
+        "keywords",
+        agent_step(researcher, "Research trending keywords for the following topics: {topic}"),
+        inputs={"topic": "user_preferences.topics"},
+        map_over="topic",
+    )
+
+    # Step 3: Write a blog post using outputs from last two steps as input. (agentic step)
+    workflow.step(
+        "blog_post",
+        agent_step(writer, "Write a 5 sentences blog post and email it to {email}. Use style: {style}. Blog post should be based on: {keywords}."),
+        inputs={"email": "user_preferences.email", "style": "user_preferences.style", "keywords": "keywords"},
+    )
+    return workflow
+
+# Agents are created (and synced) once per worker process and shared by its job threads
+_job_agents = None
+_job_agents_lock = threading.Lock()
+
+def blog_post_job(preferences):
+    """job_queue.py handler: run the pipeline for one user's preferences (email, style, topics)
+
+    A retried job resumes from the workflow checkpoints of its earlier attempt.
+    """
+    global _job_agents
+    with _job_agents_lock:
+        if _job_agents is None:
+            _job_agents = create_agents()
+    workflow = build_workflow(*_job_agents, preferences_fn=lambda: preferences)
+    results = workflow.run()
+    return {"blog_post": results["blog_post"], "executed": workflow.executed, "resumed": workflow.skipped}
+
+def main():
+    researcher, writer = create_agents()
+    workflow = build_workflow(researcher, writer)
 
-    # Step 3: Write a blog post using outputs from last two steps as input. (agentic step) 
-    keywords = last_run_response.output
-    style = user_preferences['style']
-    email = user_preferences['email']
-    writer_prompt = f"Write a 5 sentences blog post and email it to {email}. Use style: {style}. Blog post should be based on: {keywords}."
-    last_run_response = writer.run(writer_prompt)
+    results = workflow.run()
 
     # Step 4: Do whatever you want with the last step output. Here we just print it.
-    last_run_response.pretty_print()
+    print(results["blog_post"])
+    print(f"Executed steps: {workflow.executed}, resumed from checkpoint: {workflow.skipped}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
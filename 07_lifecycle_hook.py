@@ -9,20 +9,28 @@ Features:
 - Shows how to register callback functions for agent lifecycle events, such as when a required action is fulfilled or a remote service is invoked.
 - Integrates custom logging or processing logic into the agent's workflow using these hooks.
 - Uses the prebuilt CalculatorToolkit as a tool for the agent.
+- Records remote call latency, tool time, steps and tokens through the same hooks (see agent_metrics.py)
+  and prints them in Prometheus format.
+- Answers plain arithmetic questions locally through FastPathAgent (see fast_path.py); the hooks still see the tool call.
 
 Usage:
-- Update agent endpoint OCID, profile, and region as needed (or replace with environment variables for production).
+- Update agent endpoint OCID as needed. The profile, region and service endpoints are read from
+  OCI_CONFIG_PROFILE, OCI_REGION, OCI_AGENT_RUNTIME_ENDPOINT and OCI_AGENT_MANAGEMENT_ENDPOINT (.env file).
 - Implement your custom logic in the callback functions as required.
 - Run this script to see lifecycle hooks in action during agent execution.
 """
 
 import json
+import os
 
+from dotenv import load_dotenv
 from rich.console import Console
 
 from oci.addons.adk import Agent, AgentClient
 from oci.addons.adk.tool.prebuilt import CalculatorToolkit
 from oci.addons.adk.run.types import RequiredAction, PerformedAction
+from agent_metrics import MetricsCollector
+from fast_path import FastPathAgent
 
 # A callback function that is called when a required action is fulfilled
 def handle_fulfilled_required_action(required_action: RequiredAction, performed_action: PerformedAction):
@@ -37,11 +45,16 @@ def handle_invoked_remote_service(chat_request, chat_response):
     pass
 
 def main():
+    # Load environment variables from .env file
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
     # Create an AgentClient for communicating with OCI Generative AI Agents service
     client = AgentClient(
         auth_type="api_key",
-        profile="DEFAULT",
-        region="us-chicago-1"
+        profile=os.getenv("OCI_CONFIG_PROFILE", "DEFAULT"),
+        region=os.getenv("OCI_REGION", "us-chicago-1"),
+        runtime_endpoint=os.getenv("OCI_AGENT_RUNTIME_ENDPOINT"),
+        management_endpoint=os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT"),
     )
 
     # Create the agent with the CalculatorToolkit tool
@@ -55,8 +68,12 @@ def main():
     # Sync local instructions and tools to the remote agent resource
     agent.setup()
 
+    # The collector records its metrics in the hooks, then calls your callbacks
+    metrics = MetricsCollector(trace_path="agent_runs.jsonl")
+
     input = "What's the square root of 475695037565?"
-    response = agent.run(
+    response = metrics.run(
+        FastPathAgent(agent),
         input,
         max_steps=6,
         on_fulfilled_required_action=handle_fulfilled_required_action,
@@ -65,5 +82,8 @@ def main():
 
     response.pretty_print()
 
+    print(metrics.render_prometheus())
+    metrics.close()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -8,17 +8,46 @@ This script demonstrates how to explicitly delete an agent session using the Ora
 Features:
 - Shows how to create an agent, run a session, and then explicitly delete the session using the session_id.
 - Useful for cleaning up resources and managing session lifecycle in production environments.
+- Records sessions in the SessionRegistry (see session_registry.py), so sessions of workers that die before
+  deleting them are collected later with `python session_registry.py gc`.
 
 Usage:
-- Update agent endpoint OCID, profile, and region as needed (or replace with environment variables for production).
-- Run this script to see how to delete an agent session after use.
+1. Set up your `.env` file with the following variables:
+    OCI_AI_AGENT_ENDPOINT_ID=<your_agent_endpoint_ocid>
+    OCI_CONFIG_PROFILE=DEFAULT
+    OCI_REGION=us-chicago-1
+2. Run this script to see how to delete an agent session after use.
 """
 
+from oci.addons.adk import Agent, AgentClient
+from oci.addons.adk.tool.prebuilt import CalculatorToolkit
+from dotenv import load_dotenv
+from session_registry import SessionRegistry
+import os
+
+
 def main():
+    # Load environment variables from .env file
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+    # Fetch values from environment variables
+    agent_endpoint_id = os.getenv("OCI_AI_AGENT_ENDPOINT_ID")
+    profile = os.getenv("OCI_CONFIG_PROFILE", "DEFAULT")
+    region = os.getenv("OCI_REGION", "us-chicago-1")
+
+    # Create an AgentClient and record every session it creates, uses and deletes
+    registry = SessionRegistry()
+    client = registry.track(AgentClient(
+        auth_type="api_key",
+        profile=profile,
+        region=region,
+        runtime_endpoint=os.getenv("OCI_AGENT_RUNTIME_ENDPOINT"),
+        management_endpoint=os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT"),
+    ), owner="08_delete_sessions")
 
     agent = Agent(
         client=client,
-        agent_endpoint_id="ocid1.genaiagentendpoint...",
+        agent_endpoint_id=agent_endpoint_id,
         instructions="You are a helpful assistant that can perform calculations.",
         tools=[CalculatorToolkit()]
     )
@@ -31,5 +60,9 @@ def main():
     # You explicitly delete the session used by the last run
     agent.delete_session(response.session_id)
 
+    # Sessions this run could not delete are left for `python session_registry.py gc`
+    print(registry.stats())
+    registry.close()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
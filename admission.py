@@ -0,0 +1,644 @@
+"""
+admission.py - Quota-aware admission control for requests-per-minute and tokens-per-minute limits
+
+The tenancy's GenAI inference models and agent endpoints have RPM and TPM limits. 00_sample.py and the
+agent scripts send requests as fast as they come and only learn about the limits from 429s, whose
+retries then pile up on the same limit. This module meters requests before they are sent.
+
+Features:
+- Token buckets per model ("model:<id>") and per agent endpoint ("endpoint:<id>"), each metering both
+  requests and tokens, with "*" as the fallback limit. Buckets refill at `headroom` (default 90%) of the
+  limit and hold only `burst_s` seconds of it, so traffic is smoothed just under the limit instead of
+  spending a minute's quota in a burst.
+- Requests are admitted with an estimate (prompt tokens plus `max_tokens`) and settled with the actual
+  `usage.total_tokens` of the response, so over-estimates are refunded and under-estimates charged.
+- Priority classes: waiting interactive requests are admitted before batch ones, and batch requests
+  cannot take a bucket below `batch_reserve`, so interactive traffic finds capacity under a batch backlog.
+- Buckets live in memory, or in a SQLite file shared by the processes of one host (`ADMISSION_STORE`).
+- `stats()` reports RPM/TPM used and utilisation of each limit, time spent queued per priority,
+  estimated vs actual tokens, requests that gave up waiting and 429s that got through anyway.
+
+Settings (environment variables, read by admission_controller()):
+    OCI_GENAI_RPM, OCI_GENAI_TPM (default limit for every model and endpoint; unset: no limit),
+    ADMISSION_STORE (SQLite file shared across processes; unset: per-process buckets)
+
+Usage:
+    controller = AdmissionController({"model:cohere.command-r-plus": QuotaLimit(rpm=600, tpm=100000),
+                                      "*": QuotaLimit(rpm=100)})
+    client = controller.guard_inference(GenerativeAiInferenceClient(...))
+    agent_client = controller.guard_agent(AgentClient(...))
+    with controller.priority("batch"):
+        agent.run(...)
+    print(controller.stats())
+
+- python admission.py --bench
+"""
+
+import argparse
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import oci
+
+from context_budget import estimate_tokens
+from perf_stats import summarize_latencies
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), ".admission.sqlite3")
+
+# Lower rank is admitted first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Priority class set by AdmissionController.priority(); a context variable, so it follows the work into
+# asyncio tasks and into threads started with contextvars.copy_context().run (workflow.py steps)
+_priority: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("admission_priority", default=None)
+
+# (requests level, tokens level, updated at)
+BucketState = Tuple[float, float, float]
+
+
+class AdmissionTimeoutError(oci.exceptions.ServiceError):
+    """Raised without calling the endpoint when a request waited longer than its timeout for quota"""
+
+    def __init__(self, key: str, waited_s: float):
+        super().__init__(429, "AdmissionTimeout", {}, f"No quota for {key} after waiting {waited_s:.1f}s")
+        self.key = key
+
+
+class QuotaLimit:
+    """Requests and tokens per minute for one model or endpoint"""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, headroom: float = 0.9,
+                 burst_s: float = 2.0, batch_reserve: float = 0.2):
+        """
+        Args:
+            rpm (Optional[float]): Requests per minute, None for no request limit
+            tpm (Optional[float]): Tokens per minute, None for no token limit
+            headroom (float): Fraction of the limit to use, leaving room for estimate errors and clock drift
+            burst_s (float): Seconds of the (headroom) rate a bucket holds; small values pace traffic evenly
+            batch_reserve (float): Fraction of each bucket that only interactive requests may use
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.headroom = headroom
+        self.batch_reserve = batch_reserve
+        # (refill per second, capacity) per dimension, None when unlimited
+        self._dimensions = [
+            (limit * headroom / 60, max(1.0, limit * headroom / 60 * burst_s)) if limit else None
+            for limit in (rpm, tpm)
+        ]
+
+    def full(self, now: float) -> BucketState:
+        requests, tokens = (dimension[1] if dimension else 0.0 for dimension in self._dimensions)
+        return requests, tokens, now
+
+    def take(self, state: Optional[BucketState], now: float, tokens: float, reserve: float) -> Tuple[float, BucketState]:
+        """Take one request and tokens from a bucket if the levels allow it
+
+        Costs above a bucket's capacity are admitted from a full bucket and leave it in debt.
+
+        Returns:
+            Tuple[float, BucketState]: (0, new state) when taken, else (seconds until it could be, refilled state)
+        """
+        levels = self._refill(state, now)
+        wait = 0.0
+        for dimension, level, cost in zip(self._dimensions, levels, (1.0, tokens)):
+            if dimension is None:
+                continue
+            rate, capacity = dimension
+            need = min(cost, capacity * (1 - reserve)) + capacity * reserve
+            if level < need:
+                wait = max(wait, (need - level) / rate)
+        if wait > 0:
+            return wait, (levels[0], levels[1], now)
+        return 0.0, (levels[0] - 1.0, levels[1] - tokens, now)
+
+    def charge(self, state: Optional[BucketState], now: float, tokens: float) -> BucketState:
+        """Charge (or refund, when negative) tokens after the actual usage is known"""
+        requests, level = self._refill(state, now)
+        if self._dimensions[1] is not None:
+            level = min(level - tokens, self._dimensions[1][1])
+        return requests, level, now
+
+    def _refill(self, state: Optional[BucketState], now: float) -> Tuple[float, float]:
+        if state is None:
+            state = self.full(now)
+        levels = []
+        for dimension, level in zip(self._dimensions, state[:2]):
+            if dimension is not None:
+                rate, capacity = dimension
+                level = min(capacity, level + max(0.0, now - state[2]) * rate)
+            levels.append(level)
+        return levels[0], levels[1]
+
+
+class MemoryBucketStore:
+    """Buckets of one process"""
+
+    def __init__(self):
+        self._buckets: Dict[str, BucketState] = {}
+        self._lock = threading.Lock()
+
+    def update(self, key: str, fn: Callable[[Optional[BucketState], float], Tuple[Any, BucketState]]) -> Any:
+        """Atomically replace a bucket's state with fn(state, now) and return fn's result"""
+        with self._lock:
+            result, self._buckets[key] = fn(self._buckets.get(key), time.time())
+        return result
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file, shared by every process on the host that uses the same file"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+
+    def update(self, key: str, fn: Callable[[Optional[BucketState], float], Tuple[Any, BucketState]]) -> Any:
+        """Atomically replace a bucket's state with fn(state, now) and return fn's result"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT requests, tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                result, state = fn(tuple(row) if row else None, time.time())
+                self._db.execute("INSERT OR REPLACE INTO buckets (key, requests, tokens, updated) VALUES (?, ?, ?, ?)",
+                                 (key,) + tuple(state))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class Ticket:
+    """An admitted request, to be settled with its actual token usage"""
+
+    def __init__(self, key: str, priority: str, estimated_tokens: int, queued_s: float, limit: Optional[QuotaLimit]):
+        self.key = key
+        self.priority = priority
+        self.estimated_tokens = estimated_tokens
+        self.queued_s = queued_s
+        self.limit = limit
+        self.settled = False
+
+
+class _KeyStats:
+    """Counters and a one-minute usage window for one bucket key"""
+
+    def __init__(self, limit: Optional[QuotaLimit]):
+        self.limit = limit
+        self.admitted: Dict[str, int] = {}
+        self.queued: Dict[str, deque] = {}
+        self.timeouts = 0
+        self.throttled = 0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+        self.settled = 0
+        # (time, requests, tokens) charged, including settlement adjustments
+        self.window: deque = deque()
+        self.first_at: Optional[float] = None
+
+
+def _status(error: BaseException) -> Optional[int]:
+    # AgentClient wraps the SDK's ServiceError; look through the chain for the HTTP status
+    while error is not None:
+        if isinstance(error, oci.exceptions.ServiceError):
+            return error.status
+        error = error.__cause__
+    return None
+
+
+def _inference_estimate(chat_request: Any, default_max_tokens: int) -> int:
+    # Prompt (message, history, preamble or generic messages) plus the completion budget
+    texts = [getattr(chat_request, "message", None), getattr(chat_request, "preamble_override", None)]
+    for message in getattr(chat_request, "chat_history", None) or []:
+        texts.append(getattr(message, "message", None))
+    for message in getattr(chat_request, "messages", None) or []:
+        texts.extend(getattr(content, "text", None) for content in getattr(message, "content", None) or [])
+    prompt = sum(estimate_tokens(text) for text in texts if text)
+    return prompt + (getattr(chat_request, "max_tokens", None) or default_max_tokens)
+
+
+def _agent_usage(response: Any) -> Optional[int]:
+    # Agent chats report usage only inside traces (with tracing enabled on the endpoint)
+    if not isinstance(response, dict):
+        return None
+    total = None
+    for trace in response.get("traces") or []:
+        for usage in (trace or {}).get("usage") or []:
+            details = (usage or {}).get("usage_details") or {}
+            total = (total or 0) + (details.get("input_token_count") or 0) + (details.get("output_token_count") or 0)
+    return total
+
+
+class AdmissionController:
+    """Admits requests per model or endpoint within RPM and TPM limits, interactive before batch"""
+
+    def __init__(self, limits: Dict[str, QuotaLimit], store: Optional[Any] = None, timeout_s: float = 120,
+                 window_s: float = 60, queue_samples: int = 10000):
+        """
+        Args:
+            limits (Dict[str, QuotaLimit]): Limit per bucket key ("model:<id>", "endpoint:<id>"), "*" for any other key
+            store (Optional[Any]): MemoryBucketStore (default) or SQLiteBucketStore to share buckets across processes
+            timeout_s (float): Longest a request waits for quota before AdmissionTimeoutError
+            window_s (float): Window of the reported RPM/TPM usage
+            queue_samples (int): Queue-time samples kept per priority for the report
+        """
+        self.limits = limits
+        self.store = store or MemoryBucketStore()
+        self.timeout_s = timeout_s
+        self.window_s = window_s
+        self.queue_samples = queue_samples
+        self._cond = threading.Condition()
+        self._waiters: Dict[str, List[Tuple[int, int]]] = {}
+        self._seq = itertools.count()
+        self._stats: Dict[str, _KeyStats] = {}
+
+    def limit_for(self, key: str) -> Optional[QuotaLimit]:
+        return self.limits.get(key, self.limits.get("*"))
+
+    @contextmanager
+    def priority(self, priority: str) -> Iterator[None]:
+        """Run requests of this context in a priority class, e.g. `with controller.priority("batch"):`
+
+        The class applies to the calling thread, asyncio tasks it starts, and threads that run work with a
+        copy of its context (contextvars.copy_context().run, as workflow.py does for its steps).
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}")
+        token = _priority.set(priority)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    def acquire(self, key: str, tokens: int = 0, priority: Optional[str] = None, timeout_s: Optional[float] = None) -> Ticket:
+        """Wait until a request of `tokens` estimated tokens fits the key's buckets and take it
+
+        Args:
+            key (str): Bucket key, e.g. "model:<id>" or "endpoint:<id>"
+            tokens (int): Estimated tokens (prompt plus max_tokens)
+            priority (Optional[str]): "interactive" or "batch", defaults to the context's priority() or interactive
+            timeout_s (Optional[float]): Longest wait, defaults to the controller's
+
+        Returns:
+            Ticket: Settle it with the actual usage once known
+
+        Raises:
+            AdmissionTimeoutError: When no quota became available in time
+        """
+        priority = priority or _priority.get() or "interactive"
+        limit = self.limit_for(key)
+        if limit is None:
+            return Ticket(key, priority, tokens, 0.0, None)
+        reserve = limit.batch_reserve if PRIORITIES[priority] > PRIORITIES["interactive"] else 0.0
+        started = time.monotonic()
+        deadline = started + (self.timeout_s if timeout_s is None else timeout_s)
+        entry = (PRIORITIES[priority], next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters.setdefault(key, []), entry)
+            self._cond.notify_all()
+            try:
+                while True:
+                    wait = None
+                    # Only the first waiter in (priority, arrival) order takes from the bucket
+                    if self._waiters[key][0] == entry:
+                        wait = self.store.update(key, lambda state, now: limit.take(state, now, tokens, reserve))
+                        if wait == 0:
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._key_stats(key, limit).timeouts += 1
+                        raise AdmissionTimeoutError(key, time.monotonic() - started)
+                    self._cond.wait(min(wait, remaining) if wait is not None else remaining)
+            finally:
+                waiters = self._waiters[key]
+                waiters.remove(entry)
+                heapq.heapify(waiters)
+                self._cond.notify_all()
+            queued_s = time.monotonic() - started
+            stats = self._key_stats(key, limit)
+            stats.admitted[priority] = stats.admitted.get(priority, 0) + 1
+            stats.queued.setdefault(priority, deque(maxlen=self.queue_samples)).append(queued_s)
+            stats.estimated_tokens += tokens
+            self._record(stats, 1, tokens)
+        return Ticket(key, priority, tokens, queued_s, limit)
+
+    def settle(self, ticket: Ticket, actual_tokens: Optional[int]) -> None:
+        """Replace a ticket's estimate with the actual token usage (None keeps the estimate)"""
+        if ticket.settled or ticket.limit is None:
+            return
+        ticket.settled = True
+        actual = ticket.estimated_tokens if actual_tokens is None else actual_tokens
+        delta = actual - ticket.estimated_tokens
+        if delta:
+            self.store.update(ticket.key, lambda state, now: (None, ticket.limit.charge(state, now, delta)))
+        with self._cond:
+            stats = self._key_stats(ticket.key, ticket.limit)
+            stats.actual_tokens += actual
+            stats.settled += 1
+            if delta:
+                self._record(stats, 0, delta)
+
+    def record_throttled(self, key: str) -> None:
+        """Count a 429 returned by the service despite admission"""
+        with self._cond:
+            self._key_stats(key, self.limit_for(key)).throttled += 1
+
+    def guard_inference(self, client: Any, priority: Optional[str] = None, default_max_tokens: int = 600) -> Any:
+        """Admit every chat of a GenerativeAiInferenceClient per model (or dedicated endpoint)
+
+        Args:
+            client (Any): The inference client; its chat method is wrapped in place
+            priority (Optional[str]): Priority of its requests, defaults to the calling context's
+            default_max_tokens (int): Completion budget assumed when a request sets no max_tokens
+
+        Returns:
+            Any: The same client
+        """
+        chat = client.chat
+
+        def admitted_chat(chat_details: Any, **kwargs: Any) -> Any:
+            serving_mode = chat_details.serving_mode
+            model_id = getattr(serving_mode, "model_id", None)
+            key = f"model:{model_id}" if model_id else f"endpoint:{getattr(serving_mode, 'endpoint_id', None)}"
+            ticket = self.acquire(key, _inference_estimate(chat_details.chat_request, default_max_tokens), priority)
+            try:
+                response = chat(chat_details, **kwargs)
+            except Exception as e:
+                if _status(e) == 429:
+                    self.record_throttled(key)
+                self.settle(ticket, None)
+                raise
+            # Streaming responses have no usage up front; their estimate stands
+            usage = getattr(getattr(response.data, "chat_response", None), "usage", None)
+            self.settle(ticket, getattr(usage, "total_tokens", None))
+            return response
+
+        client.chat = admitted_chat
+        return client
+
+    def guard_agent(self, client: Any, priority: Optional[str] = None, output_tokens: int = 1024) -> Any:
+        """Admit every chat of an ADK AgentClient per agent endpoint
+
+        Args:
+            client (Any): The AgentClient; its chat method is wrapped in place (shared clients cover all their agents)
+            priority (Optional[str]): Priority of its requests, defaults to the calling context's
+            output_tokens (int): Tokens assumed per chat on top of the user message and tool outputs
+
+        Returns:
+            Any: The same client
+        """
+        chat = client.chat
+
+        def admitted_chat(agent_endpoint_id: str, session_id: str, user_message: Optional[str] = None,
+                          performed_actions: Optional[List[Any]] = None) -> Any:
+            key = f"endpoint:{agent_endpoint_id}"
+            prompt = estimate_tokens(user_message or "") + sum(
+                estimate_tokens(str(action.function_call_output)) for action in performed_actions or []
+            )
+            ticket = self.acquire(key, prompt + output_tokens, priority)
+            try:
+                response = chat(agent_endpoint_id, session_id, user_message=user_message,
+                                performed_actions=performed_actions)
+            except Exception as e:
+                if _status(e) == 429:
+                    self.record_throttled(key)
+                self.settle(ticket, None)
+                raise
+            self.settle(ticket, _agent_usage(response))
+            return response
+
+        client.chat = admitted_chat
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        """Usage, utilisation and queueing per bucket key
+
+        Returns:
+            Dict[str, Any]: Per key: limits, RPM/TPM used over the window and their utilisation (of the
+                full limit), requests admitted and seconds queued per priority, timeouts, 429s and tokens
+        """
+        now = time.monotonic()
+        report: Dict[str, Any] = {}
+        with self._cond:
+            for key, stats in self._stats.items():
+                self._trim(stats, now)
+                span = min(self.window_s, now - stats.first_at) if stats.first_at is not None else 0.0
+                per_minute = 60.0 / span if span > 0 else 0.0
+                rpm_used = sum(entry[1] for entry in stats.window) * per_minute
+                tpm_used = sum(entry[2] for entry in stats.window) * per_minute
+                limit = stats.limit
+                report[key] = {
+                    "limit": {"rpm": limit.rpm, "tpm": limit.tpm, "headroom": limit.headroom} if limit else None,
+                    "rpm_used": round(rpm_used, 1),
+                    "tpm_used": round(tpm_used, 1),
+                    "rpm_utilisation_pct": round(100 * rpm_used / limit.rpm, 1) if limit and limit.rpm else None,
+                    "tpm_utilisation_pct": round(100 * tpm_used / limit.tpm, 1) if limit and limit.tpm else None,
+                    "admitted": dict(stats.admitted),
+                    "queued_s": {
+                        priority: {name: round(value, 4) for name, value in summarize_latencies(samples).items()}
+                        for priority, samples in stats.queued.items()
+                    },
+                    "queued_total_s": round(sum(sum(samples) for samples in stats.queued.values()), 2),
+                    "timeouts": stats.timeouts,
+                    "throttled_429": stats.throttled,
+                    "estimated_tokens": stats.estimated_tokens,
+                    "actual_tokens": stats.actual_tokens,
+                    "settled": stats.settled,
+                }
+        return report
+
+    def close(self) -> None:
+        self.store.close()
+
+    def _key_stats(self, key: str, limit: Optional[QuotaLimit]) -> _KeyStats:
+        if key not in self._stats:
+            self._stats[key] = _KeyStats(limit)
+        return self._stats[key]
+
+    def _record(self, stats: _KeyStats, requests: int, tokens: float) -> None:
+        now = time.monotonic()
+        if stats.first_at is None:
+            stats.first_at = now
+        stats.window.append((now, requests, tokens))
+        self._trim(stats, now)
+
+    def _trim(self, stats: _KeyStats, now: float) -> None:
+        while stats.window and stats.window[0][0] <= now - self.window_s:
+            stats.window.popleft()
+
+
+_default_controller: Optional[AdmissionController] = None
+_default_lock = threading.Lock()
+
+
+def admission_controller() -> Optional[AdmissionController]:
+    """Process-wide controller from OCI_GENAI_RPM / OCI_GENAI_TPM / ADMISSION_STORE, None when no limit is set"""
+    global _default_controller
+    with _default_lock:
+        if _default_controller is None:
+            rpm, tpm = os.getenv("OCI_GENAI_RPM"), os.getenv("OCI_GENAI_TPM")
+            if not rpm and not tpm:
+                return None
+            store_path = os.getenv("ADMISSION_STORE")
+            _default_controller = AdmissionController(
+                {"*": QuotaLimit(rpm=float(rpm) if rpm else None, tpm=float(tpm) if tpm else None)},
+                store=SQLiteBucketStore(store_path) if store_path else None,
+            )
+        return _default_controller
+
+
+def _bench_load(url: str, config_path: str, limits: Optional[Dict[str, QuotaLimit]], store_path: Optional[str],
+                threads: int, duration_s: float, priorities: Optional[List[str]] = None,
+                pause_s: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Send inference chats from `threads` threads for duration_s, admitted by a controller unless limits is None"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    config = oci.config.from_file(config_path, "DEFAULT")
+    client = oci.generative_ai_inference.GenerativeAiInferenceClient(
+        config=config, service_endpoint=url, retry_strategy=oci.retry.NoneRetryStrategy(), timeout=(10, 60),
+        circuit_breaker_strategy=oci.circuit_breaker.NoCircuitBreakerStrategy())
+    controller = None
+    if limits is not None:
+        controller = AdmissionController(limits, SQLiteBucketStore(store_path) if store_path else None)
+        controller.guard_inference(client)
+    priorities = priorities or ["interactive"] * threads
+    counts: Dict[str, Dict[str, int]] = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration_s
+
+    def details() -> Any:
+        chat_request = oci.generative_ai_inference.models.CohereChatRequest(message="what is oracle cloud in 1 line",
+                                                                            max_tokens=200)
+        return oci.generative_ai_inference.models.ChatDetails(
+            compartment_id="ocid1.compartment.oc1..standin", chat_request=chat_request,
+            serving_mode=oci.generative_ai_inference.models.OnDemandServingMode(model_id="cohere.command-r-plus"))
+
+    def worker(priority: str) -> None:
+        with controller.priority(priority) if controller else nullcontext():
+            while time.monotonic() < deadline:
+                try:
+                    client.chat(details())
+                    outcome = "ok"
+                except AdmissionTimeoutError:
+                    outcome = "gave_up"
+                except oci.exceptions.ServiceError as e:
+                    outcome = "throttled_429" if e.status == 429 else "error"
+                with lock:
+                    entry = counts.setdefault(priority, {"ok": 0, "throttled_429": 0, "gave_up": 0, "error": 0})
+                    entry[outcome] += 1
+                if pause_s and pause_s.get(priority):
+                    time.sleep(pause_s[priority])
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, priorities))
+    elapsed = time.monotonic() - started
+    ok = sum(entry["ok"] for entry in counts.values())
+    report = {"by_priority": counts, "ok_per_s": round(ok / elapsed, 2),
+              "throttled_429": sum(entry["throttled_429"] for entry in counts.values())}
+    if controller is not None:
+        report["admission"] = controller.stats()
+        controller.close()
+    return report
+
+
+def _bench_process(args: Tuple) -> Dict[str, Any]:
+    return _bench_load(*args)
+
+
+def benchmark(duration_s: float = 10, threads: int = 16, rpm: float = 600, tpm: float = 24000,
+              latency_ms: float = 20) -> Dict[str, Any]:
+    """Drive a stand-in server that enforces RPM and TPM with 429s, with and without admission control
+
+    Requests ask for max_tokens=200 but use 60 tokens, so only settled estimates can use the TPM limit.
+
+    Args:
+        duration_s (float): Length of each run
+        threads (int): Client threads (per process in the two-process runs)
+        rpm (float): Server request limit (enforced over a 6 s sliding window)
+        tpm (float): Server token limit (enforced over a 6 s sliding window)
+        latency_ms (float): Stand-in latency of each chat
+
+    Returns:
+        Dict[str, Any]: Per run: successful chats per second, 429s, and the controller's report
+    """
+    import multiprocessing
+    import tempfile
+
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+
+    config_path = write_offline_oci_config()
+    window_s = 6
+    server_config = {
+        "latency_ms": {"inference_chat": {"mean": latency_ms, "jitter": latency_ms / 4}},
+        "quota": {"window_s": window_s, "requests": int(rpm * window_s / 60), "tokens": int(tpm * window_s / 60)},
+    }
+    limits = {"*": QuotaLimit(rpm=rpm, tpm=tpm)}
+    # The stand-in reports 20 prompt and 40 completion tokens per chat
+    tokens_per_chat = 60
+    report: Dict[str, Any] = {"limit": {"rpm": rpm, "tpm": tpm,
+                                        "max_ok_per_s": round(min(rpm / 60, tpm / 60 / tokens_per_chat), 2)}}
+    with MockGenAIServer(config=server_config) as server:
+        def run(label: str, *args: Any, **kwargs: Any) -> None:
+            time.sleep(window_s)  # let the server window drain between runs
+            report[label] = _bench_load(server.url, config_path, *args, **kwargs)
+
+        run("uncontrolled", None, None, threads, duration_s)
+        run("admitted", limits, None, threads, duration_s)
+        # A batch backlog on most threads, and a few interactive users pausing between requests
+        run("batch_and_interactive", limits, None, threads, duration_s,
+            priorities=["batch"] * (threads - 2) + ["interactive"] * 2, pause_s={"interactive": 0.5})
+
+        # Two worker processes: per-process buckets each think they own the whole quota, a shared store does not
+        store_path = os.path.join(tempfile.mkdtemp(prefix="admission-"), "buckets.sqlite3")
+        context = multiprocessing.get_context("spawn")
+        for label, path in (("two_processes_separate_buckets", None), ("two_processes_shared_store", store_path)):
+            time.sleep(window_s)
+            with context.Pool(2) as pool:
+                results = pool.map(_bench_process, [(server.url, config_path, limits, path, threads // 2, duration_s)] * 2)
+            report[label] = {"ok_per_s": round(sum(result["ok_per_s"] for result in results), 2),
+                             "throttled_429": sum(result["throttled_429"] for result in results)}
+        report["server"] = server.state.stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RPM/TPM admission control for GenAI inference and agent endpoints.")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark against a stand-in server")
+    parser.add_argument("--duration", type=float, default=10, help="bench: seconds per run")
+    parser.add_argument("--threads", type=int, default=16, help="bench: client threads")
+    parser.add_argument("--rpm", type=float, default=600, help="bench: server requests per minute")
+    parser.add_argument("--tpm", type=float, default=24000, help="bench: server tokens per minute")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(json.dumps(benchmark(args.duration, args.threads, args.rpm, args.tpm), indent=2))
+        return
+    parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,668 @@
+"""
+agent_gateway.py - Asyncio-native agent runs and an HTTP gateway with backpressure
+
+01_weather_agent.py suggests embedding `agent.run()` in a web app or bot, but `Agent.run` blocks: a
+conversation holds a thread for its whole multi-step run, including the ADK's fixed 2 s pause before
+every follow-up chat. `run_agent_async` runs the same loop on asyncio. Only the blocking chat calls
+and local tools borrow a worker thread, and the pauses are `asyncio.sleep`, so a small thread budget
+serves thousands of concurrent conversations. `AgentGateway` serves a registry of agents over HTTP on top of it.
+
+Features:
+- `run_agent_async(agent, input, ...)`: same arguments, hooks and RunResponse as `Agent.run`; local
+  tools of one step run concurrently on the worker pool (see parallel_tools.py).
+- Registry of named agents (weather, support, calculator by default), each with its endpoint's
+  concurrency limit. A conversation id maps to a session per agent, and turns of one conversation run in order.
+  A run without a conversation id is one-off: its session is deleted when it finishes.
+- Backpressure: beyond an endpoint's limit, requests wait in a bounded queue; when the queue is full
+  (or the wait exceeds queue_timeout_s) the gateway answers 503 with Retry-After at once instead of
+  queuing without bound. A turn takes its endpoint slot before it waits for the conversation's previous
+  turn, so every waiting request counts toward the limit or the queue.
+- Stats: in flight, queued, rejected, queue wait and run latency per agent, and busy worker threads.
+
+HTTP API:
+    POST   /v1/agents/{agent}/runs                         {"input": "...", "conversation_id": "...", "max_steps": 10}
+    DELETE /v1/agents/{agent}/conversations/{conversation_id}
+    GET    /v1/stats
+    GET    /healthz
+
+Usage:
+- python agent_gateway.py --port 8080 --workers 32 --endpoint-concurrency 64 --max-queue 256
+- python agent_gateway.py --bench --conversations 1000 compares thread-per-run agent.run and the gateway.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from agent_metrics import ADK_STEP_SLEEP_SECONDS
+from parallel_tools import ParallelToolRunner
+from perf_stats import summarize_latencies
+
+# name -> agent settings; endpoint ids default to OCI_AI_<NAME>_AGENT_ENDPOINT_ID, then OCI_AI_AGENT_ENDPOINT_ID
+DEFAULT_AGENTS: Dict[str, Dict[str, Any]] = {
+    "weather": {
+        "instructions": "You perform weather queries using tools.",
+        "tools": ["weather"],
+    },
+    "support": {
+        "instructions": "Answer question using the OCI RAG tool.",
+        "tools": ["support_rag"],
+    },
+    "calculator": {
+        "instructions": "You perform calculations using tools provided.",
+        "tools": ["calculator"],
+    },
+}
+
+
+def _support_rag_tool() -> Any:
+    from oci.addons.adk.tool.prebuilt import AgenticRagTool
+
+    return AgenticRagTool(
+        name="OCI RAG tool",
+        description="If question is related to OCI - Use this tool to answer questions about Oracle Cloud Infrastructure (OCI).",
+        knowledge_base_ids=[os.getenv("OCI_AI_KNOWLEDGE_BASE_ID")],
+    )
+
+
+# Tool names usable in DEFAULT_AGENTS, besides load_test.TOOL_SPECS shortcuts and "module:attribute" paths
+GATEWAY_TOOLS: Dict[str, Callable[[], Any]] = {
+    "weather": lambda: _load_tool("01_weather_agent:get_weather"),
+    "support_rag": _support_rag_tool,
+}
+
+
+def _load_tool(spec: str) -> Any:
+    from load_test import load_tool
+
+    return GATEWAY_TOOLS[spec]() if spec in GATEWAY_TOOLS else load_tool(spec)
+
+
+def build_agents(specs: Optional[Dict[str, Dict[str, Any]]] = None, client: Optional[Any] = None) -> Dict[str, Any]:
+    """Create and set up the registry's agents on one shared AgentClient
+
+    Args:
+        specs (Optional[Dict[str, Dict[str, Any]]]): name -> {"instructions", "tools", "agent_endpoint_id"}
+        client (Optional[Any]): AgentClient, defaults to client_pool.get_agent_client()
+
+    Returns:
+        Dict[str, Any]: name -> Agent
+    """
+    from oci.addons.adk import Agent
+
+    from client_pool import get_agent_client
+
+    client = client or get_agent_client()
+    agents = {}
+    for name, spec in (specs or DEFAULT_AGENTS).items():
+        endpoint_id = spec.get("agent_endpoint_id") or os.getenv(f"OCI_AI_{name.upper()}_AGENT_ENDPOINT_ID") \
+            or os.getenv("OCI_AI_AGENT_ENDPOINT_ID")
+        agent = Agent(client=client, agent_endpoint_id=endpoint_id, name=name,
+                      instructions=spec.get("instructions", "You are a helpful assistant"),
+                      tools=[_load_tool(tool) for tool in spec.get("tools", [])])
+        agent.setup()
+        agents[name] = agent
+    return agents
+
+
+async def run_agent_async(agent: Any, input: str, session_id: Optional[str] = None, max_steps: int = 10,
+                          executor: Optional[ThreadPoolExecutor] = None, tool_runner: Optional[ParallelToolRunner] = None,
+                          step_pause_s: float = ADK_STEP_SLEEP_SECONDS, on_fulfilled_required_action: Optional[Callable] = None,
+                          on_invoked_remote_service: Optional[Callable] = None) -> Any:
+    """Agent.run on asyncio: blocking calls go to executor, the pause between steps does not hold a thread
+
+    Args:
+        agent (Any): An ADK Agent (setup() already done)
+        input (str): The user message
+        session_id (Optional[str]): Continue this session; a new one is created otherwise
+        max_steps (int): Maximum number of tool round trips
+        executor (Optional[ThreadPoolExecutor]): Threads for chat calls and tools, defaults to the loop's
+        tool_runner (Optional[ParallelToolRunner]): Runs the local tools of a step, defaults to one on executor
+        step_pause_s (float): Pause before each follow-up chat, like Agent.run's
+        on_fulfilled_required_action (Optional[Callable]): Same hook as Agent.run
+        on_invoked_remote_service (Optional[Callable]): Same hook as Agent.run
+
+    Returns:
+        RunResponse: Same as Agent.run
+    """
+    from oci.addons.adk.run.response import RunResponse
+    from oci.addons.adk.run.types import RawResponse
+
+    loop = asyncio.get_running_loop()
+    tool_runner = tool_runner or ParallelToolRunner(executor=executor, log_calls=False)
+
+    def blocking(call: Callable[[], Any]) -> "asyncio.Future":
+        return loop.run_in_executor(executor, call)
+
+    if session_id is None:
+        session_id = await blocking(agent.create_session)
+    response = await blocking(lambda: agent._handle_chat(
+        user_message=input, session_id=session_id, on_invoked_remote_service=on_invoked_remote_service))
+    raw_responses = [RawResponse(raw_data=response)]
+    steps = 0
+    while agent._has_required_actions(response) and steps < max_steps:
+        performed_actions = await tool_runner.perform(agent, response, on_fulfilled_required_action)
+        if step_pause_s:
+            await asyncio.sleep(step_pause_s)
+        # Same placeholder user message that Agent.run sends with performed actions
+        response = await blocking(lambda: agent._handle_chat(
+            user_message="null", session_id=session_id, performed_actions=performed_actions,
+            on_invoked_remote_service=on_invoked_remote_service))
+        raw_responses.append(RawResponse(raw_data=response))
+        steps += 1
+    return RunResponse(session_id=session_id, data=response, raw_responses=raw_responses)
+
+
+class GatewayOverloadedError(Exception):
+    """The endpoint's queue is full or the wait for a slot timed out; maps to HTTP 503"""
+
+    def __init__(self, agent: str, reason: str, retry_after_s: float):
+        super().__init__(f"Agent '{agent}' overloaded: {reason}")
+        self.agent = agent
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class UnknownAgentError(KeyError):
+    """No agent of that name is registered; maps to HTTP 404"""
+
+
+class _EndpointLimiter:
+    """Concurrency limit with a bounded wait queue for one agent endpoint"""
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout_s: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+
+    async def acquire(self, agent: str) -> None:
+        if not self.semaphore.locked():
+            # A free slot is taken without yielding, so a burst cannot overshoot the queue check below
+            await self.semaphore.acquire()
+            self.in_flight += 1
+            return
+        if self.waiting >= self.max_queue:
+            raise GatewayOverloadedError(agent, "queue full", self.queue_timeout_s)
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            raise GatewayOverloadedError(agent, "queue timeout", self.queue_timeout_s) from None
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self.semaphore.release()
+
+
+class AgentGateway:
+    """Runs registered agents on asyncio with per-endpoint limits and queue-depth backpressure"""
+
+    def __init__(self, agents: Dict[str, Any], workers: int = 32, endpoint_concurrency: Any = 64,
+                 max_queue: int = 256, queue_timeout_s: float = 30, step_pause_s: float = ADK_STEP_SLEEP_SECONDS,
+                 max_conversations: int = 10000, latency_window: int = 10000):
+        """
+        Args:
+            agents (Dict[str, Any]): name -> Agent (set up)
+            workers (int): Threads for blocking chat calls and local tools, shared by all agents
+            endpoint_concurrency (Any): Concurrent runs per agent endpoint, an int or a dict by endpoint id
+            max_queue (int): Runs that may wait for a slot per endpoint before new ones get 503
+            queue_timeout_s (float): Longest wait for a slot before a 503
+            step_pause_s (float): Pause before follow-up chats (Agent.run uses 2 s)
+            max_conversations (int): Conversation -> session mappings kept; the oldest are ended beyond it
+            latency_window (int): Latency samples kept per agent for stats
+        """
+        self.agents = agents
+        self.workers = workers
+        self.step_pause_s = step_pause_s
+        self.max_conversations = max_conversations
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent-gateway")
+        self._counting_executor = _CountingExecutor(self)
+        self.tool_runner = ParallelToolRunner(executor=self._counting_executor, log_calls=False)
+        self._endpoint_concurrency = endpoint_concurrency
+        self._max_queue = max_queue
+        self._queue_timeout_s = queue_timeout_s
+        # Created on first use, inside the serving loop
+        self._limiters: Dict[str, _EndpointLimiter] = {}
+        # (agent, conversation id) -> [session id or None, lock serializing the conversation's turns]
+        self._conversations: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self._queue_s: Dict[str, Deque[float]] = {name: deque(maxlen=latency_window) for name in agents}
+        self._run_s: Dict[str, Deque[float]] = {name: deque(maxlen=latency_window) for name in agents}
+        self.counters: Dict[str, Dict[str, int]] = {
+            name: {"runs": 0, "completed": 0, "errors": 0, "rejected": 0, "timeouts": 0} for name in agents
+        }
+        self._started = time.monotonic()
+
+    async def run(self, agent_name: str, input: str, conversation_id: Optional[str] = None,
+                  max_steps: int = 10) -> Dict[str, Any]:
+        """Run one turn, continuing the conversation's session if it has one
+
+        Args:
+            agent_name (str): Registered agent
+            input (str): The user message
+            conversation_id (Optional[str]): Turns with the same id share a session; None for a one-off
+                run, whose session is deleted afterwards, whether it succeeded or not
+            max_steps (int): Maximum number of tool round trips
+
+        Returns:
+            Dict[str, Any]: output, conversation_id (None for a one-off run), session_id, steps, queue_ms and run_ms
+
+        Raises:
+            UnknownAgentError: No such agent
+            GatewayOverloadedError: The endpoint's queue is full or the wait timed out
+        """
+        agent = self.agents.get(agent_name)
+        if agent is None:
+            raise UnknownAgentError(agent_name)
+        counters = self.counters[agent_name]
+        counters["runs"] += 1
+        limiter = self._limiter(agent)
+        queued = time.perf_counter()
+        # Admission first: rejected requests never touch the conversation table, and a turn waiting for
+        # its conversation's previous turn holds a slot, so it is bounded by the limit like any other run
+        try:
+            await limiter.acquire(agent_name)
+        except GatewayOverloadedError as e:
+            counters["timeouts" if e.reason == "queue timeout" else "rejected"] += 1
+            raise
+        try:
+            entry = self._conversation(agent_name, conversation_id) if conversation_id else [None, asyncio.Lock()]
+            async with entry[1]:
+                started = time.perf_counter()
+                try:
+                    if entry[0] is None:
+                        # Created here rather than in run_agent_async, so a turn that fails later still
+                        # leaves its session known: kept by the conversation, or deleted below
+                        entry[0] = await asyncio.get_running_loop().run_in_executor(self._counting_executor,
+                                                                                   agent.create_session)
+                    response = await run_agent_async(agent, input, session_id=entry[0], max_steps=max_steps,
+                                                     executor=self._counting_executor, tool_runner=self.tool_runner,
+                                                     step_pause_s=self.step_pause_s)
+                except Exception:
+                    counters["errors"] += 1
+                    raise
+                finally:
+                    if not conversation_id and entry[0] is not None:
+                        self.executor.submit(agent.delete_session, entry[0])
+        finally:
+            limiter.release()
+        finished = time.perf_counter()
+        counters["completed"] += 1
+        self._queue_s[agent_name].append(started - queued)
+        self._run_s[agent_name].append(finished - started)
+        return {
+            "output": response.final_output,
+            "conversation_id": conversation_id,
+            "session_id": response.session_id,
+            "steps": len(response.raw_responses) - 1,
+            "queue_ms": round((started - queued) * 1000, 1),
+            "run_ms": round((finished - started) * 1000, 1),
+        }
+
+    async def end_conversation(self, agent_name: str, conversation_id: str) -> bool:
+        """Forget a conversation and delete its session
+
+        Returns:
+            bool: Whether the conversation existed
+        """
+        entry = self._conversations.pop((agent_name, conversation_id), None)
+        if entry is None:
+            return False
+        if entry[0] is not None:
+            agent = self.agents[agent_name]
+            await asyncio.get_running_loop().run_in_executor(self.executor, agent.delete_session, entry[0])
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        agents = {}
+        for name, agent in self.agents.items():
+            limiter = self._limiters.get(agent.agent_endpoint_id)
+            agents[name] = dict(self.counters[name])
+            agents[name].update({
+                "endpoint": agent.agent_endpoint_id,
+                "in_flight": limiter.in_flight if limiter else 0,
+                "queued": limiter.waiting if limiter else 0,
+                "max_queued": limiter.max_waiting if limiter else 0,
+                "limit": limiter.limit if limiter else self._limit_for(agent.agent_endpoint_id),
+                "queue_s": summarize_latencies(self._queue_s[name]),
+                "run_s": summarize_latencies(self._run_s[name]),
+            })
+        return {
+            "uptime_s": round(time.monotonic() - self._started, 1),
+            "workers": self.workers,
+            "workers_busy": self._busy,
+            "conversations": len(self._conversations),
+            "agents": agents,
+        }
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080, backlog: int = 4096) -> asyncio.AbstractServer:
+        """Start the HTTP server on the running loop
+
+        The accept backlog must cover connection bursts: connections beyond it wait for a SYN
+        retransmit (1 s or more) before the gateway even sees them, which would defeat fast 503s.
+        """
+        return await asyncio.start_server(self._handle_connection, host, port, limit=1024 * 1024, backlog=backlog)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    def _limit_for(self, endpoint_id: str) -> int:
+        if isinstance(self._endpoint_concurrency, dict):
+            return self._endpoint_concurrency.get(endpoint_id, 64)
+        return self._endpoint_concurrency
+
+    def _limiter(self, agent: Any) -> _EndpointLimiter:
+        # Agents sharing an endpoint share its limit
+        limiter = self._limiters.get(agent.agent_endpoint_id)
+        if limiter is None:
+            limiter = self._limiters[agent.agent_endpoint_id] = _EndpointLimiter(
+                self._limit_for(agent.agent_endpoint_id), self._max_queue, self._queue_timeout_s)
+        return limiter
+
+    def _conversation(self, agent_name: str, conversation_id: str) -> list:
+        key = (agent_name, conversation_id)
+        entry = self._conversations.get(key)
+        if entry is None:
+            entry = self._conversations[key] = [None, asyncio.Lock()]
+            while len(self._conversations) > self.max_conversations:
+                (old_agent, _), (session_id, lock) = self._conversations.popitem(last=False)
+                # A conversation mid-turn keeps running; its session is left to expire server-side
+                if session_id is not None and not lock.locked():
+                    self.executor.submit(self.agents[old_agent].delete_session, session_id)
+        self._conversations.move_to_end(key)
+        return entry
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    _write_response(writer, 400, {"code": "InvalidParameter", "message": f"Malformed request: {e}"},
+                                    {}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload, extra_headers = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, extra_headers, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        try:
+            if method == "GET" and parts == ["healthz"]:
+                return 200, {"status": "ok"}, {}
+            if method == "GET" and parts == ["v1", "stats"]:
+                return 200, self.stats(), {}
+            if method == "POST" and len(parts) == 4 and parts[:2] == ["v1", "agents"] and parts[3] == "runs":
+                try:
+                    request = json.loads(body or b"{}")
+                    input = request["input"]
+                except (ValueError, KeyError, TypeError):
+                    return 400, {"code": "InvalidParameter", "message": "Body must be JSON with an 'input' string"}, {}
+                result = await self.run(parts[2], input, request.get("conversation_id"),
+                                        int(request.get("max_steps", 10)))
+                return 200, result, {}
+            if method == "DELETE" and len(parts) == 5 and parts[:2] == ["v1", "agents"] and parts[3] == "conversations":
+                if parts[2] not in self.agents:
+                    raise UnknownAgentError(parts[2])
+                found = await self.end_conversation(parts[2], parts[4])
+                return (204, None, {}) if found else (404, {"code": "NotFound", "message": "No such conversation"}, {})
+            return 404, {"code": "NotFound", "message": f"No route for {method} {path}"}, {}
+        except UnknownAgentError as e:
+            return 404, {"code": "NotFound", "message": f"No agent named {e.args[0]!r}"}, {}
+        except GatewayOverloadedError as e:
+            return 503, {"code": "Overloaded", "message": str(e)}, {"Retry-After": str(max(int(e.retry_after_s), 1))}
+        except Exception as e:
+            return 502, {"code": "AgentError", "message": f"{type(e).__name__}: {e}"}, {}
+
+
+class _CountingExecutor:
+    """Passes work to the gateway's executor while counting busy workers"""
+
+    def __init__(self, gateway: AgentGateway):
+        self.gateway = gateway
+
+    def submit(self, fn: Callable, *args: Any) -> Any:
+        gateway = self.gateway
+
+        def counted() -> Any:
+            with gateway._busy_lock:
+                gateway._busy += 1
+            try:
+                return fn(*args)
+            finally:
+                with gateway._busy_lock:
+                    gateway._busy -= 1
+
+        return gateway.executor.submit(counted)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.gateway.executor, name)
+
+
+_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 502: "Bad Gateway",
+            503: "Service Unavailable"}
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    if reader.at_eof():
+        return None
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    request_line = lines[0].split(" ")
+    if len(request_line) != 3:
+        raise ValueError(f"bad request line {lines[0]!r}")
+    method, path, _ = request_line
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise ValueError(f"bad Content-Length {headers['content-length']!r}") from None
+    if length < 0:
+        raise ValueError(f"bad Content-Length {length}")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any, headers: Dict[str, str],
+                    keep_alive: bool) -> None:
+    data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}", "Content-Type: application/json",
+             f"Content-Length: {len(data)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+
+
+async def _post_json(host: str, port: int, path: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    # Minimal client for the benchmark: one request per connection
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        raw = await reader.read()
+        return int(status_line.split()[1]), json.loads(raw.split(b"\r\n\r\n", 1)[1] or b"null")
+    finally:
+        writer.close()
+
+
+def benchmark(conversations: int = 1000, workers: int = 32, agent_latency_ms: float = 100,
+              endpoint_concurrency: int = 2000) -> Dict[str, Any]:
+    """Serve calculator conversations (one tool step each) from a stand-in agent, threaded vs gateway
+
+    The threaded baseline runs agent.run on `workers` threads, like a thread-per-request web app.
+    The gateway gets the same number of threads. A final burst against a small endpoint limit shows 503 backpressure.
+
+    Args:
+        conversations (int): Concurrent conversations, all submitted at once
+        workers (int): Thread budget in both modes
+        agent_latency_ms (float): Stand-in latency of each agent chat
+        endpoint_concurrency (int): Gateway limit for the endpoint
+
+    Returns:
+        Dict[str, Any]: Throughput and latency per mode, and the backpressure burst result
+    """
+    from oci.addons.adk import Agent
+    from oci.addons.adk.logger import default_logger
+    from oci.addons.adk.tool.prebuilt import CalculatorToolkit
+
+    from client_pool import get_agent_client
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+
+    default_logger.console.quiet = True
+    config_path = write_offline_oci_config()
+    server_config = {
+        "latency_ms": {"agent_chat": {"mean": agent_latency_ms, "jitter": agent_latency_ms / 4},
+                       "session": {"mean": agent_latency_ms / 4, "jitter": 0}},
+        "tool_calls": [{"match": "square root", "steps": [[{"name": "sqrt", "arguments": {"number": 256}}]]}],
+    }
+    report: Dict[str, Any] = {"conversations": conversations, "workers": workers}
+    with MockGenAIServer(config=server_config) as server:
+        client = get_agent_client(profile="DEFAULT", config_path=config_path, runtime_endpoint=server.url,
+                                  management_endpoint=server.url, pool_size=workers * 2)
+        agent = Agent(client=client, agent_endpoint_id="ocid1.genaiagentendpoint.oc1..standin", name="calculator",
+                      instructions="You perform calculations using tools provided.", tools=[CalculatorToolkit()])
+        agent.setup()
+        questions = [f"What is the square root of {n * n}?" for n in range(conversations)]
+
+        # Thread per run, as when agent.run is called from a threaded web framework; all runs are
+        # submitted at once, so latency counts from the start
+        def threaded(question: str) -> float:
+            try:
+                asyncio.get_event_loop()
+            except RuntimeError:
+                asyncio.set_event_loop(asyncio.new_event_loop())
+            agent.run(question, max_steps=3)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(threaded, questions))
+        elapsed = time.perf_counter() - started
+        report["threaded"] = _mode_report(elapsed, latencies, conversations)
+
+        async def through_gateway(limit: int, queue: int, count: int) -> Tuple[float, List[Tuple[int, float]], Dict]:
+            gateway = AgentGateway({"calculator": agent}, workers=workers, endpoint_concurrency=limit, max_queue=queue)
+            server_ = await gateway.serve("127.0.0.1", 0)
+            port = server_.sockets[0].getsockname()[1]
+
+            async def one(question: str) -> Tuple[int, float]:
+                submitted = time.perf_counter()
+                status, _ = await _post_json("127.0.0.1", port, "/v1/agents/calculator/runs", {"input": question, "max_steps": 3})
+                return status, time.perf_counter() - submitted
+
+            started_ = time.perf_counter()
+            results = await asyncio.gather(*(one(question) for question in questions[:count]))
+            elapsed_ = time.perf_counter() - started_
+            stats = gateway.stats()
+            server_.close()
+            await server_.wait_closed()
+            gateway.close()
+            return elapsed_, results, stats
+
+        elapsed, results, stats = asyncio.run(through_gateway(endpoint_concurrency, conversations, conversations))
+        report["gateway"] = _mode_report(elapsed, [latency for status, latency in results if status == 200], conversations)
+        report["gateway"]["errors"] = sum(status != 200 for status, _ in results)
+
+        # Backpressure: 4x more concurrent conversations than the endpoint limit plus queue
+        limit, queue = 64, 64
+        burst = min(conversations, (limit + queue) * 4)
+        elapsed, results, stats = asyncio.run(through_gateway(limit, queue, burst))
+        rejected = [latency for status, latency in results if status == 503]
+        report["backpressure"] = {
+            "requests": burst,
+            "endpoint_limit": limit,
+            "max_queue": queue,
+            "ok": sum(status == 200 for status, _ in results),
+            "rejected_503": len(rejected),
+            "rejected_latency_ms_p99": round(summarize_latencies(rejected)["p99"] * 1000, 1),
+            "max_queued": stats["agents"]["calculator"]["max_queued"],
+        }
+    return report
+
+
+def _mode_report(elapsed: float, latencies: List[float], conversations: int) -> Dict[str, Any]:
+    summary = summarize_latencies(latencies)
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "runs_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "completed": len(latencies),
+        "latency_s": {key: round(value, 3) for key, value in summary.items() if key != "count"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio HTTP gateway for ADK agents.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=32, help="Threads for chat calls and tools")
+    parser.add_argument("--endpoint-concurrency", type=int, default=64, help="Concurrent runs per agent endpoint")
+    parser.add_argument("--max-queue", type=int, default=256, help="Runs waiting per endpoint before 503s")
+    parser.add_argument("--queue-timeout", type=float, default=30, help="Longest wait for a slot before a 503")
+    parser.add_argument("--agents", default=",".join(DEFAULT_AGENTS), help="Comma-separated agents to serve")
+    parser.add_argument("--verbose", action="store_true", help="Keep the ADK's console logging")
+    parser.add_argument("--bench", action="store_true", help="Compare thread-per-run and the gateway on a stand-in agent")
+    parser.add_argument("--conversations", type=int, default=1000, help="bench: concurrent conversations")
+    args = parser.parse_args()
+
+    from oci.addons.adk.logger import default_logger
+
+    default_logger.console.quiet = not args.verbose
+    if args.bench:
+        print(json.dumps(benchmark(args.conversations, args.workers), indent=2))
+        return
+
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+    agents = build_agents({name: DEFAULT_AGENTS[name] for name in args.agents.split(",")})
+    gateway = AgentGateway(agents, workers=args.workers, endpoint_concurrency=args.endpoint_concurrency,
+                           max_queue=args.max_queue, queue_timeout_s=args.queue_timeout)
+
+    async def serve() -> None:
+        server = await gateway.serve(args.host, args.port)
+        print(f"Serving {', '.join(agents)} on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.close()
+
+
+if __name__ == "__main__":
+    main()
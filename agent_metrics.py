@@ -0,0 +1,430 @@
+"""
+agent_metrics.py - Always-on metrics for agent runs, built on the ADK lifecycle hooks
+
+07_lifecycle_hook.py shows where `on_fulfilled_required_action` and `on_invoked_remote_service` plug in,
+but leaves them empty. This module fills them in to show where the time goes inside `agent.run`.
+
+Features:
+- Per-step remote chat latency, local tool execution time per tool name, session creation time and total run time.
+- Steps used against `max_steps` (runs that hit the limit are counted separately) and token usage
+  reported in the response traces.
+- Fixed-bucket histograms and counters, exported as Prometheus text (`render_prometheus`, `start_http_server`).
+- Optional JSONL trace file with one line per run listing every remote call and tool call.
+- Hooks only take timestamps; aggregation happens once per run (`python agent_metrics.py --bench` measures it).
+
+Usage:
+    metrics = MetricsCollector(trace_path="agent_runs.jsonl")
+    response = metrics.run(agent, "What's the square root of 475695037565?", max_steps=6)
+    print(metrics.render_prometheus())
+
+  Or pass the hooks yourself:
+    run = metrics.start_run(agent.name, max_steps=6)
+    response = agent.run(input, max_steps=6, **run.hooks())
+    run.finish(response)
+"""
+
+import argparse
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STEP_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+# Agent.run sleeps this long before each follow-up chat call carrying performed actions
+ADK_STEP_SLEEP_SECONDS = 2.0
+
+OUTCOME_OK = "ok"
+OUTCOME_MAX_STEPS = "max_steps"
+OUTCOME_ERROR = "error"
+
+# name -> (type, help, buckets)
+METRICS = {
+    "agent_remote_call_seconds": ("histogram", "Latency of one agent chat call", DEFAULT_LATENCY_BUCKETS),
+    "agent_tool_seconds": ("histogram", "Execution time of one local function tool call", DEFAULT_LATENCY_BUCKETS),
+    "agent_session_create_seconds": ("histogram", "Latency of creating an agent session", DEFAULT_LATENCY_BUCKETS),
+    "agent_run_seconds": ("histogram", "Wall time of one agent run", DEFAULT_LATENCY_BUCKETS),
+    "agent_run_steps": ("histogram", "Tool round trips used by one agent run", STEP_BUCKETS),
+    "agent_runs_total": ("counter", "Agent runs by outcome", None),
+    "agent_tool_calls_total": ("counter", "Local function tool calls", None),
+    "agent_tokens_total": ("counter", "Tokens reported in agent response traces", None),
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a binary search and two additions"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs including +Inf, as Prometheus expects"""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            pairs.append((_format_number(bound), running))
+        pairs.append(("+Inf", running + self.counts[-1]))
+        return pairs
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _token_usage(response: Any) -> Tuple[int, int]:
+    # Usage is only reported inside planning/generation/retrieval traces (when tracing is enabled)
+    input_tokens = output_tokens = 0
+    if not isinstance(response, dict):
+        return 0, 0
+    for trace in response.get("traces") or []:
+        for usage in (trace or {}).get("usage") or []:
+            details = (usage or {}).get("usage_details") or {}
+            input_tokens += details.get("input_token_count") or 0
+            output_tokens += details.get("output_token_count") or 0
+    return input_tokens, output_tokens
+
+
+class RunRecorder:
+    """Timestamps of one agent run; pass hooks() to agent.run and call finish() afterwards"""
+
+    def __init__(self, collector: "MetricsCollector", agent_name: str, max_steps: int,
+                 on_fulfilled_required_action: Optional[Callable] = None,
+                 on_invoked_remote_service: Optional[Callable] = None):
+        self.collector = collector
+        self.agent_name = agent_name
+        self.max_steps = max_steps
+        self.user_on_fulfilled_required_action = on_fulfilled_required_action
+        self.user_on_invoked_remote_service = on_invoked_remote_service
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.session_create_s: Optional[float] = None
+        # (kind, name, step, seconds); kind is "remote" or "tool"
+        self.events: List[Tuple[str, Optional[str], int, float]] = []
+        self.remote_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.pending_actions = False
+        self.last_response: Any = None
+        self._mark = self.started
+
+    def mark(self) -> None:
+        """Restart the clock, e.g. after creating the session outside the run"""
+        self._mark = time.perf_counter()
+
+    def on_fulfilled_required_action(self, required_action: Any, performed_action: Any) -> None:
+        now = time.perf_counter()
+        function_call = getattr(required_action, "function_call", None)
+        name = getattr(function_call, "name", None) or "unknown"
+        self.events.append(("tool", name, self.remote_calls, now - self._mark))
+        self.pending_actions = True
+        if self.user_on_fulfilled_required_action:
+            self.user_on_fulfilled_required_action(required_action, performed_action)
+        # User hook time must not count as tool or remote time
+        self._mark = time.perf_counter()
+
+    def on_invoked_remote_service(self, chat_request: Dict[str, Any], chat_response: Any) -> None:
+        now = time.perf_counter()
+        elapsed = now - self._mark
+        if self.pending_actions:
+            # Agent.run slept before this call; that is neither remote nor local work
+            elapsed = max(elapsed - self.collector.step_sleep_seconds, 0.0)
+            self.pending_actions = False
+        self.events.append(("remote", None, self.remote_calls, elapsed))
+        self.remote_calls += 1
+        input_tokens, output_tokens = _token_usage(chat_response)
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.last_response = chat_response
+        if self.user_on_invoked_remote_service:
+            self.user_on_invoked_remote_service(chat_request, chat_response)
+        self._mark = time.perf_counter()
+
+    def hooks(self) -> Dict[str, Callable]:
+        """Keyword arguments for agent.run"""
+        return {
+            "on_fulfilled_required_action": self.on_fulfilled_required_action,
+            "on_invoked_remote_service": self.on_invoked_remote_service,
+        }
+
+    def finish(self, response: Any = None, error: Optional[BaseException] = None) -> Dict[str, Any]:
+        """Aggregate the run into the collector's metrics and trace file
+
+        Args:
+            response (Any): The RunResponse, if the run completed
+            error (Optional[BaseException]): The exception, if the run failed
+
+        Returns:
+            Dict[str, Any]: The trace record of the run
+        """
+        total = time.perf_counter() - self.started
+        steps = max(self.remote_calls - 1, 0)
+        if error is not None:
+            outcome = OUTCOME_ERROR
+        elif steps >= self.max_steps and (self.last_response or {}).get("required_actions"):
+            outcome = OUTCOME_MAX_STEPS
+        else:
+            outcome = OUTCOME_OK
+        record = {
+            "ts": self.started_wall,
+            "agent": self.agent_name,
+            "session_id": getattr(response, "session_id", None),
+            "outcome": outcome,
+            "error": repr(error) if error is not None else None,
+            "steps": steps,
+            "max_steps": self.max_steps,
+            "total_s": round(total, 6),
+            "session_create_s": round(self.session_create_s, 6) if self.session_create_s is not None else None,
+            "tokens": {"input": self.input_tokens, "output": self.output_tokens},
+            "events": [
+                {"type": kind, "name": name, "step": step, "s": round(seconds, 6)}
+                for kind, name, step, seconds in self.events
+            ],
+        }
+        self.collector._record(self, outcome, steps, total, record)
+        return record
+
+
+class MetricsCollector:
+    """Thread-safe histograms and counters for agent runs, with Prometheus and JSONL export"""
+
+    def __init__(self, trace_path: Optional[str] = None, step_sleep_seconds: float = ADK_STEP_SLEEP_SECONDS):
+        """
+        Args:
+            trace_path (Optional[str]): Append one JSON line per run to this file
+            step_sleep_seconds (float): Sleep Agent.run inserts before each follow-up call, excluded from
+                remote latency (0 for runners that do not sleep, e.g. streaming.AgentRunStream)
+        """
+        self.step_sleep_seconds = step_sleep_seconds
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._trace_file = open(trace_path, "a", encoding="utf-8") if trace_path else None
+
+    def start_run(self, agent_name: Optional[str], max_steps: int = 10,
+                  on_fulfilled_required_action: Optional[Callable] = None,
+                  on_invoked_remote_service: Optional[Callable] = None) -> RunRecorder:
+        """Start recording a run
+
+        Args:
+            agent_name (Optional[str]): Label for the metrics
+            max_steps (int): The max_steps passed to agent.run
+            on_fulfilled_required_action (Optional[Callable]): Your own hook, called after recording
+            on_invoked_remote_service (Optional[Callable]): Your own hook, called after recording
+
+        Returns:
+            RunRecorder: Recorder whose hooks() go to agent.run
+        """
+        return RunRecorder(self, agent_name or "agent", max_steps, on_fulfilled_required_action,
+                           on_invoked_remote_service)
+
+    def run(self, agent: Any, input: str, session_id: Optional[str] = None, max_steps: int = 10,
+            on_fulfilled_required_action: Optional[Callable] = None,
+            on_invoked_remote_service: Optional[Callable] = None, **kwargs: Any) -> Any:
+        """agent.run with metrics; same arguments and return value
+
+        Args:
+            agent (Any): An ADK Agent
+            input (str): The user message
+            session_id (Optional[str]): Continue this session; a new one is created (and timed) otherwise,
+                unless agent.routes_locally(input) says the agent answers without one (FastPathAgent)
+            max_steps (int): Maximum number of tool round trips
+            on_fulfilled_required_action (Optional[Callable]): Your own hook, still called
+            on_invoked_remote_service (Optional[Callable]): Your own hook, still called
+            **kwargs: Passed to agent.run
+
+        Returns:
+            RunResponse: The agent's response
+        """
+        recorder = self.start_run(agent.name, max_steps, on_fulfilled_required_action, on_invoked_remote_service)
+        try:
+            routes_locally = getattr(agent, "routes_locally", None)
+            if session_id is None and not (routes_locally and routes_locally(input)):
+                session_id = agent.create_session()
+                recorder.session_create_s = time.perf_counter() - recorder.started
+                recorder.mark()
+            response = agent.run(input, session_id=session_id, max_steps=max_steps, **recorder.hooks(), **kwargs)
+        except Exception as e:
+            recorder.finish(error=e)
+            raise
+        recorder.finish(response)
+        return response
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        with self._lock:
+            self._observe(name, tuple(sorted(labels.items())), value)
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1) -> None:
+        with self._lock:
+            key = (name, tuple(sorted(labels.items())))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: (list(h.cumulative()), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines: List[str] = []
+        for name, (kind, help_text, _) in METRICS.items():
+            series = [key for key in histograms if key[0] == name] if kind == "histogram" else \
+                [key for key in counters if key[0] == name]
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key in sorted(series):
+                labels = key[1]
+                if kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {_format_number(counters[key])}")
+                    continue
+                buckets, total, count = histograms[key]
+                for le, cumulative in buckets:
+                    lines.append(f"{name}_bucket{_labels(labels, 'le=' + json.dumps(le))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total!r}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count, mean and sum per histogram series plus every counter, for logging"""
+        with self._lock:
+            snapshot: Dict[str, Any] = {}
+            for (name, labels), h in self._histograms.items():
+                snapshot[f"{name}{_labels(labels)}"] = {
+                    "count": h.count, "sum": h.sum, "mean": h.sum / h.count if h.count else None,
+                }
+            for (name, labels), value in self._counters.items():
+                snapshot[f"{name}{_labels(labels)}"] = value
+        return snapshot
+
+    def start_http_server(self, port: int = 9464, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Serve render_prometheus() on http://host:port/metrics from a daemon thread"""
+        collector = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = collector.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def close(self) -> None:
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+
+    def _observe(self, name: str, labels: Tuple, value: float) -> None:
+        # Caller holds the lock
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(METRICS[name][2])
+        histogram.observe(value)
+
+    def _record(self, recorder: RunRecorder, outcome: str, steps: int, total: float, record: Dict[str, Any]) -> None:
+        agent = (("agent", recorder.agent_name),)
+        line = json.dumps(record, separators=(",", ":")) + "\n" if self._trace_file is not None else None
+        with self._lock:
+            for kind, name, _, seconds in recorder.events:
+                if kind == "remote":
+                    self._observe("agent_remote_call_seconds", agent, seconds)
+                else:
+                    tool_labels = agent + (("tool", name),)
+                    self._observe("agent_tool_seconds", tool_labels, seconds)
+                    key = ("agent_tool_calls_total", tool_labels)
+                    self._counters[key] = self._counters.get(key, 0) + 1
+            if recorder.session_create_s is not None:
+                self._observe("agent_session_create_seconds", agent, recorder.session_create_s)
+            self._observe("agent_run_seconds", agent, total)
+            self._observe("agent_run_steps", agent, steps)
+            for key, value in (
+                (("agent_runs_total", agent + (("outcome", outcome),)), 1),
+                (("agent_tokens_total", agent + (("direction", "input"),)), recorder.input_tokens),
+                (("agent_tokens_total", agent + (("direction", "output"),)), recorder.output_tokens),
+            ):
+                self._counters[key] = self._counters.get(key, 0) + value
+            if line is not None and self._trace_file is not None:
+                self._trace_file.write(line)
+                self._trace_file.flush()
+
+
+def benchmark_overhead(runs: int = 20000, steps: int = 3, trace_path: Optional[str] = None) -> Dict[str, float]:
+    """Measure the collector's own cost per run, with no network involved
+
+    Args:
+        runs (int): Number of simulated runs
+        steps (int): Tool round trips per simulated run
+        trace_path (Optional[str]): Also write the JSONL trace (e.g. os.devnull)
+
+    Returns:
+        Dict[str, float]: Microseconds of overhead per run and per hook call
+    """
+    from types import SimpleNamespace
+
+    collector = MetricsCollector(trace_path=trace_path, step_sleep_seconds=0)
+    action = SimpleNamespace(function_call=SimpleNamespace(name="sqrt"))
+    response = {"required_actions": None, "traces": [
+        {"usage": [{"usage_details": {"input_token_count": 20, "output_token_count": 40}}]}
+    ]}
+    started = time.perf_counter()
+    for _ in range(runs):
+        recorder = collector.start_run("bench", max_steps=10)
+        for _ in range(steps):
+            recorder.on_invoked_remote_service({}, {"required_actions": [{}]})
+            recorder.on_fulfilled_required_action(action, None)
+        recorder.on_invoked_remote_service({}, response)
+        recorder.finish()
+    elapsed = time.perf_counter() - started
+    collector.close()
+    return {
+        "runs": runs,
+        "us_per_run": elapsed / runs * 1e6,
+        "us_per_hook": elapsed / (runs * (2 * steps + 1)) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-run overhead of MetricsCollector.")
+    parser.add_argument("--bench", action="store_true", help="Run the overhead benchmark")
+    parser.add_argument("--runs", type=int, default=20000)
+    parser.add_argument("--trace", default=None, help="Also write the JSONL trace to this path")
+    args = parser.parse_args()
+    if args.bench:
+        print(json.dumps(benchmark_overhead(args.runs, trace_path=args.trace), indent=2))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+agent_setup.py - Skip redundant Agent.setup() calls via instruction/tool fingerprinting
+
+`Agent.setup()` re-checks instructions and every tool against the remote agent on each start, even
+when nothing changed. This module fingerprints what setup() would sync and only calls it when the
+fingerprint differs from the one last synced to that endpoint.
+
+Features:
+- Fingerprint: SHA-256 over name, description, instructions and the generated tool schemas
+  (`@tool` functions, `Toolkit` subclasses such as `AccountToolkit`, agents used as tools, RAG and SQL tools).
+- Last-synced fingerprints are kept per endpoint in a local JSON file.
+- Agents that need a sync are set up concurrently; agents sharing an endpoint are synced in order.
+
+Usage:
+    setup_agents(trend_analyzer, content_writer, marketing_director)
+
+  Set AGENT_SETUP_FORCE=1 (or pass force=True) to sync regardless, e.g. after editing an agent in the console.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+DEFAULT_STATE_PATH = os.getenv("AGENT_SETUP_STATE_PATH", os.path.join(os.path.dirname(__file__), ".agent_setup_state.json"))
+
+SYNCED = "synced"
+SKIPPED = "skipped"
+
+
+def agent_fingerprint(agent: Any) -> str:
+    """Return a fingerprint of everything Agent.setup() syncs to the remote agent
+
+    Args:
+        agent (Any): An ADK Agent
+
+    Returns:
+        str: Hex SHA-256 of the agent settings and tool schemas
+    """
+    # The Agent already built these lists in its constructor (the same ones setup() syncs)
+    function_tools = sorted((tool.to_dict() for tool in agent._local_handler_functions), key=lambda t: t["name"])
+    rag_tools = sorted(
+        ({"name": tool.name, "description": tool.description, "knowledge_base_ids": sorted(tool.knowledge_base_ids)}
+         for tool in agent._local_rag_tools),
+        key=lambda t: t["name"],
+    )
+    sql_tools = sorted((repr(tool) for tool in agent._local_sql_tools))
+    settings = {
+        "name": agent.name,
+        "description": agent.description,
+        "instructions": agent.instructions,
+        "function_tools": function_tools,
+        "rag_tools": rag_tools,
+        "sql_tools": sql_tools,
+    }
+    encoded = json.dumps(settings, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def endpoint_key(agent: Any) -> str:
+    """The store key for an agent: management endpoint plus agent endpoint OCID"""
+    management_endpoint = getattr(agent.client, "management_endpoint", "")
+    return f"{management_endpoint}|{agent.agent_endpoint_id}"
+
+
+class SetupStateStore:
+    """Last-synced fingerprint per endpoint, persisted as JSON"""
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._load().get(key, {}).get("fingerprint")
+
+    def put(self, key: str, fingerprint: str) -> None:
+        with self._lock:
+            state = self._load()
+            state[key] = {"fingerprint": fingerprint, "synced_at": time.time()}
+            # Write to a temp file and rename so a crash never leaves a truncated store
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+
+def setup_agents(*agents: Any, store: Optional[SetupStateStore] = None, force: bool = False,
+                 max_workers: int = 4) -> Dict[str, str]:
+    """Run Agent.setup() only for agents whose fingerprint changed since their last sync
+
+    Args:
+        *agents (Any): ADK Agents to set up
+        store (Optional[SetupStateStore]): Fingerprint store, defaults to DEFAULT_STATE_PATH
+        force (bool): Sync every agent regardless of the stored fingerprint
+        max_workers (int): Maximum number of concurrent syncs
+
+    Returns:
+        Dict[str, str]: "synced" or "skipped" per agent endpoint key
+    """
+    store = store or SetupStateStore()
+    force = force or os.getenv("AGENT_SETUP_FORCE", "") == "1"
+
+    # Agents sharing an endpoint must not be synced at the same time
+    groups: Dict[str, List[Any]] = {}
+    for agent in agents:
+        groups.setdefault(endpoint_key(agent), []).append(agent)
+
+    def sync_group(key: str, group: List[Any]) -> str:
+        result = SKIPPED
+        for agent in group:
+            fingerprint = agent_fingerprint(agent)
+            if not force and store.get(key) == fingerprint:
+                continue
+            agent.setup()
+            store.put(key, fingerprint)
+            result = SYNCED
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {key: executor.submit(sync_group, key, group) for key, group in groups.items()}
+        return {key: future.result() for key, future in futures.items()}
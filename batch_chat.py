@@ -0,0 +1,155 @@
+"""
+batch_chat.py - Concurrent batch prompts over the direct inference path
+
+This script is the batch counterpart of 00_sample.py. Instead of one `CohereChatRequest` per process,
+it reads prompts from a JSONL file and sends them through one shared, pooled
+`GenerativeAiInferenceClient` with a bounded number of requests in flight.
+
+Features:
+- Input is JSONL: each line is either a JSON string or an object with a "prompt" key and optional
+  "id", "max_tokens", "temperature", "frequency_penalty", "top_p" and "top_k" overrides.
+- Results are streamed to a JSONL output file in input order while later prompts are still running.
+- Reports throughput (requests/s, tokens/s from `usage.total_tokens`) and latency percentiles.
+
+Usage:
+- Set up your `.env` file as for 00_sample.py.
+- python batch_chat.py --input prompts.jsonl --output results.jsonl --concurrency 16
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, TextIO
+
+from perf_stats import summarize_latencies
+
+
+def read_prompts(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield prompt records from a JSONL file, skipping blank lines
+
+    Args:
+        path (str): Path to the JSONL file
+
+    Returns:
+        Iterator[Dict[str, Any]]: Records with at least a "prompt" key
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"prompt": record}
+            yield record
+
+
+class BatchStats:
+    """Thread-safe accumulator for batch throughput and latency"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.total_tokens = 0
+        self.errors = 0
+        self.started_at = time.perf_counter()
+
+    def record(self, latency: float, total_tokens: Optional[int], error: bool) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.total_tokens += total_tokens or 0
+            if error:
+                self.errors += 1
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.perf_counter() - self.started_at
+            count = len(self.latencies)
+            return {
+                "requests": count,
+                "errors": self.errors,
+                "elapsed_s": elapsed,
+                "requests_per_s": count / elapsed if elapsed > 0 else 0.0,
+                "tokens_per_s": self.total_tokens / elapsed if elapsed > 0 else 0.0,
+                "total_tokens": self.total_tokens,
+                "latency_s": summarize_latencies(self.latencies),
+            }
+
+
+def run_batch(records: Iterator[Dict[str, Any]], output: TextIO, send: Callable[[Dict[str, Any]], Dict[str, Any]],
+              concurrency: int = 8) -> Dict[str, Any]:
+    """Send records concurrently and write their results to output in input order
+
+    At most `concurrency` requests are in flight and at most twice that many results are
+    buffered, so arbitrarily large inputs run in constant memory.
+
+    Args:
+        records (Iterator[Dict[str, Any]]): Prompt records
+        output (TextIO): Where result lines are written
+        send (Callable): Sends one record and returns text, finish_reason and total_tokens
+        concurrency (int): Maximum number of requests in flight
+
+    Returns:
+        Dict[str, Any]: The throughput and latency report
+    """
+    stats = BatchStats()
+
+    def process(index: int, record: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = {"index": index, "id": record.get("id", index)}
+        try:
+            result.update(send(record))
+            result["error"] = None
+        except Exception as e:
+            result["error"] = str(e)
+        result["latency_s"] = time.perf_counter() - start
+        stats.record(result["latency_s"], result.get("total_tokens"), result["error"] is not None)
+        return result
+
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index, record in enumerate(records):
+            pending.append(executor.submit(process, index, record))
+            # Flush completed results from the head, and bound the window of buffered results
+            while pending and (pending[0].done() or len(pending) >= 2 * concurrency):
+                _write_result(output, pending.popleft())
+        while pending:
+            _write_result(output, pending.popleft())
+
+    return stats.report()
+
+
+def _write_result(output: TextIO, future: Future) -> None:
+    output.write(json.dumps(future.result(), default=str) + "\n")
+    output.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a JSONL file of prompts to OCI Generative AI concurrently.")
+    parser.add_argument("--input", required=True, help="JSONL file of prompts")
+    parser.add_argument("--output", required=True, help="JSONL file for results (written in input order)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum number of requests in flight")
+    args = parser.parse_args()
+
+    # Imported here so that --help works without OCI credentials
+    from genai_chat import build_chat_details, create_inference_client, extract_chat_result
+
+    # One client shared by all workers, with a connection pool sized for the concurrency limit
+    client = create_inference_client(pool_size=args.concurrency)
+
+    def send(record: Dict[str, Any]) -> Dict[str, Any]:
+        params = {key: value for key, value in record.items() if key not in ("id", "prompt")}
+        return extract_chat_result(client.chat(build_chat_details(record["prompt"], **params)))
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        report = run_batch(read_prompts(args.input), output, send, concurrency=args.concurrency)
+
+    print("**************************Batch Result**************************")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+cassette.py - Record and replay OCI Generative AI inference and agent HTTP traffic
+
+Profiling or regression-testing the client side of the examples (tool dispatch, hooks, output handling)
+otherwise spends real quota and waits for real latency. A cassette captures every HTTP exchange of a run
+(inference chat, agent setup, session create/chat/delete including required-action round trips) at the
+transport level, below the OCI SDK, so any script using `GenerativeAiInferenceClient` or `AgentClient`
+can be recorded and replayed without changes.
+
+Features:
+- Record mode sends requests as usual and stores method, path, query, request body, status, response
+  headers, response body and elapsed time. Request headers (signatures, tokens) are never stored.
+- Replay mode answers from the cassette without network access, with zero or scaled latency. Requests
+  are matched on method, path, query and body, falling back to the recorded order for the same path
+  when a body differs (e.g. a tool output that contains a timestamp).
+- "auto" mode replays when the cassette exists and records it otherwise.
+- Replay also scales the ADK's fixed sleeps (2s before each follow-up chat after tool calls), so
+  replays run at client speed.
+- Compact JSON (gzip when the path ends in .gz); bodies are stored as JSON where possible.
+
+Usage:
+    with use_cassette("cassettes/01_weather.json", mode="record"):
+        agent.run("Is it cold in Seattle?")
+
+    python cassette.py record cassettes/04_calculator.json 04_calculator_multi_turns_agent.py
+    python cassette.py replay --repeat 500 --quiet cassettes/04_calculator.json 04_calculator_multi_turns_agent.py
+  Options go before the cassette; everything after the script is passed to the script.
+"""
+
+import argparse
+import contextlib
+import datetime
+import gzip
+import hashlib
+import http.client
+import io
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from oci._vendor.requests.adapters import HTTPAdapter
+from oci._vendor.requests.models import Response
+from oci._vendor.requests.structures import CaseInsensitiveDict
+from oci._vendor.requests.utils import get_encoding_from_headers
+
+CASSETTE_VERSION = 1
+
+# Non-secret settings the recorded paths and bodies depend on; replays default to the recorded values
+RECORDED_ENVIRONMENT = ("OCI_AI_AGENT_ENDPOINT_ID", "OCI_COMPARTMENT_ID", "OCI_REGION", "MODEL_ID")
+
+REPLAY_ENDPOINT = "https://cassette.replay.invalid"
+
+SKIPPED_RESPONSE_HEADERS = ("set-cookie", "content-length", "transfer-encoding", "connection", "date")
+
+
+class CassetteMissError(Exception):
+    """A replayed request has no recorded counterpart"""
+
+
+def _parse_body(body: Any) -> Any:
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body
+
+
+def _request_key(method: str, url: str, body: Any) -> Tuple[str, str, str]:
+    parsed = urlparse(url)
+    # The host is left out so a cassette recorded against one region or stand-in replays against any
+    path = parsed.path + ("?" + urlencode(sorted(parse_qsl(parsed.query))) if parsed.query else "")
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return method.upper(), path, digest
+
+
+class Cassette:
+    """The recorded exchanges of one cassette file"""
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0, match_body: bool = True):
+        """
+        Args:
+            path (str): Cassette file (.json or .json.gz)
+            mode (str): "record", "replay", or "auto" (replay if the file exists, record otherwise)
+            latency_scale (float): Replay: recorded latency multiplier, 0 for none
+            match_body (bool): Replay: match request bodies, falling back to recorded order per path
+        """
+        if mode == "auto":
+            mode = "replay" if os.path.exists(path) else "record"
+        if mode not in ("record", "replay"):
+            raise ValueError("mode must be 'record', 'replay' or 'auto'")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.match_body = match_body
+        self.interactions: List[Dict[str, Any]] = []
+        self.environment: Dict[str, str] = {}
+        self._by_body: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        self._by_path: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._cursors: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+        self.counters = {"recorded": 0, "played": 0, "body_matches": 0, "order_matches": 0, "misses": 0}
+        if mode == "replay":
+            self.load()
+
+    def load(self) -> None:
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {data.get('version')} in {self.path}")
+        self.environment = data.get("environment", {})
+        self.interactions = data["interactions"]
+        for interaction in self.interactions:
+            request = interaction["request"]
+            key = _request_key(request["method"], request["path"], request["body"])
+            self._by_body.setdefault(key, []).append(interaction)
+            self._by_path.setdefault(key[:2], []).append(interaction)
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "version": CASSETTE_VERSION,
+            "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "environment": {name: os.environ[name] for name in RECORDED_ENVIRONMENT if os.environ.get(name)},
+            "interactions": self.interactions,
+        }
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    def record(self, request: Any, response: Response, elapsed_s: float) -> None:
+        """Store one exchange; the response body must already have been read"""
+        parsed = urlparse(request.url)
+        interaction = {
+            "request": {
+                "method": request.method,
+                "path": parsed.path + ("?" + parsed.query if parsed.query else ""),
+                "body": _parse_body(request.body),
+            },
+            "response": {
+                "status": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() not in SKIPPED_RESPONSE_HEADERS},
+                "body": _parse_body(response.content),
+                "elapsed_s": round(elapsed_s, 4),
+            },
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+            self.counters["recorded"] += 1
+
+    def play(self, request: Any) -> Response:
+        """Build the recorded response for a request
+
+        Raises:
+            CassetteMissError: If nothing was recorded for the request's method and path
+        """
+        key = _request_key(request.method, request.url, _parse_body(request.body))
+        with self._lock:
+            candidates = self._by_body.get(key) if self.match_body else None
+            if candidates:
+                self.counters["body_matches"] += 1
+                cursor_key: Tuple = key
+            else:
+                candidates = self._by_path.get(key[:2])
+                cursor_key = key[:2]
+                if candidates:
+                    self.counters["order_matches"] += 1
+            if not candidates:
+                self.counters["misses"] += 1
+                raise CassetteMissError(f"No recorded response for {key[0]} {key[1]} in {self.path}")
+            # Repeated requests (polling, or the same script replayed many times) cycle through recordings
+            cursor = self._cursors.get(cursor_key, 0)
+            self._cursors[cursor_key] = cursor + 1
+            interaction = candidates[cursor % len(candidates)]
+            self.counters["played"] += 1
+
+        recorded = interaction["response"]
+        if self.latency_scale > 0:
+            time.sleep(recorded["elapsed_s"] * self.latency_scale)
+        body = recorded["body"]
+        if body is None:
+            content = b""
+        elif isinstance(body, str):
+            content = body.encode("utf-8")
+        else:
+            content = json.dumps(body).encode("utf-8")
+
+        response = Response()
+        response.status_code = recorded["status"]
+        response.reason = http.client.responses.get(recorded["status"], "")
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(content)
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(seconds=recorded["elapsed_s"] * self.latency_scale)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+        stats["interactions"] = len(self.interactions)
+        return stats
+
+
+class _ScaledTime:
+    """Stands in for the time module in the ADK agent module, with sleeps scaled"""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+
+    def sleep(self, seconds: float) -> None:
+        if seconds * self.scale > 0:
+            time.sleep(seconds * self.scale)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(time, name)
+
+
+_active_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def use_cassette(path: str, mode: str = "replay", latency_scale: float = 0.0, match_body: bool = True,
+                 scale_client_sleeps: bool = True) -> Iterator[Cassette]:
+    """Record or replay all OCI SDK HTTP traffic of the process inside the block
+
+    Args:
+        path (str): Cassette file
+        mode (str): "record", "replay" or "auto"
+        latency_scale (float): Replay: recorded latency multiplier, 0 for none
+        match_body (bool): Replay: match request bodies before falling back to recorded order
+        scale_client_sleeps (bool): Replay: scale the ADK's fixed sleeps by latency_scale too
+
+    Yields:
+        Cassette: The cassette, saved on exit in record mode
+    """
+    cassette = Cassette(path, mode, latency_scale, match_body)
+    original_send = HTTPAdapter.send
+
+    def send(adapter: HTTPAdapter, request: Any, **kwargs: Any) -> Response:
+        if cassette.mode == "replay":
+            return cassette.play(request)
+        started = time.perf_counter()
+        response = original_send(adapter, request, **kwargs)
+        # Reads the whole body (streamed responses too); the caller then iterates the buffered content
+        response.content
+        cassette.record(request, response, time.perf_counter() - started)
+        return response
+
+    import oci.addons.adk.agent as adk_agent
+
+    original_time = adk_agent.time
+    if not _active_lock.acquire(blocking=False):
+        raise RuntimeError("Another cassette is already in use")
+    HTTPAdapter.send = send
+    if cassette.mode == "replay" and scale_client_sleeps:
+        adk_agent.time = _ScaledTime(latency_scale)
+    try:
+        yield cassette
+    finally:
+        HTTPAdapter.send = original_send
+        adk_agent.time = original_time
+        _active_lock.release()
+        if cassette.mode == "record":
+            cassette.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay the OCI traffic of a script.")
+    parser.add_argument("mode", choices=["record", "replay", "auto"])
+    parser.add_argument("cassette", help="Cassette file (.json or .json.gz)")
+    parser.add_argument("script", help="Script to run, e.g. 01_weather_agent.py")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the script")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Replay: recorded latency multiplier")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay: run the script this many times")
+    parser.add_argument("--no-match-body", action="store_true", help="Replay: match on recorded order only")
+    parser.add_argument("--quiet", action="store_true", help="Discard the script's output")
+    args = parser.parse_args()
+
+    if args.mode != "record" and os.path.exists(args.cassette):
+        # Replays need no OCI account: the recorded settings and a throwaway key are enough to sign requests
+        from mock_genai_server import write_offline_oci_config
+
+        with open(args.cassette, "rb") as f:
+            raw = f.read()
+        data = json.loads(gzip.decompress(raw) if args.cassette.endswith(".gz") else raw)
+        for name, value in data.get("environment", {}).items():
+            os.environ.setdefault(name, value)
+        config_path = write_offline_oci_config()
+        os.environ.update({"OCI_CONFIG_FILE": config_path, "OCI_CONFIG_PATH": config_path, "OCI_CONFIG_PROFILE": "DEFAULT"})
+        # Recorded paths carry no host, so any well-formed endpoint works; nothing is sent to it
+        for name in ("OCI_GENAI_ENDPOINT", "OCI_AGENT_RUNTIME_ENDPOINT", "OCI_AGENT_MANAGEMENT_ENDPOINT"):
+            os.environ[name] = REPLAY_ENDPOINT
+
+    script = os.path.abspath(args.script)
+    sys.path.insert(0, os.path.dirname(script))
+    repeat = args.repeat if args.mode != "record" else 1
+    started = time.perf_counter()
+    with use_cassette(args.cassette, args.mode, args.latency_scale, not args.no_match_body) as cassette:
+        for _ in range(repeat):
+            sys.argv = [script] + args.args
+            with contextlib.redirect_stdout(io.StringIO()) if args.quiet else contextlib.nullcontext():
+                runpy.run_path(script, run_name="__main__")
+    wall = time.perf_counter() - started
+    report = {"mode": cassette.mode, "runs": repeat, "wall_s": round(wall, 3),
+              "runs_per_minute": round(repeat / wall * 60, 1) if wall else None, **cassette.stats()}
+    print(json.dumps(report, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
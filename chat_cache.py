@@ -0,0 +1,288 @@
+"""
+chat_cache.py - Two-tier response cache with request coalescing for deterministic chat calls
+
+00_sample.py sends `temperature=0` / `top_k=0` requests, so identical prompts produce identical answers.
+This module caches those answers so repeated prompts skip the paid round trip.
+
+Features:
+- Cache key: SHA-256 of the normalized serving mode and every chat request field that shapes the answer
+  (message, chat_history, preamble_override, documents, tools, stop_sequences, seed, sampling parameters...);
+  only the streaming options are left out.
+- In-memory LRU tier in front of an on-disk SQLite tier with TTL and size-based eviction.
+- Single-flight coalescing: concurrent identical requests share one upstream call; the lookup and the
+  in-flight check are one step, so a request arriving as the first call completes does not repeat it.
+- Hit/miss/eviction counters via `stats()`.
+- Requests with temperature > 0 (or streaming requests) bypass the cache automatically.
+
+Usage:
+    client = CachedChatClient(create_inference_client(), ResponseCache())
+    response = client.chat(build_chat_details("what is oracle cloud in 1 line"))
+    print(response.data.chat_response.text, response.headers.get("x-cache"))
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.getenv("CHAT_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".chat_cache.sqlite3"))
+
+# Chat request fields that only change how the answer is delivered, left out of the key
+TRANSPORT_FIELDS = ("is_stream", "stream_options")
+
+# Numeric chat request fields; 0 and 0.0 (or "1" and 1.0 from env vars) must produce the same key
+NUMERIC_FIELDS = ("max_tokens", "max_input_tokens", "temperature", "top_p", "top_k", "frequency_penalty",
+                  "presence_penalty", "seed")
+
+
+def chat_cache_key(chat_details: Any) -> str:
+    """Return the cache key for a ChatDetails request
+
+    Args:
+        chat_details (Any): The ChatDetails passed to GenerativeAiInferenceClient.chat
+
+    Returns:
+        str: Hex SHA-256 of the normalized request fields
+    """
+    from oci.util import to_dict
+
+    # Unset fields are dropped, so a field added to the SDK model does not change existing keys
+    request = {field: value for field, value in to_dict(chat_details.chat_request).items()
+               if value is not None and field not in TRANSPORT_FIELDS}
+    if isinstance(request.get("message"), str):
+        request["message"] = request["message"].strip()
+    for item in request.get("chat_history") or []:
+        if isinstance(item, dict) and isinstance(item.get("message"), str):
+            item["message"] = item["message"].strip()
+    for field in NUMERIC_FIELDS:
+        if field in request:
+            request[field] = float(request[field])
+    normalized = {"serving_mode": to_dict(chat_details.serving_mode), "chat_request": request}
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(chat_details: Any) -> bool:
+    """Only deterministic, non-streaming requests are cached"""
+    chat_request = chat_details.chat_request
+    return not (chat_request.temperature or 0) > 0 and not getattr(chat_request, "is_stream", False)
+
+
+class _Flight:
+    """An upstream call that concurrent callers with the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """Memory LRU + SQLite cache of JSON strings, with single-flight computation"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, memory_entries: int = 1024,
+                 ttl_seconds: float = 24 * 3600, max_disk_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            path (Optional[str]): SQLite file for the disk tier, None for memory only
+            memory_entries (int): Capacity of the in-memory LRU tier
+            ttl_seconds (float): Entries older than this are treated as misses and purged
+            max_disk_bytes (int): Least recently used disk entries are evicted above this size
+        """
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "bypassed": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "expired": 0,
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key from either tier, or None"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.counters["misses"] += 1
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        """Store value in both tiers, evicting as needed"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf-8")), now, now),
+                )
+                self._evict_disk()
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> tuple:
+        """Return (value, source) for key, calling compute at most once across concurrent callers
+
+        Args:
+            key (str): Cache key
+            compute (Callable[[], str]): Produces the value on a miss
+
+        Returns:
+            tuple: The value and "HIT", "COALESCED" or "MISS"
+        """
+        # One critical section: a leader stores its value before it retires its flight, so a caller
+        # either finds the value or joins the flight, and never starts a second upstream call
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value, "HIT"
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.counters["misses"] += 1
+            else:
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, "COALESCED"
+
+        try:
+            flight.value = compute()
+            self.put(key, flight.value)
+            return flight.value, "MISS"
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.counters["bypassed"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+                stats["disk_entries"] = entries
+                stats["disk_bytes"] = size
+        # Coalesced callers missed the cache but still did not trigger an upstream call
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"] + stats["coalesced"]
+        saved = stats["memory_hits"] + stats["disk_hits"] + stats["coalesced"]
+        stats["hit_rate"] = saved / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _lookup(self, key: str) -> Optional[str]:
+        # Caller holds the lock; counts hits and expirations, the caller counts the miss
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created = entry
+            if now - created <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return value
+            del self._memory[key]
+            self.counters["expired"] += 1
+
+        if self._db is not None:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                value, created = row
+                if now - created <= self.ttl_seconds:
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._remember(key, value, created)
+                    self.counters["disk_hits"] += 1
+                    return value
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.counters["expired"] += 1
+        return None
+
+    def _remember(self, key: str, value: str, created: float) -> None:
+        # Caller holds the lock
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["memory_evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        # Caller holds the lock; drop expired rows, then least recently used rows until under the size cap
+        expired = self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,)).rowcount
+        self.counters["expired"] += max(expired, 0)
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while total > self.max_disk_bytes:
+            row = self._db.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            total -= row[1]
+            self.counters["disk_evictions"] += 1
+
+
+class CachedChatClient:
+    """Drop-in wrapper for GenerativeAiInferenceClient.chat backed by a ResponseCache"""
+
+    def __init__(self, client: Any, cache: ResponseCache):
+        """
+        Args:
+            client (Any): A GenerativeAiInferenceClient
+            cache (ResponseCache): The cache to use
+        """
+        self.client = client
+        self.cache = cache
+
+    def chat(self, chat_details: Any, **kwargs: Any) -> Any:
+        """Same contract as GenerativeAiInferenceClient.chat; the x-cache header tells where the answer came from"""
+        import oci
+
+        if not is_cacheable(chat_details):
+            self.cache.record_bypass()
+            return self.client.chat(chat_details, **kwargs)
+
+        base_client = self.client.base_client
+
+        def compute() -> str:
+            response = self.client.chat(chat_details, **kwargs)
+            return json.dumps(base_client.sanitize_for_serialization(response.data))
+
+        value, source = self.cache.get_or_compute(chat_cache_key(chat_details), compute)
+        data = base_client.deserialize_response_data(value.encode("utf-8"), "ChatResult")
+        return oci.response.Response(200, {"x-cache": source}, data, None)
+
+    def __getattr__(self, name: str) -> Any:
+        # Everything else goes straight to the wrapped client
+        return getattr(self.client, name)
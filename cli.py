@@ -0,0 +1,342 @@
+"""
+cli.py - One entry point for the example scenarios, with lazy imports and cached settings
+
+Each numbered script imports the OCI SDK, the ADK, `rich` and `dotenv` up front and re-reads `.env`,
+which dominates the start-up of short-lived CLI and serverless invocations. This entry point imports
+only the standard library until a subcommand runs, and then only that scenario's module.
+
+Features:
+- Subcommands for every scenario: chat (00), weather (01), support (02), product-support (03),
+  calculator (04), multi-agent (05), workflow (06), hooks (07) and sessions (08).
+- Settings from `.env` (the process environment wins) are validated once: the OCI config file and
+  profile are checked with the standard library and each scenario's required variables are checked
+  before the SDK is imported, so a misconfiguration fails in milliseconds. The validated settings are
+  cached in `.cli_settings.json` and reused until `.env`, the OCI config file or the environment change.
+- `bench-imports` times cold starts in fresh interpreters (the CLI itself, settings, each heavy
+  dependency and each scenario module) and compares them against a saved baseline, so start-up
+  regressions are caught across releases.
+- `--profile-dir DIR` runs the scenario under profiling.py's per-phase CPU profiler.
+
+Usage:
+    python cli.py chat --prompt "what is oracle cloud in 1 line"
+    python cli.py --profile DEFAULT --region us-chicago-1 calculator
+    python cli.py --profile-dir profiles calculator
+    python cli.py settings
+    python cli.py bench-imports --output imports.json
+    python cli.py bench-imports --compare imports.json --threshold 0.2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ENV_PATH = os.path.join(HERE, ".env")
+SETTINGS_CACHE_PATH = os.getenv("CLI_SETTINGS_CACHE", os.path.join(HERE, ".cli_settings.json"))
+
+# name -> (module, description, required settings); every scenario except chat authenticates through the ADK
+SCENARIOS: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "chat": ("00_sample", "Send one prompt to the inference endpoint", ("OCI_COMPARTMENT_ID",)),
+    "weather": ("01_weather_agent", "Agent with a function tool", ("OCI_AI_AGENT_ENDPOINT_ID",)),
+    "support": ("02_support_agent", "RAG support agent with a semantic cache",
+                ("OCI_AI_AGENT_ENDPOINT_ID", "OCI_AI_KNOWLEDGE_BASE_ID")),
+    "product-support": ("03_product_support_agent", "Support agent with RAG and account tools",
+                        ("OCI_AI_AGENT_ENDPOINT_ID", "OCI_AI_KNOWLEDGE_BASE_ID")),
+    "calculator": ("04_calculator_multi_turns_agent", "Multi-turn calculator agent", ("OCI_AI_AGENT_ENDPOINT_ID",)),
+    "multi-agent": ("05_multi_agents", "Collaborating agents", ()),
+    "workflow": ("06_multi_step_workflow_agents", "Workflow with agentic steps", ()),
+    "hooks": ("07_lifecycle_hook", "Lifecycle hooks and metrics", ()),
+    "sessions": ("08_delete_sessions", "Run an agent and delete its session", ("OCI_AI_AGENT_ENDPOINT_ID",)),
+}
+
+# Settings read from .env or the environment; only these are cached and fingerprinted
+SETTING_KEYS = (
+    "OCI_CONFIG_PATH", "OCI_CONFIG_FILE", "OCI_CONFIG_PROFILE", "OCI_REGION", "OCI_COMPARTMENT_ID",
+    "OCI_GENAI_ENDPOINT", "MODEL_ID", "OCI_AI_AGENT_ENDPOINT_ID", "OCI_AI_KNOWLEDGE_BASE_ID", "OCI_AGENT_RUNTIME_ENDPOINT",
+    "OCI_AGENT_MANAGEMENT_ENDPOINT", "OCI_GENAI_RPM", "OCI_GENAI_TPM", "ADMISSION_STORE",
+)
+OCI_CONFIG_KEYS = ("user", "fingerprint", "key_file", "tenancy", "region")
+
+# Targets of bench-imports: label -> code run in a fresh interpreter
+IMPORT_TARGETS: Dict[str, str] = {
+    "python": "pass",
+    "cli": "import cli",
+    "cli_settings": "import cli; cli.load_settings()",
+    "dotenv": "import dotenv",
+    "rich": "import rich.console",
+    "oci": "import oci",
+    "oci.generative_ai_inference": "import oci.generative_ai_inference",
+    "oci.addons.adk": "import oci.addons.adk",
+}
+
+
+def _file_signature(path: Optional[str]) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path) if path else None
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size] if stat else None
+
+
+def _agent_config_path(settings: Dict[str, str]) -> str:
+    # The SDK's lookup for AgentClient's default config: ~/.oci/config, then OCI_CONFIG_FILE, then ~/.oraclebmc/config
+    default = os.path.expanduser(os.path.join("~", ".oci", "config"))
+    if os.path.isfile(default):
+        return default
+    if settings.get("OCI_CONFIG_FILE"):
+        return os.path.expanduser(settings["OCI_CONFIG_FILE"])
+    return os.path.expanduser(os.path.join("~", ".oraclebmc", "config"))
+
+
+def _oci_config_paths(settings: Dict[str, str]) -> Dict[str, str]:
+    # 00_sample.py reads OCI_CONFIG_PATH (default .oci/config next to it); AgentClient resolves its own default
+    return {
+        "inference": os.path.expanduser(settings.get("OCI_CONFIG_PATH") or os.path.join(HERE, ".oci", "config")),
+        "agent": _agent_config_path(settings),
+    }
+
+
+def _read_env_file(env_path: str) -> Dict[str, str]:
+    if not os.path.exists(env_path):
+        return {}
+    from dotenv import dotenv_values
+
+    return {key: value for key, value in dotenv_values(env_path).items() if value is not None}
+
+
+def validate_oci_config(path: str, profile: str) -> List[str]:
+    """Check that the OCI config file has the profile and the keys API key auth needs, without the SDK
+
+    Returns:
+        List[str]: Problems found, empty when the profile looks usable
+    """
+    import configparser
+
+    if not os.path.exists(path):
+        return [f"OCI config file {path} not found"]
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        parser.read(path, encoding="utf-8")
+    except configparser.Error as e:
+        return [f"OCI config file {path} is not valid: {e}"]
+    if profile != "DEFAULT" and not parser.has_section(profile):
+        return [f"Profile '{profile}' not found in {path}"]
+    section = parser.defaults() if profile == "DEFAULT" else parser[profile]
+    problems = [f"Profile '{profile}' in {path} has no '{key}'" for key in OCI_CONFIG_KEYS if not section.get(key)]
+    key_file = section.get("key_file")
+    if key_file and not os.path.exists(os.path.expanduser(key_file)):
+        problems.append(f"Key file {key_file} of profile '{profile}' not found")
+    return problems
+
+
+def load_settings(env_path: str = ENV_PATH, cache_path: Optional[str] = SETTINGS_CACHE_PATH) -> Dict[str, Any]:
+    """Settings from .env under the process environment, validated and cached
+
+    The cache is keyed on the .env and OCI config files (modification time and size) and on the
+    values of SETTING_KEYS in the environment, including OCI_CONFIG_FILE.
+
+    Args:
+        env_path (str): The .env file
+        cache_path (Optional[str]): Cache file, None to always re-read and re-validate
+
+    Returns:
+        Dict[str, Any]: {"values": settings by name, "problems": OCI config problems of the inference
+            ("inference") and ADK ("agent") config files, "cached": bool}
+    """
+    environment = {key: os.environ[key] for key in SETTING_KEYS if key in os.environ}
+    env_signature = _file_signature(env_path)
+    if cache_path:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            values = cached["values"]
+            fingerprint = _fingerprint(env_path, env_signature, environment, _oci_config_paths(values))
+            if cached["fingerprint"] == fingerprint:
+                return {"values": values, "problems": cached["problems"], "cached": True}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    values = {key: value for key, value in _read_env_file(env_path).items() if key in SETTING_KEYS}
+    values.update(environment)
+    values.setdefault("OCI_CONFIG_PROFILE", "DEFAULT")
+    values.setdefault("OCI_REGION", "us-chicago-1")
+    config_paths = _oci_config_paths(values)
+    problems = {kind: validate_oci_config(path, values["OCI_CONFIG_PROFILE"]) for kind, path in config_paths.items()}
+    if cache_path:
+        fingerprint = _fingerprint(env_path, env_signature, environment, config_paths)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "values": values, "problems": problems}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    return {"values": values, "problems": problems, "cached": False}
+
+
+def _fingerprint(env_path: str, env_signature: Optional[List[int]], environment: Dict[str, str],
+                 config_paths: Dict[str, str]) -> str:
+    parts = [env_path, env_signature, environment, {kind: [path, _file_signature(path)] for kind, path in config_paths.items()}]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def run_scenario(name: str, settings: Dict[str, Any], profile_dir: Optional[str] = None) -> None:
+    """Export the settings, import the scenario's module and run its main(), profiled when profile_dir is set"""
+    import importlib
+
+    module_name, _, required = SCENARIOS[name]
+    missing = [key for key in required if not settings["values"].get(key)]
+    problems = settings["problems"]["inference" if name == "chat" else "agent"]
+    if missing or problems:
+        problems = problems + [f"{key} is not set (in .env or the environment)" for key in missing]
+        sys.exit(f"Cannot run '{name}':\n  " + "\n  ".join(problems))
+    # The scripts' own load_dotenv() calls never override variables that are already set
+    for key, value in settings["values"].items():
+        os.environ.setdefault(key, value)
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    if not profile_dir:
+        importlib.import_module(module_name).main()
+        return
+    from profiling import format_summary, profiling
+
+    with profiling(profile_dir) as profiler:
+        importlib.import_module(module_name).main()
+    print("\n" + format_summary(profiler.summary()), file=sys.stderr)
+
+
+def _time_target(code: str) -> Tuple[float, float]:
+    # (wall time of the whole interpreter, time of the code itself), both in seconds
+    import subprocess
+
+    program = f"import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", program], cwd=HERE, capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": HERE})
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"'{code}' failed: {result.stderr.strip().splitlines()[-1:]}")
+    return wall, float(result.stdout.strip().splitlines()[-1])
+
+
+def bench_imports(repeat: int = 5, scenarios: bool = True) -> Dict[str, Any]:
+    """Time cold starts of the CLI, its settings, heavy dependencies and scenario modules
+
+    Every sample runs in a new interpreter, so nothing is already imported; the OS file cache
+    and compiled bytecode are warm after the first sample, as on a long-lived host.
+
+    Args:
+        repeat (int): Samples per target; medians are reported
+        scenarios (bool): Also time importing each scenario module
+
+    Returns:
+        Dict[str, Any]: Median milliseconds per target, for the whole process and for the import itself
+    """
+    import statistics
+    import subprocess
+
+    targets = dict(IMPORT_TARGETS)
+    if scenarios:
+        for name, (module_name, _, _) in SCENARIOS.items():
+            targets[f"scenario:{name}"] = f"import importlib; importlib.import_module({module_name!r})"
+    report: Dict[str, Any] = {"python": sys.version.split()[0], "repeat": repeat, "targets": {}}
+    for label, code in targets.items():
+        samples = [_time_target(code) for _ in range(repeat)]
+        report["targets"][label] = {
+            "process_ms": round(statistics.median(wall for wall, _ in samples) * 1000, 1),
+            "import_ms": round(statistics.median(own for _, own in samples) * 1000, 1),
+        }
+    # Start-up of the CLI that never reaches the SDK, e.g. --help or a settings error
+    help_samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(HERE, "cli.py"), "--help"], capture_output=True)
+        help_samples.append(time.perf_counter() - started)
+    report["targets"]["cli --help"] = {"process_ms": round(statistics.median(help_samples) * 1000, 1), "import_ms": None}
+    return report
+
+
+def compare_imports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.2,
+                    min_change_ms: float = 5) -> List[Dict[str, Any]]:
+    """Compare two bench-imports reports target by target
+
+    Args:
+        baseline (Dict[str, Any]): Earlier report
+        current (Dict[str, Any]): New report
+        threshold (float): Relative slow-down counted as a regression (0.2 = 20%)
+        min_change_ms (float): Smaller absolute slow-downs are noise, not regressions
+
+    Returns:
+        List[Dict[str, Any]]: One row per target with baseline, current (process ms), relative change and regression flag
+    """
+    rows = []
+    for label, entry in current["targets"].items():
+        before = baseline.get("targets", {}).get(label, {}).get("process_ms")
+        after = entry["process_ms"]
+        if before is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        rows.append({"target": label, "baseline": before, "current": after, "change": round(change, 4),
+                     "regression": change > threshold and after - before > min_change_ms})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Oracle Generative AI ADK lab scenarios.")
+    parser.add_argument("--profile", help="OCI config profile (OCI_CONFIG_PROFILE)")
+    parser.add_argument("--region", help="OCI region (OCI_REGION)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-read and re-validate settings")
+    parser.add_argument("--profile-dir", default=None, help="Profile the scenario by phase into this directory (profiling.py)")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    for name, (module_name, description, _) in SCENARIOS.items():
+        scenario_parser = subparsers.add_parser(name, help=f"{description} ({module_name}.py)")
+        if name == "chat":
+            scenario_parser.add_argument("--prompt", help="Prompt to send (PROMPT)")
+    subparsers.add_parser("settings", help="Show the validated settings")
+    bench_parser = subparsers.add_parser("bench-imports", help="Time cold starts in fresh interpreters")
+    bench_parser.add_argument("--repeat", type=int, default=5, help="Samples per target")
+    bench_parser.add_argument("--no-scenarios", action="store_true", help="Skip the scenario modules")
+    bench_parser.add_argument("--output", default=None, help="Write the report to this file")
+    bench_parser.add_argument("--compare", default=None, help="Baseline report to diff against")
+    bench_parser.add_argument("--threshold", type=float, default=0.2, help="Relative slow-down counted as a regression")
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.print_help()
+        return
+    if args.command == "bench-imports":
+        report = bench_imports(args.repeat, not args.no_scenarios)
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        print(text)
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                rows = compare_imports(json.load(f), report, args.threshold)
+            for row in rows:
+                flag = "REGRESSION" if row["regression"] else ""
+                print(f"{row['target']:<36} {row['baseline']:>10} {row['current']:>10} {row['change']:>+9.1%} {flag}")
+            if any(row["regression"] for row in rows):
+                sys.exit(1)
+        return
+
+    if args.profile:
+        os.environ["OCI_CONFIG_PROFILE"] = args.profile
+    if args.region:
+        os.environ["OCI_REGION"] = args.region
+    if getattr(args, "prompt", None):
+        os.environ["PROMPT"] = args.prompt
+    settings = load_settings(cache_path=None if args.no_cache else SETTINGS_CACHE_PATH)
+    if args.command == "settings":
+        print(json.dumps(settings, indent=2))
+        return
+    run_scenario(args.command, settings, args.profile_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+client_pool.py - Process-wide cache of OCI config, signers and keep-alive clients
+
+Each example builds its own `AgentClient`, reloads `.env` and (in 00_sample.py) parses the OCI config
+and creates a fresh `GenerativeAiInferenceClient`. In a long-running service that repeats config
+parsing, key loading and TLS handshakes. This module hands out shared clients instead.
+
+Features:
+- Parsed config and request signers are cached per (config file, profile).
+- Inference and agent clients are cached per (profile, region, endpoint, timeout, retry strategy) and shared
+  across agents and threads; a caller asking for another timeout or strategy gets its own client.
+- HTTP connection pool size and (connect, read) timeouts are tunable, replacing the hard-coded (10, 240).
+- Clients use the retry, circuit breaker and hedging strategies of resilience.py unless OCI_RESILIENCE=0.
+- Chats are admitted against RPM/TPM limits by admission.py when OCI_GENAI_RPM or OCI_GENAI_TPM is set.
+- `pool_stats()` reports config/signer/client reuse and per-host connection reuse from urllib3.
+
+Settings (environment variables, read once):
+    OCI_HTTP_POOL_SIZE=10, OCI_CONNECT_TIMEOUT=10, OCI_READ_TIMEOUT=240, OCI_RESILIENCE=1,
+    OCI_GENAI_RPM, OCI_GENAI_TPM, ADMISSION_STORE (see admission.py)
+
+Usage:
+    client = get_agent_client(profile="DEFAULT", region="us-chicago-1")
+    agent = Agent(client=client, agent_endpoint_id=..., tools=[...])
+    inference_client = get_inference_client(endpoint=ENDPOINT)
+    print(pool_stats())
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import oci
+from dotenv import load_dotenv
+
+_lock = threading.RLock()
+_settings: Optional[Dict[str, Any]] = None
+_configs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_signers: Dict[Tuple[str, str], Any] = {}
+_clients: Dict[Tuple, Any] = {}
+_counters = {"config_loads": 0, "signer_loads": 0, "clients_created": 0, "client_reuses": 0}
+
+
+def get_settings() -> Dict[str, Any]:
+    """Load .env once and return the pool settings"""
+    global _settings
+    with _lock:
+        if _settings is None:
+            load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+            _settings = {
+                "profile": os.getenv("OCI_CONFIG_PROFILE", "DEFAULT"),
+                "region": os.getenv("OCI_REGION", "us-chicago-1"),
+                "pool_size": int(os.getenv("OCI_HTTP_POOL_SIZE", 10)),
+                "timeout": (float(os.getenv("OCI_CONNECT_TIMEOUT", 10)), float(os.getenv("OCI_READ_TIMEOUT", 240))),
+                "resilience": os.getenv("OCI_RESILIENCE", "1") not in ("0", "false", "False"),
+            }
+        return _settings
+
+
+def get_config(config_path: str = oci.config.DEFAULT_LOCATION, profile: Optional[str] = None) -> Dict[str, Any]:
+    """Return the parsed and validated OCI config for a profile, parsing the file only once"""
+    profile = profile or get_settings()["profile"]
+    key = (config_path, profile)
+    with _lock:
+        if key not in _configs:
+            config = oci.config.from_file(config_path, profile)
+            oci.config.validate_config(config)
+            _configs[key] = config
+            _counters["config_loads"] += 1
+        return _configs[key]
+
+
+def get_signer(config_path: str = oci.config.DEFAULT_LOCATION, profile: Optional[str] = None) -> Any:
+    """Return the API key signer for a profile, loading the private key only once"""
+    profile = profile or get_settings()["profile"]
+    key = (config_path, profile)
+    with _lock:
+        if key not in _signers:
+            _signers[key] = oci.signer.Signer.from_config(get_config(config_path, profile))
+            _counters["signer_loads"] += 1
+        return _signers[key]
+
+
+def configure_pool(client: Any, pool_size: int) -> None:
+    """Remount the client's HTTP adapters with a keep-alive pool of pool_size connections per host
+
+    The SDK mounts its own adapter classes (and vendors its own requests), so the mounted
+    classes are re-created with a larger pool instead of being replaced.
+
+    Args:
+        client (Any): An OCI service client
+        pool_size (int): Maximum number of keep-alive connections per host
+    """
+    session = client.base_client.session
+    for prefix in ("https://", "http://"):
+        adapter_cls = type(session.get_adapter(prefix))
+        session.mount(prefix, adapter_cls(pool_connections=pool_size, pool_maxsize=pool_size))
+    client._pool_size = pool_size
+
+
+def _pooled(key: Tuple, pool_size: int, create, retry_strategy: Optional[Any] = None) -> Any:
+    # The retry strategy is part of key, so it is set once on creation and never swapped under other callers
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = create()
+            _clients[key] = client
+            _counters["clients_created"] += 1
+            if retry_strategy is not None:
+                for service_client in _service_clients(client):
+                    service_client.retry_strategy = retry_strategy
+        else:
+            _counters["client_reuses"] += 1
+        for service_client in _service_clients(client):
+            # Grow (never shrink) the pool when a caller asks for more concurrency
+            if getattr(service_client, "_pool_size", 0) < pool_size:
+                configure_pool(service_client, pool_size)
+        return client
+
+
+def _admitted(client: Any) -> Any:
+    # Shared clients are metered once, for every agent and thread using them
+    from admission import admission_controller
+
+    controller = admission_controller()
+    if controller is None:
+        return client
+    if hasattr(client, "_rt_client"):
+        return controller.guard_agent(client)
+    return controller.guard_inference(client)
+
+
+def _service_clients(client: Any):
+    # AgentClient wraps a runtime and a management client; SDK clients are their own service client
+    if hasattr(client, "_rt_client"):
+        return [client._rt_client, client._mgmt_client]
+    return [client]
+
+
+def get_inference_client(profile: Optional[str] = None, region: Optional[str] = None, endpoint: Optional[str] = None,
+                         config_path: str = oci.config.DEFAULT_LOCATION, pool_size: Optional[int] = None,
+                         timeout: Optional[Tuple[float, float]] = None, retry_strategy: Optional[Any] = None) -> Any:
+    """Return the shared GenerativeAiInferenceClient for (profile, region, endpoint, timeout, retry strategy)
+
+    Args:
+        profile (Optional[str]): Config profile, defaults to OCI_CONFIG_PROFILE
+        region (Optional[str]): Region used to derive the endpoint, defaults to OCI_REGION
+        endpoint (Optional[str]): Service endpoint, derived from region when not given
+        config_path (str): OCI config file
+        pool_size (Optional[int]): Keep-alive connections per host, defaults to OCI_HTTP_POOL_SIZE
+        timeout (Optional[Tuple[float, float]]): (connect, read) timeout, defaults to the settings
+        retry_strategy (Optional[Any]): OCI retry strategy for the shared client, defaults to
+            resilience.inference_retry_strategy() (no retries with OCI_RESILIENCE=0)
+
+    Returns:
+        GenerativeAiInferenceClient: The shared client
+    """
+    settings = get_settings()
+    profile = profile or settings["profile"]
+    region = region or settings["region"]
+    endpoint = endpoint or f"https://inference.generativeai.{region}.oci.oraclecloud.com"
+    timeout = timeout or settings["timeout"]
+
+    def create():
+        return _admitted(oci.generative_ai_inference.GenerativeAiInferenceClient(
+            config=get_config(config_path, profile),
+            signer=get_signer(config_path, profile),
+            service_endpoint=endpoint,
+            retry_strategy=oci.retry.NoneRetryStrategy(),
+            timeout=timeout,
+        ))
+
+    if retry_strategy is None and settings["resilience"]:
+        from resilience import inference_retry_strategy
+        retry_strategy = inference_retry_strategy()
+    key = ("inference", config_path, profile, region, endpoint, timeout, retry_strategy)
+    return _pooled(key, pool_size or settings["pool_size"], create, retry_strategy)
+
+
+def get_agent_client(profile: Optional[str] = None, region: Optional[str] = None,
+                     runtime_endpoint: Optional[str] = None, management_endpoint: Optional[str] = None,
+                     config_path: str = oci.config.DEFAULT_LOCATION, pool_size: Optional[int] = None,
+                     timeout: Optional[Tuple[float, float]] = None, retry_strategy: Optional[Any] = None) -> Any:
+    """Return the shared ADK AgentClient for (profile, region, endpoints, timeout, retry strategy)
+
+    Args:
+        profile (Optional[str]): Config profile, defaults to OCI_CONFIG_PROFILE
+        region (Optional[str]): Region, defaults to OCI_REGION
+        runtime_endpoint (Optional[str]): Agent runtime endpoint, defaults to OCI_AGENT_RUNTIME_ENDPOINT or the region's
+        management_endpoint (Optional[str]): Agent management endpoint, defaults to OCI_AGENT_MANAGEMENT_ENDPOINT or the region's
+        config_path (str): OCI config file
+        pool_size (Optional[int]): Keep-alive connections per host, defaults to OCI_HTTP_POOL_SIZE
+        timeout (Optional[Tuple[float, float]]): (connect, read) timeout, defaults to the settings
+        retry_strategy (Optional[Any]): OCI retry strategy for the shared client, defaults to
+            resilience.agent_retry_strategy() (the SDK default with OCI_RESILIENCE=0)
+
+    Returns:
+        AgentClient: The shared client
+    """
+    from oci.addons.adk import AgentClient
+
+    settings = get_settings()
+    profile = profile or settings["profile"]
+    region = region or settings["region"]
+    runtime_endpoint = runtime_endpoint or os.getenv("OCI_AGENT_RUNTIME_ENDPOINT")
+    management_endpoint = management_endpoint or os.getenv("OCI_AGENT_MANAGEMENT_ENDPOINT")
+    timeout = timeout or settings["timeout"]
+
+    def create():
+        return _admitted(AgentClient(
+            auth_type="api_key",
+            config=config_path,
+            profile=profile,
+            region=region,
+            runtime_endpoint=runtime_endpoint,
+            management_endpoint=management_endpoint,
+            timeout=timeout,
+        ))
+
+    if retry_strategy is None and settings["resilience"]:
+        from resilience import agent_retry_strategy
+        retry_strategy = agent_retry_strategy()
+    key = ("agent", config_path, profile, region, runtime_endpoint, management_endpoint, timeout, retry_strategy)
+    return _pooled(key, pool_size or settings["pool_size"], create, retry_strategy)
+
+
+def connection_stats(client: Any) -> Dict[str, Dict[str, int]]:
+    """Per-host connection counters of a client's urllib3 pools
+
+    Returns:
+        Dict[str, Dict[str, int]]: requests, connections opened and reused requests per host
+    """
+    stats: Dict[str, Dict[str, int]] = {}
+    for service_client in _service_clients(client):
+        for adapter in service_client.base_client.session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                host = f"{pool.scheme}://{pool.host}:{pool.port}"
+                entry = stats.setdefault(host, {"requests": 0, "connections_opened": 0})
+                entry["requests"] += pool.num_requests
+                entry["connections_opened"] += pool.num_connections
+    for entry in stats.values():
+        entry["reused_requests"] = max(entry["requests"] - entry["connections_opened"], 0)
+    return stats
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Config/signer/client cache counters plus connection reuse of every pooled client"""
+    with _lock:
+        clients = dict(_clients)
+        stats: Dict[str, Any] = dict(_counters)
+    stats["clients"] = {"|".join(str(part) for part in key): connection_stats(client) for key, client in clients.items()}
+    return stats
@@ -0,0 +1,509 @@
+"""
+context_prefetch.py - Speculative tool-result prefetch from the known caller context
+
+In 03_product_support_agent.py, "Is my user account eligible for the Responses API?" costs the agent two
+extra steps before it can answer: a `get_user_info` round trip for the user id we already put in
+`client_provided_context`, then a `get_org_info` round trip for that user's org, each followed by the
+ADK's 2 s pause. Both tools are local, so their results can be looked up before the run and sent with
+the question, leaving the agent nothing to ask for.
+
+Features:
+- `PrefetchPlan`: when a message matches, facts (e.g. the user id) are extracted from the caller context
+  and a chain of `PrefetchStep`s resolves the tools the agent would most likely call. Steps whose
+  dependencies are resolved run concurrently; `account_plan()` covers AccountToolkit.
+- `ContextPrefetcher.submit` starts the lookups in the background, so they overlap with session
+  acquisition; a deadline bounds how long a run waits for them.
+- Results go to the agent as one context block, through a `ContextBudget` when one is given.
+- A message that names another user than the caller (`mentions`) skips the plan instead of being sent
+  the caller's records.
+- Falls back cleanly: the tools stay registered, so a wrong guess (a failed or timed-out lookup, a block
+  dropped by the budget) only means the agent calls the tools as it would have. With
+  the shared AccountToolkit loaders (dataloader.py) such a repeated lookup is a cache hit.
+- `PrefetchAgent.stats()` reports runs with and without prefetch, agent steps, lookups the agent did not
+  repeat, repeated ones, misses (tool calls the prefetch did not anticipate) and latency per path.
+
+Usage:
+    agent = PrefetchAgent(agent, budget=ContextBudget(max_input_tokens=1500))
+    prefetched = agent.prefetch(message, client_provided_context)
+    with sessions.session("user_123") as session_id:
+        response = agent.run(message, session_id=session_id, context=client_provided_context, prefetched=prefetched)
+    print(agent.stats())
+
+- python context_prefetch.py --bench compares steps and latency of stand-in support runs with and without prefetch.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from perf_stats import summarize_latencies
+
+PATH_PREFETCHED = "prefetched"
+PATH_PLAIN = "plain"
+
+PREFETCH_BLOCK = "prefetched"
+
+
+class PrefetchStep:
+    """One speculative tool call"""
+
+    def __init__(self, tool: str, arguments: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+                 after: Tuple[str, ...] = ()):
+        """
+        Args:
+            tool (str): Name of the agent's local function tool
+            arguments (Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]): Builds the call's arguments from
+                what is known so far (the plan's facts, and the results of earlier steps by tool name);
+                None skips the step
+            after (Tuple[str, ...]): Tools whose results the arguments need
+        """
+        self.tool = tool
+        self.arguments = arguments
+        self.after = after
+
+
+class PrefetchPlan:
+    """The tool calls a kind of message most likely needs, resolved from the caller context"""
+
+    def __init__(self, name: str, match: str, facts: Dict[str, str], steps: List[PrefetchStep],
+                 mentions: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            name (str): Plan name, for stats
+            match (str): Case-insensitive regular expression; the plan applies when it is found in the message
+            facts (Dict[str, str]): Fact name -> regular expression whose first group extracts it from the
+                caller context values
+            steps (List[PrefetchStep]): The calls, dependencies before the steps that use them
+            mentions (Optional[Dict[str, str]]): Fact name -> regular expression whose first group finds a value
+                of that fact named in the message; a message naming a different value skips the plan
+        """
+        self.name = name
+        self.match = re.compile(match, re.IGNORECASE)
+        self.facts = {fact: re.compile(pattern, re.IGNORECASE) for fact, pattern in facts.items()}
+        self.steps = steps
+        self.mentions = {fact: re.compile(pattern, re.IGNORECASE) for fact, pattern in (mentions or {}).items()}
+
+    def applies(self, message: str) -> bool:
+        return self.match.search(message) is not None
+
+    def conflicts(self, message: str, facts: Dict[str, Any]) -> bool:
+        """Whether the message names a value of a fact other than the one extracted from the context"""
+        for fact, pattern in self.mentions.items():
+            known = str(facts.get(fact, "")).lower()
+            if any(named.lower() != known for named in pattern.findall(message)):
+                return True
+        return False
+
+    def extract(self, context: Dict[str, str]) -> Dict[str, Any]:
+        facts: Dict[str, Any] = {}
+        for fact, pattern in self.facts.items():
+            for text in context.values():
+                found = pattern.search(text or "")
+                if found:
+                    facts[fact] = found.group(1)
+                    break
+        return facts
+
+
+def account_plan() -> PrefetchPlan:
+    """Questions about the caller's own account, org, plan or eligibility: their user record, then its org"""
+    return PrefetchPlan(
+        "account",
+        match=r"\b(?:my|our)\b.*\b(?:account|user|org|organi[sz]ation|plan|subscription)\b"
+              r"|\b(?:i|we|me|us|my|our)\b.*\beligib",
+        facts={"user_id": r"\buser id(?: is)?\s*:?\s*([\w.@-]+)"},
+        # "Is user_456 eligible?" is about someone else: the caller's records would be the wrong answer
+        mentions={"user_id": r"\b(user[_-]?[a-z]*\d[\w.@-]*)"},
+        steps=[
+            PrefetchStep("get_user_info", lambda known: {"user_id": known["user_id"]} if known.get("user_id") else None),
+            PrefetchStep("get_org_info",
+                         lambda known: {"org_id": known["get_user_info"]["org_id"]}
+                         if (known.get("get_user_info") or {}).get("org_id") else None,
+                         after=("get_user_info",)),
+        ],
+    )
+
+
+def call_key(tool: str, arguments: Dict[str, Any]) -> str:
+    """How a call is written in the prefetch block, and how calls are compared"""
+    return f"{tool}({json.dumps(arguments, sort_keys=True)})"
+
+
+class PrefetchedCall:
+    """One speculative tool call and its outcome"""
+
+    def __init__(self, tool: str, arguments: Dict[str, Any]):
+        self.tool = tool
+        self.arguments = arguments
+        self.key = call_key(tool, arguments)
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.elapsed_s = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class PrefetchResult:
+    """What was prefetched for one message"""
+
+    def __init__(self, plans: List[str], calls: List[PrefetchedCall], elapsed_s: float):
+        self.plans = plans
+        self.calls = calls
+        self.elapsed_s = elapsed_s
+
+    @property
+    def supplied(self) -> List[PrefetchedCall]:
+        return [call for call in self.calls if call.ok]
+
+    def block(self) -> Optional[str]:
+        """The context block for the agent, None when nothing was resolved"""
+        if not self.supplied:
+            return None
+        results = "; ".join(f"{call.key} = {json.dumps(call.result, sort_keys=True, default=str)}" for call in self.supplied)
+        return f"Already looked up for this request (use these instead of calling the tools again): {results}"
+
+    def dynamic(self) -> List[Tuple[str, str]]:
+        """The block as ContextBudget.prepare's dynamic context"""
+        block = self.block()
+        return [(PREFETCH_BLOCK, block)] if block else []
+
+
+EMPTY_RESULT = PrefetchResult([], [], 0.0)
+
+
+class ContextPrefetcher:
+    """Runs matching prefetch plans against an agent's local tools"""
+
+    def __init__(self, agent: Any, plans: Optional[List[PrefetchPlan]] = None, max_workers: int = 4,
+                 timeout_seconds: float = 2.0):
+        """
+        Args:
+            agent (Any): An ADK Agent; the plans call its local function tools
+            plans (Optional[List[PrefetchPlan]]): Defaults to [account_plan()]
+            max_workers (int): Concurrent tool calls
+            timeout_seconds (float): Deadline for one message's prefetch; later results are not supplied
+        """
+        self.plans = plans if plans is not None else [account_plan()]
+        self.timeout_seconds = timeout_seconds
+        self._tools = {handler.name: handler for handler in agent._local_handler_functions}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        # Orchestration waits on tool calls, so it must not take slots from them
+        self._planner = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch-plan")
+
+    def submit(self, message: str, context: Optional[Dict[str, str]] = None) -> "Future[PrefetchResult]":
+        """Start prefetching for a message in the background"""
+        return self._planner.submit(self.prefetch, message, context)
+
+    def prefetch(self, message: str, context: Optional[Dict[str, str]] = None) -> PrefetchResult:
+        """Resolve the matching plans' tool calls for a message
+
+        Args:
+            message (str): The user message
+            context (Optional[Dict[str, str]]): Known caller context, e.g. client_provided_context
+
+        Returns:
+            PrefetchResult: Resolved calls; failed and timed-out ones carry an error and are not supplied
+        """
+        started = time.perf_counter()
+        deadline = started + self.timeout_seconds
+        plans = []
+        for plan in self.plans:
+            if plan.applies(message):
+                known = plan.extract(context or {})
+                if not plan.conflicts(message, known):
+                    plans.append((plan, known))
+        calls: List[PrefetchedCall] = []
+        for plan, known in plans:
+            pending = [step for step in plan.steps if step.tool in self._tools]
+            # Each round runs every step whose dependencies are resolved, concurrently
+            while pending:
+                ready = [step for step in pending if all(tool in known for tool in step.after)]
+                pending = [step for step in pending if step not in ready]
+                round_calls = []
+                for step in ready:
+                    arguments = step.arguments(known)
+                    if arguments:
+                        call = PrefetchedCall(step.tool, arguments)
+                        round_calls.append((call, self._executor.submit(self._call, call)))
+                if not round_calls:
+                    break
+                wait([future for _, future in round_calls], timeout=max(deadline - time.perf_counter(), 0))
+                for call, future in round_calls:
+                    if not future.done():
+                        call.error = "timeout"
+                    elif call.ok:
+                        known[call.tool] = call.result
+                    calls.append(call)
+        return PrefetchResult([plan.name for plan, _ in plans], calls, time.perf_counter() - started)
+
+    def shutdown(self) -> None:
+        self._planner.shutdown(wait=False)
+        self._executor.shutdown(wait=False)
+
+    def _call(self, call: PrefetchedCall) -> None:
+        handler = self._tools[call.tool]
+        started = time.perf_counter()
+        try:
+            result = handler.callable(**handler._prepare_arguments(call.arguments))
+            if asyncio.iscoroutine(result):
+                result = asyncio.run(result)
+            if result is None:
+                raise LookupError("no result")
+            call.result = result
+        except Exception as e:
+            call.error = f"{type(e).__name__}: {e}"
+        call.elapsed_s = time.perf_counter() - started
+
+
+class PrefetchAgent:
+    """Wrapper for Agent.run that sends prefetched tool results with the message"""
+
+    def __init__(self, agent: Any, prefetcher: Optional[ContextPrefetcher] = None, budget: Any = None):
+        """
+        Args:
+            agent (Any): An ADK Agent (or ParallelAgent, FastPathAgent, ...)
+            prefetcher (Optional[ContextPrefetcher]): Defaults to the account plan over the agent's tools
+            budget (Any): Optional ContextBudget; the context and the prefetch block go through it
+        """
+        self.agent = agent
+        self.prefetcher = prefetcher or ContextPrefetcher(getattr(agent, "agent", agent))
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {PATH_PREFETCHED: [], PATH_PLAIN: []}
+        self._wait_s: List[float] = []
+        self.counters: Dict[str, int] = {
+            "runs": 0,
+            "prefetched": 0,
+            "calls": 0,
+            "call_errors": 0,
+            "timeouts": 0,
+            "dropped_by_budget": 0,
+            "not_repeated": 0,
+            "repeated": 0,
+            "missed": 0,
+            "steps_prefetched": 0,
+            "steps_plain": 0,
+        }
+
+    def prefetch(self, input: str, context: Optional[Dict[str, str]] = None) -> "Future[PrefetchResult]":
+        """Start the prefetch for a message, e.g. before acquiring its session; pass the future to run()"""
+        return self.prefetcher.submit(input, context)
+
+    def run(self, input: str, session_id: Optional[str] = None, context: Optional[Dict[str, str]] = None,
+            prefetched: Any = None, on_fulfilled_required_action: Optional[Callable] = None, **kwargs: Any) -> Any:
+        """Same contract as Agent.run, plus the caller context
+
+        Args:
+            input (str): The user message
+            session_id (Optional[str]): Session of the conversation, if any
+            context (Optional[Dict[str, str]]): Known caller context, sent with the message
+            prefetched (Any): A PrefetchResult or the Future from prefetch(); prefetched now if omitted
+            on_fulfilled_required_action (Optional[Callable]): Still called for every tool call
+            **kwargs: Passed to agent.run
+
+        Returns:
+            RunResponse: The agent's response
+        """
+        started = time.perf_counter()
+        if prefetched is None:
+            prefetched = self.prefetcher.prefetch(input, context)
+        elif isinstance(prefetched, Future):
+            try:
+                prefetched = prefetched.result(timeout=self.prefetcher.timeout_seconds)
+            except Exception:
+                prefetched = EMPTY_RESULT
+        wait_s = time.perf_counter() - started
+
+        dynamic = prefetched.dynamic()
+        supplied = bool(dynamic)
+        turn = None
+        if self.budget is not None and session_id is not None:
+            turn = self.budget.prepare(session_id, input, static=context, dynamic=dynamic)
+            message = turn.message
+            supplied = supplied and PREFETCH_BLOCK not in turn.dropped
+        else:
+            parts = list((context or {}).values()) + [text for _, text in dynamic]
+            message = f"[Context: {' '.join(parts)}] {input}" if parts else input
+
+        requested: List[str] = []
+
+        def track(required_action: Any, performed_action: Any) -> None:
+            function_call = required_action.function_call
+            arguments = function_call.arguments
+            requested.append(call_key(function_call.name, json.loads(arguments) if isinstance(arguments, str) else arguments))
+            if on_fulfilled_required_action:
+                on_fulfilled_required_action(required_action, performed_action)
+
+        response = self.agent.run(message, session_id=session_id, on_fulfilled_required_action=track, **kwargs)
+        if turn is not None:
+            self.budget.commit(turn)
+        elapsed = time.perf_counter() - started
+
+        path = PATH_PREFETCHED if supplied else PATH_PLAIN
+        keys = {call.key for call in prefetched.supplied} if supplied else set()
+        planned_tools = {call.tool for call in prefetched.calls}
+        with self._lock:
+            self.counters["runs"] += 1
+            self.counters["prefetched"] += bool(prefetched.plans)
+            self.counters["calls"] += len(prefetched.calls)
+            self.counters["call_errors"] += sum(1 for call in prefetched.calls if call.error not in (None, "timeout"))
+            self.counters["timeouts"] += sum(1 for call in prefetched.calls if call.error == "timeout")
+            self.counters["dropped_by_budget"] += bool(dynamic) and not supplied
+            self.counters["not_repeated"] += len(keys - set(requested))
+            self.counters["repeated"] += len(keys & set(requested))
+            self.counters["missed"] += sum(1 for key in requested
+                                           if key not in keys and key.split("(", 1)[0] in planned_tools)
+            self.counters[f"steps_{path}"] += len(response.raw_responses)
+            self._latencies[path].append(elapsed)
+            if prefetched.plans:
+                self._wait_s.append(wait_s)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            latencies = {path: list(values) for path, values in self._latencies.items()}
+            wait_s = list(self._wait_s)
+        for path, values in latencies.items():
+            stats[f"mean_steps_{path}"] = stats[f"steps_{path}"] / len(values) if values else 0.0
+        stats["latency_s"] = {path: summarize_latencies(values) for path, values in latencies.items()}
+        stats["prefetch_wait_s"] = summarize_latencies(wait_s)
+        return stats
+
+    def __getattr__(self, name: str) -> Any:
+        # setup, create_session, delete_session, ... go to the agent
+        return getattr(self.agent, name)
+
+
+BENCH_CONTEXT = {"user": "The logged in user ID is: user_123"}
+# (question, kind): the account plan applies, does not apply, and is skipped because another user is named
+BENCH_QUESTIONS = [
+    ("Is my user account eligible for the Responses API?", "own_account"),
+    ("Tell me about Oracle Cloud?", "product"),
+    ("Is user_456 eligible for the Responses API?", "other_user"),
+]
+
+
+def benchmark(repeat: int = 3, agent_latency_ms: float = 300, backend_latency_ms: float = 30,
+              concurrency: int = 3) -> Dict[str, Any]:
+    """Run support questions through a stand-in agent with and without prefetch
+
+    The stand-in asks for get_user_info, then get_org_info, for eligibility questions, unless the message
+    already contains that call's result.
+
+    Args:
+        repeat (int): Runs per question and mode
+        agent_latency_ms (float): Stand-in latency of each agent chat
+        backend_latency_ms (float): Latency of each user/org backend query
+        concurrency (int): Concurrent runs
+
+    Returns:
+        Dict[str, Any]: Per mode and question kind: latency, agent steps and tool calls; and the prefetch stats
+    """
+    from oci.addons.adk import AgentClient
+    from oci.addons.adk.logger import default_logger
+
+    from custom_function_tools import AccountBackend, AccountToolkit, create_account_loaders
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+    from parallel_tools import ParallelAgent
+
+    default_logger.console.quiet = True
+    config_path = write_offline_oci_config()
+
+    def lookup(tool: str, name: str, value: str) -> Dict[str, Any]:
+        return {"name": tool, "arguments": {name: value}, "known_if": call_key(tool, {name: value})}
+
+    server_config = {
+        "latency_ms": {"agent_chat": {"mean": agent_latency_ms, "jitter": agent_latency_ms / 6},
+                       "session": {"mean": 20, "jitter": 0}},
+        "tool_calls": [
+            {"match": "user_456", "steps": [[lookup("get_user_info", "user_id", "user_456")],
+                                            [lookup("get_org_info", "org_id", "org_222")]]},
+            {"match": "eligible", "steps": [[lookup("get_user_info", "user_id", "user_123")],
+                                            [lookup("get_org_info", "org_id", "org_222")]]},
+        ],
+    }
+    traffic = [question for question in BENCH_QUESTIONS for _ in range(repeat)]
+    report: Dict[str, Any] = {"runs_per_mode": len(traffic)}
+    with MockGenAIServer(config=server_config) as server:
+        client = AgentClient(auth_type="api_key", config=config_path, profile="DEFAULT",
+                             runtime_endpoint=server.url, management_endpoint=server.url)
+        for mode in (PATH_PLAIN, PATH_PREFETCHED):
+            # Fresh backend and loaders per mode, so neither benefits from the other's cache
+            backend = AccountBackend(latency_ms=backend_latency_ms)
+            agent = ParallelAgent(client=client, agent_endpoint_id="ocid1.genaiagentendpoint.oc1..standin",
+                                  instructions="You are customer support agent.",
+                                  tools=[AccountToolkit(backend, create_account_loaders(backend))])
+            agent.setup()
+            wrapped = PrefetchAgent(agent, ContextPrefetcher(agent, plans=[] if mode == PATH_PLAIN else None))
+            before = server.state.stats()["requests"].get("agent_chat", 0)
+
+            def ask(question: Tuple[str, str]) -> Tuple[str, float, int, int]:
+                try:
+                    asyncio.get_event_loop()
+                except RuntimeError:
+                    asyncio.set_event_loop(asyncio.new_event_loop())
+                calls: List[Any] = []
+                started = time.perf_counter()
+                prefetched = wrapped.prefetch(question[0], BENCH_CONTEXT)
+                session_id = agent.create_session()
+                response = wrapped.run(question[0], session_id=session_id, context=BENCH_CONTEXT, prefetched=prefetched,
+                                       on_fulfilled_required_action=lambda required, performed: calls.append(required))
+                elapsed = time.perf_counter() - started
+                agent.delete_session(session_id)
+                return question[1], elapsed, len(response.raw_responses), len(calls)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(ask, traffic))
+            per_kind: Dict[str, Any] = {}
+            for _, kind in BENCH_QUESTIONS:
+                rows = [row for row in results if row[0] == kind]
+                per_kind[kind] = {
+                    "latency_s": round(summarize_latencies([row[1] for row in rows])["mean"], 3),
+                    "agent_steps": round(sum(row[2] for row in rows) / len(rows), 2),
+                    "agent_tool_calls": round(sum(row[3] for row in rows) / len(rows), 2),
+                }
+            report[mode] = {
+                "elapsed_s": round(time.perf_counter() - started, 2),
+                "agent_chats": server.state.stats()["requests"].get("agent_chat", 0) - before,
+                "backend_queries": backend.stats()["queries"],
+                "questions": per_kind,
+            }
+            if mode == PATH_PREFETCHED:
+                stats = wrapped.stats()
+                report["prefetch"] = {key: stats[key] for key in ("prefetched", "calls", "call_errors", "timeouts",
+                                                                  "not_repeated", "repeated", "missed")}
+                report["prefetch"]["wait_s_p95"] = round(stats["prefetch_wait_s"]["p95"], 4)
+            wrapped.prefetcher.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speculative tool-result prefetch from the caller context.")
+    parser.add_argument("--bench", action="store_true", help="Compare stand-in support runs with and without prefetch")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per question and mode")
+    parser.add_argument("question", nargs="?", help="Show what would be prefetched for a question")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(json.dumps(benchmark(args.repeat), indent=2))
+    elif args.question:
+        # Only the plan matching and fact extraction, no tool calls
+        plans = [(plan, plan.extract(BENCH_CONTEXT)) for plan in [account_plan()] if plan.applies(args.question)]
+        plans = [(plan, facts) for plan, facts in plans if not plan.conflicts(args.question, facts)]
+        print(json.dumps({"plans": [plan.name for plan, _ in plans],
+                          "facts": {plan.name: facts for plan, facts in plans}}, indent=2))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
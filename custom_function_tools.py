@@ -1,8 +1,87 @@
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, List, Optional
 from oci.addons.adk import Toolkit, tool
+from dataloader import DataLoader
+
+
+class AccountBackend:
+    """Bulk user/org queries; stands in for the user and org database"""
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.queries = 0
+        self.keys_queried = 0
+        self._lock = threading.Lock()
+
+    def get_users(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # Here is a mock implementation of: SELECT ... FROM users WHERE user_id IN (...)
+        self._query(user_ids)
+        return {
+            user_id: {
+                "user_id": user_id,
+                "account_id": "acc_111",
+                "name": "John Doe",
+                "email": "john.doe@example.com",
+                "org_id": "org_222",
+            }
+            for user_id in user_ids
+        }
+
+    def get_orgs(self, org_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # Here is a mock implementation of: SELECT ... FROM orgs WHERE org_id IN (...)
+        self._query(org_ids)
+        return {
+            org_id: {
+                "org_id": org_id,
+                "name": "Acme Inc",
+                "admin_email": "admin@acme.com",
+                "plan": "Enterprise",
+            }
+            for org_id in org_ids
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"queries": self.queries, "keys_queried": self.keys_queried}
+
+    def _query(self, keys: List[str]) -> None:
+        with self._lock:
+            self.queries += 1
+            self.keys_queried += len(keys)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+
+def create_account_loaders(backend: AccountBackend, ttl_seconds: float = 300) -> Dict[str, DataLoader]:
+    """Data loaders for users and orgs, caching results for ttl_seconds"""
+    return {
+        "users": DataLoader(backend.get_users, ttl_seconds=ttl_seconds),
+        "orgs": DataLoader(backend.get_orgs, ttl_seconds=ttl_seconds),
+    }
+
+
+_default_backend = AccountBackend()
+# Shared by every AccountToolkit, so concurrent runs and later turns reuse each other's lookups
+_default_loaders = create_account_loaders(_default_backend)
+
 
 class AccountToolkit(Toolkit):
 
+    _backend: Any = None
+    _loaders: Optional[Dict[str, DataLoader]] = None
+
+    def __init__(self, backend: Optional[AccountBackend] = None, loaders: Optional[Dict[str, DataLoader]] = None):
+        """
+        Args:
+            backend (Optional[AccountBackend]): User/org backend, defaults to the shared one
+            loaders (Optional[Dict[str, DataLoader]]): "users" and "orgs" loaders; defaults to the shared ones
+                for the default backend, and direct backend queries for any other backend
+        """
+        super().__init__()
+        self._backend = backend or _default_backend
+        self._loaders = loaders if loaders is not None or backend is not None else _default_loaders
+
     @tool
     def get_user_info(self, user_id: str) -> Dict[str, Any]:
         """Get information about a user by user_id
@@ -13,14 +92,9 @@ class AccountToolkit(Toolkit):
         Returns:
             Dict[str, Any]: A dictionary containing the user information
         """
-        # Here is a mock implementation
-        return {
-            "user_id": user_id,
-            "account_id": "acc_111",
-            "name": "John Doe",
-            "email": "john.doe@example.com",
-            "org_id": "org_222",
-        }
+        if self._loaders is not None:
+            return self._loaders["users"].load(user_id)
+        return self._backend.get_users([user_id]).get(user_id)
 
     @tool
     def get_org_info(self, org_id: str) -> Dict[str, Any]:
@@ -32,10 +106,6 @@ class AccountToolkit(Toolkit):
         Returns:
             Dict[str, Any]: A dictionary containing the organization information
         """
-        # Here is a mock implementation
-        return {
-            "org_id": org_id,
-            "name": "Acme Inc",
-            "admin_email": "admin@acme.com",
-            "plan": "Enterprise",
-        }
\ No newline at end of file
+        if self._loaders is not None:
+            return self._loaders["orgs"].load(org_id)
+        return self._backend.get_orgs([org_id]).get(org_id)
@@ -0,0 +1,254 @@
+"""
+dataloader.py - Batched, cached, coalescing key lookups for Toolkit function tools
+
+`AccountToolkit.get_user_info` and `get_org_info` (custom_function_tools.py) look up one id at a time,
+once per agent step, and the same user and org are looked up again on every turn of a session.
+A `DataLoader` sits between such tools and their backend.
+
+Features:
+- Per-key results cached with a TTL (and an LRU bound on the number of entries).
+- Lookups of a key that is already being fetched wait for that fetch instead of querying again.
+- Lookups arriving within `batch_window_ms` of each other (concurrent tool calls in a step, or concurrent
+  runs on other threads) are sent to the backend as one bulk query of up to `max_batch_size` keys.
+- `stats()` reports hits, coalesced lookups, backend batches and keys fetched.
+
+Usage:
+    users = DataLoader(lambda ids: backend.get_users(ids), ttl_seconds=300)
+    user = users.load("user_123")
+    users_by_id = dict(zip(ids, users.load_many(ids)))
+
+- python dataloader.py --bench compares backend queries and tool latency of AccountToolkit with and without loaders.
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from perf_stats import summarize_latencies
+
+
+class _Pending:
+    """A key queued for (or in) a backend batch"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class DataLoader:
+    """Caches, de-duplicates and batches lookups to a bulk backend function"""
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Dict[Hashable, Any]], ttl_seconds: float = 300,
+                 max_entries: int = 10000, batch_window_ms: float = 2.0, max_batch_size: int = 100):
+        """
+        Args:
+            batch_fn (Callable[[List[Hashable]], Dict[Hashable, Any]]): Bulk lookup returning values by key;
+                keys missing from the result load as None
+            ttl_seconds (float): How long a loaded value is served from the cache, 0 disables caching
+            max_entries (int): Least recently used entries are dropped above this count
+            batch_window_ms (float): How long the first lookup waits for others to join its batch
+            max_batch_size (int): Maximum keys per backend call
+        """
+        self.batch_fn = batch_fn
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+        self._cache: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Pending] = {}
+        self._queue: List[Hashable] = []
+        self._dispatch_scheduled = False
+        self._lock = threading.Lock()
+        self.counters = {
+            "loads": 0,
+            "hits": 0,
+            "coalesced": 0,
+            "misses": 0,
+            "batches": 0,
+            "keys_fetched": 0,
+            "errors": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+    def load(self, key: Hashable) -> Any:
+        """Return the value for one key"""
+        return self.load_many([key])[0]
+
+    def load_many(self, keys: List[Hashable]) -> List[Any]:
+        """Return values for keys, in order; uncached keys are fetched in as few batches as possible
+
+        Raises:
+            Exception: Whatever batch_fn raised for a batch containing one of the keys
+        """
+        now = time.monotonic()
+        results: Dict[Hashable, Any] = {}
+        waiting: Dict[Hashable, _Pending] = {}
+        leader = False
+        with self._lock:
+            for key in keys:
+                if key in results or key in waiting:
+                    continue
+                self.counters["loads"] += 1
+                entry = self._cache.get(key)
+                if entry is not None:
+                    if entry[1] > now:
+                        self._cache.move_to_end(key)
+                        self.counters["hits"] += 1
+                        results[key] = entry[0]
+                        continue
+                    del self._cache[key]
+                    self.counters["expired"] += 1
+                pending = self._inflight.get(key)
+                if pending is not None:
+                    self.counters["coalesced"] += 1
+                else:
+                    pending = self._inflight[key] = _Pending()
+                    self._queue.append(key)
+                    self.counters["misses"] += 1
+                waiting[key] = pending
+            if self._queue and not self._dispatch_scheduled:
+                self._dispatch_scheduled = leader = True
+
+        if leader:
+            # The first caller collects keys from concurrent callers for a moment, then sends the batch
+            if self.batch_window_ms > 0:
+                time.sleep(self.batch_window_ms / 1000)
+            self._dispatch()
+
+        for key, pending in waiting.items():
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            results[key] = pending.value
+        return [results[key] for key in keys]
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        """Cache a value obtained elsewhere (e.g. a user record that embeds its org)"""
+        with self._lock:
+            self._remember(key, value, time.monotonic())
+
+    def clear(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key (after a write to the backend) or the whole cache"""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            stats["entries"] = len(self._cache)
+        stats["hit_rate"] = stats["hits"] / stats["loads"] if stats["loads"] else 0.0
+        stats["avg_batch_size"] = stats["keys_fetched"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            keys, self._queue = self._queue, []
+            self._dispatch_scheduled = False
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = keys[start:start + self.max_batch_size]
+            try:
+                values = self.batch_fn(batch) or {}
+                error = None
+            except Exception as e:
+                values, error = {}, e
+            now = time.monotonic()
+            with self._lock:
+                self.counters["batches"] += 1
+                self.counters["keys_fetched"] += len(batch)
+                if error is not None:
+                    self.counters["errors"] += 1
+                pendings = [self._inflight.pop(key) for key in batch]
+                for key, pending in zip(batch, pendings):
+                    if error is None:
+                        pending.value = values.get(key)
+                        self._remember(key, pending.value, now)
+                    pending.error = error
+            for pending in pendings:
+                pending.done.set()
+
+    def _remember(self, key: Hashable, value: Any, now: float) -> None:
+        # Caller holds the lock
+        if self.ttl_seconds <= 0:
+            return
+        self._cache[key] = (value, now + self.ttl_seconds)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.counters["evictions"] += 1
+
+
+def benchmark(sessions: int = 20, turns: int = 5, users: int = 8, backend_latency_ms: float = 20,
+              concurrency: int = 8) -> Dict[str, Any]:
+    """Run simulated support sessions against AccountToolkit with and without loaders
+
+    Each turn looks up the session's user and then the user's org, as 03_product_support_agent.py does.
+
+    Args:
+        sessions (int): Number of simulated sessions
+        turns (int): Turns per session
+        users (int): Distinct users across sessions
+        backend_latency_ms (float): Simulated latency of one backend query
+        concurrency (int): Sessions running at once
+
+    Returns:
+        Dict[str, Any]: Backend queries, wall time and tool latency per mode
+    """
+    from custom_function_tools import AccountBackend, AccountToolkit, create_account_loaders
+
+    report: Dict[str, Any] = {}
+    for mode in ("direct", "dataloader"):
+        backend = AccountBackend(latency_ms=backend_latency_ms)
+        loaders = create_account_loaders(backend) if mode == "dataloader" else None
+        toolkit = AccountToolkit(backend=backend, loaders=loaders)
+        latencies: List[float] = []
+        latencies_lock = threading.Lock()
+
+        def run_session(index: int) -> None:
+            user_id = f"user_{index % users}"
+            for _ in range(turns):
+                started = time.perf_counter()
+                user = toolkit.get_user_info(user_id)
+                toolkit.get_org_info(user["org_id"])
+                with latencies_lock:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run_session, range(sessions)))
+        report[mode] = {
+            "wall_s": time.perf_counter() - started,
+            "backend": backend.stats(),
+            "tool_latency_s": summarize_latencies(latencies),
+        }
+        if loaders is not None:
+            report[mode]["loaders"] = {name: loader.stats() for name, loader in loaders.items()}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AccountToolkit with and without data loaders.")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--backend-latency-ms", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return
+    report = benchmark(args.sessions, args.turns, args.users, args.backend_latency_ms, args.concurrency)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
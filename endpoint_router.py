@@ -0,0 +1,543 @@
+"""
+endpoint_router.py - Latency-aware routing and failover across regions, endpoints and replica agents
+
+The examples fix one region per process (`OCI_REGION`, `ENDPOINT` in 00_sample.py) and one
+`agent_endpoint_id` per `Agent`, so a slow or degraded region directly becomes our latency. An
+`EndpointRouter` spreads calls over several targets instead and keeps each conversation on its own.
+
+Features:
+- Per-target EWMA latency and error rate; each call goes to the healthy target with the lowest
+  latency, penalized by its recent error rate. A small share of calls explores the other targets so a
+  recovered region wins its traffic back.
+- Targets failing `failure_threshold` times in a row are ejected for `eject_seconds`, then get a
+  trial call; when every target is ejected the least recently ejected one is still tried.
+- Automatic failover to the next best target on throttling, 5xx, timeouts and connection errors,
+  for calls that are safe to repeat (inference chat, creating a session).
+- `RoutedInferenceClient`: `chat()` across inference endpoints (e.g. one per region).
+- `RoutedAgent`: replica agent endpoints behind one `run()`. A session stays on the endpoint that created
+  it and is never sent to another one; if that endpoint fails, the error is raised, or with
+  `restart_lost_sessions=True` the turn starts a new session on a replica that has not failed it yet
+  (each replica at most once per turn), deleting the abandoned sessions.
+  Drop-in for `SessionPool` (create_session/run/delete_session).
+
+Usage:
+    client = RoutedInferenceClient(["https://inference.generativeai.us-chicago-1.oci.oraclecloud.com",
+                                    "https://inference.generativeai.eu-frankfurt-1.oci.oraclecloud.com"])
+    response = client.chat(build_chat_details("what is oracle cloud in 1 line"))
+
+    agent = RoutedAgent([chicago_agent, frankfurt_agent])
+    agent.setup()
+    response = agent.run("What is the square root of 256?")
+    response = agent.run("do the same thing for 81", session_id=response.session_id)
+    print(agent.router.stats())
+
+- python endpoint_router.py --bench routes inference calls over three stand-in servers of different
+  latency, degrades the fastest one midway, and checks multi-turn affinity across two stand-in agents.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import oci
+from circuitbreaker import CircuitBreakerError
+
+from perf_stats import summarize_latencies
+
+
+class NoHealthyTargetError(Exception):
+    """Every target was tried for a call and failed"""
+
+
+class SessionAffinityError(Exception):
+    """A session_id that this router did not create (or has forgotten) was passed to run()"""
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """Whether an error means the target, not the request, is the problem"""
+    if isinstance(error, oci.exceptions.ServiceError):
+        return error.status == 429 or error.status >= 500 or error.status == -1
+    # CircuitBreakerError: the SDK's own breaker for the endpoint is open
+    if isinstance(error, (oci.exceptions.RequestException, oci.exceptions.ConnectTimeout, CircuitBreakerError)):
+        return True
+    # AgentClient wraps SDK errors; the cause says what happened
+    cause = error.__cause__
+    return cause is not None and cause is not error and is_failover_error(cause)
+
+
+class _TargetHealth:
+    """EWMA latency and error rate, and ejection state, of one target"""
+
+    def __init__(self):
+        self.latency_s: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.ejections = 0
+
+
+class EndpointRouter:
+    """Ranks targets by recent latency and errors and fails over between them"""
+
+    def __init__(self, targets: Sequence[str], alpha: float = 0.2, error_penalty: float = 4.0,
+                 failure_threshold: int = 3, eject_seconds: float = 30, explore_ratio: float = 0.05,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            targets (Sequence[str]): Target names (endpoints, regions or agent endpoint ids)
+            alpha (float): EWMA weight of the newest sample
+            error_penalty (float): Score is latency * (1 + error_penalty * error rate)
+            failure_threshold (int): Consecutive failures that eject a target
+            eject_seconds (float): How long an ejected target is skipped
+            explore_ratio (float): Share of calls sent to a random healthy target other than the best
+            seed (Optional[int]): Seed for exploration
+        """
+        if not targets:
+            raise ValueError("At least one target is required")
+        self.targets = list(targets)
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.explore_ratio = explore_ratio
+        self.random = random.Random(seed)
+        self._health = {target: _TargetHealth() for target in self.targets}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failovers": 0, "explored": 0, "exhausted": 0}
+
+    def ranked(self, exclude: Sequence[str] = ()) -> List[str]:
+        """Targets in the order they should be tried: healthy by score, then ejected by ejection time"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [target for target in self.targets if target not in exclude]
+
+            def score(target: str) -> float:
+                health = self._health[target]
+                # Targets without a latency sample rank first, so every target gets measured
+                latency = health.latency_s if health.latency_s is not None else 0.0
+                return latency * (1 + self.error_penalty * health.error_rate)
+
+            healthy = sorted((t for t in candidates if self._health[t].ejected_until <= now), key=score)
+            ejected = sorted((t for t in candidates if self._health[t].ejected_until > now),
+                             key=lambda t: self._health[t].ejected_until)
+            if len(healthy) > 1 and self.random.random() < self.explore_ratio:
+                healthy.insert(0, healthy.pop(self.random.randrange(1, len(healthy))))
+                self.counters["explored"] += 1
+        return healthy + ejected
+
+    def choose(self, exclude: Sequence[str] = ()) -> str:
+        """The target the next call should go to"""
+        ranked = self.ranked(exclude)
+        if not ranked:
+            raise NoHealthyTargetError("No target left to try")
+        return ranked[0]
+
+    def observe(self, target: str, latency_s: float, ok: bool) -> None:
+        """Record the outcome of one call to a target"""
+        with self._lock:
+            health = self._health[target]
+            health.calls += 1
+            health.error_rate += self.alpha * ((0.0 if ok else 1.0) - health.error_rate)
+            if ok:
+                health.consecutive_failures = 0
+                health.ejected_until = 0.0
+                health.latency_s = latency_s if health.latency_s is None else \
+                    health.latency_s + self.alpha * (latency_s - health.latency_s)
+                return
+            health.errors += 1
+            health.consecutive_failures += 1
+            # A target back from ejection is ejected again on its first failure
+            if health.consecutive_failures >= self.failure_threshold:
+                health.ejected_until = time.monotonic() + self.eject_seconds
+                health.ejections += 1
+
+    def call(self, fn: Callable[[str], Any], failover: bool = True,
+             is_retryable: Callable[[BaseException], bool] = is_failover_error) -> Tuple[str, Any]:
+        """Call fn(target) on the best target, failing over to the next on target errors
+
+        Args:
+            fn (Callable[[str], Any]): The call, given the target name
+            failover (bool): Try the next target on a target error (only for calls safe to repeat)
+            is_retryable (Callable[[BaseException], bool]): Which errors are target errors
+
+        Returns:
+            Tuple[str, Any]: The target that answered and fn's result
+
+        Raises:
+            NoHealthyTargetError: If every target failed (chained to the last error)
+            Exception: A non-target error, or any error when failover is False
+        """
+        with self._lock:
+            self.counters["calls"] += 1
+        last_error: Optional[BaseException] = None
+        for attempt, target in enumerate(self.ranked()):
+            if attempt:
+                with self._lock:
+                    self.counters["failovers"] += 1
+            started = time.perf_counter()
+            try:
+                result = fn(target)
+            except Exception as e:
+                target_error = is_retryable(e)
+                self.observe(target, time.perf_counter() - started, not target_error)
+                if not (failover and target_error):
+                    raise
+                last_error = e
+                continue
+            self.observe(target, time.perf_counter() - started, True)
+            return target, result
+        with self._lock:
+            self.counters["exhausted"] += 1
+        raise NoHealthyTargetError(f"All {len(self.targets)} targets failed") from last_error
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            stats["targets"] = {
+                target: {
+                    "latency_ewma_s": health.latency_s,
+                    "error_rate_ewma": health.error_rate,
+                    "calls": health.calls,
+                    "errors": health.errors,
+                    "ejections": health.ejections,
+                    "ejected": health.ejected_until > now,
+                }
+                for target, health in self._health.items()
+            }
+        return stats
+
+
+class RoutedInferenceClient:
+    """GenerativeAiInferenceClient.chat over several inference endpoints"""
+
+    def __init__(self, endpoints: Sequence[str], router: Optional[EndpointRouter] = None,
+                 client_factory: Optional[Callable[[str], Any]] = None):
+        """
+        Args:
+            endpoints (Sequence[str]): Inference service endpoints, e.g. one per region
+            router (Optional[EndpointRouter]): Router over the endpoints, created with defaults when not given
+            client_factory (Optional[Callable[[str], Any]]): Creates the client for an endpoint, defaults to
+                genai_chat.create_inference_client (shared, pooled clients)
+        """
+        if client_factory is None:
+            from genai_chat import create_inference_client
+
+            def client_factory(endpoint: str) -> Any:
+                return create_inference_client(endpoint=endpoint)
+
+        self.router = router or EndpointRouter(endpoints)
+        self.clients = {endpoint: client_factory(endpoint) for endpoint in endpoints}
+
+    def chat(self, chat_details: Any, **kwargs: Any) -> Any:
+        """Send a chat to the best endpoint, failing over to the others"""
+        _, response = self.router.call(lambda endpoint: self.clients[endpoint].chat(chat_details, **kwargs))
+        return response
+
+
+class RoutedAgent:
+    """Replica agent endpoints behind one Agent-like run() with session affinity"""
+
+    def __init__(self, agents: Sequence[Any], router: Optional[EndpointRouter] = None, max_sessions: int = 100000,
+                 restart_lost_sessions: bool = False):
+        """
+        Args:
+            agents (Sequence[Any]): One ADK Agent per replica endpoint (same instructions and tools)
+            router (Optional[EndpointRouter]): Router over the agents' endpoint ids, created with defaults when not given
+            max_sessions (int): Session-to-endpoint assignments remembered (least recently used are forgotten)
+            restart_lost_sessions (bool): When a session's endpoint fails, start a new session (losing
+                the conversation's remote history) on another endpoint instead of raising
+        """
+        self.agents = {agent.agent_endpoint_id: agent for agent in agents}
+        if len(self.agents) != len(agents):
+            raise ValueError("Each agent must use a different agent_endpoint_id")
+        self.router = router or EndpointRouter(list(self.agents))
+        self.max_sessions = max_sessions
+        self.restart_lost_sessions = restart_lost_sessions
+        self._sessions: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"sessions_created": 0, "sessions_restarted": 0, "sessions_forgotten": 0,
+                         "abandoned_not_deleted": 0}
+        for endpoint_id, agent in self.agents.items():
+            self._observe_chats(endpoint_id, agent)
+
+    def setup(self) -> None:
+        """Set up every replica; a replica that cannot be reached is recorded as failing
+
+        Raises:
+            NoHealthyTargetError: If no replica could be set up
+        """
+        errors = []
+        for endpoint_id, agent in self.agents.items():
+            started = time.perf_counter()
+            try:
+                agent.setup()
+            except Exception as e:
+                errors.append(e)
+                self.router.observe(endpoint_id, time.perf_counter() - started, False)
+        if len(errors) == len(self.agents):
+            raise NoHealthyTargetError("No agent endpoint could be set up") from errors[-1]
+
+    def create_session(self, session_name: Optional[str] = None, session_description: Optional[str] = None) -> str:
+        """Create a session on the best replica and remember where it lives"""
+        endpoint_id, session_id = self.router.call(
+            lambda target: self.agents[target].create_session(session_name, session_description)
+        )
+        self._assign(session_id, endpoint_id)
+        return session_id
+
+    def run(self, input: str, session_id: Optional[str] = None, **kwargs: Any) -> Any:
+        """Agent.run on the replica owning session_id, or on the best replica for a new session
+
+        With restart_lost_sessions, a turn whose replica fails is started over on a new session on a
+        replica that has not failed this turn; each replica is tried at most once per turn.
+
+        Raises:
+            SessionAffinityError: If session_id was not created through this router
+            NoHealthyTargetError: With restart_lost_sessions, if every replica failed the turn
+            Exception: The replica's error (unless restart_lost_sessions starts the turn over elsewhere)
+        """
+        if session_id is None:
+            session_id = self.create_session(kwargs.pop("session_name", None), kwargs.pop("session_description", None))
+        endpoint_id = self.endpoint_for(session_id)
+        if endpoint_id is None:
+            raise SessionAffinityError(f"Unknown session {session_id}; it must be created through this RoutedAgent")
+        failed: List[str] = []
+        while True:
+            try:
+                # Not failed over: the turn may already have run tools on the remote session
+                response = self.agents[endpoint_id].run(input, session_id=session_id, **kwargs)
+                break
+            except Exception as e:
+                if not (self.restart_lost_sessions and is_failover_error(e)):
+                    raise
+                failed.append(endpoint_id)
+                self._abandon(session_id, endpoint_id)
+                if len(failed) == len(self.agents):
+                    raise NoHealthyTargetError(f"All {len(self.agents)} agent endpoints failed the turn") from e
+                with self._lock:
+                    self.counters["sessions_restarted"] += 1
+                session_id, endpoint_id = self._create_session_excluding(failed)
+        if kwargs.get("delete_session"):
+            self.forget(session_id)
+        return response
+
+    def delete_session(self, session_id: str) -> None:
+        """Delete a session on the replica that owns it"""
+        endpoint_id = self.endpoint_for(session_id)
+        if endpoint_id is None:
+            raise SessionAffinityError(f"Unknown session {session_id}")
+        self.forget(session_id)
+        self.agents[endpoint_id].delete_session(session_id)
+
+    def endpoint_for(self, session_id: str) -> Optional[str]:
+        """The agent endpoint id a session lives on, None if unknown"""
+        with self._lock:
+            endpoint_id = self._sessions.get(session_id)
+            if endpoint_id is not None:
+                self._sessions.move_to_end(session_id)
+            return endpoint_id
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            stats["sessions"] = len(self._sessions)
+        stats["router"] = self.router.stats()
+        return stats
+
+    def _abandon(self, session_id: str, endpoint_id: str) -> None:
+        # The turn moves elsewhere; delete the session on its failing replica if that still works
+        self.forget(session_id)
+        try:
+            self.agents[endpoint_id].delete_session(session_id)
+        except Exception:
+            with self._lock:
+                self.counters["abandoned_not_deleted"] += 1
+
+    def _create_session_excluding(self, exclude: Sequence[str]) -> Tuple[str, str]:
+        # Replicas that already failed this turn are not tried again
+        last_error: Optional[BaseException] = None
+        for target in self.router.ranked(exclude=exclude):
+            started = time.perf_counter()
+            try:
+                session_id = self.agents[target].create_session()
+            except Exception as e:
+                self.router.observe(target, time.perf_counter() - started, not is_failover_error(e))
+                last_error = e
+                continue
+            self.router.observe(target, time.perf_counter() - started, True)
+            self._assign(session_id, target)
+            return session_id, target
+        raise NoHealthyTargetError("No agent endpoint could create a session") from last_error
+
+    def _assign(self, session_id: str, endpoint_id: str) -> None:
+        with self._lock:
+            self._sessions[session_id] = endpoint_id
+            self._sessions.move_to_end(session_id)
+            self.counters["sessions_created"] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.counters["sessions_forgotten"] += 1
+
+    def _observe_chats(self, endpoint_id: str, agent: Any) -> None:
+        # Every chat round trip of a run feeds the replica's latency and error rate
+        handle_chat = agent._handle_chat
+
+        def observed_handle_chat(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                response = handle_chat(*args, **kwargs)
+            except Exception as e:
+                self.router.observe(endpoint_id, time.perf_counter() - started, not is_failover_error(e))
+                raise
+            self.router.observe(endpoint_id, time.perf_counter() - started, True)
+            return response
+
+        agent._handle_chat = observed_handle_chat
+
+
+def benchmark(requests: int = 300, concurrency: int = 4, latencies_ms: Sequence[float] = (40, 120, 250),
+              conversations: int = 20) -> Dict[str, Any]:
+    """Route inference chats over stand-in servers while the fastest one degrades, and check agent affinity
+
+    After a third of the requests the fastest server slows down by 400 ms, after two thirds it fails every
+    chat with 503. "fixed" sends everything to that server, "routed" uses an EndpointRouter over all of them.
+    Then two-turn conversations run through a RoutedAgent over two stand-in agents (a stand-in answers
+    404 for sessions it did not create, so any affinity mistake fails the turn).
+
+    Args:
+        requests (int): Inference chats per mode
+        concurrency (int): Chats in flight
+        latencies_ms (Sequence[float]): Latency of each inference server, the first one degrades
+        conversations (int): Two-turn conversations for the affinity check
+
+    Returns:
+        Dict[str, Any]: Latency, success rate and per-target calls per mode, and the affinity check
+    """
+    from oci.addons.adk import Agent, AgentClient
+    from oci.addons.adk.logger import default_logger
+
+    from genai_chat import build_chat_details
+    from mock_genai_server import MockGenAIServer, StandInState, write_offline_oci_config
+
+    config_path = write_offline_oci_config()
+    config = oci.config.from_file(config_path, "DEFAULT")
+    report: Dict[str, Any] = {"latencies_ms": list(latencies_ms), "degrade": "+400 ms after 1/3, 503s after 2/3"}
+
+    for mode in ("fixed", "routed"):
+        servers = [
+            MockGenAIServer(config={"latency_ms": {"inference_chat": {"mean": latency, "jitter": latency / 10}},
+                                    "error_status": 503, "error_routes": ["inference_chat"]}).start()
+            for latency in latencies_ms
+        ]
+        try:
+            endpoints = [server.url for server in servers] if mode == "routed" else [servers[0].url]
+            client = RoutedInferenceClient(
+                endpoints,
+                router=EndpointRouter(endpoints, eject_seconds=2, seed=0),
+                # No SDK retries or circuit breaker, so only the router reacts to the degraded server
+                client_factory=lambda endpoint: oci.generative_ai_inference.GenerativeAiInferenceClient(
+                    config=config, service_endpoint=endpoint, retry_strategy=oci.retry.NoneRetryStrategy(),
+                    circuit_breaker_strategy=oci.circuit_breaker.NoCircuitBreakerStrategy()),
+            )
+            latencies: List[float] = []
+            failures = 0
+            lock = threading.Lock()
+
+            def call(index: int) -> None:
+                nonlocal failures
+                if index == requests // 3:
+                    servers[0].state.config["latency_ms"]["inference_chat"]["mean"] += 400
+                elif index == 2 * requests // 3:
+                    servers[0].state.config["error_rate"] = 1.0
+                started = time.perf_counter()
+                try:
+                    client.chat(build_chat_details(f"request {index}", compartment_id=StandInState.COMPARTMENT_ID))
+                except Exception:
+                    with lock:
+                        failures += 1
+                    return
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(call, range(requests)))
+            router_stats = client.router.stats()
+            report[mode] = {
+                "success_rate": (requests - failures) / requests,
+                "latency_s": summarize_latencies(latencies),
+                "calls_per_target": {f"{latency:g}ms": server.state.stats()["requests"].get("inference_chat", 0)
+                                     for latency, server in zip(latencies_ms, servers)},
+                "failovers": router_stats["failovers"],
+            }
+        finally:
+            for server in servers:
+                server.stop()
+
+    # Affinity: multi-turn conversations over two replica agents
+    quiet = default_logger.console.quiet
+    default_logger.console.quiet = True
+    servers = [MockGenAIServer(config={"latency_ms": {"agent_chat": {"mean": latency, "jitter": 0}}}).start()
+               for latency in latencies_ms[:2]]
+    try:
+        agents = [
+            Agent(
+                client=AgentClient(auth_type="api_key", config=config_path, profile="DEFAULT",
+                                   runtime_endpoint=server.url, management_endpoint=server.url),
+                agent_endpoint_id=f"ocid1.genaiagentendpoint.oc1..replica{index}",
+                instructions="You answer questions.",
+            )
+            for index, server in enumerate(servers)
+        ]
+        routed = RoutedAgent(agents, router=EndpointRouter([a.agent_endpoint_id for a in agents], seed=0))
+        routed.setup()
+        turn_errors = 0
+        for index in range(conversations):
+            if index == conversations // 2:
+                # The preferred replica slows down; new conversations move, running ones stay
+                servers[0].state.config["latency_ms"]["agent_chat"]["mean"] += 400
+            try:
+                first = routed.run("What is Oracle Cloud?")
+                routed.run("Tell me more", session_id=first.session_id, delete_session=True)
+            except Exception:
+                turn_errors += 1
+        report["affinity"] = {
+            "conversations": conversations,
+            "turn_errors": turn_errors,
+            "sessions_per_replica": [server.state.stats()["sessions_deleted"] for server in servers],
+            "sessions_live": [server.state.stats()["sessions_live"] for server in servers],
+        }
+    finally:
+        default_logger.console.quiet = quiet
+        for server in servers:
+            server.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latency-aware routing and failover over stand-in servers.")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latencies-ms", type=float, nargs="+", default=[40, 120, 250])
+    parser.add_argument("--conversations", type=int, default=20)
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return
+    print(json.dumps(benchmark(args.requests, args.concurrency, args.latencies_ms, args.conversations), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""
+fast_path.py - Answer trivial tool queries locally, without the remote agent loop
+
+04_calculator_multi_turns_agent.py and 07_lifecycle_hook.py send questions like "What is the square root
+of 256?" through the remote agent: one chat to get the `sqrt` required action, the local tool call, the
+ADK's fixed 2 s pause and a second chat for the final answer. When a question maps unambiguously onto
+one local tool with parseable arguments, `FastPathAgent` calls that tool directly and returns a
+RunResponse shaped like agent.run's. Everything else falls through to the agent unchanged.
+
+Features:
+- `FastPathRouter`: rules are anchored regular expressions over the whole (normalized) question, so
+  "square root of 81 and then explain it" or two matching rules never short-circuit.
+- Rules for CalculatorToolkit (add, subtract, multiply, divide, power, sqrt); add your own `FastPathRule`s
+  for other tools. A rule only applies when the agent has a local tool of that name.
+- Tool errors and non-finite results fall through to the agent, which explains them better.
+- Lifecycle hooks still fire: on_fulfilled_required_action gets the local call as a required and performed action.
+- Sessions stay coherent: turns answered locally are passed along with the next question that reaches
+  the remote session, so "do the same thing for 81" still knows what "the same thing" was.
+- `routes_locally(input)` tells wrappers such as `MetricsCollector.run` not to create a remote session
+  for a question answered locally.
+- Short-circuit rate, counts per rule and end-to-end latency per path via `stats()`.
+
+Usage:
+    agent = FastPathAgent(agent)
+    response = agent.run("What is the square root of 256?")
+    response.pretty_print()
+    print(agent.stats())
+
+- python fast_path.py --bench compares agent-only and fast-path runs of a mixed workload.
+"""
+
+import argparse
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from perf_stats import summarize_latencies
+
+FUNCTION_CALLING_REQUIRED_ACTION = "FUNCTION_CALLING_REQUIRED_ACTION"
+FUNCTION_CALLING_PERFORMED_ACTION = "FUNCTION_CALLING_PERFORMED_ACTION"
+
+PATH_LOCAL = "local"
+PATH_AGENT = "agent"
+
+# A number as people type it: 475695037565, 1,024, -3.5, .25
+NUMBER = r"(-?(?:\d{1,3}(?:,\d{3})+|\d+)?(?:\.\d+)?)"
+
+# Leading and trailing phrasing that does not change what is asked
+_PREFIX = re.compile(
+    r"^(?:(?:please|hey|hi|ok|okay)[,\s]+)*"
+    r"(?:(?:can|could|would) you (?:please )?(?:tell me |calculate |compute |work out )?|"
+    r"what(?:'s| is)(?: the (?:value|result) of)?|what does|calculate|compute|work out|tell me|how much is|find)?\s*",
+)
+_SUFFIX = re.compile(r"\s*(?:equal|equals|come to|please)?\s*[?.!]*\s*$")
+
+
+def _number(text: str) -> float:
+    if text is None or text.strip("-.") == "":
+        raise ValueError(f"not a number: {text!r}")
+    return float(text.replace(",", ""))
+
+
+def format_number(value: float) -> str:
+    """Integral results without a trailing .0, others with up to 12 significant digits"""
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.12g}"
+
+
+class FastPathRule:
+    """Maps questions matching an anchored pattern onto one local tool call"""
+
+    def __init__(self, name: str, tool: str, patterns: List[str], arguments: Callable[[Tuple[str, ...]], Dict[str, Any]],
+                 answer: str):
+        """
+        Args:
+            name (str): Rule name, used in stats
+            tool (str): Name of the local function tool to call
+            patterns (List[str]): Regular expressions matched against the whole normalized question
+            arguments (Callable): Builds the tool arguments from the match groups; raising ValueError rejects the match
+            answer (str): Final answer template; {result} and the tool argument names are available
+        """
+        self.name = name
+        self.tool = tool
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.arguments = arguments
+        self.answer = answer
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        for pattern in self.patterns:
+            found = pattern.fullmatch(text)
+            if found is None:
+                continue
+            try:
+                return self.arguments(found.groups())
+            except ValueError:
+                return None
+        return None
+
+
+def _two(groups: Tuple[str, ...], first: str = "left", second: str = "right") -> Dict[str, Any]:
+    return {first: _number(groups[0]), second: _number(groups[1])}
+
+
+def _swapped(groups: Tuple[str, ...]) -> Dict[str, Any]:
+    # "subtract 3 from 10"
+    return {"left": _number(groups[1]), "right": _number(groups[0])}
+
+
+CALCULATOR_RULES: List[FastPathRule] = [
+    FastPathRule("sqrt", "sqrt", [
+        rf"(?:the )?square root of {NUMBER}",
+        rf"sqrt\s*\(?\s*{NUMBER}\s*\)?",
+        rf"√\s*{NUMBER}",
+    ], lambda g: {"number": _number(g[0])}, "The square root of {number} is {result}."),
+    FastPathRule("power", "power", [
+        rf"{NUMBER} (?:to the power of|to the|raised to(?: the power of)?) {NUMBER}(?:st|nd|rd|th)?(?: power)?",
+        rf"{NUMBER}\s*(?:\^|\*\*)\s*{NUMBER}",
+    ], lambda g: _two(g, "base", "exponent"), "{base} to the power of {exponent} is {result}."),
+    FastPathRule("square", "power", [
+        rf"{NUMBER} squared",
+        rf"(?:the )?square of {NUMBER}",
+    ], lambda g: {"base": _number(g[0]), "exponent": 2.0}, "{base} squared is {result}."),
+    FastPathRule("cube", "power", [
+        rf"{NUMBER} cubed",
+        rf"(?:the )?cube of {NUMBER}",
+    ], lambda g: {"base": _number(g[0]), "exponent": 3.0}, "{base} cubed is {result}."),
+    FastPathRule("add", "add", [
+        rf"{NUMBER}\s*(?:\+|plus)\s*{NUMBER}",
+        rf"(?:the )?sum of {NUMBER} and {NUMBER}",
+        rf"add {NUMBER} (?:and|to) {NUMBER}",
+    ], _two, "{left} plus {right} is {result}."),
+    FastPathRule("subtract", "subtract", [
+        rf"{NUMBER}\s*(?:-|minus)\s*{NUMBER}",
+        rf"(?:the )?difference (?:between|of) {NUMBER} and {NUMBER}",
+    ], _two, "{left} minus {right} is {result}."),
+    FastPathRule("subtract_from", "subtract", [
+        rf"subtract {NUMBER} from {NUMBER}",
+    ], _swapped, "{left} minus {right} is {result}."),
+    FastPathRule("multiply", "multiply", [
+        rf"{NUMBER}\s*(?:\*|x|×|times|multiplied by)\s*{NUMBER}",
+        rf"(?:the )?product of {NUMBER} and {NUMBER}",
+        rf"multiply {NUMBER} (?:and|by) {NUMBER}",
+    ], _two, "{left} times {right} is {result}."),
+    FastPathRule("divide", "divide", [
+        rf"{NUMBER}\s*(?:/|÷|divided by|over)\s*{NUMBER}",
+        rf"(?:the )?quotient of {NUMBER} and {NUMBER}",
+        rf"divide {NUMBER} by {NUMBER}",
+    ], _two, "{left} divided by {right} is {result}."),
+]
+
+
+def normalize(text: str) -> str:
+    """Lowercase, collapse whitespace and strip politeness and question phrasing"""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    text = _SUFFIX.sub("", text)
+    return _PREFIX.sub("", text, count=1).strip()
+
+
+class FastPathRouter:
+    """Classifies a question onto at most one local tool call"""
+
+    def __init__(self, rules: Optional[List[FastPathRule]] = None):
+        """
+        Args:
+            rules (Optional[List[FastPathRule]]): Rules to try, defaults to CALCULATOR_RULES
+        """
+        self.rules = rules if rules is not None else CALCULATOR_RULES
+
+    def route(self, text: str, tools: Optional[Dict[str, Any]] = None) -> Optional[Tuple[FastPathRule, Dict[str, Any]]]:
+        """Return (rule, arguments) when exactly one rule matches, else None
+
+        Args:
+            text (str): The user message
+            tools (Optional[Dict[str, Any]]): Available local tools by name; rules for other tools are skipped
+
+        Returns:
+            Optional[Tuple[FastPathRule, Dict[str, Any]]]: The rule and the tool arguments
+        """
+        normalized = normalize(text)
+        matches = []
+        for rule in self.rules:
+            if tools is not None and rule.tool not in tools:
+                continue
+            arguments = rule.match(normalized)
+            if arguments is not None:
+                matches.append((rule, arguments))
+        # Two readings of the same question means we are not sure what was asked
+        return matches[0] if len(matches) == 1 else None
+
+
+class FastPathAgent:
+    """Drop-in wrapper for Agent.run that answers trivial tool queries locally"""
+
+    def __init__(self, agent: Any, router: Optional[FastPathRouter] = None, max_sessions: int = 1024,
+                 max_local_turns: int = 5, log_calls: bool = True):
+        """
+        Args:
+            agent (Any): An ADK Agent
+            router (Optional[FastPathRouter]): Defaults to the calculator rules
+            max_sessions (int): Sessions whose locally answered turns are remembered
+            max_local_turns (int): Locally answered turns remembered per session
+            log_calls (bool): Print local tool calls like the ADK does
+        """
+        self.agent = agent
+        self.router = router or FastPathRouter()
+        self.max_sessions = max_sessions
+        self.max_local_turns = max_local_turns
+        self.log_calls = log_calls
+        self._tools = {handler.name: handler for handler in agent._local_handler_functions}
+        self._local_turns: "OrderedDict[str, List[Tuple[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {PATH_LOCAL: [], PATH_AGENT: []}
+        self.counters: Dict[str, Any] = {
+            "runs": 0,
+            "short_circuited": 0,
+            "fell_through": 0,
+            "tool_errors": 0,
+            "context_carried": 0,
+            "rules": {},
+        }
+
+    def run(self, input: str, session_id: Optional[str] = None,
+            on_fulfilled_required_action: Optional[Callable] = None, **kwargs: Any) -> Any:
+        """Same contract as Agent.run
+
+        Args:
+            input (str): The user message
+            session_id (Optional[str]): Session of the conversation, if any
+            on_fulfilled_required_action (Optional[Callable]): Also called for the local tool call
+            **kwargs: Passed to agent.run
+
+        Returns:
+            RunResponse: The local answer or the agent's response
+        """
+        started = time.perf_counter()
+        response = self._run_local(input, session_id, on_fulfilled_required_action)
+        path = PATH_LOCAL
+        if response is None:
+            path = PATH_AGENT
+            response = self.agent.run(self._with_local_turns(input, session_id), session_id=session_id,
+                                      on_fulfilled_required_action=on_fulfilled_required_action, **kwargs)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.counters["runs"] += 1
+            self.counters["short_circuited" if path == PATH_LOCAL else "fell_through"] += 1
+            self._latencies[path].append(elapsed)
+        return response
+
+    def routes_locally(self, input: str) -> bool:
+        """Whether run() would try to answer input locally, so callers can hold off creating a session
+
+        Args:
+            input (str): The user message
+
+        Returns:
+            bool: True when a rule matches; a tool error still falls through to the agent
+        """
+        return self.router.route(input, self._tools) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {key: dict(value) if isinstance(value, dict) else value
+                                     for key, value in self.counters.items()}
+            latencies = {path: list(values) for path, values in self._latencies.items()}
+        stats["short_circuit_rate"] = stats["short_circuited"] / stats["runs"] if stats["runs"] else 0.0
+        stats["latency_s"] = {path: summarize_latencies(values) for path, values in latencies.items()}
+        return stats
+
+    def __getattr__(self, name: str) -> Any:
+        # create_session, delete_session, setup, ... go to the agent
+        return getattr(self.agent, name)
+
+    def _run_local(self, input: str, session_id: Optional[str], on_fulfilled_required_action: Optional[Callable]) -> Any:
+        from oci.addons.adk.run.response import RunResponse
+        from oci.addons.adk.run.types import PerformedAction, RawResponse, RequiredAction
+
+        routed = self.router.route(input, self._tools)
+        if routed is None:
+            return None
+        rule, arguments = routed
+        handler = self._tools[rule.tool]
+        try:
+            if self.log_calls:
+                self.agent._log_function_execution_start(handler.name, handler.callable.__name__, arguments)
+            result = handler.callable(**handler._prepare_arguments(arguments))
+            if self.log_calls:
+                self.agent._log_function_execution_result(result)
+            if isinstance(result, bool) or not isinstance(result, (int, float)) or not math.isfinite(result):
+                raise ValueError(f"non-finite result {result!r}")
+        except Exception:
+            # Division by zero, square root of a negative number, ...: let the agent explain
+            with self._lock:
+                self.counters["tool_errors"] += 1
+            return None
+
+        text = rule.answer.format(result=format_number(result),
+                                  **{name: format_number(value) for name, value in arguments.items()})
+        action_id = f"fastpath-{uuid.uuid4().hex[:12]}"
+        if on_fulfilled_required_action:
+            on_fulfilled_required_action(
+                RequiredAction(action_id=action_id, required_action_type=FUNCTION_CALLING_REQUIRED_ACTION,
+                               function_call={"name": handler.name, "arguments": json.dumps(arguments)}),
+                PerformedAction(action_id=action_id, performed_action_type=FUNCTION_CALLING_PERFORMED_ACTION,
+                                function_call_output=json.dumps(result)),
+            )
+        raw_data = {
+            "message": {"role": "AGENT", "content": {"text": text}},
+            "required_actions": None,
+            "fast_path": {"rule": rule.name, "tool": handler.name, "arguments": arguments, "result": result},
+        }
+        with self._lock:
+            self.counters["rules"][rule.name] = self.counters["rules"].get(rule.name, 0) + 1
+            if session_id is not None:
+                turns = self._local_turns.setdefault(session_id, [])
+                turns.append((input, text))
+                del turns[:-self.max_local_turns]
+                self._local_turns.move_to_end(session_id)
+                while len(self._local_turns) > self.max_sessions:
+                    self._local_turns.popitem(last=False)
+        return RunResponse(raw_responses=[RawResponse(raw_data=raw_data)], data=raw_data, session_id=session_id or "")
+
+    def _with_local_turns(self, input: str, session_id: Optional[str]) -> str:
+        # The remote session never saw the turns answered locally; hand them over with this message
+        if session_id is None:
+            return input
+        with self._lock:
+            turns = self._local_turns.pop(session_id, None)
+            if turns:
+                self.counters["context_carried"] += 1
+        if not turns:
+            return input
+        transcript = "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+        return f"Earlier in this conversation:\n{transcript}\n\n{input}"
+
+
+# Mixed calculator traffic; the last entries need the agent (follow-ups, explanations, compound asks)
+BENCH_QUESTIONS = [
+    "What is the square root of 256?",
+    "What's the square root of 475695037565?",
+    "Calculate 1,024 * 768",
+    "What is 12.5 divided by 4?",
+    "2 to the power of 16",
+    "Please add 19 and 23.",
+    "subtract 17 from 100",
+    "What is 37 squared?",
+    "do the same thing for 81",
+    "Explain what a square root is.",
+    "What is the square root of 144 plus the square root of 81?",
+    "If I invest 1000 at 5% for 3 years, how much do I have?",
+]
+
+
+def benchmark(runs: int = 48, agent_latency_ms: float = 150, concurrency: int = 8, seed: int = 0) -> Dict[str, Any]:
+    """Run a calculator workload through a stand-in agent with and without the fast path
+
+    Args:
+        runs (int): Questions per mode
+        agent_latency_ms (float): Stand-in latency of each agent chat
+        concurrency (int): Concurrent questions
+        seed (int): Traffic seed
+
+    Returns:
+        Dict[str, Any]: Per-mode latency, agent chats and the fast path stats
+    """
+    import asyncio
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    from oci.addons.adk import Agent, AgentClient
+    from oci.addons.adk.logger import default_logger
+    from oci.addons.adk.tool.prebuilt import CalculatorToolkit
+
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+
+    default_logger.console.quiet = True
+    rng = random.Random(seed)
+    traffic = [rng.choice(BENCH_QUESTIONS) for _ in range(runs)]
+    config_path = write_offline_oci_config()
+    server_config = {
+        "latency_ms": {"agent_chat": {"mean": agent_latency_ms, "jitter": agent_latency_ms / 4}},
+        # Any calculator question costs the agent one tool step before the final answer
+        "tool_calls": [{"match": keyword, "steps": [[{"name": tool, "arguments": arguments}]]} for keyword, tool, arguments in [
+            ("square root", "sqrt", {"number": 256}), ("power", "power", {"base": 2, "exponent": 16}),
+            ("squared", "power", {"base": 37, "exponent": 2}), ("divided", "divide", {"left": 12.5, "right": 4}),
+            ("add", "add", {"left": 19, "right": 23}), ("subtract", "subtract", {"left": 100, "right": 17}),
+            ("*", "multiply", {"left": 1024, "right": 768}),
+        ]],
+    }
+    report: Dict[str, Any] = {"runs": runs}
+    with MockGenAIServer(config=server_config) as server:
+        client = AgentClient(auth_type="api_key", config=config_path, profile="DEFAULT",
+                             runtime_endpoint=server.url, management_endpoint=server.url)
+        agent = Agent(client=client, agent_endpoint_id="ocid1.genaiagentendpoint.oc1..standin",
+                      instructions="You perform calculations using tools provided.", tools=[CalculatorToolkit()])
+        agent.setup()
+        fast_agent = FastPathAgent(agent, log_calls=False)
+
+        for mode, target in (("agent_only", agent), ("with_fast_path", fast_agent)):
+            before = server.state.stats()["requests"].get("agent_chat", 0)
+
+            def ask(question: str) -> float:
+                try:
+                    asyncio.get_event_loop()
+                except RuntimeError:
+                    asyncio.set_event_loop(asyncio.new_event_loop())
+                started = time.perf_counter()
+                target.run(question, max_steps=3)
+                return time.perf_counter() - started
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                latencies = list(executor.map(ask, traffic))
+            report[mode] = {
+                "elapsed_s": round(time.perf_counter() - started, 2),
+                "agent_chats": server.state.stats()["requests"].get("agent_chat", 0) - before,
+                "latency_s": {k: round(v, 4) for k, v in summarize_latencies(latencies).items()},
+            }
+        stats = fast_agent.stats()
+    report["fast_path"] = {
+        "short_circuit_rate": round(stats["short_circuit_rate"], 3),
+        "rules": stats["rules"],
+        "local_latency_s": {k: round(v, 6) for k, v in stats["latency_s"][PATH_LOCAL].items()},
+        "agent_latency_s": {k: round(v, 4) for k, v in stats["latency_s"][PATH_AGENT].items()},
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fast path for trivial tool queries.")
+    parser.add_argument("--bench", action="store_true", help="Compare agent-only and fast-path runs on a stand-in agent")
+    parser.add_argument("--runs", type=int, default=48, help="Questions per mode")
+    parser.add_argument("question", nargs="?", help="Show how a question would be routed")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(json.dumps(benchmark(args.runs), indent=2))
+    elif args.question:
+        routed = FastPathRouter().route(args.question)
+        print(json.dumps({"normalized": normalize(args.question),
+                          "rule": routed[0].name if routed else None,
+                          "arguments": routed[1] if routed else None}, indent=2))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+genai_chat.py - Shared helpers for the direct OCI Generative AI inference path
+
+This module factors out the client and request building that 00_sample.py does inline, so that
+other utilities (batch driver, benchmarks) can send the same `CohereChatRequest` without
+re-implementing it.
+
+Features:
+- Reads the same environment variables as 00_sample.py (.env file).
+- Hands out the shared, pooled `GenerativeAiInferenceClient` from client_pool.py.
+- Builds `ChatDetails` for a prompt, with optional chat history and per-request parameter overrides.
+- Clamps max_tokens to the room left in the model's context window (see context_budget.py).
+- Extracts text, finish reason and token usage from a chat response.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+import oci
+from dotenv import load_dotenv
+
+from client_pool import get_inference_client
+from context_budget import DEFAULT_CONTEXT_WINDOW, estimate_tokens, fit_max_tokens
+
+# Load environment variables
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+# OCI authentication and compartment setup (same defaults as 00_sample.py)
+COMPARTMENT_ID = os.getenv("OCI_COMPARTMENT_ID")
+CONFIG_PROFILE = os.getenv("OCI_CONFIG_PROFILE", "DEFAULT")
+OCI_CONFIG_PATH = os.getenv("OCI_CONFIG_PATH", os.path.join(os.path.dirname(__file__), ".oci", "config"))
+MODEL_ID = os.getenv("MODEL_ID", "ocid1.generativeaimodel.oc1.us-chicago-1.amaaaaaask7dceyanrlpnq5ybfu5hnzarg7jomak3q6kyhkzjsl4qj24fyoq")
+ENDPOINT = os.getenv("OCI_GENAI_ENDPOINT", "https://inference.generativeai.us-chicago-1.oci.oraclecloud.com")
+MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", DEFAULT_CONTEXT_WINDOW))
+
+# Default chat parameters, overridable per request
+DEFAULT_CHAT_PARAMS = {
+    "max_tokens": int(os.getenv("MAX_TOKENS", 600)),
+    "temperature": float(os.getenv("TEMPERATURE", 0)),
+    "frequency_penalty": float(os.getenv("FREQUENCY_PENALTY", 1)),
+    "top_p": float(os.getenv("TOP_P", 0.75)),
+    "top_k": int(os.getenv("TOP_K", 0)),
+}
+
+
+def create_inference_client(pool_size: int = 10, endpoint: Optional[str] = None) -> oci.generative_ai_inference.GenerativeAiInferenceClient:
+    """Return the process-wide inference client for the configured profile and endpoint
+
+    Args:
+        pool_size (int): Minimum number of keep-alive HTTP connections to the endpoint
+        endpoint (Optional[str]): Service endpoint, defaults to OCI_GENAI_ENDPOINT
+
+    Returns:
+        GenerativeAiInferenceClient: The shared client (see client_pool.py)
+    """
+    return get_inference_client(
+        profile=CONFIG_PROFILE,
+        endpoint=endpoint or ENDPOINT,
+        config_path=OCI_CONFIG_PATH,
+        pool_size=pool_size,
+    )
+
+
+def build_chat_details(prompt: str, model_id: Optional[str] = None, compartment_id: Optional[str] = None,
+                       chat_history: Optional[List[Dict[str, str]]] = None,
+                       **params: Any) -> oci.generative_ai_inference.models.ChatDetails:
+    """Build the ChatDetails for a single prompt
+
+    Args:
+        prompt (str): The user message
+        model_id (Optional[str]): Model OCID, defaults to MODEL_ID
+        compartment_id (Optional[str]): Compartment OCID, defaults to OCI_COMPARTMENT_ID
+        chat_history (Optional[List[Dict[str, str]]]): Earlier messages as {"role": "USER" | "CHATBOT", "message": str},
+            e.g. from context_budget.compact_chat_history
+        **params: Overrides for max_tokens, temperature, frequency_penalty, top_p and top_k
+
+    Returns:
+        ChatDetails: The request body for GenerativeAiInferenceClient.chat
+    """
+    values = dict(DEFAULT_CHAT_PARAMS)
+    values.update({key: value for key, value in params.items() if key in DEFAULT_CHAT_PARAMS and value is not None})
+
+    models = oci.generative_ai_inference.models
+    chat_request = models.CohereChatRequest()
+    chat_request.message = prompt
+    if chat_history:
+        chat_request.chat_history = [
+            models.CohereUserMessage(message=item["message"]) if item["role"] == "USER"
+            else models.CohereChatBotMessage(message=item["message"])
+            for item in chat_history
+        ]
+    prompt_tokens = estimate_tokens(prompt) + sum(estimate_tokens(item["message"]) for item in chat_history or [])
+    chat_request.max_tokens = fit_max_tokens(prompt_tokens, int(values["max_tokens"]), MODEL_CONTEXT_TOKENS)
+    chat_request.temperature = float(values["temperature"])
+    chat_request.frequency_penalty = float(values["frequency_penalty"])
+    chat_request.top_p = float(values["top_p"])
+    chat_request.top_k = int(values["top_k"])
+
+    chat_detail = oci.generative_ai_inference.models.ChatDetails()
+    chat_detail.serving_mode = oci.generative_ai_inference.models.OnDemandServingMode(
+        model_id=model_id or MODEL_ID
+    )
+    chat_detail.chat_request = chat_request
+    chat_detail.compartment_id = compartment_id or COMPARTMENT_ID
+    return chat_detail
+
+
+def extract_chat_result(chat_response: Any) -> Dict[str, Any]:
+    """Extract the interesting fields of a chat response
+
+    Args:
+        chat_response (Any): The response returned by GenerativeAiInferenceClient.chat
+
+    Returns:
+        Dict[str, Any]: text, finish_reason and total_tokens (None when not reported)
+    """
+    result = chat_response.data.chat_response
+    usage = getattr(result, "usage", None)
+    return {
+        "text": result.text,
+        "finish_reason": result.finish_reason,
+        "total_tokens": getattr(usage, "total_tokens", None) if usage is not None else None,
+    }
@@ -0,0 +1,657 @@
+"""
+job_queue.py - Durable SQLite job queue and multi-process worker pool for batch agent workloads
+
+Offline jobs such as running the 06_multi_step_workflow_agents.py pipeline for every user in the
+preferences DB are bound by one Python process, and a crash loses all progress. This module keeps the
+jobs in a SQLite file; any number of worker processes, on this host or on hosts sharing the filesystem,
+lease jobs from it, run them and store their results.
+
+Features:
+- Jobs name a handler ("module:function", called with the job's JSON payload) and an idempotency key
+  (default: a hash of handler and payload); enqueueing the same job twice is a no-op, so a whole batch
+  can be re-submitted after a crash without paying for the jobs that already finished.
+- Leases with a visibility timeout: a leased job is invisible to other workers until its lease expires.
+  Workers extend the leases of running jobs, so only jobs of dead workers are handed out again.
+- Failed jobs are retried with exponential backoff up to max_attempts, then moved to "dead" for inspection;
+  completions are fenced by a lease token, so a worker that lost its lease cannot overwrite a newer run.
+- Results (or the last error) are stored per job; `progress()` reports counts per state, throughput,
+  mean job duration, retried attempts, active workers and an ETA.
+- Handlers that checkpoint their steps (e.g. workflow.py's Workflow) resume a retried job after its last
+  completed step instead of repeating its paid calls.
+
+Usage:
+    python job_queue.py enqueue --handler 06_multi_step_workflow_agents:blog_post_job --jsonl users.jsonl --key-field email
+    python job_queue.py work --processes 4 --threads 8
+    python job_queue.py progress --watch 10
+    python job_queue.py results --state dead
+
+    queue = JobQueue()
+    queue.enqueue("06_multi_step_workflow_agents:blog_post_job", {"email": "a@b.c", "style": ["casual"], "topics": ["ai"]})
+    run_workers(processes=4, threads=8)
+
+- Several hosts can share one queue file on a network filesystem with `--journal-mode DELETE`: WAL needs
+  shared memory, which only works between processes of one host. Lease expiry uses each host's clock.
+- python job_queue.py --bench --processes 4 --threads 8
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(os.path.dirname(__file__), ".job_queue.sqlite3"))
+DEFAULT_JOURNAL_MODE = os.getenv("JOB_QUEUE_JOURNAL_MODE", "WAL")
+
+STATE_QUEUED = "queued"
+STATE_LEASED = "leased"
+STATE_DONE = "done"
+STATE_DEAD = "dead"
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def idempotency_key(handler: str, payload: Any) -> str:
+    """Default job key: the same handler and payload are the same job"""
+    encoded = json.dumps({"handler": handler, "payload": payload}, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+class Job:
+    """A leased job"""
+
+    def __init__(self, job_id: str, handler: str, payload: Any, attempts: int, lease_token: str):
+        self.job_id = job_id
+        self.handler = handler
+        self.payload = payload
+        # Including the current one
+        self.attempts = attempts
+        self.lease_token = lease_token
+
+
+class JobQueue:
+    """SQLite table of jobs with leases, retries and results"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, journal_mode: str = DEFAULT_JOURNAL_MODE):
+        """
+        Args:
+            path (str): SQLite file shared by producers and workers
+            journal_mode (str): "WAL" for workers on one host, "DELETE" for hosts sharing a network filesystem
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=60)
+        self._db.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._db.execute("PRAGMA synchronous=NORMAL" if journal_mode.upper() == "WAL" else "PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, queue TEXT NOT NULL, idempotency_key TEXT NOT NULL, handler TEXT NOT NULL,"
+            " payload TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, available_at REAL NOT NULL,"
+            " lease_owner TEXT, lease_token TEXT, lease_expires REAL, first_leased_at REAL, leased_at REAL,"
+            " created_at REAL NOT NULL, finished_at REAL, duration_s REAL, result TEXT, error TEXT,"
+            " UNIQUE (queue, idempotency_key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (queue, state, available_at)")
+
+    def enqueue(self, handler: str, payload: Any, key: Optional[str] = None, queue: str = "default",
+                priority: int = 0, max_attempts: int = 3) -> str:
+        """Add a job unless a job with the same key is already in the queue
+
+        Args:
+            handler (str): "module:function" called with the payload
+            payload (Any): JSON-serializable handler argument
+            key (Optional[str]): Idempotency key, defaults to a hash of handler and payload
+            queue (str): Queue name
+            priority (int): Higher priorities are leased first
+            max_attempts (int): Attempts (including leases lost by dead workers) before the job is dead
+
+        Returns:
+            str: The id of the new job, or of the existing job with the same key
+        """
+        key = key or idempotency_key(handler, payload)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, queue, idempotency_key, handler, payload, priority, state,"
+                " max_attempts, available_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (uuid.uuid4().hex, queue, key, handler, json.dumps(payload, default=str), priority, STATE_QUEUED,
+                 max_attempts, now, now),
+            )
+            return self._db.execute("SELECT job_id FROM jobs WHERE queue = ? AND idempotency_key = ?",
+                                    (queue, key)).fetchone()[0]
+
+    def enqueue_many(self, handler: str, payloads: Iterable[Any], key_fn: Optional[Callable[[Any], str]] = None,
+                     queue: str = "default", priority: int = 0, max_attempts: int = 3) -> Dict[str, int]:
+        """Add many jobs in one transaction, skipping those already in the queue
+
+        Args:
+            handler (str): "module:function" called with each payload
+            payloads (Iterable[Any]): JSON-serializable handler arguments
+            key_fn (Optional[Callable[[Any], str]]): Idempotency key per payload, defaults to a hash of handler and payload
+            queue (str): Queue name
+            priority (int): Higher priorities are leased first
+            max_attempts (int): Attempts per job before it is dead
+
+        Returns:
+            Dict[str, int]: Jobs enqueued and duplicates skipped
+        """
+        now = time.time()
+        rows = [
+            (uuid.uuid4().hex, queue, key_fn(payload) if key_fn else idempotency_key(handler, payload), handler,
+             json.dumps(payload, default=str), priority, STATE_QUEUED, max_attempts, now, now)
+            for payload in payloads
+        ]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = self._db.executemany(
+                    "INSERT OR IGNORE INTO jobs (job_id, queue, idempotency_key, handler, payload, priority, state,"
+                    " max_attempts, available_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                ).rowcount
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return {"enqueued": inserted, "duplicates": len(rows) - inserted}
+
+    def lease(self, worker_id: str, queue: str = "default", limit: int = 1,
+              visibility_timeout_s: float = 300) -> List[Job]:
+        """Take up to limit ready jobs, and jobs whose lease expired, for visibility_timeout_s
+
+        Jobs whose lease expired on their last attempt are moved to dead instead.
+
+        Returns:
+            List[Job]: The leased jobs
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, lease_owner = NULL, lease_token = NULL, finished_at = ?,"
+                    " error = 'lease expired on the last attempt (worker died or timed out)'"
+                    " WHERE queue = ? AND state = ? AND lease_expires < ? AND attempts >= max_attempts",
+                    (STATE_DEAD, now, queue, STATE_LEASED, now),
+                )
+                rows = self._db.execute(
+                    "SELECT job_id, handler, payload, attempts FROM jobs WHERE queue = ? AND"
+                    " ((state = ? AND available_at <= ?) OR (state = ? AND lease_expires < ?))"
+                    " ORDER BY priority DESC, available_at LIMIT ?",
+                    (queue, STATE_QUEUED, now, STATE_LEASED, now, limit),
+                ).fetchall()
+                jobs = [Job(job_id, handler, json.loads(payload), attempts + 1, uuid.uuid4().hex)
+                        for job_id, handler, payload, attempts in rows]
+                self._db.executemany(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_owner = ?, lease_token = ?,"
+                    " lease_expires = ?, leased_at = ?, first_leased_at = COALESCE(first_leased_at, ?) WHERE job_id = ?",
+                    [(STATE_LEASED, worker_id, job.lease_token, now + visibility_timeout_s, now, now, job.job_id)
+                     for job in jobs],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return jobs
+
+    def extend(self, leases: Dict[str, str], visibility_timeout_s: float) -> int:
+        """Push back the lease expiry of running jobs
+
+        Args:
+            leases (Dict[str, str]): Lease token by job id
+            visibility_timeout_s (float): New lease duration from now
+
+        Returns:
+            int: Leases extended (fewer when a lease was lost)
+        """
+        expires = time.time() + visibility_timeout_s
+        with self._lock:
+            return self._db.executemany(
+                "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND lease_token = ? AND state = ?",
+                [(expires, job_id, token, STATE_LEASED) for job_id, token in leases.items()],
+            ).rowcount
+
+    def complete(self, job: Job, result: Any) -> bool:
+        """Store the result of a leased job
+
+        Returns:
+            bool: False when the lease was lost to another worker (the result is discarded)
+        """
+        now = time.time()
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = NULL, finished_at = ?, duration_s = ? - leased_at,"
+                " lease_owner = NULL, lease_token = NULL WHERE job_id = ? AND lease_token = ? AND state = ?",
+                (STATE_DONE, json.dumps(result, default=str), now, now, job.job_id, job.lease_token, STATE_LEASED),
+            ).rowcount == 1
+
+    def fail(self, job: Job, error: str, backoff_s: float = 5) -> bool:
+        """Requeue a leased job after backoff_s * 2 ** (attempts - 1), or move it to dead after its last attempt
+
+        Returns:
+            bool: False when the lease was lost to another worker
+        """
+        now = time.time()
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END,"
+                " finished_at = CASE WHEN attempts >= max_attempts THEN ? END, available_at = ?, error = ?,"
+                " lease_owner = NULL, lease_token = NULL WHERE job_id = ? AND lease_token = ? AND state = ?",
+                (STATE_DEAD, STATE_QUEUED, now, now + backoff_s * 2 ** (job.attempts - 1), error[:2000], job.job_id,
+                 job.lease_token, STATE_LEASED),
+            ).rowcount == 1
+
+    def pending(self, queue: str = "default") -> int:
+        """Jobs not yet done or dead (queued, backing off or leased)"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE queue = ? AND state IN (?, ?)",
+                                    (queue, STATE_QUEUED, STATE_LEASED)).fetchone()[0]
+
+    def results(self, queue: str = "default", state: str = STATE_DONE, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored results (or last errors) of jobs in a state, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id, idempotency_key, payload, attempts, duration_s, result, error FROM jobs"
+                " WHERE queue = ? AND state = ? ORDER BY finished_at LIMIT ?", (queue, state, limit or -1)
+            ).fetchall()
+        return [
+            {"job_id": job_id, "key": key, "payload": json.loads(payload), "attempts": attempts,
+             "duration_s": duration_s, "result": json.loads(result) if result is not None else None, "error": error}
+            for job_id, key, payload, attempts, duration_s, result, error in rows
+        ]
+
+    def requeue_dead(self, queue: str = "default") -> int:
+        """Give dead jobs a fresh set of attempts"""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, available_at = ?, finished_at = NULL WHERE queue = ? AND state = ?",
+                (STATE_QUEUED, time.time(), queue, STATE_DEAD),
+            ).rowcount
+
+    def progress(self, queue: str = "default", window_s: float = 60) -> Dict[str, Any]:
+        """Counts per state, throughput and ETA
+
+        Args:
+            queue (str): Queue name
+            window_s (float): Window of the recent throughput used for the ETA
+
+        Returns:
+            Dict[str, Any]: Jobs per state, percent finished, overall and recent jobs per second, mean job
+                duration, attempts retried by finished jobs, workers holding leases and ETA in seconds
+        """
+        now = time.time()
+        with self._lock:
+            states = dict(self._db.execute("SELECT state, COUNT(*) FROM jobs WHERE queue = ? GROUP BY state",
+                                           (queue,)).fetchall())
+            first_leased, last_finished, mean_duration, retried = self._db.execute(
+                "SELECT MIN(first_leased_at), MAX(finished_at), AVG(CASE WHEN state = ? THEN duration_s END),"
+                " SUM(CASE WHEN state = ? THEN attempts - 1 ELSE 0 END) FROM jobs WHERE queue = ?",
+                (STATE_DONE, STATE_DONE, queue),
+            ).fetchone()
+            recent = self._db.execute("SELECT COUNT(*) FROM jobs WHERE queue = ? AND state = ? AND finished_at >= ?",
+                                      (queue, STATE_DONE, now - window_s)).fetchone()[0]
+            workers = self._db.execute("SELECT COUNT(DISTINCT lease_owner) FROM jobs WHERE queue = ? AND state = ?",
+                                       (queue, STATE_LEASED)).fetchone()[0]
+        total = sum(states.values())
+        done, dead = states.get(STATE_DONE, 0), states.get(STATE_DEAD, 0)
+        remaining = total - done - dead
+        elapsed = (last_finished if remaining == 0 and last_finished else now) - first_leased if first_leased else 0.0
+        throughput = done / elapsed if elapsed > 0 else 0.0
+        recent_throughput = recent / min(window_s, elapsed) if elapsed > 0 else 0.0
+        rate = recent_throughput or throughput
+        return {
+            "states": {state: states.get(state, 0) for state in (STATE_QUEUED, STATE_LEASED, STATE_DONE, STATE_DEAD)},
+            "total": total,
+            "finished_pct": round(100.0 * (done + dead) / total, 1) if total else 0.0,
+            "elapsed_s": round(elapsed, 1),
+            "jobs_per_s": round(throughput, 2),
+            "recent_jobs_per_s": round(recent_throughput, 2),
+            "mean_job_s": round(mean_duration, 3) if mean_duration is not None else None,
+            "retried_attempts": retried or 0,
+            "active_workers": workers,
+            "eta_s": round(remaining / rate, 1) if remaining and rate else (0.0 if not remaining else None),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_handlers: Dict[str, Callable[[Any], Any]] = {}
+_handlers_lock = threading.Lock()
+
+
+def resolve_handler(spec: str) -> Callable[[Any], Any]:
+    """Import a "module:function" handler once per process"""
+    with _handlers_lock:
+        if spec not in _handlers:
+            module_name, _, function_name = spec.partition(":")
+            if not function_name:
+                raise ValueError(f"Handler '{spec}' must be 'module:function'")
+            _handlers[spec] = getattr(importlib.import_module(module_name), function_name)
+        return _handlers[spec]
+
+
+class JobWorker:
+    """Leases jobs from a queue and runs them on a pool of threads"""
+
+    def __init__(self, queue: JobQueue, name: str = "default", threads: int = 4, visibility_timeout_s: float = 300,
+                 poll_interval_s: float = 1.0, backoff_s: float = 5, worker_id: Optional[str] = None):
+        """
+        Args:
+            queue (JobQueue): The queue to work on
+            name (str): Queue name
+            threads (int): Jobs run concurrently by this worker (agent runs mostly wait on the network)
+            visibility_timeout_s (float): Lease duration; running jobs are extended every third of it
+            poll_interval_s (float): Wait between polls when no job is ready
+            backoff_s (float): Base backoff before retrying a failed job
+            worker_id (Optional[str]): Lease owner, defaults to host:pid
+        """
+        self.queue = queue
+        self.name = name
+        self.threads = threads
+        self.visibility_timeout_s = visibility_timeout_s
+        self.poll_interval_s = poll_interval_s
+        self.backoff_s = backoff_s
+        self.worker_id = worker_id or _worker_id()
+        self.counters = {"completed": 0, "failed": 0, "lost_leases": 0}
+        self._in_flight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self, drain: bool = True, max_jobs: Optional[int] = None) -> Dict[str, Any]:
+        """Work until stopped, or until no job is pending when drain is set
+
+        Args:
+            drain (bool): Return once the queue has no queued or leased jobs left
+            max_jobs (Optional[int]): Return after leasing this many jobs
+
+        Returns:
+            Dict[str, Any]: This worker's completed, failed and lost-lease counts
+        """
+        leased = [0]
+        threads = [threading.Thread(target=self._work, args=(drain, max_jobs, leased), name=f"job-worker-{i}")
+                   for i in range(self.threads)]
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._stop.set()
+        return {"worker_id": self.worker_id, **self.counters}
+
+    def stop(self) -> None:
+        """Finish running jobs and return from run()"""
+        self._stop.set()
+
+    def _work(self, drain: bool, max_jobs: Optional[int], leased: List[int]) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                if max_jobs is not None and leased[0] >= max_jobs:
+                    return
+                leased[0] += 1
+            jobs = self.queue.lease(self.worker_id, self.name, 1, self.visibility_timeout_s)
+            if not jobs:
+                with self._lock:
+                    leased[0] -= 1
+                if drain and self.queue.pending(self.name) == 0:
+                    return
+                # Jobs backing off or leased by other workers may still come back
+                self._stop.wait(self.poll_interval_s)
+                continue
+            self._run(jobs[0])
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            self._in_flight[job.job_id] = job.lease_token
+        from admission import admission_controller
+
+        # Under admission control (admission.py) queued jobs yield quota to interactive traffic
+        controller = admission_controller()
+        try:
+            with controller.priority("batch") if controller else nullcontext():
+                result = resolve_handler(job.handler)(job.payload)
+        except Exception as e:
+            stored, outcome = self.queue.fail(job, f"{type(e).__name__}: {e}", self.backoff_s), "failed"
+        else:
+            stored, outcome = self.queue.complete(job, result), "completed"
+        with self._lock:
+            self._in_flight.pop(job.job_id, None)
+            self.counters[outcome if stored else "lost_leases"] += 1
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.visibility_timeout_s / 3):
+            with self._lock:
+                leases = dict(self._in_flight)
+            if leases:
+                self.queue.extend(leases, self.visibility_timeout_s)
+
+
+def _work_process(path: str, journal_mode: str, worker_kwargs: Dict[str, Any], drain: bool) -> None:
+    queue = JobQueue(path, journal_mode)
+    try:
+        JobWorker(queue, **worker_kwargs).run(drain=drain)
+    finally:
+        queue.close()
+
+
+def run_workers(path: str = DEFAULT_QUEUE_PATH, name: str = "default", processes: int = 1, threads: int = 4,
+                visibility_timeout_s: float = 300, drain: bool = True, journal_mode: str = DEFAULT_JOURNAL_MODE,
+                **worker_kwargs: Any) -> Dict[str, Any]:
+    """Run a pool of worker processes on this host until the queue is drained
+
+    Args:
+        path (str): Queue file
+        name (str): Queue name
+        processes (int): Worker processes; each has its own interpreter, so CPU-bound handler work scales with cores
+        threads (int): Concurrent jobs per process
+        visibility_timeout_s (float): Lease duration
+        drain (bool): Exit once no job is pending, otherwise keep polling
+        journal_mode (str): SQLite journal mode, see JobQueue
+        **worker_kwargs: Other JobWorker arguments, e.g. poll_interval_s or backoff_s
+
+    Returns:
+        Dict[str, Any]: The queue's progress report afterwards
+    """
+    worker_kwargs.update(name=name, threads=threads, visibility_timeout_s=visibility_timeout_s)
+    # spawn: handlers create SDK clients and threads, which do not survive a fork
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_work_process, args=(path, journal_mode, worker_kwargs, drain),
+                               name=f"job-worker-{i}") for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    queue = JobQueue(path, journal_mode)
+    report = queue.progress(name)
+    queue.close()
+    return report
+
+
+_bench_agents: Dict[str, Any] = {}
+
+
+def benchmark_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handler of the benchmark: one calculator run against the stand-in server in payload["url"]"""
+    from workflow import _ensure_event_loop
+
+    with _handlers_lock:
+        if payload["url"] not in _bench_agents:
+            from oci.addons.adk import Agent
+            from oci.addons.adk.logger import default_logger
+            from oci.addons.adk.tool.prebuilt import CalculatorToolkit
+
+            from client_pool import get_agent_client
+
+            default_logger.console.quiet = True
+            client = get_agent_client(profile="DEFAULT", config_path=payload["config"], runtime_endpoint=payload["url"],
+                                      management_endpoint=payload["url"])
+            _bench_agents[payload["url"]] = Agent(client=client, agent_endpoint_id="ocid1.genaiagentendpoint.oc1..standin",
+                                                  name="calculator", instructions="You perform calculations using tools provided.",
+                                                  tools=[CalculatorToolkit()])
+        agent = _bench_agents[payload["url"]]
+    _ensure_event_loop()
+    return {"answer": agent.run(payload["question"], max_steps=3).final_output, "pid": os.getpid()}
+
+
+def benchmark(jobs: int = 96, processes: int = 4, threads: int = 8, agent_latency_ms: float = 100,
+              visibility_timeout_s: float = 5) -> Dict[str, Any]:
+    """Run calculator jobs (one tool step each) from a queue against a stand-in agent
+
+    One worker process is compared with a pool of processes. In the pool run one process is killed
+    with SIGKILL mid-batch; its jobs come back after the visibility timeout. The batch is then
+    enqueued again to show that finished jobs are not run twice.
+
+    Args:
+        jobs (int): Jobs in the batch
+        processes (int): Worker processes in the pool run
+        threads (int): Threads per worker process
+        agent_latency_ms (float): Stand-in latency of each agent chat
+        visibility_timeout_s (float): Lease duration
+
+    Returns:
+        Dict[str, Any]: Progress report per run, agent chats paid and jobs re-run after the crash
+    """
+    import tempfile
+
+    from oci.addons.adk import Agent
+    from oci.addons.adk.tool.prebuilt import CalculatorToolkit
+
+    from client_pool import get_agent_client
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+
+    config_path = write_offline_oci_config()
+    directory = tempfile.mkdtemp(prefix="job-queue-")
+    server_config = {
+        "latency_ms": {"agent_chat": {"mean": agent_latency_ms, "jitter": agent_latency_ms / 4},
+                       "session": {"mean": agent_latency_ms / 4, "jitter": 0}},
+        "tool_calls": [{"match": "square root", "steps": [[{"name": "sqrt", "arguments": {"number": 256}}]]}],
+    }
+    report: Dict[str, Any] = {"jobs": jobs, "threads_per_process": threads}
+    with MockGenAIServer(config=server_config) as server:
+        # Register the tools once, as a deployment would
+        client = get_agent_client(profile="DEFAULT", config_path=config_path, runtime_endpoint=server.url,
+                                  management_endpoint=server.url)
+        Agent(client=client, agent_endpoint_id="ocid1.genaiagentendpoint.oc1..standin",
+              instructions="You perform calculations using tools provided.", tools=[CalculatorToolkit()]).setup()
+        payloads = [{"url": server.url, "config": config_path, "question": f"What is the square root of {n * n}?"}
+                    for n in range(jobs)]
+
+        def chats() -> int:
+            return server.state.stats()["requests"].get("agent_chat", 0)
+
+        for label, count in (("1_process", 1), (f"{processes}_processes_one_killed", processes)):
+            path = os.path.join(directory, f"{label}.sqlite3")
+            queue = JobQueue(path)
+            queue.enqueue_many("job_queue:benchmark_job", payloads)
+            chats_before = chats()
+            if count == 1:
+                progress = run_workers(path, processes=1, threads=threads, visibility_timeout_s=visibility_timeout_s,
+                                       poll_interval_s=0.2)
+            else:
+                context = multiprocessing.get_context("spawn")
+                worker_kwargs = {"threads": threads, "visibility_timeout_s": visibility_timeout_s, "poll_interval_s": 0.2}
+                workers = [context.Process(target=_work_process, args=(path, DEFAULT_JOURNAL_MODE, worker_kwargs, True))
+                           for _ in range(count)]
+                for worker in workers:
+                    worker.start()
+                # Kill one worker while it holds leases
+                while queue.progress()["states"][STATE_DONE] < jobs // 4:
+                    time.sleep(0.1)
+                workers[0].kill()
+                for worker in workers:
+                    worker.join()
+                progress = queue.progress()
+            progress["agent_chats"] = chats() - chats_before
+            progress["agent_chats_per_job"] = round(progress["agent_chats"] / jobs, 2)
+            report[label] = progress
+            queue.close()
+
+        queue = JobQueue(path)
+        chats_before = chats()
+        report["resubmitted"] = queue.enqueue_many("job_queue:benchmark_job", payloads)
+        run_workers(path, threads=threads)
+        report["resubmitted"]["agent_chats"] = chats() - chats_before
+        report["resubmitted"]["distinct_results"] = len({r["payload"]["question"] for r in queue.results()})
+        queue.close()
+    return report
+
+
+def _read_payloads(path: str) -> List[Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable job queue and worker pool for batch agent workloads.")
+    parser.add_argument("command", nargs="?", choices=["enqueue", "work", "progress", "results", "requeue-dead"],
+                        help="What to do")
+    parser.add_argument("--queue-path", default=DEFAULT_QUEUE_PATH, help="SQLite queue file")
+    parser.add_argument("--queue", default="default", help="Queue name")
+    parser.add_argument("--journal-mode", default=DEFAULT_JOURNAL_MODE,
+                        help="WAL on one host, DELETE for hosts sharing a network filesystem")
+    parser.add_argument("--handler", help="enqueue: module:function called with each payload")
+    parser.add_argument("--jsonl", help="enqueue: file with one JSON payload per line")
+    parser.add_argument("--key-field", help="enqueue: payload field used as idempotency key (default: payload hash)")
+    parser.add_argument("--priority", type=int, default=0, help="enqueue: higher runs first")
+    parser.add_argument("--max-attempts", type=int, default=3, help="enqueue: attempts before a job is dead")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="work: worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="work: concurrent jobs per process")
+    parser.add_argument("--visibility-timeout", type=float, default=300, help="work: lease duration in seconds")
+    parser.add_argument("--keep-polling", action="store_true", help="work: keep waiting for new jobs instead of exiting")
+    parser.add_argument("--watch", type=float, default=None, help="progress: repeat every this many seconds")
+    parser.add_argument("--state", default=STATE_DONE, help="results: job state to list")
+    parser.add_argument("--limit", type=int, default=None, help="results: maximum jobs to list")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark against a stand-in server")
+    parser.add_argument("--jobs", type=int, default=96, help="bench: jobs in the batch")
+    args = parser.parse_args()
+
+    if args.bench:
+        # The pool run kills one worker, so it needs another to finish the batch
+        if args.processes < 2:
+            parser.error("--bench needs --processes 2 or more (one worker process is killed mid-batch)")
+        if args.threads < 1:
+            parser.error("--threads must be 1 or more")
+        print(json.dumps(benchmark(args.jobs, args.processes, args.threads), indent=2))
+        return
+    if args.command is None:
+        parser.print_help()
+        return
+
+    if args.command == "work":
+        print(json.dumps(run_workers(args.queue_path, args.queue, args.processes, args.threads, args.visibility_timeout,
+                                     drain=not args.keep_polling, journal_mode=args.journal_mode), indent=2))
+        return
+    queue = JobQueue(args.queue_path, args.journal_mode)
+    if args.command == "enqueue":
+        if not args.handler or not args.jsonl:
+            parser.error("enqueue needs --handler and --jsonl")
+        key_fn = (lambda payload: str(payload[args.key_field])) if args.key_field else None
+        print(json.dumps(queue.enqueue_many(args.handler, _read_payloads(args.jsonl), key_fn, args.queue,
+                                            args.priority, args.max_attempts), indent=2))
+    elif args.command == "progress":
+        while True:
+            print(json.dumps(queue.progress(args.queue), indent=2))
+            if args.watch is None or queue.pending(args.queue) == 0:
+                break
+            time.sleep(args.watch)
+    elif args.command == "results":
+        print(json.dumps(queue.results(args.queue, args.state, args.limit), indent=2))
+    else:
+        print(json.dumps({"requeued": queue.requeue_dead(args.queue)}, indent=2))
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+"""
+load_test.py - Open-loop load generator and soak-test harness for agent conversations
+
+Answers "how many concurrent conversations can one worker sustain" for the patterns in 01-07 by replaying
+a scenario of conversations against an agent endpoint (or the local stand-in server) and reporting
+throughput, latency, errors and client resource use over time.
+
+Features:
+- Scenario file: weighted conversations (turn sequences with max_steps), the agent's instructions and tools,
+  and optionally the stand-in server configuration (latency, tool-call sequences) to test against.
+- Open loop (`--mode open --rate N`): conversations arrive as a Poisson process at N per second whether or
+  not earlier ones finished, and latency is measured from the scheduled arrival (no coordinated omission).
+  Closed loop (`--mode closed --concurrency N`): N conversations are always in flight.
+- Throughput, turn and conversation latency percentiles, error and timeout rates, dropped arrivals.
+- Client RSS and CPU sampled over time alongside per-interval throughput and latency.
+- A tool call with no local handler fails the turn (and stand-in tool calls are checked against the
+  agent's tools up front), so a misnamed tool cannot make tool-heavy conversations look cheap.
+- Reports are JSON with sorted keys and rounded values; `--compare baseline.json` diffs two runs and exits
+  non-zero on regressions beyond `--threshold`.
+
+Usage:
+    python load_test.py --stand-in --mode open --rate 5 --duration 60 --output report.json
+    python load_test.py --scenario support.json --mode closed --concurrency 20 --duration 600 --compare report.json
+
+  Scenario file:
+    {"name": "calculator", "agent": {"instructions": "...", "tools": ["calculator"]},
+     "conversations": [{"weight": 3, "turns": ["What is the square root of 256?", "do the same for 81"], "max_steps": 3}],
+     "stand_in": {"latency_ms": {"agent_chat": {"mean": 400, "jitter": 100}}}}
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from perf_stats import summarize_latencies
+
+# Tool shortcuts for scenario files; anything else is "module:attribute"
+TOOL_SPECS = {
+    "calculator": "oci.addons.adk.tool.prebuilt:CalculatorToolkit",
+    "account": "custom_function_tools:AccountToolkit",
+    "researcher": "custom_functon_tools_v1:ResearcherToolkit",
+    "writer": "custom_functon_tools_v1:WriterToolkit",
+}
+
+DEFAULT_SCENARIO: Dict[str, Any] = {
+    "name": "mixed",
+    "agent": {
+        "instructions": "You perform calculations and answer account questions using the tools provided.",
+        "tools": ["calculator", "account"],
+    },
+    "conversations": [
+        {"name": "single_turn", "weight": 3, "turns": ["Tell me about Oracle Cloud?"], "max_steps": 3},
+        {"name": "single_tool", "weight": 2, "turns": ["What is the square root of 256?"], "max_steps": 3},
+        {"name": "multi_turn", "weight": 2, "max_steps": 3,
+         "turns": ["What is the square root of 256?", "do the same thing for 81"]},
+        {"name": "multi_tool", "weight": 1, "max_steps": 3,
+         "turns": ["Is my user account eligible for the Responses API?"]},
+    ],
+    "stand_in": {
+        "latency_ms": {"agent_chat": {"mean": 300, "jitter": 100}, "session": {"mean": 80, "jitter": 20}},
+        "tool_calls": [
+            {"match": "square root", "steps": [[{"name": "sqrt", "arguments": {"number": 256}}]]},
+            {"match": "eligible", "steps": [[{"name": "get_user_info", "arguments": {"user_id": "user_123"}},
+                                             {"name": "get_org_info", "arguments": {"org_id": "org_222"}}]]},
+        ],
+    },
+}
+
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+
+# Summary metrics compared by --compare; True when a higher value is worse
+COMPARED_METRICS = {
+    "throughput_conversations_per_s": False,
+    "throughput_turns_per_s": False,
+    "turn_latency_s.p50": True,
+    "turn_latency_s.p95": True,
+    "turn_latency_s.p99": True,
+    "conversation_latency_s.p95": True,
+    "error_rate": True,
+    "timeout_rate": True,
+    "dropped_rate": True,
+    "client.rss_mb_peak": True,
+    "client.cpu_percent_mean": True,
+}
+
+
+def load_scenario(path: Optional[str]) -> Dict[str, Any]:
+    """Read a scenario file, or return DEFAULT_SCENARIO when path is None"""
+    if path is None:
+        return json.loads(json.dumps(DEFAULT_SCENARIO))
+    with open(path, "r", encoding="utf-8") as f:
+        scenario = json.load(f)
+    if not scenario.get("conversations"):
+        raise ValueError(f"Scenario {path} has no conversations")
+    return scenario
+
+
+def load_tool(spec: str) -> Any:
+    """Instantiate a tool from a TOOL_SPECS shortcut or a "module:attribute" path"""
+    module_name, _, attribute = TOOL_SPECS.get(spec, spec).partition(":")
+    tool = getattr(importlib.import_module(module_name), attribute)
+    return tool() if isinstance(tool, type) else tool
+
+
+def build_agent(scenario: Dict[str, Any], config_path: Optional[str] = None) -> Any:
+    """Create (and set up) the scenario's agent on the shared agent client"""
+    from oci.addons.adk import Agent
+
+    from client_pool import get_agent_client
+
+    agent_config = scenario.get("agent", {})
+    client = get_agent_client(config_path=config_path) if config_path else get_agent_client()
+    agent = Agent(
+        client=client,
+        agent_endpoint_id=agent_config.get("agent_endpoint_id") or os.getenv("OCI_AI_AGENT_ENDPOINT_ID"),
+        instructions=agent_config.get("instructions", "You are a helpful assistant"),
+        tools=[load_tool(spec) for spec in agent_config.get("tools", [])],
+    )
+    agent.setup()
+    return agent
+
+
+def check_stand_in_tools(scenario: Dict[str, Any], agent: Any) -> None:
+    """Raise ValueError if the stand-in requests a tool the agent has no local handler for"""
+    handlers = {handler.name for handler in agent._local_handler_functions}
+    requested = {call["name"] for entry in scenario.get("stand_in", {}).get("tool_calls", [])
+                 for step in entry.get("steps", []) for call in step}
+    missing = sorted(requested - handlers)
+    if missing:
+        raise ValueError(f"Stand-in tool calls {missing} have no local handler; the agent has {sorted(handlers)}")
+
+
+class ResourceSampler:
+    """Samples this process's RSS and CPU use on a background thread"""
+
+    def __init__(self, interval_s: float = 1.0):
+        self.interval_s = interval_s
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self) -> "ResourceSampler":
+        self._started = time.perf_counter()
+        self._last = (self._started, self._cpu_seconds())
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    @staticmethod
+    def _cpu_seconds() -> float:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    @staticmethod
+    def rss_mb() -> float:
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError, IndexError):
+            # No procfs (macOS): peak RSS is the best available figure (bytes on macOS, KiB elsewhere)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    def _sample(self) -> None:
+        now, cpu = time.perf_counter(), self._cpu_seconds()
+        last_now, last_cpu = self._last
+        self._last = (now, cpu)
+        self.samples.append({
+            "t": now - self._started,
+            "rss_mb": self.rss_mb(),
+            "cpu_percent": (cpu - last_cpu) / (now - last_now) * 100 if now > last_now else 0.0,
+        })
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+
+class LoadGenerator:
+    """Replays a scenario's conversations at a target arrival rate or concurrency"""
+
+    def __init__(self, scenario: Dict[str, Any], run_conversation: Callable[[Dict[str, Any]], List[Dict[str, Any]]],
+                 mode: str = "open", rate: float = 1.0, concurrency: int = 4, duration_s: float = 60,
+                 max_inflight: int = 256, timeout_s: float = 120, sample_interval_s: float = 1.0, seed: int = 7):
+        """
+        Args:
+            scenario (Dict[str, Any]): The scenario (see load_scenario)
+            run_conversation (Callable[[Dict[str, Any]], List[Dict[str, Any]]]): Runs one conversation and
+                returns one {"latency_s", "outcome", "error"} record per turn
+            mode (str): "open" (arrival rate) or "closed" (fixed concurrency)
+            rate (float): Conversations started per second in open mode
+            concurrency (int): Conversations in flight in closed mode
+            duration_s (float): How long to keep starting conversations
+            max_inflight (int): Open mode: arrivals beyond this many in-flight conversations are dropped
+            timeout_s (float): Turns slower than this count as timeouts
+            sample_interval_s (float): Resource sampling and timeline interval
+            seed (int): Seed for arrivals and conversation choice
+        """
+        if mode not in ("open", "closed"):
+            raise ValueError("mode must be 'open' or 'closed'")
+        self.scenario = scenario
+        self.run_conversation = run_conversation
+        self.mode = mode
+        self.rate = rate
+        self.concurrency = concurrency
+        self.duration_s = duration_s
+        self.max_inflight = max_inflight
+        self.timeout_s = timeout_s
+        self.sample_interval_s = sample_interval_s
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.conversations = scenario["conversations"]
+        self.weights = [conversation.get("weight", 1) for conversation in self.conversations]
+        self.records: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def run(self) -> Dict[str, Any]:
+        """Generate the load and return the report"""
+        sampler = ResourceSampler(self.sample_interval_s).start()
+        self._started = time.perf_counter()
+        if self.mode == "open":
+            self._run_open()
+        else:
+            self._run_closed()
+        wall = time.perf_counter() - self._started
+        sampler.stop()
+        return self._report(wall, sampler.samples)
+
+    def _pick(self) -> Dict[str, Any]:
+        with self._lock:
+            return self.random.choices(self.conversations, weights=self.weights)[0]
+
+    def _run_open(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.max_inflight, thread_name_prefix="load") as executor:
+            scheduled = self._started
+            end = self._started + self.duration_s
+            while True:
+                scheduled += self.random.expovariate(self.rate)
+                if scheduled >= end:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                with self._lock:
+                    if self._inflight >= self.max_inflight:
+                        self.dropped += 1
+                        continue
+                    self._inflight += 1
+                executor.submit(self._conversation, self._pick(), scheduled)
+
+    def _run_closed(self) -> None:
+        end = self._started + self.duration_s
+
+        def worker() -> None:
+            while time.perf_counter() < end:
+                with self._lock:
+                    self._inflight += 1
+                self._conversation(self._pick(), time.perf_counter())
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _conversation(self, conversation: Dict[str, Any], scheduled: float) -> None:
+        try:
+            turns = self.run_conversation(conversation)
+        except Exception as e:
+            turns = [{"latency_s": 0.0, "outcome": OUTCOME_ERROR, "error": repr(e)}]
+        finished = time.perf_counter()
+        for turn in turns:
+            if turn["outcome"] == OUTCOME_OK and turn["latency_s"] > self.timeout_s:
+                turn["outcome"] = OUTCOME_TIMEOUT
+        outcome = next((turn["outcome"] for turn in turns if turn["outcome"] != OUTCOME_OK), OUTCOME_OK)
+        with self._lock:
+            self._inflight -= 1
+            self.records.append({
+                "name": conversation.get("name", "conversation"),
+                "scheduled": scheduled - self._started,
+                "finished": finished - self._started,
+                # From the scheduled arrival, so time spent waiting for a free worker counts
+                "latency_s": finished - scheduled,
+                "outcome": outcome,
+                "turns": turns,
+            })
+
+    def _report(self, wall: float, samples: List[Dict[str, float]]) -> Dict[str, Any]:
+        records = sorted(self.records, key=lambda record: record["finished"])
+        turns = [turn for record in records for turn in record["turns"]]
+        ok_turns = [turn["latency_s"] for turn in turns if turn["outcome"] == OUTCOME_OK]
+        ok_conversations = [record["latency_s"] for record in records if record["outcome"] == OUTCOME_OK]
+        arrivals = len(records) + self.dropped
+        errors: Dict[str, int] = {}
+        for turn in turns:
+            if turn.get("error"):
+                errors[turn["error"][:120]] = errors.get(turn["error"][:120], 0) + 1
+
+        timeline = []
+        for index in range(int(wall // self.sample_interval_s) + 1):
+            low, high = index * self.sample_interval_s, (index + 1) * self.sample_interval_s
+            window = [record for record in records if low <= record["finished"] < high]
+            # Sampler ticks drift slightly past interval boundaries, so take the nearest sample
+            sample = min(samples, key=lambda s: abs(s["t"] - high), default=None)
+            timeline.append({
+                "t": high,
+                "conversations": len(window),
+                "errors": sum(1 for record in window if record["outcome"] != OUTCOME_OK),
+                "latency_p50_s": summarize_latencies([r["latency_s"] for r in window])["p50"],
+                "latency_p95_s": summarize_latencies([r["latency_s"] for r in window])["p95"],
+                "rss_mb": sample["rss_mb"] if sample else None,
+                "cpu_percent": sample["cpu_percent"] if sample else None,
+            })
+
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for conversation in self.conversations:
+            name = conversation.get("name", "conversation")
+            latencies = [r["latency_s"] for r in records if r["name"] == name and r["outcome"] == OUTCOME_OK]
+            by_name[name] = {
+                "count": sum(1 for r in records if r["name"] == name),
+                "latency_s": summarize_latencies(latencies),
+            }
+
+        report = {
+            "scenario": self.scenario.get("name", "scenario"),
+            "config": {
+                "mode": self.mode,
+                "rate": self.rate if self.mode == "open" else None,
+                "concurrency": self.concurrency if self.mode == "closed" else None,
+                "duration_s": self.duration_s,
+                "max_inflight": self.max_inflight,
+                "timeout_s": self.timeout_s,
+                "seed": self.seed,
+            },
+            "summary": {
+                "wall_s": wall,
+                "conversations": len(records),
+                "turns": len(turns),
+                "dropped": self.dropped,
+                "dropped_rate": self.dropped / arrivals if arrivals else 0.0,
+                "throughput_conversations_per_s": len(ok_conversations) / wall if wall else 0.0,
+                "throughput_turns_per_s": len(ok_turns) / wall if wall else 0.0,
+                "error_rate": sum(1 for t in turns if t["outcome"] == OUTCOME_ERROR) / len(turns) if turns else 0.0,
+                "timeout_rate": sum(1 for t in turns if t["outcome"] == OUTCOME_TIMEOUT) / len(turns) if turns else 0.0,
+                "turn_latency_s": summarize_latencies(ok_turns),
+                "conversation_latency_s": summarize_latencies(ok_conversations),
+                "client": {
+                    "rss_mb_peak": max((s["rss_mb"] for s in samples), default=None),
+                    "rss_mb_end": samples[-1]["rss_mb"] if samples else None,
+                    "cpu_percent_mean": sum(s["cpu_percent"] for s in samples) / len(samples) if samples else None,
+                },
+            },
+            "by_conversation": by_name,
+            "errors": errors,
+            "timeline": timeline,
+        }
+        return _rounded(report)
+
+
+def _rounded(value: Any) -> Any:
+    # Fixed precision keeps reports readable in a diff
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, dict):
+        return {key: _rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rounded(item) for item in value]
+    return value
+
+
+def agent_conversation_runner(agent: Any) -> Callable[[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Run a scenario conversation as consecutive agent.run turns in one session, deleting it at the end"""
+    local = threading.local()
+
+    def run(conversation: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Agent.run needs an event loop on the calling thread; each worker thread keeps one
+        if getattr(local, "loop", None) is None:
+            local.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(local.loop)
+        records = []
+        session_id = None
+        turns = conversation["turns"]
+
+        def require_handler(required_action: Any, performed_action: Any) -> None:
+            # The ADK logs and skips a tool call it has no handler for; a load test must not
+            if performed_action is None:
+                raise LookupError(f"No local handler for tool '{required_action.function_call.name}'")
+
+        for index, message in enumerate(turns):
+            started = time.perf_counter()
+            try:
+                response = agent.run(message, session_id=session_id, max_steps=conversation.get("max_steps", 10),
+                                     delete_session=index == len(turns) - 1,
+                                     on_fulfilled_required_action=require_handler)
+                session_id = response.session_id
+                records.append({"latency_s": time.perf_counter() - started, "outcome": OUTCOME_OK, "error": None})
+            except Exception as e:
+                records.append({"latency_s": time.perf_counter() - started, "outcome": OUTCOME_ERROR,
+                                "error": f"{type(e).__name__}: {getattr(e, 'status', '')} {getattr(e, 'code', '')}".strip()
+                                if hasattr(e, "status") else f"{type(e).__name__}: {e}"})
+                if session_id is not None:
+                    try:
+                        agent.delete_session(session_id)
+                    except Exception:
+                        pass
+                break
+        return records
+
+    return run
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """Compare the summary metrics of two reports
+
+    Args:
+        baseline (Dict[str, Any]): Earlier report
+        current (Dict[str, Any]): New report
+        threshold (float): Relative change counted as a regression (0.1 = 10%)
+
+    Returns:
+        List[Dict[str, Any]]: One row per metric with baseline, current, relative change and regression flag
+    """
+    def lookup(report: Dict[str, Any], path: str) -> Optional[float]:
+        value: Any = report.get("summary", {})
+        for key in path.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+
+    rows = []
+    for path, higher_is_worse in COMPARED_METRICS.items():
+        before, after = lookup(baseline, path), lookup(current, path)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else (0.0 if after == before else float("inf"))
+        worse = change > threshold if higher_is_worse else change < -threshold
+        # Rates that stay tiny are not regressions just because they doubled
+        if path.endswith("_rate") and after < 0.001:
+            worse = False
+        rows.append({"metric": path, "baseline": before, "current": after, "change": round(change, 4),
+                     "regression": worse})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator and soak test for agent conversations.")
+    parser.add_argument("--scenario", default=None, help="Scenario JSON file (default: built-in mixed scenario)")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open")
+    parser.add_argument("--rate", type=float, default=2.0, help="Open mode: conversations started per second")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed mode: conversations in flight")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to keep starting conversations")
+    parser.add_argument("--max-inflight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=120, help="Turns slower than this count as timeouts")
+    parser.add_argument("--interval", type=float, default=1.0, help="Sampling and timeline interval in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--stand-in", action="store_true", help="Run against an in-process mock_genai_server")
+    parser.add_argument("--output", default=None, help="Write the report to this file")
+    parser.add_argument("--compare", default=None, help="Baseline report to diff against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep the ADK's per-call console output")
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    if not args.verbose:
+        from oci.addons.adk.logger import default_logger
+        default_logger.console.quiet = True
+
+    server = None
+    config_path = None
+    if args.stand_in:
+        from mock_genai_server import MockGenAIServer, write_offline_oci_config
+
+        server = MockGenAIServer(config=scenario.get("stand_in")).start()
+        config_path = write_offline_oci_config()
+        os.environ.update(server.environment(config_path))
+
+    try:
+        agent = build_agent(scenario, config_path)
+        if server is not None:
+            check_stand_in_tools(scenario, agent)
+        generator = LoadGenerator(
+            scenario, agent_conversation_runner(agent), mode=args.mode, rate=args.rate,
+            concurrency=args.concurrency, duration_s=args.duration, max_inflight=args.max_inflight,
+            timeout_s=args.timeout, sample_interval_s=args.interval, seed=args.seed,
+        )
+        report = generator.run()
+    finally:
+        if server is not None:
+            server.stop()
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(json.dumps(report["summary"], indent=2, sort_keys=True))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            rows = compare_reports(json.load(f), report, args.threshold)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['metric']:<36} {row['baseline']:>12} {row['current']:>12} {row['change']:>+9.1%} {flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
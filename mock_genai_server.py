@@ -0,0 +1,624 @@
+"""
+mock_genai_server.py - Local stand-in for the OCI Generative AI inference and Agent endpoints
+
+This module runs a small HTTP server that speaks enough of the OCI REST APIs for the examples
+(00_sample.py through 08_delete_sessions.py) to run end to end without network access or quota.
+It is meant for benchmarking client-side overhead and catching regressions in CI.
+
+Features:
+- Inference: POST /20231130/actions/chat (CohereChatRequest in, CohereChatResponse with usage out).
+- Agent runtime: create session, chat (including required actions and performed action callbacks)
+  and delete session under /20240531/agentEndpoints/{agentEndpointId}/...
+- Agent management: the endpoint, agent and tool calls that Agent.setup() makes.
+- Server-sent event streaming when the request sets `isStream` (inference) or `shouldStream` (agent),
+  one whitespace-delimited token per event at a configurable interval.
+- Configurable per-route latency, jitter and slow tail, token counts, error rate/status, and tool-call
+  sequences keyed on the user message. Randomness is seeded, so runs are reproducible.
+- Optional request and token quotas over a sliding window, answered with 429 like a tenancy's RPM/TPM limits.
+- GET /_stats returns request counters, injected errors and live sessions.
+
+Usage:
+- python mock_genai_server.py --port 8088 [--config stand_in.json]
+- Export the environment variables it prints, then run any example, for example:
+    OCI_GENAI_ENDPOINT=http://127.0.0.1:8088 python 00_sample.py
+- From Python (tests, benchmarks):
+    server = MockGenAIServer(config={"latency_ms": {"agent_chat": {"mean": 50, "jitter": 0}}}).start()
+    ... point clients at server.url ...
+    server.stop()
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+INFERENCE_BASE_PATH = "/20231130"
+AGENT_BASE_PATH = "/20240531"
+
+# Every key can be overridden by the JSON config; nested dicts are merged one level deep
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "seed": 0,
+    # Simulated server time per route: mean and uniform +/- jitter in milliseconds, plus an optional
+    # tail: a slow_rate fraction of requests take slow_ms longer (e.g. a throttled or cold backend)
+    "latency_ms": {
+        "inference_chat": {"mean": 0, "jitter": 0},
+        "agent_chat": {"mean": 0, "jitter": 0},
+        "session": {"mean": 0, "jitter": 0},
+        "management": {"mean": 0, "jitter": 0},
+    },
+    # Fraction of requests on error_routes that fail with error_status
+    "error_rate": 0.0,
+    "error_status": 429,
+    "error_routes": ["inference_chat", "agent_chat"],
+    # Requests and tokens (prompt plus completion) allowed per sliding window of window_s seconds on the
+    # quota routes; None is unlimited. Requests over quota fail fast with 429
+    "quota": {"window_s": 60, "requests": None, "tokens": None, "routes": ["inference_chat", "agent_chat"]},
+    "usage": {"prompt_tokens": 20, "completion_tokens": 40},
+    # Delay between streamed tokens, after the route latency above (time to first token)
+    "token_interval_ms": 0,
+    # Final answer text; {message} is the user message, {tool_outputs} the outputs of the last step
+    "reply": "Stand-in response to: {message}",
+    # Tool-call sequences: the first entry whose "match" is found in the user message is used.
+    # "steps" is a list of agent steps, each a list of function calls requested in that step.
+    # A call with "known_if" is skipped when that text is in the user message (the answer was supplied
+    # up front, e.g. by context_prefetch.py); steps left empty are skipped too.
+    "tool_calls": [],
+}
+
+
+def load_config(path: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge a JSON config file and/or a dict of overrides onto DEFAULT_CONFIG
+
+    Args:
+        path (Optional[str]): Path to a JSON config file
+        overrides (Optional[Dict[str, Any]]): Config values applied after the file
+
+    Returns:
+        Dict[str, Any]: The effective config
+    """
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    layers = []
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            layers.append(json.load(f))
+    if overrides:
+        layers.append(overrides)
+    for layer in layers:
+        for key, value in layer.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key] = {**config[key], **copy.deepcopy(value)}
+            else:
+                config[key] = copy.deepcopy(value)
+    return config
+
+
+def write_offline_oci_config(directory: Optional[str] = None, profile: str = "DEFAULT",
+                             region: str = "us-chicago-1") -> str:
+    """Write a throwaway OCI config file and API key so SDK clients can sign requests offline
+
+    The stand-in server does not verify signatures; this only satisfies the SDK's config validation.
+
+    Args:
+        directory (Optional[str]): Where to write the files, a new temp dir by default
+        profile (str): Profile name to write
+        region (str): Region to put in the profile
+
+    Returns:
+        str: Path to the config file
+    """
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    directory = directory or tempfile.mkdtemp(prefix="oci-stand-in-")
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    key_path = os.path.join(directory, "stand_in_key.pem")
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+    public_der = key.public_key().public_bytes(
+        serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    digest = hashes.Hash(hashes.MD5())
+    digest.update(public_der)
+    fingerprint = ":".join(f"{byte:02x}" for byte in digest.finalize())
+
+    config_path = os.path.join(directory, "config")
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write(
+            f"[{profile}]\n"
+            "user=ocid1.user.oc1..standin\n"
+            "tenancy=ocid1.tenancy.oc1..standin\n"
+            f"fingerprint={fingerprint}\n"
+            f"key_file={key_path}\n"
+            f"region={region}\n"
+        )
+    return config_path
+
+
+class StandInState:
+    """Sessions, agents, tools and counters shared by all request handler threads"""
+
+    COMPARTMENT_ID = "ocid1.compartment.oc1..standin"
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.get("seed", 0))
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+        self.agents: Dict[str, Dict[str, Any]] = {}
+        self.tools: Dict[str, Dict[str, Any]] = {}
+        self.counters: Dict[str, int] = {}
+        self.errors_injected = 0
+        self.quota_throttled = 0
+        self.sessions_deleted = 0
+        self._quota_window: "deque[Tuple[float, int]]" = deque()
+
+    def count(self, route: str) -> None:
+        with self.lock:
+            self.counters[route] = self.counters.get(route, 0) + 1
+
+    def latency(self, route: str) -> float:
+        setting = self.config["latency_ms"].get(route, {"mean": 0, "jitter": 0})
+        with self.lock:
+            jitter = self.rng.uniform(-setting.get("jitter", 0), setting.get("jitter", 0))
+            slow = setting.get("slow_ms", 0) if self.rng.random() < setting.get("slow_rate", 0) else 0
+        return max(0.0, setting.get("mean", 0) + jitter + slow) / 1000.0
+
+    def should_fail(self, route: str) -> bool:
+        if route not in self.config["error_routes"] or self.config["error_rate"] <= 0:
+            return False
+        with self.lock:
+            failed = self.rng.random() < self.config["error_rate"]
+            if failed:
+                self.errors_injected += 1
+        return failed
+
+    def within_quota(self, route: str, tokens: int) -> bool:
+        quota = self.config["quota"]
+        if route not in quota["routes"] or (quota["requests"] is None and quota["tokens"] is None):
+            return True
+        now = time.monotonic()
+        with self.lock:
+            window = self._quota_window
+            while window and window[0][0] <= now - quota["window_s"]:
+                window.popleft()
+            if ((quota["requests"] is not None and len(window) + 1 > quota["requests"])
+                    or (quota["tokens"] is not None and sum(used for _, used in window) + tokens > quota["tokens"])):
+                self.quota_throttled += 1
+                return False
+            window.append((now, tokens))
+        return True
+
+    def endpoint(self, endpoint_id: str) -> Dict[str, Any]:
+        # Any endpoint OCID is accepted; its agent is created on first use
+        with self.lock:
+            if endpoint_id not in self.endpoints:
+                agent_id = "ocid1.genaiagent.oc1..standin" + hashlib.sha1(endpoint_id.encode()).hexdigest()[:12]
+                self.endpoints[endpoint_id] = {
+                    "id": endpoint_id,
+                    "agentId": agent_id,
+                    "compartmentId": self.COMPARTMENT_ID,
+                    "displayName": "stand-in endpoint",
+                    "shouldEnableSession": True,
+                    "lifecycleState": "ACTIVE",
+                }
+                self.agents[agent_id] = {
+                    "id": agent_id,
+                    "compartmentId": self.COMPARTMENT_ID,
+                    "displayName": "stand-in agent",
+                    "description": None,
+                    "llmConfig": {"routingLlmCustomization": {"instruction": ""}},
+                    "lifecycleState": "ACTIVE",
+                }
+            return self.endpoints[endpoint_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": dict(self.counters),
+                "errors_injected": self.errors_injected,
+                "quota_throttled": self.quota_throttled,
+                "sessions_live": len(self.sessions),
+                "sessions_deleted": self.sessions_deleted,
+                "tools": len(self.tools),
+            }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Routes OCI REST calls to the stand-in implementations"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "OCIStandIn/1.0"
+
+    # (method, regex, route name, handler method name); route names key latency and error config
+    ROUTES: List[Tuple[str, str, str, str]] = [
+        ("POST", INFERENCE_BASE_PATH + r"/actions/chat", "inference_chat", "_inference_chat"),
+        ("POST", AGENT_BASE_PATH + r"/agentEndpoints/([^/]+)/sessions", "session", "_create_session"),
+        ("DELETE", AGENT_BASE_PATH + r"/agentEndpoints/([^/]+)/sessions/([^/]+)", "session", "_delete_session"),
+        ("POST", AGENT_BASE_PATH + r"/agentEndpoints/([^/]+)/actions/chat", "agent_chat", "_agent_chat"),
+        ("GET", AGENT_BASE_PATH + r"/agentEndpoints/([^/]+)", "management", "_get_endpoint"),
+        ("GET", AGENT_BASE_PATH + r"/agents/([^/]+)", "management", "_get_agent"),
+        ("PUT", AGENT_BASE_PATH + r"/agents/([^/]+)", "management", "_update_agent"),
+        ("GET", AGENT_BASE_PATH + r"/tools", "management", "_list_tools"),
+        ("POST", AGENT_BASE_PATH + r"/tools", "management", "_create_tool"),
+        ("GET", AGENT_BASE_PATH + r"/tools/([^/]+)", "management", "_get_tool"),
+        ("DELETE", AGENT_BASE_PATH + r"/tools/([^/]+)", "management", "_delete_tool"),
+        ("GET", r"/_stats", "stats", "_stats"),
+    ]
+
+    @property
+    def state(self) -> StandInState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        body = json.loads(raw_body) if raw_body else {}
+
+        for route_method, pattern, route, handler_name in self.ROUTES:
+            match = re.fullmatch(pattern, parsed.path)
+            if route_method != method or not match:
+                continue
+            self.state.count(route)
+            if not self.state.within_quota(route, self._usage_tokens(body)):
+                self._send_error(429, "TooManyRequests", "Stand-in quota exceeded")
+                return
+            delay = self.state.latency(route)
+            if delay:
+                time.sleep(delay)
+            if self.state.should_fail(route):
+                self._send_error(self.state.config["error_status"], "InjectedFault", "Stand-in injected failure")
+                return
+            handler = getattr(self, handler_name)
+            handler(body, parse_qs(parsed.query), *match.groups())
+            return
+        self._send_error(404, "NotAuthorizedOrNotFound", f"No stand-in route for {method} {parsed.path}")
+
+    def _send_json(self, status: int, payload: Optional[Any] = None) -> None:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("opc-request-id", uuid.uuid4().hex)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_sse(self, events: List[Dict[str, Any]]) -> None:
+        # Chunked transfer keeps the connection reusable without knowing the length up front
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("opc-request-id", uuid.uuid4().hex)
+        self.end_headers()
+        interval = self.state.config["token_interval_ms"] / 1000.0
+        for index, event in enumerate(events):
+            if index and interval:
+                time.sleep(interval)
+            chunk = f"data: {json.dumps(event)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _usage_tokens(self, body: Dict[str, Any]) -> int:
+        # Tokens the response will report: prompt plus completion, capped by the request's maxTokens
+        usage = self.state.config["usage"]
+        max_tokens = (body.get("chatRequest") or {}).get("maxTokens") or usage["completion_tokens"]
+        return usage["prompt_tokens"] + min(usage["completion_tokens"], max_tokens)
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return re.findall(r"\S+\s*", text)
+
+    def _send_error(self, status: int, code: str, message: str) -> None:
+        self.send_response(status)
+        data = json.dumps({"code": code, "message": message}).encode("utf-8")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("opc-request-id", uuid.uuid4().hex)
+        if status == 429:
+            self.send_header("retry-after", "1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Inference
+
+    def _inference_chat(self, body, query):
+        chat_request = body.get("chatRequest", {})
+        message = chat_request.get("message", "")
+        usage = self.state.config["usage"]
+        completion_tokens = min(usage["completion_tokens"], chat_request.get("maxTokens") or usage["completion_tokens"])
+        text = self.state.config["reply"].format(message=message, tool_outputs=[])
+        usage_payload = {
+            "promptTokens": usage["prompt_tokens"],
+            "completionTokens": completion_tokens,
+            "totalTokens": usage["prompt_tokens"] + completion_tokens,
+        }
+        if chat_request.get("isStream"):
+            events = [{"apiFormat": "COHERE", "text": token} for token in self._tokens(text)]
+            events.append({"apiFormat": "COHERE", "text": text, "finishReason": "COMPLETE", "usage": usage_payload})
+            self._send_sse(events)
+            return
+        self._send_json(200, {
+            "modelId": body.get("servingMode", {}).get("modelId"),
+            "modelVersion": "stand-in",
+            "chatResponse": {
+                "apiFormat": "COHERE",
+                "text": text,
+                "finishReason": "COMPLETE",
+                "usage": usage_payload,
+            },
+        })
+
+    # Agent runtime
+
+    def _create_session(self, body, query, endpoint_id):
+        self.state.endpoint(endpoint_id)
+        session_id = "ocid1.genaiagentsession.oc1..standin" + uuid.uuid4().hex
+        now = time.time()
+        with self.state.lock:
+            self.state.sessions[session_id] = {"endpoint_id": endpoint_id, "created": now, "last_used": now,
+                                               "steps": [], "step": 0, "message": ""}
+        self._send_json(200, {
+            "id": session_id,
+            "displayName": body.get("displayName"),
+            "description": body.get("description"),
+        })
+
+    def _delete_session(self, body, query, endpoint_id, session_id):
+        with self.state.lock:
+            session = self.state.sessions.pop(session_id, None)
+            if session is not None:
+                self.state.sessions_deleted += 1
+        if session is None:
+            self._send_error(404, "NotAuthorizedOrNotFound", f"Session {session_id} not found")
+            return
+        self._send_json(200)
+
+    def _agent_chat(self, body, query, endpoint_id):
+        session_id = body.get("sessionId")
+        performed_actions = body.get("performedActions") or []
+        user_message = body.get("userMessage")
+        with self.state.lock:
+            session = self.state.sessions.get(session_id)
+            if session is not None:
+                session["last_used"] = time.time()
+                if not performed_actions:
+                    # New turn: pick the tool-call sequence matching the user message
+                    session["message"] = user_message or ""
+                    session["steps"] = self._match_steps(session["message"])
+                    session["step"] = 0
+                else:
+                    session["step"] += 1
+                step = session["step"]
+                steps = session["steps"]
+                message = session["message"]
+        if session is None:
+            self._send_error(404, "NotAuthorizedOrNotFound", f"Session {session_id} not found")
+            return
+
+        if step < len(steps):
+            required_actions = [
+                {
+                    "requiredActionType": "FUNCTION_CALLING_REQUIRED_ACTION",
+                    "actionId": uuid.uuid4().hex,
+                    "functionCall": {
+                        "name": call["name"],
+                        "arguments": json.dumps(call.get("arguments", {})),
+                    },
+                }
+                for call in steps[step]
+            ]
+            payload = {"message": None, "requiredActions": required_actions, "traces": []}
+            if body.get("shouldStream"):
+                self._send_sse([payload])
+            else:
+                self._send_json(200, payload)
+            return
+
+        tool_outputs = [action.get("functionCallOutput") for action in performed_actions]
+        text = self.state.config["reply"].format(message=message, tool_outputs=tool_outputs)
+        usage = self.state.config["usage"]
+        payload = {
+            "message": {"role": "AGENT", "content": {"text": text}},
+            "requiredActions": None,
+            # Token usage is only reported inside traces, as with tracing enabled on a real endpoint
+            "traces": [{
+                "traceType": "GENERATION_TRACE",
+                "key": uuid.uuid4().hex,
+                "generation": text,
+                "usage": [{"usageDetails": {"inputTokenCount": usage["prompt_tokens"],
+                                            "outputTokenCount": usage["completion_tokens"]}}],
+            }],
+        }
+        if body.get("shouldStream"):
+            # Deltas first, then the complete result (its text repeats everything streamed so far)
+            events = [{"message": {"role": "AGENT", "content": {"text": token}}} for token in self._tokens(text)]
+            self._send_sse(events + [payload])
+            return
+        self._send_json(200, payload)
+
+    def _match_steps(self, message: str) -> List[List[Dict[str, Any]]]:
+        lowered = message.lower()
+        for scenario in self.state.config["tool_calls"]:
+            if scenario.get("match", "").lower() in lowered:
+                steps = [[call for call in step if not call.get("known_if") or call["known_if"] not in message]
+                         for step in scenario.get("steps", [])]
+                return [step for step in steps if step]
+        return []
+
+    # Agent management (what Agent.setup() needs)
+
+    def _get_endpoint(self, body, query, endpoint_id):
+        self._send_json(200, self.state.endpoint(endpoint_id))
+
+    def _get_agent(self, body, query, agent_id):
+        with self.state.lock:
+            agent = copy.deepcopy(self.state.agents.get(agent_id))
+        if agent is None:
+            self._send_error(404, "NotAuthorizedOrNotFound", f"Agent {agent_id} not found")
+            return
+        self._send_json(200, agent)
+
+    def _update_agent(self, body, query, agent_id):
+        with self.state.lock:
+            agent = self.state.agents.get(agent_id)
+            if agent is not None:
+                for key in ("displayName", "description", "llmConfig", "freeformTags"):
+                    if body.get(key) is not None:
+                        agent[key] = body[key]
+        if agent is None:
+            self._send_error(404, "NotAuthorizedOrNotFound", f"Agent {agent_id} not found")
+            return
+        self._send_json(202)
+
+    def _list_tools(self, body, query):
+        agent_id = (query.get("agentId") or [None])[0]
+        with self.state.lock:
+            items = [copy.deepcopy(t) for t in self.state.tools.values() if agent_id in (None, t.get("agentId"))]
+        self._send_json(200, {"items": items})
+
+    def _create_tool(self, body, query):
+        tool = dict(body)
+        tool["id"] = "ocid1.genaiagenttool.oc1..standin" + uuid.uuid4().hex
+        tool["lifecycleState"] = "ACTIVE"
+        with self.state.lock:
+            self.state.tools[tool["id"]] = tool
+        self._send_json(200, tool)
+
+    def _get_tool(self, body, query, tool_id):
+        with self.state.lock:
+            tool = copy.deepcopy(self.state.tools.get(tool_id))
+        if tool is None:
+            self._send_error(404, "NotAuthorizedOrNotFound", f"Tool {tool_id} not found")
+            return
+        self._send_json(200, tool)
+
+    def _delete_tool(self, body, query, tool_id):
+        with self.state.lock:
+            tool = self.state.tools.get(tool_id)
+            if tool is not None:
+                tool["lifecycleState"] = "DELETED"
+        self._send_json(202)
+
+    def _stats(self, body, query):
+        self._send_json(200, self.state.stats())
+
+
+class MockGenAIServer:
+    """A stand-in server running on a background thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[Dict[str, Any]] = None,
+                 config_path: Optional[str] = None):
+        """
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind, 0 picks a free port
+            config (Optional[Dict[str, Any]]): Config overrides
+            config_path (Optional[str]): JSON config file
+        """
+        self.state = StandInState(load_config(config_path, config))
+        self._httpd = ThreadingHTTPServer((host, port), StandInHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.state = self.state
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockGenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def environment(self, config_file: Optional[str] = None, profile: str = "DEFAULT") -> Dict[str, str]:
+        """Environment variables that point the examples at this server
+
+        Args:
+            config_file (Optional[str]): OCI config file to use, see write_offline_oci_config
+            profile (str): Profile in the config file
+
+        Returns:
+            Dict[str, str]: Variables to export before running a script
+        """
+        env = {
+            "OCI_GENAI_ENDPOINT": self.url,
+            "OCI_AGENT_RUNTIME_ENDPOINT": self.url,
+            "OCI_AGENT_MANAGEMENT_ENDPOINT": self.url,
+            "OCI_CONFIG_PROFILE": profile,
+            "OCI_AI_AGENT_ENDPOINT_ID": "ocid1.genaiagentendpoint.oc1..standin",
+            "OCI_COMPARTMENT_ID": StandInState.COMPARTMENT_ID,
+        }
+        if config_file:
+            # OCI_CONFIG_PATH is read by 00_sample.py, OCI_CONFIG_FILE by AgentClient
+            env["OCI_CONFIG_PATH"] = config_file
+            env["OCI_CONFIG_FILE"] = config_file
+        return env
+
+    def __enter__(self) -> "MockGenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the OCI Generative AI endpoints.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--config", help="JSON file overriding DEFAULT_CONFIG")
+    args = parser.parse_args()
+
+    server = MockGenAIServer(args.host, args.port, config_path=args.config)
+    config_file = write_offline_oci_config()
+    print(f"Stand-in server listening on {server.url}")
+    print("Point the examples at it with:")
+    for key, value in server.environment(config_file).items():
+        print(f"  export {key}={value}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
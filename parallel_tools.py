@@ -0,0 +1,247 @@
+"""
+parallel_tools.py - Run the local function tools of one agent step concurrently
+
+When the remote agent hands back several required actions at once (e.g. `get_user_info` plus
+`get_org_info` from AccountToolkit, or `get_trending_keywords` plus `send_email`), the ADK executes
+them one after another, so the step takes the sum of the tool times. `ParallelAgent` executes them
+concurrently instead, so the step takes as long as the slowest tool.
+
+Features:
+- Synchronous tools run on a thread pool; `async def` tools run as tasks on the run's event loop.
+- Per-tool timeouts (a default plus overrides by tool name); a timed-out tool reports an error
+  string to the agent, the same way the ADK reports a tool exception.
+- Performed actions are submitted in the order of the required actions, whatever order they finish in.
+- Drop-in: `ParallelAgent` takes the same arguments as `Agent`, and works with `AgentRunStream` too.
+
+Usage:
+    agent = ParallelAgent(client=client, agent_endpoint_id=..., tools=[AccountToolkit()],
+                          tool_runner=ParallelToolRunner(max_workers=8, tool_timeouts={"send_email": 10}))
+    response = agent.run("Is my user account eligible for the Responses API?")
+
+- python parallel_tools.py --bench compares serial and parallel steps with mock slow tools.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from oci.addons.adk import Agent
+from oci.addons.adk.run.types import PerformedAction, RequiredAction
+
+from perf_stats import summarize_latencies
+
+FUNCTION_CALLING_REQUIRED_ACTION = "FUNCTION_CALLING_REQUIRED_ACTION"
+FUNCTION_CALLING_PERFORMED_ACTION = "FUNCTION_CALLING_PERFORMED_ACTION"
+
+
+class ParallelToolRunner:
+    """Executes the required actions of one step concurrently"""
+
+    def __init__(self, max_workers: int = 8, timeout_seconds: Optional[float] = 60,
+                 tool_timeouts: Optional[Dict[str, float]] = None, executor: Optional[ThreadPoolExecutor] = None,
+                 log_calls: bool = True):
+        """
+        Args:
+            max_workers (int): Threads for synchronous tools (ignored when executor is given)
+            timeout_seconds (Optional[float]): Default timeout per tool call, None for no timeout
+            tool_timeouts (Optional[Dict[str, float]]): Timeout overrides by tool name
+            executor (Optional[ThreadPoolExecutor]): Thread pool to share with other runners
+            log_calls (bool): Print tool calls and results like the ADK does
+        """
+        self.timeout_seconds = timeout_seconds
+        self.tool_timeouts = tool_timeouts or {}
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-tool")
+        self.log_calls = log_calls
+
+    async def perform(self, agent: Any, response: Dict[str, Any],
+                      on_fulfilled_required_action: Optional[Callable] = None) -> List[PerformedAction]:
+        """Same contract as Agent._handle_required_actions, but concurrent
+
+        Args:
+            agent (Any): The agent whose local tools handle the actions
+            response (Dict[str, Any]): Chat response carrying required_actions
+            on_fulfilled_required_action (Optional[Callable]): Called as each action completes
+
+        Returns:
+            List[PerformedAction]: Performed actions in the order of the required actions
+        """
+        required_actions = [
+            RequiredAction.model_validate(action) for action in response.get("required_actions") or []
+        ]
+        calls = [action for action in required_actions if action.required_action_type == FUNCTION_CALLING_REQUIRED_ACTION]
+        if not calls:
+            return []
+
+        tasks = [asyncio.ensure_future(self._perform_one(agent, index, action)) for index, action in enumerate(calls)]
+        performed: List[Optional[PerformedAction]] = [None] * len(calls)
+        # Hooks fire in completion order so observers see when each tool finished
+        for next_done in asyncio.as_completed(tasks):
+            index, performed_action = await next_done
+            performed[index] = performed_action
+            if on_fulfilled_required_action:
+                on_fulfilled_required_action(calls[index], performed_action)
+        return [action for action in performed if action is not None]
+
+    async def _perform_one(self, agent: Any, index: int, required_action: RequiredAction) -> Tuple[int, Optional[PerformedAction]]:
+        function_call = required_action.function_call
+        name = function_call.name
+        handler = next((f for f in agent._local_handler_functions if f.name == name), None)
+        if handler is None:
+            # Same as the ADK: actions without a local handler are not answered
+            return index, None
+        try:
+            arguments = json.loads(function_call.arguments) if isinstance(function_call.arguments, str) \
+                else function_call.arguments
+            arguments = handler._prepare_arguments(arguments)
+            if self.log_calls:
+                agent._log_function_execution_start(handler.name, handler.callable.__name__, arguments)
+            if asyncio.iscoroutinefunction(handler.callable):
+                call = handler.callable(**arguments)
+            else:
+                # With the run's context variables, so a tool that calls an agent keeps e.g. its admission priority
+                context = contextvars.copy_context()
+                call = asyncio.get_running_loop().run_in_executor(
+                    self.executor, lambda: context.run(handler.callable, **arguments))
+            timeout = self.tool_timeouts.get(name, self.timeout_seconds)
+            result = await asyncio.wait_for(call, timeout) if timeout is not None else await call
+            if self.log_calls:
+                agent._log_function_execution_result(result)
+            output = result if isinstance(result, str) else json.dumps(result, default=str)
+        except asyncio.TimeoutError:
+            # A thread cannot be cancelled; the call keeps running but its result is discarded
+            output = f"Tool '{name}' timed out after {self.tool_timeouts.get(name, self.timeout_seconds)}s"
+        except Exception as e:
+            output = str(e)
+        return index, PerformedAction(
+            action_id=required_action.action_id,
+            performed_action_type=FUNCTION_CALLING_PERFORMED_ACTION,
+            function_call_output=output,
+        )
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+_default_runner: Optional[ParallelToolRunner] = None
+
+
+def default_tool_runner() -> ParallelToolRunner:
+    """The runner shared by ParallelAgents created without one"""
+    global _default_runner
+    if _default_runner is None:
+        _default_runner = ParallelToolRunner()
+    return _default_runner
+
+
+class ParallelAgent(Agent):
+    """An Agent whose required actions of one step run concurrently"""
+
+    def __init__(self, *args: Any, tool_runner: Optional[ParallelToolRunner] = None, **kwargs: Any):
+        """
+        Args:
+            *args: Agent arguments
+            tool_runner (Optional[ParallelToolRunner]): Runner to use, defaults to a shared one
+            **kwargs: Agent arguments
+        """
+        super().__init__(*args, **kwargs)
+        self.tool_runner = tool_runner or default_tool_runner()
+
+    async def _handle_required_actions(self, response: Dict[str, Any],
+                                       on_fulfilled_required_action: Optional[Callable] = None) -> List[PerformedAction]:
+        return await self.tool_runner.perform(self, response, on_fulfilled_required_action)
+
+
+def benchmark(actions: int = 3, tool_latency_ms: float = 100, steps: int = 10, max_workers: int = 8) -> Dict[str, Any]:
+    """Compare the ADK's serial tool execution with ParallelToolRunner on one step of mock slow tools
+
+    Half of the mock tools block (like a DB driver), the other half are async (like an HTTP client).
+
+    Args:
+        actions (int): Required actions per step
+        tool_latency_ms (float): Latency of each mock tool
+        steps (int): Steps to time per mode
+        max_workers (int): Threads for the parallel runner
+
+    Returns:
+        Dict[str, Any]: Step latency summary per mode
+    """
+    from oci.addons.adk import tool
+    from oci.addons.adk.tool.function_tool import FunctionTool
+
+    @tool
+    def blocking_lookup(key: str) -> Dict[str, str]:
+        """Mock blocking I/O tool"""
+        time.sleep(tool_latency_ms / 1000)
+        return {"key": key}
+
+    @tool
+    async def async_lookup(key: str) -> Dict[str, str]:
+        """Mock async I/O tool"""
+        await asyncio.sleep(tool_latency_ms / 1000)
+        return {"key": key}
+
+    # An agent with local tools only; nothing here talks to the service
+    agent = Agent.__new__(Agent)
+    agent.name = "bench"
+    agent._local_handler_functions = [FunctionTool.from_callable(blocking_lookup), FunctionTool.from_callable(async_lookup)]
+    response = {"required_actions": [
+        {
+            "action_id": str(index),
+            "required_action_type": FUNCTION_CALLING_REQUIRED_ACTION,
+            "function_call": {
+                "name": "blocking_lookup" if index % 2 == 0 else "async_lookup",
+                "arguments": json.dumps({"key": f"k{index}"}),
+            },
+        }
+        for index in range(actions)
+    ]}
+    runner = ParallelToolRunner(max_workers=max_workers, log_calls=False)
+    modes = {
+        "serial": lambda: Agent._handle_required_actions(agent, response),
+        "parallel": lambda: runner.perform(agent, response),
+    }
+
+    report: Dict[str, Any] = {"actions_per_step": actions, "tool_latency_ms": tool_latency_ms}
+    loop = asyncio.new_event_loop()
+    # The ADK prints every tool call; silence it so only the timing is measured
+    quiet = {name: getattr(Agent, name) for name in ("_log_function_execution_start", "_log_function_execution_result")}
+    try:
+        for name in quiet:
+            setattr(Agent, name, lambda self, *args: None)
+        for mode, perform in modes.items():
+            latencies = []
+            for _ in range(steps):
+                started = time.perf_counter()
+                performed = loop.run_until_complete(perform())
+                latencies.append(time.perf_counter() - started)
+                assert [action.action_id for action in performed] == [str(i) for i in range(actions)]
+            report[mode] = summarize_latencies(latencies)
+    finally:
+        for name, method in quiet.items():
+            setattr(Agent, name, method)
+        loop.close()
+        runner.shutdown()
+    report["speedup_p50"] = report["serial"]["p50"] / report["parallel"]["p50"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel tool execution in one agent step.")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark")
+    parser.add_argument("--actions", type=int, default=3)
+    parser.add_argument("--tool-latency-ms", type=float, default=100)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--max-workers", type=int, default=8)
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return
+    print(json.dumps(benchmark(args.actions, args.tool_latency_ms, args.steps, args.max_workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+perf_stats.py - Small latency and throughput helpers shared by the lab utilities
+
+Features:
+- Nearest-rank percentiles over a list of samples (no NumPy required).
+- A summary dictionary (count, mean, p50/p90/p95/p99, max) for latency reports.
+"""
+
+import math
+from typing import Dict, Iterable, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of the samples
+
+    Args:
+        samples (List[float]): The samples, in any order
+        pct (float): The percentile to compute, between 0 and 100
+
+    Returns:
+        float: The percentile value, or 0.0 when there are no samples
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_latencies(samples: Iterable[float]) -> Dict[str, float]:
+    """Summarize latency samples (in seconds) into the usual report fields
+
+    Args:
+        samples (Iterable[float]): Latency samples in seconds
+
+    Returns:
+        Dict[str, float]: count, mean, p50, p90, p95, p99 and max
+    """
+    values = list(samples)
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
@@ -0,0 +1,719 @@
+"""
+profiling.py - Client-side CPU and allocation profiling of agent runs and chat calls
+
+Once network latency is out of the way (stand-in server, cassettes, pooled clients), the time left
+is spent in this process: building tool schemas, (de)serialising requests, dispatching local tools
+and rendering with `rich`. `RunProfiler` shows where, per agent run or chat call, tagged by phase,
+so a CPU- or memory-limited host can be sized and the hot spots found without guessing.
+
+Features:
+- Opt-in: `install()` (or `with profiling():`) patches Agent.__init__/setup/run, AgentClient
+  chat/create_session/delete_session, GenerativeAiInferenceClient.chat and RunResponse.pretty_print.
+  Every top-level call becomes its own scope (`001-run`, `002-render`, ...); nested calls are part
+  of the enclosing scope. `with profiler.profile("name"):` scopes any other block.
+- A sampling thread reads the stacks of the scope's thread, and of any thread running one of the
+  agent's local tools (parallel_tools.py, job pools), every `interval_s`. Each sample is tagged
+  with the phase of its innermost recognised frame:
+  setup (Agent.__init__/setup, tool schema generation), remote_wait (agent and inference chat,
+  session calls), local_tool (the agent's function tools), rendering (ADK console logging,
+  pretty_print, `rich`), or the scope's own base phase (ADK orchestration, including its pacing sleep).
+- CPU time per phase from per-thread CPU clocks (Linux), alongside wall-clock samples, so a waiting
+  thread is not mistaken for a busy one.
+- Flamegraph-compatible collapsed stacks per scope (`<scope>.collapsed` by samples, `<scope>.cpu.collapsed`
+  by CPU microseconds) and for the whole session (`all.collapsed`), rooted at the phase:
+  `flamegraph.pl all.collapsed > all.svg` or load them in speedscope.
+- Optional tracemalloc snapshots around each scope: peak and retained memory, and the top retained
+  allocation sites tagged by phase. Snapshots are process-wide, so concurrent scopes share them, and
+  tracing slows allocation-heavy code (rich rendering ~25x at 32 frames): take CPU figures from a run
+  without memory profiling.
+- Optional deterministic cProfile per scope (`<scope>.pstats`, top functions by own time).
+- `summary.json` and a printed top-N summary per phase and function.
+
+Usage:
+    with profiling("profiles") as profiler:
+        agent.setup()
+        agent.run("What is the square root of 256?").pretty_print()
+    print(json.dumps(profiler.summary()["phases"], indent=2))
+
+    python profiling.py --output profiles --memory 04_calculator_multi_turns_agent.py
+    python profiling.py --output profiles cli.py calculator
+    python cli.py --profile-dir profiles calculator
+  Options go before the script; everything after the script is passed to the script.
+
+- python profiling.py --bench profiles stand-in calculator runs and reports the profiler's overhead.
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+
+SETUP = "setup"
+REMOTE_WAIT = "remote_wait"
+LOCAL_TOOL = "local_tool"
+RENDERING = "rendering"
+PHASES = (SETUP, REMOTE_WAIT, LOCAL_TOOL, RENDERING)
+
+# Patched entry points: (module, class, attribute, scope kind). The kind's base phase covers samples
+# that fall in none of PHASES, e.g. the ADK's run loop between chats.
+ENTRY_POINTS: List[Tuple[str, str, str, str]] = [
+    ("oci.addons.adk.agent", "Agent", "__init__", "setup"),
+    ("oci.addons.adk.agent", "Agent", "setup", "setup"),
+    ("oci.addons.adk.agent", "Agent", "run", "run"),
+    ("oci.addons.adk.agent_client", "AgentClient", "create_session", "chat"),
+    ("oci.addons.adk.agent_client", "AgentClient", "chat", "chat"),
+    ("oci.addons.adk.agent_client", "AgentClient", "delete_session", "chat"),
+    ("oci.generative_ai_inference", "GenerativeAiInferenceClient", "chat", "chat"),
+    ("oci.addons.adk.run.response", "RunResponse", "pretty_print", "render"),
+]
+BASE_PHASES = {"setup": SETUP, "run": "agent", "chat": REMOTE_WAIT, "render": RENDERING}
+
+# Functions whose frames, wherever they appear in a stack, put a sample in that phase
+PHASE_FUNCTIONS: List[Tuple[str, str, str, str]] = [
+    ("oci.addons.adk.agent", "Agent", "__init__", SETUP),
+    ("oci.addons.adk.agent", "Agent", "setup", SETUP),
+    ("oci.addons.adk.agent", "Agent", "_process_function_tools", SETUP),
+    ("oci.addons.adk.agent_client", "AgentClient", "create_session", REMOTE_WAIT),
+    ("oci.addons.adk.agent_client", "AgentClient", "chat", REMOTE_WAIT),
+    ("oci.addons.adk.agent_client", "AgentClient", "delete_session", REMOTE_WAIT),
+    ("oci.generative_ai_inference", "GenerativeAiInferenceClient", "chat", REMOTE_WAIT),
+    ("oci.addons.adk.agent", "Agent", "_log_chat_request", RENDERING),
+    ("oci.addons.adk.agent", "Agent", "_log_chat_response", RENDERING),
+    ("oci.addons.adk.agent", "Agent", "_log_function_execution_start", RENDERING),
+    ("oci.addons.adk.agent", "Agent", "_log_function_execution_result", RENDERING),
+    ("oci.addons.adk.agent", "Agent", "_log_tool_counts", RENDERING),
+    ("oci.addons.adk.run.response", "RunResponse", "pretty_print", RENDERING),
+    ("oci.addons.adk.run.response", "RunResponse", "pretty_print_traces", RENDERING),
+]
+# Whole packages (by import name) whose frames are in a phase
+PHASE_PACKAGES: List[Tuple[str, str]] = [("rich", RENDERING)]
+
+# tracemalloc frames kept per allocation; deep enough to reach the phase's entry point
+TRACEMALLOC_FRAMES = 32
+
+
+def _code_of(function: Any) -> Any:
+    # Unwrap bound methods, functools.wraps/partial chains and callable objects down to a code object
+    for _ in range(10):
+        if hasattr(function, "__code__"):
+            return function.__code__
+        function = (getattr(function, "__func__", None) or getattr(function, "__wrapped__", None)
+                    or getattr(function, "func", None) or getattr(type(function), "__call__", None))
+        if function is None:
+            return None
+    return None
+
+
+def _label(code: Any) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class PhaseClassifier:
+    """Maps stack frames, or tracemalloc (filename, lineno) frames, onto phases"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes: Dict[Any, Optional[str]] = {}
+        self._spans: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._prefixes: List[Tuple[str, str]] = []
+        self._registered: set = set()
+
+    def add(self, function: Any, phase: str) -> None:
+        """Put every frame of function (or method, or callable object) in phase"""
+        code = _code_of(function)
+        if code is None or code in self._registered:
+            return
+        lines = [line for _, _, line in code.co_lines() if line is not None]
+        with self._lock:
+            self._registered.add(code)
+            self._spans.setdefault(code.co_filename, []).append(
+                (min(lines, default=code.co_firstlineno), max(lines, default=code.co_firstlineno), phase))
+            # Cached misses may now be hits
+            self._codes = {}
+
+    def add_package(self, module_name: str, phase: str) -> None:
+        """Put every frame from a package (e.g. "rich") in phase, if it is installed"""
+        import importlib.util
+
+        spec = importlib.util.find_spec(module_name)
+        if spec is None or not spec.origin:
+            return
+        with self._lock:
+            self._prefixes.append((os.path.dirname(spec.origin) + os.sep, phase))
+            self._codes = {}
+
+    def location_phase(self, filename: str, lineno: int) -> Optional[str]:
+        for first, last, phase in self._spans.get(filename, ()):
+            if first <= lineno <= last:
+                return phase
+        for prefix, phase in self._prefixes:
+            if filename.startswith(prefix):
+                return phase
+        return None
+
+    def code_phase(self, code: Any) -> Optional[str]:
+        try:
+            return self._codes[code]
+        except KeyError:
+            phase = self._codes[code] = self.location_phase(code.co_filename, code.co_firstlineno)
+            return phase
+
+    def classify(self, codes: List[Any]) -> Optional[str]:
+        """Phase of the innermost recognised frame; codes run outermost first"""
+        for code in reversed(codes):
+            phase = self.code_phase(code)
+            if phase is not None:
+                return phase
+        return None
+
+
+def _thread_cpu_clock(ident: int) -> Optional[Callable[[], float]]:
+    # CPU clock of another thread, where the platform exposes one (Linux, most Unixes)
+    if not hasattr(time, "pthread_getcpuclockid"):
+        return None
+    try:
+        clock_id = time.pthread_getcpuclockid(ident)
+        time.clock_gettime(clock_id)
+    except (OSError, OverflowError):
+        return None
+    return lambda: time.clock_gettime(clock_id)
+
+
+class ProfileScope:
+    """Samples, CPU time and allocations of one agent run, chat call or profiled block"""
+
+    def __init__(self, profiler: "RunProfiler", name: str, kind: str, base_phase: str):
+        self.profiler = profiler
+        self.name = name
+        self.kind = kind
+        self.base_phase = base_phase
+        self.thread_ident = threading.get_ident()
+        self.samples: Counter = Counter()
+        self.cpu: Counter = Counter()
+        self.ticks = 0
+        self.started = time.perf_counter()
+        self.wall_s: Optional[float] = None
+        self.memory: Optional[Dict[str, Any]] = None
+        self.cprofile: Optional[List[Dict[str, Any]]] = None
+        self._clocks: Dict[int, Optional[Callable[[], float]]] = {}
+        self._cpu_seen: Dict[int, float] = {self.thread_ident: time.thread_time()}
+        self._clocks[self.thread_ident] = _thread_cpu_clock(self.thread_ident)
+
+    def record(self, ident: int, codes: List[Any]) -> None:
+        """Add one sample of a thread's stack (outermost frame first); called by the sampler"""
+        if ident not in self._clocks:
+            self._clocks[ident] = _thread_cpu_clock(ident)
+        clock = self._clocks[ident]
+        cpu = 0.0
+        if clock is not None:
+            now = clock()
+            cpu = max(now - self._cpu_seen.get(ident, now), 0.0)
+            self._cpu_seen[ident] = now
+        phase = self.profiler.classifier.classify(codes) or self.base_phase
+        stack = ";".join([phase] + [_label(code) for code in codes])
+        self.samples[stack] += 1
+        self.cpu[stack] += cpu
+
+    def finish(self) -> None:
+        self.wall_s = time.perf_counter() - self.started
+        # The sampler may not have run yet in a short scope; charge the scope thread's CPU to its base phase
+        if not self.samples:
+            self.cpu[self.base_phase] += max(time.thread_time() - self._cpu_seen[self.thread_ident], 0.0)
+
+    def phases(self) -> Dict[str, Dict[str, Any]]:
+        """Samples, estimated wall time and CPU time per phase"""
+        period = self.wall_s / self.ticks if self.ticks and self.wall_s else 0.0
+        result: Dict[str, Dict[str, Any]] = {}
+        total = sum(self.samples.values()) or 1
+        for stack in set(self.samples) | set(self.cpu):
+            phase = stack.split(";", 1)[0]
+            entry = result.setdefault(phase, {"samples": 0, "share": 0.0, "wall_s": 0.0, "cpu_s": 0.0})
+            entry["samples"] += self.samples.get(stack, 0)
+            entry["cpu_s"] += self.cpu.get(stack, 0.0)
+        for entry in result.values():
+            entry["share"] = round(entry["samples"] / total, 4)
+            entry["wall_s"] = round(entry["samples"] * period, 4)
+            entry["cpu_s"] = round(entry["cpu_s"], 4)
+        return result
+
+    def summary(self, top: int = 15) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "wall_s": round(self.wall_s or 0.0, 4),
+            "samples": sum(self.samples.values()),
+            "cpu_s": round(sum(self.cpu.values()), 4),
+            "phases": self.phases(),
+            "top_self": _top_frames(self.samples, self.cpu, top),
+            "memory": self.memory,
+            "cprofile": self.cprofile,
+        }
+
+
+def _top_frames(samples: Counter, cpu: Counter, top: int) -> List[Dict[str, Any]]:
+    # Innermost function of each stack, with the phase it was sampled in
+    frames: Dict[Tuple[str, str], List[float]] = {}
+    for stack in set(samples) | set(cpu):
+        parts = stack.split(";")
+        if len(parts) < 2:
+            continue
+        entry = frames.setdefault((parts[0], parts[-1]), [0, 0.0])
+        entry[0] += samples.get(stack, 0)
+        entry[1] += cpu.get(stack, 0.0)
+    ranked = sorted(frames.items(), key=lambda item: (item[1][1], item[1][0]), reverse=True)[:top]
+    return [{"phase": phase, "function": function, "samples": int(count), "cpu_s": round(cpu_s, 4)}
+            for (phase, function), (count, cpu_s) in ranked]
+
+
+class RunProfiler:
+    """Opt-in sampling, CPU, allocation and (optionally) cProfile profiling of agent runs and chat calls
+
+    Args:
+        output_dir (Optional[str]): Where collapsed stacks, pstats and summary.json go; None keeps results in memory
+        interval_s (float): Sampling interval
+        memory (bool): Take tracemalloc snapshots around every scope
+        memory_frames (int): Frames kept per traced allocation; fewer is faster but tags fewer sites by phase
+        deterministic (bool): Also run cProfile on each scope's thread
+        top (int): Entries in the top-N lists
+    """
+
+    def __init__(self, output_dir: Optional[str] = DEFAULT_OUTPUT_DIR, interval_s: float = 0.005,
+                 memory: bool = False, memory_frames: int = TRACEMALLOC_FRAMES, deterministic: bool = False,
+                 top: int = 15):
+        self.output_dir = output_dir
+        self.interval_s = interval_s
+        self.memory = memory
+        self.memory_frames = memory_frames
+        self.deterministic = deterministic
+        self.top = top
+        self.classifier = PhaseClassifier()
+        self.scopes: List[ProfileScope] = []
+        self.sampler_s = 0.0
+        self._active: List[ProfileScope] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._count = 0
+        self._sampler: Optional[threading.Thread] = None
+        self._patches: List[Tuple[Any, str, Any]] = []
+        self._started_tracemalloc = False
+        self._memory_lock = threading.Lock()
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    # Entry points
+
+    def install(self) -> "RunProfiler":
+        """Patch the ADK and inference entry points so every top-level call is profiled"""
+        import importlib
+
+        for module_name, class_name, attribute, phase in PHASE_FUNCTIONS:
+            self.classifier.add(getattr(getattr(importlib.import_module(module_name), class_name), attribute), phase)
+        for package, phase in PHASE_PACKAGES:
+            self.classifier.add_package(package, phase)
+        if self._patches:
+            return self
+        for module_name, class_name, attribute, kind in ENTRY_POINTS:
+            owner = getattr(importlib.import_module(module_name), class_name)
+            original = owner.__dict__[attribute]
+            setattr(owner, attribute, self._wrap(original, kind))
+            self._patches.append((owner, attribute, original))
+        return self
+
+    def uninstall(self) -> None:
+        """Restore the patched entry points"""
+        while self._patches:
+            owner, attribute, original = self._patches.pop()
+            setattr(owner, attribute, original)
+
+    def _wrap(self, function: Callable, kind: str) -> Callable:
+        @functools.wraps(function)
+        def profiled(*args, **kwargs):
+            if getattr(self._local, "scope", None) is not None:
+                result = function(*args, **kwargs)
+            else:
+                with self.profile(kind):
+                    result = function(*args, **kwargs)
+            if kind in ("setup", "run") and args:
+                self.watch_agent(args[0])
+            return result
+
+        return profiled
+
+    def watch_agent(self, agent: Any) -> None:
+        """Tag the agent's local function tools as local_tool (done for every agent the patches see)"""
+        for handler in getattr(agent, "_local_handler_functions", None) or ():
+            self.classifier.add(getattr(handler, "callable", None), LOCAL_TOOL)
+
+    def watch_tools(self, *functions: Callable) -> None:
+        """Tag other functions as local_tool, e.g. tools called by fast_path.py without an Agent"""
+        for function in functions:
+            self.classifier.add(function, LOCAL_TOOL)
+
+    @contextlib.contextmanager
+    def profile(self, kind: str = "block", base_phase: Optional[str] = None) -> Iterator[ProfileScope]:
+        """Profile the enclosed block as one scope
+
+        Args:
+            kind (str): Scope kind, part of its name (e.g. "run", "chat", or your own)
+            base_phase (Optional[str]): Phase of samples outside setup/remote_wait/local_tool/rendering
+
+        Yields:
+            ProfileScope: The scope; its summary() is complete after the block
+        """
+        with self._lock:
+            self._count += 1
+            name = f"{self._count:03d}-{kind}"
+        snapshot = self._start_memory() if self.memory else None
+        scope = ProfileScope(self, name, kind, base_phase or BASE_PHASES.get(kind, kind))
+        self._local.scope = scope
+        profile = None
+        if self.deterministic:
+            import cProfile
+
+            profile = cProfile.Profile()
+        with self._lock:
+            self._active.append(scope)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="run-profiler", daemon=True)
+                self._sampler.start()
+        try:
+            if profile is not None:
+                profile.enable()
+            try:
+                yield scope
+            finally:
+                if profile is not None:
+                    profile.disable()
+        finally:
+            self._local.scope = None
+            with self._lock:
+                self._active.remove(scope)
+                self.scopes.append(scope)
+            scope.finish()
+            if snapshot is not None:
+                scope.memory = self._finish_memory(snapshot)
+            if profile is not None:
+                scope.cprofile = self._cprofile_top(profile, scope.name)
+            self._write_scope(scope)
+
+    # Sampling
+
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        while True:
+            started = time.perf_counter()
+            with self._lock:
+                scopes = list(self._active)
+                if not scopes:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            claimed = {scope.thread_ident for scope in scopes}
+            for scope in scopes:
+                scope.ticks += 1
+                frame = frames.get(scope.thread_ident)
+                if frame is not None:
+                    scope.record(scope.thread_ident, self._codes(frame))
+            # Threads running a local tool on behalf of a run (executor pools) go to the first active scope
+            for ident, frame in frames.items():
+                if ident in claimed or ident == own:
+                    continue
+                codes = self._codes(frame)
+                if any(self.classifier.code_phase(code) == LOCAL_TOOL for code in codes):
+                    scopes[0].record(ident, codes)
+            del frames
+            spent = time.perf_counter() - started
+            self.sampler_s += spent
+            time.sleep(max(self.interval_s - spent, 0.0005))
+
+    @staticmethod
+    def _codes(frame: Any) -> List[Any]:
+        codes = []
+        while frame is not None:
+            if frame.f_code.co_filename != __file__:
+                codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return codes
+
+    # Memory and cProfile
+
+    def _start_memory(self) -> Tuple[Any, int]:
+        with self._memory_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.memory_frames)
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            return tracemalloc.take_snapshot(), current
+
+    def _finish_memory(self, start: Tuple[Any, int]) -> Dict[str, Any]:
+        before, current_before = start
+        with self._memory_lock:
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        by_phase: Counter = Counter()
+        sites = []
+        # Snapshot.filter_traces is slow on large snapshots; the profiler's own allocations are skipped here instead
+        for stat in after.compare_to(before, "traceback"):
+            traceback = stat.traceback  # oldest frame first
+            if stat.size_diff <= 0 or traceback[-1].filename in (__file__, tracemalloc.__file__):
+                continue
+            # Walk outwards from the allocating frame only as far as the first recognised one
+            phase = next((found for found in (self.classifier.location_phase(f.filename, f.lineno)
+                                              for f in reversed(traceback)) if found is not None), "other")
+            by_phase[phase] += stat.size_diff
+            sites.append((stat.size_diff, stat.count_diff, phase, traceback))
+        sites.sort(key=lambda site: site[0], reverse=True)
+        return {
+            "peak_kb": round((peak - current_before) / 1024, 1),
+            "retained_kb": round((current - current_before) / 1024, 1),
+            "retained_kb_by_phase": {phase: round(size / 1024, 1) for phase, size in by_phase.most_common()},
+            "top_retained": [
+                {"phase": phase, "size_kb": round(size / 1024, 1), "count": count,
+                 "site": f"{os.path.basename(traceback[-1].filename)}:{traceback[-1].lineno}",
+                 "stack": [f"{os.path.basename(f.filename)}:{f.lineno}" for f in list(traceback)[:-7:-1]]}
+                for size, count, phase, traceback in sites[:self.top]
+            ],
+        }
+
+    def _cprofile_top(self, profile: Any, name: str) -> List[Dict[str, Any]]:
+        import pstats
+
+        if self.output_dir:
+            profile.dump_stats(os.path.join(self.output_dir, f"{name}.pstats"))
+        stats = pstats.Stats(profile).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        return [{"function": f"{function} ({os.path.basename(filename)}:{line})", "calls": calls,
+                 "own_s": round(own, 5), "cumulative_s": round(cumulative, 5)}
+                for (filename, line, function), (_, calls, own, cumulative, _) in ranked]
+
+    # Output
+
+    def _write_scope(self, scope: ProfileScope) -> None:
+        if not self.output_dir or not scope.samples:
+            return
+        _write_collapsed(os.path.join(self.output_dir, f"{scope.name}.collapsed"), scope.samples)
+        _write_collapsed(os.path.join(self.output_dir, f"{scope.name}.cpu.collapsed"),
+                         Counter({stack: int(cpu * 1e6) for stack, cpu in scope.cpu.items()}))
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals per phase and function over all finished scopes, plus each scope's summary"""
+        with self._lock:
+            scopes = list(self.scopes)
+        samples: Counter = Counter()
+        cpu: Counter = Counter()
+        phases: Dict[str, Dict[str, Any]] = {}
+        for scope in scopes:
+            samples.update(scope.samples)
+            cpu.update(scope.cpu)
+            for phase, entry in scope.phases().items():
+                total = phases.setdefault(phase, {"samples": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                for key in total:
+                    total[key] += entry[key]
+        cpu_total = sum(entry["cpu_s"] for entry in phases.values()) or 1.0
+        for entry in phases.values():
+            entry["wall_s"] = round(entry["wall_s"], 3)
+            entry["cpu_s"] = round(entry["cpu_s"], 4)
+            entry["cpu_share"] = round(entry["cpu_s"] / cpu_total, 4)
+        return {
+            "scopes": len(scopes),
+            "interval_s": self.interval_s,
+            "sampler_cpu_s": round(self.sampler_s, 3),
+            "phases": dict(sorted(phases.items(), key=lambda item: item[1]["cpu_s"], reverse=True)),
+            "top_self": _top_frames(samples, cpu, self.top),
+            "runs": [scope.summary(self.top) for scope in scopes],
+        }
+
+    def close(self) -> Dict[str, Any]:
+        """Uninstall, stop tracemalloc if this profiler started it and write all.collapsed and summary.json"""
+        self.uninstall()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        summary = self.summary()
+        if self.output_dir:
+            samples: Counter = Counter()
+            cpu: Counter = Counter()
+            for scope in self.scopes:
+                samples.update(scope.samples)
+                cpu.update(scope.cpu)
+            _write_collapsed(os.path.join(self.output_dir, "all.collapsed"), samples)
+            _write_collapsed(os.path.join(self.output_dir, "all.cpu.collapsed"),
+                             Counter({stack: int(value * 1e6) for stack, value in cpu.items()}))
+            with open(os.path.join(self.output_dir, "summary.json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        return summary
+
+
+def _write_collapsed(path: str, counts: Counter) -> None:
+    # Brendan Gregg's collapsed format: "frame;frame;frame count", root first
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in sorted(counts.items()):
+            if count > 0 and ";" in stack:
+                f.write(f"{stack} {count}\n")
+
+
+@contextlib.contextmanager
+def profiling(output_dir: Optional[str] = DEFAULT_OUTPUT_DIR, **kwargs) -> Iterator[RunProfiler]:
+    """Install a RunProfiler for the enclosed block and write its results on exit
+
+    Args:
+        output_dir (Optional[str]): Output directory, None to keep results in memory
+        **kwargs: RunProfiler options (interval_s, memory, memory_frames, deterministic, top)
+
+    Yields:
+        RunProfiler: The installed profiler
+    """
+    profiler = RunProfiler(output_dir, **kwargs).install()
+    try:
+        yield profiler
+    finally:
+        profiler.close()
+
+
+def format_summary(summary: Dict[str, Any], top: int = 10) -> str:
+    """Plain-text top-N report of a RunProfiler summary"""
+    lines = [f"{summary['scopes']} scopes, sampled every {summary['interval_s'] * 1000:g} ms "
+             f"(sampler used {summary['sampler_cpu_s']} s CPU)", "",
+             f"{'phase':<14}{'cpu_s':>10}{'cpu %':>8}{'samples':>10}{'wall_s':>10}"]
+    for phase, entry in summary["phases"].items():
+        lines.append(f"{phase:<14}{entry['cpu_s']:>10.3f}{entry['cpu_share']:>8.1%}{entry['samples']:>10}{entry['wall_s']:>10.2f}")
+    lines += ["", f"{'cpu_s':>8}{'samples':>9}  {'phase':<13}function"]
+    for frame in summary["top_self"][:top]:
+        lines.append(f"{frame['cpu_s']:>8.3f}{frame['samples']:>9}  {frame['phase']:<13}{frame['function']}")
+    memory = [run["memory"] for run in summary["runs"] if run.get("memory")]
+    if memory:
+        lines += ["", f"peak memory per scope: max {max(m['peak_kb'] for m in memory):.0f} KiB; retained: "
+                  + ", ".join(f"{phase} {sum(m['retained_kb_by_phase'].get(phase, 0) for m in memory):.0f} KiB"
+                              for phase in sorted({p for m in memory for p in m['retained_kb_by_phase']}))]
+    return "\n".join(lines)
+
+
+BENCH_QUESTIONS = [
+    "What is the square root of 256?",
+    "What is 2 to the power of 16?",
+    "Add 19 and 23.",
+    "Explain what a square root is.",
+]
+
+
+def benchmark(runs: int = 8, concurrency: int = 4, interval_s: float = 0.005) -> Dict[str, Any]:
+    """Profile stand-in calculator runs (with console rendering) and measure the profiler's overhead
+
+    Args:
+        runs (int): Agent runs per mode
+        concurrency (int): Concurrent runs
+        interval_s (float): Sampling interval
+
+    Returns:
+        Dict[str, Any]: Per-mode wall and process CPU time, and the profiled phase breakdown
+    """
+    import asyncio
+    import io
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    from oci.addons.adk import Agent, AgentClient
+    from oci.addons.adk.logger import default_logger
+    from oci.addons.adk.tool.prebuilt import CalculatorToolkit
+
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+
+    config_path = write_offline_oci_config()
+    server_config = {
+        "latency_ms": {"agent_chat": {"mean": 40, "jitter": 10}},
+        "tool_calls": [{"match": keyword, "steps": [[{"name": tool, "arguments": arguments}]]} for keyword, tool, arguments in [
+            ("square root of", "sqrt", {"number": 256}), ("power", "power", {"base": 2, "exponent": 16}),
+            ("add", "add", {"left": 19, "right": 23}),
+        ]],
+    }
+    # Render to a discarded buffer: the rendering cost stays, the terminal noise goes
+    console_file = default_logger.console.file
+    default_logger.console.file = io.StringIO()
+    report: Dict[str, Any] = {"runs": runs, "concurrency": concurrency}
+    try:
+        with MockGenAIServer(config=server_config) as server:
+            def workload() -> Dict[str, float]:
+                def ask(question: str) -> None:
+                    try:
+                        asyncio.get_event_loop()
+                    except RuntimeError:
+                        asyncio.set_event_loop(asyncio.new_event_loop())
+                    agent.run(question, max_steps=3).pretty_print()
+
+                started, cpu = time.perf_counter(), time.process_time()
+                agent = Agent(client=client, agent_endpoint_id="ocid1.genaiagentendpoint.oc1..standin",
+                              instructions="You perform calculations using tools provided.", tools=[CalculatorToolkit()])
+                agent.setup()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    list(executor.map(ask, [BENCH_QUESTIONS[i % len(BENCH_QUESTIONS)] for i in range(runs)]))
+                return {"wall_s": round(time.perf_counter() - started, 3), "cpu_s": round(time.process_time() - cpu, 3)}
+
+            client = AgentClient(auth_type="api_key", config=config_path, profile="DEFAULT",
+                                 runtime_endpoint=server.url, management_endpoint=server.url)
+            workload()  # warm imports and connections
+            report["unprofiled"] = workload()
+            for mode, options in (("sampling", {}), ("sampling_memory", {"memory": True})):
+                with tempfile.TemporaryDirectory() as output_dir:
+                    with profiling(output_dir, interval_s=interval_s, **options) as profiler:
+                        report[mode] = workload()
+                    summary = profiler.summary()
+                    report[mode]["files_written"] = len(os.listdir(output_dir))
+                extra_cpu = report[mode]["cpu_s"] - report["unprofiled"]["cpu_s"]
+                report[mode]["extra_cpu_ms_per_run"] = round(extra_cpu / runs * 1000, 1)
+                report[mode]["sampler_cpu_s"] = summary["sampler_cpu_s"]
+                report[mode]["scopes"] = summary["scopes"]
+                report[mode]["phases"] = summary["phases"]
+                report[mode]["top_self"] = summary["top_self"][:5]
+                if options:
+                    report[mode]["memory"] = [run["memory"] for run in summary["runs"] if run["kind"] == "run"][0]
+                    report[mode]["memory"]["top_retained"] = report[mode]["memory"]["top_retained"][:3]
+    finally:
+        default_logger.console.file = console_file
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile a script's agent runs and chat calls by phase.")
+    parser.add_argument("--bench", action="store_true", help="Profile stand-in calculator runs and report the overhead")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Directory for collapsed stacks and summary.json")
+    parser.add_argument("--interval", type=float, default=5.0, help="Sampling interval in milliseconds")
+    parser.add_argument("--memory", action="store_true", help="Take tracemalloc snapshots around every scope")
+    parser.add_argument("--cprofile", action="store_true", help="Also run cProfile in every scope")
+    parser.add_argument("--top", type=int, default=15, help="Entries in the top-N lists")
+    parser.add_argument("script", nargs="?", help="Script to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the script")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(json.dumps(benchmark(interval_s=args.interval / 1000), indent=2))
+        return
+    if not args.script:
+        parser.print_help()
+        return
+
+    script = os.path.abspath(args.script)
+    sys.path.insert(0, os.path.dirname(script))
+    sys.argv = [script] + args.args
+    with profiling(args.output, interval_s=args.interval / 1000, memory=args.memory,
+                   deterministic=args.cprofile, top=args.top) as profiler:
+        try:
+            runpy.run_path(script, run_name="__main__")
+        finally:
+            print("\n" + format_summary(profiler.summary(), args.top), file=sys.stderr)
+    print(f"Wrote collapsed stacks and summary.json to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,541 @@
+"""
+resilience.py - Adaptive retry, circuit breaking and hedged requests for OCI inference and agent calls
+
+00_sample.py and client_pool.py create inference clients with `oci.retry.NoneRetryStrategy()`, so a single
+throttled (429) or failed call fails the request, and `AgentClient` uses the SDK's default strategy, which
+knows nothing about the endpoint's recent latency or health. Under load a few slow or throttled calls
+dominate p99. `ResilientRetryStrategy` is an OCI retry strategy (the `retry_strategy` of any SDK client),
+so it applies to every operation of a client without changing call sites.
+
+Features:
+- Exponential backoff with full jitter that honors `retry-after` on throttling responses, bounded by
+  an attempt limit, an overall deadline and a retry budget (retries at most a fraction of calls, so a
+  struggling endpoint does not receive a retry storm).
+- Only safe calls are retried: non-idempotent calls (agent chat, create session) are retried on 429 and
+  connect timeouts only, where the service never processed the request.
+- Per-endpoint circuit breaker: after consecutive 5xx/timeouts the endpoint fails fast with
+  `CircuitOpenError` until a probe call succeeds after `breaker_reset_s`.
+- Hedged requests for idempotent, non-streaming calls (inference chat): when the call has not answered
+  within the endpoint's recent p95, a duplicate is sent and whichever answers first is used. Hedges are
+  limited to a budget fraction of calls. Hedged calls run on a bounded pool of `hedge_workers` threads;
+  when the pool is full, calls run on the caller's thread without a hedge instead of queueing behind it.
+- `stats()` reports attempts, retries, throttles, hedges sent and won, and breaker transitions.
+
+Usage:
+    # client_pool.py clients use the shared strategies by default; other clients pass one explicitly
+    client = oci.generative_ai_inference.GenerativeAiInferenceClient(config, service_endpoint=ENDPOINT,
+                                                                     retry_strategy=inference_retry_strategy())
+    agent_client = get_agent_client(retry_strategy=ResilientRetryStrategy(max_attempts=2))
+    print(inference_retry_strategy().stats())
+
+- python resilience.py --bench compares no retries, retries and retries with hedging against a
+  fault-injecting stand-in server (slow tail plus 429/503 errors) and reports tail latency and success rate.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import oci
+
+from perf_stats import percentile, summarize_latencies
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+
+
+class CircuitOpenError(oci.exceptions.ServiceError):
+    """Raised without calling the endpoint while its circuit breaker is open"""
+
+    def __init__(self, endpoint: str, retry_in_s: float):
+        super().__init__(503, "CircuitOpen", {}, f"Circuit open for {endpoint}, next probe in {retry_in_s:.1f}s")
+        self.endpoint = endpoint
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one endpoint"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_s: float = 30):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_s (float): How long the circuit stays open before one probe call is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open state only one probe at a time"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_s:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(self.reset_s - (time.monotonic() - self.opened_at), 0.0)
+
+    def record(self, failed: bool) -> None:
+        """Record the outcome of an allowed call"""
+        with self._lock:
+            self._probing = False
+            if not failed:
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class _Budget:
+    """Token bucket: every call earns `ratio` tokens, every retry or hedge spends one"""
+
+    def __init__(self, ratio: float, burst: float = 10):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.burst)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class _LatencyWindow:
+    """The most recent successful call latencies of one (endpoint, operation)"""
+
+    def __init__(self, size: int):
+        self.samples: "deque[float]" = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < min_samples:
+                return None
+            samples = list(self.samples)
+        return percentile(samples, pct)
+
+
+class ResilientRetryStrategy:
+    """OCI retry strategy with jittered backoff, retry budget, circuit breaker and hedging"""
+
+    def __init__(self, idempotent: bool = False, hedge: bool = False, max_attempts: int = 4,
+                 base_delay_s: float = 0.2, max_delay_s: float = 8, total_timeout_s: float = 300,
+                 retry_statuses: Iterable[int] = RETRY_STATUSES, retry_budget_ratio: float = 0.2,
+                 breaker_failure_threshold: int = 5, breaker_reset_s: float = 30, hedge_percentile: float = 95,
+                 hedge_min_samples: int = 20, hedge_min_delay_s: float = 0.05, hedge_budget_ratio: float = 0.1,
+                 latency_window: int = 200, hedge_workers: int = 32, seed: Optional[int] = None):
+        """
+        Args:
+            idempotent (bool): Whether the client's POST operations are safe to repeat (inference chat is,
+                agent chat and create session are not); GET, PUT and DELETE always are
+            hedge (bool): Send a duplicate of slow idempotent, non-streaming calls
+            max_attempts (int): Attempts per call, including the first
+            base_delay_s (float): Backoff before the first retry; doubles per retry, with full jitter
+            max_delay_s (float): Backoff cap, also caps retry-after
+            total_timeout_s (float): No retry starts after this much time since the call began
+            retry_statuses (Iterable[int]): HTTP statuses retried on idempotent calls
+            retry_budget_ratio (float): Retries allowed per call on average
+            breaker_failure_threshold (int): Consecutive failures that open an endpoint's circuit
+            breaker_reset_s (float): Time an open circuit waits before a probe call
+            hedge_percentile (float): Latency percentile after which a hedge is sent
+            hedge_min_samples (int): Successful calls needed before hedging starts
+            hedge_min_delay_s (float): Lower bound on the hedge delay
+            hedge_budget_ratio (float): Hedges allowed per call on average
+            latency_window (int): Recent latencies kept per (endpoint, operation)
+            hedge_workers (int): Threads for hedged calls (primaries and hedges); calls beyond it are not hedged
+            seed (Optional[int]): Seed for backoff jitter
+        """
+        self.idempotent = idempotent
+        self.hedge = hedge
+        self.max_attempts = max_attempts
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.total_timeout_s = total_timeout_s
+        self.retry_statuses = set(retry_statuses)
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_s = breaker_reset_s
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay_s = hedge_min_delay_s
+        self.latency_window = latency_window
+        self.hedge_workers = hedge_workers
+        self.random = random.Random(seed)
+        self.circuit_breaker_callbacks = []
+        self._retry_budget = _Budget(retry_budget_ratio)
+        self._hedge_budget = _Budget(hedge_budget_ratio)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._windows: Dict[Tuple[str, str], _LatencyWindow] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_slots = threading.BoundedSemaphore(hedge_workers)
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "throttled": 0,
+            "retry_budget_exhausted": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "hedge_budget_exhausted": 0,
+            "hedge_pool_saturated": 0,
+            "short_circuited": 0,
+            "failures": 0,
+        }
+
+    # Called by every SDK operation before make_retrying_call; the SDK's own breaker is not used
+    def add_circuit_breaker_callback(self, callback: Callable) -> None:
+        if callback is not None and callback not in self.circuit_breaker_callbacks:
+            self.circuit_breaker_callbacks.append(callback)
+
+    def make_retrying_call(self, func_ref: Callable, *func_args: Any, **func_kwargs: Any) -> Any:
+        """Call func_ref (BaseClient.call_api) with retries, circuit breaking and hedging
+
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open
+            Exception: The last error when the call is not retryable or retries are exhausted
+        """
+        endpoint = str(getattr(getattr(func_ref, "__self__", None), "endpoint", "default"))
+        operation = func_kwargs.get("operation_name") or "call"
+        idempotent = self.idempotent or str(func_kwargs.get("method", "")).upper() in IDEMPOTENT_METHODS
+        breaker = self._breaker(endpoint)
+        window = self._window(endpoint, operation)
+        hedge = self.hedge and idempotent and not _is_streaming(func_kwargs.get("body"))
+        deadline = time.monotonic() + self.total_timeout_s
+        self._count("calls")
+        self._retry_budget.earn()
+        self._hedge_budget.earn()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError(endpoint, breaker.retry_in())
+            try:
+                if hedge:
+                    result = self._hedged_call(func_ref, func_args, func_kwargs, window)
+                else:
+                    result = self._timed_call(func_ref, func_args, func_kwargs, window)
+            except Exception as e:
+                retryable, failed, retry_after = self._classify(e, idempotent)
+                breaker.record(failed)
+                if failed:
+                    self._count("failures")
+                # Retrying into a circuit that just opened would only turn this error into CircuitOpenError
+                if not retryable or attempt >= self.max_attempts or breaker.state == CircuitBreaker.OPEN:
+                    raise
+                delay = self._backoff(attempt, retry_after)
+                if time.monotonic() + delay > deadline:
+                    raise
+                if not self._retry_budget.spend():
+                    self._count("retry_budget_exhausted")
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            breaker.record(False)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            breakers = dict(self._breakers)
+            windows = dict(self._windows)
+        stats["breakers"] = {endpoint: {"state": b.state, "opens": b.opens} for endpoint, b in breakers.items()}
+        stats["hedge_delay_s"] = {
+            f"{endpoint} {operation}": window.percentile(self.hedge_percentile, self.hedge_min_samples)
+            for (endpoint, operation), window in windows.items()
+        }
+        stats["hedge_win_rate"] = stats["hedge_wins"] / stats["hedges"] if stats["hedges"] else 0.0
+        return stats
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _timed_call(self, func_ref: Callable, func_args: tuple, func_kwargs: Dict[str, Any],
+                    window: _LatencyWindow) -> Any:
+        self._count("attempts")
+        started = time.perf_counter()
+        result = func_ref(*func_args, **func_kwargs)
+        window.add(time.perf_counter() - started)
+        return result
+
+    def _hedged_call(self, func_ref: Callable, func_args: tuple, func_kwargs: Dict[str, Any],
+                     window: _LatencyWindow) -> Any:
+        delay = window.percentile(self.hedge_percentile, self.hedge_min_samples)
+        if delay is None:
+            return self._timed_call(func_ref, func_args, func_kwargs, window)
+        # A call is only moved off the caller's thread when a pool thread is free to start it at once;
+        # queueing behind a full pool would add latency to every call and trigger hedges for queued ones
+        primary = self._submit_hedged(func_ref, func_args, func_kwargs, window)
+        if primary is None:
+            self._count("hedge_pool_saturated")
+            return self._timed_call(func_ref, func_args, func_kwargs, window)
+        done, _ = wait([primary], timeout=max(delay, self.hedge_min_delay_s))
+        if done:
+            return primary.result()
+        if not self._hedge_budget.spend():
+            self._count("hedge_budget_exhausted")
+            return primary.result()
+
+        # An independent copy: its own headers, and no retry token the service could de-duplicate on
+        hedge_kwargs = dict(func_kwargs)
+        header_params = dict(func_kwargs.get("header_params") or {})
+        header_params.pop("opc-retry-token", None)
+        header_params.pop("opc-request-id", None)
+        hedge_kwargs["header_params"] = header_params
+        hedge = self._submit_hedged(func_ref, func_args, hedge_kwargs, window)
+        if hedge is None:
+            self._count("hedge_pool_saturated")
+            return primary.result()
+        self._count("hedges")
+
+        # The slower call keeps running in its thread; its result is discarded
+        error: Optional[BaseException] = None
+        for future in as_completed([primary, hedge]):
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            if future is hedge:
+                self._count("hedge_wins")
+            return result
+        raise error
+
+    def _classify(self, error: Exception, idempotent: bool) -> Tuple[bool, bool, Optional[float]]:
+        """Return (retryable, counts as endpoint failure, retry-after seconds) for an error"""
+        if isinstance(error, CircuitOpenError):
+            return False, False, None
+        if isinstance(error, oci.exceptions.ServiceError):
+            status = error.status
+            if status == 429:
+                self._count("throttled")
+                return True, False, _retry_after(error.headers)
+            failed = status >= 500 or status == -1
+            return idempotent and status in self.retry_statuses, failed, None
+        if isinstance(error, oci.exceptions.ConnectTimeout):
+            # The request never reached the service
+            return True, True, None
+        if isinstance(error, oci.exceptions.RequestException):
+            # Read timeouts and dropped connections: the service may have processed the request
+            return idempotent, True, None
+        return False, False, None
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        with self._lock:
+            delay = self.random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay_s))
+        return delay
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(self.breaker_failure_threshold, self.breaker_reset_s)
+            return breaker
+
+    def _window(self, endpoint: str, operation: str) -> _LatencyWindow:
+        with self._lock:
+            window = self._windows.get((endpoint, operation))
+            if window is None:
+                window = self._windows[(endpoint, operation)] = _LatencyWindow(self.latency_window)
+            return window
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="hedge")
+            return self._executor
+
+    def _submit_hedged(self, func_ref: Callable, func_args: tuple, func_kwargs: Dict[str, Any],
+                       window: _LatencyWindow) -> Optional[Future]:
+        """Run a call on the hedge pool if one of its threads is free, else return None"""
+        if not self._hedge_slots.acquire(blocking=False):
+            return None
+        try:
+            future = self._hedge_executor().submit(self._timed_call, func_ref, func_args, func_kwargs, window)
+        except BaseException:
+            self._hedge_slots.release()
+            raise
+        future.add_done_callback(lambda _: self._hedge_slots.release())
+        return future
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+
+def _is_streaming(body: Any) -> bool:
+    # A streamed response is consumed after call_api returns, so hedging it would only double the load
+    chat_request = getattr(body, "chat_request", None)
+    return bool(getattr(chat_request, "is_stream", False) or getattr(body, "should_stream", False))
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    try:
+        value = (headers or {}).get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+_inference_strategy: Optional[ResilientRetryStrategy] = None
+_agent_strategy: Optional[ResilientRetryStrategy] = None
+
+
+def inference_retry_strategy() -> ResilientRetryStrategy:
+    """The shared strategy for inference clients: chat is idempotent, so it is retried and hedged"""
+    global _inference_strategy
+    if _inference_strategy is None:
+        _inference_strategy = ResilientRetryStrategy(idempotent=True, hedge=True)
+    return _inference_strategy
+
+
+def agent_retry_strategy() -> ResilientRetryStrategy:
+    """The shared strategy for agent clients: session calls are not idempotent, so no hedging"""
+    global _agent_strategy
+    if _agent_strategy is None:
+        _agent_strategy = ResilientRetryStrategy(idempotent=False, hedge=False)
+    return _agent_strategy
+
+
+def benchmark(requests: int = 300, concurrency: int = 8, latency_ms: float = 50, slow_rate: float = 0.02,
+              slow_ms: float = 1000, error_rate: float = 0.05, error_status: int = 503) -> Dict[str, Any]:
+    """Send inference chats to a fault-injecting stand-in server with each strategy
+
+    Args:
+        requests (int): Chat calls per strategy
+        concurrency (int): Calls in flight
+        latency_ms (float): Normal server latency
+        slow_rate (float): Fraction of calls that take slow_ms longer
+        slow_ms (float): Extra latency of slow calls
+        error_rate (float): Fraction of calls that fail with error_status
+        error_status (int): Injected error status (429 carries retry-after: 1)
+
+    Returns:
+        Dict[str, Any]: Latency of successful calls, success rate and strategy counters per strategy
+    """
+    from genai_chat import build_chat_details
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+
+    config_path = write_offline_oci_config()
+    strategies = {
+        "none": lambda: oci.retry.NoneRetryStrategy(),
+        "retry": lambda: ResilientRetryStrategy(idempotent=True, hedge=False, base_delay_s=0.05, seed=0),
+        "retry_hedge": lambda: ResilientRetryStrategy(idempotent=True, hedge=True, base_delay_s=0.05, seed=0),
+    }
+    report: Dict[str, Any] = {
+        "requests": requests,
+        "fault": {"latency_ms": latency_ms, "slow_rate": slow_rate, "slow_ms": slow_ms,
+                  "error_rate": error_rate, "error_status": error_status},
+    }
+    for name, create in strategies.items():
+        # A fresh server (same seed) per strategy, so every strategy meets the same faults
+        server_config = {
+            "latency_ms": {"inference_chat": {"mean": latency_ms, "jitter": latency_ms / 5,
+                                              "slow_rate": slow_rate, "slow_ms": slow_ms}},
+            "error_rate": error_rate,
+            "error_status": error_status,
+            "error_routes": ["inference_chat"],
+        }
+        with MockGenAIServer(config=server_config) as server:
+            strategy = create()
+            client = oci.generative_ai_inference.GenerativeAiInferenceClient(
+                config=oci.config.from_file(config_path, "DEFAULT"),
+                service_endpoint=server.url,
+                retry_strategy=strategy,
+                timeout=(10, 60),
+            )
+            latencies = []
+            failures = 0
+            lock = threading.Lock()
+
+            def call(index: int) -> None:
+                nonlocal failures
+                started = time.perf_counter()
+                try:
+                    client.chat(build_chat_details(f"request {index}", compartment_id=server.state.COMPARTMENT_ID))
+                except Exception:
+                    with lock:
+                        failures += 1
+                    return
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(call, range(requests)))
+            report[name] = {
+                "wall_s": time.perf_counter() - started,
+                "success_rate": (requests - failures) / requests,
+                "latency_s": summarize_latencies(latencies),
+                "server_requests": server.state.stats()["requests"].get("inference_chat", 0),
+            }
+            if isinstance(strategy, ResilientRetryStrategy):
+                stats = strategy.stats()
+                report[name]["strategy"] = {key: stats[key] for key in ("retries", "throttled", "hedges", "hedge_wins",
+                                                                        "hedge_pool_saturated")}
+                strategy.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retry and hedging strategies against a fault-injecting stand-in.")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--slow-rate", type=float, default=0.02)
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return
+    report = benchmark(args.requests, args.concurrency, args.latency_ms, args.slow_rate, args.slow_ms,
+                       args.error_rate, args.error_status)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
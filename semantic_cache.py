@@ -0,0 +1,675 @@
+"""
+semantic_cache.py - Embedding-based answer cache for the RAG support agent
+
+02_support_agent.py sends every question through a full agent run against the knowledge base, while
+support traffic is mostly paraphrases of the same few hundred questions. chat_cache.py only helps with
+identical prompts; this cache embeds the question and answers from the most similar cached question
+when the cosine similarity clears a threshold.
+
+Features:
+- Vectors live in a NumPy memory-mapped matrix per namespace (one per agent endpoint and knowledge
+  base set), answers and bookkeeping in SQLite next to it, so the cache survives restarts and is shared
+  by processes on the host.
+- Lookup is one matrix-vector product over the namespace; configurable similarity threshold. A match
+  whose question asks for the opposite action (enable/disable, upload/download...) is a miss whatever
+  its similarity, since bag-of-words vectors barely tell such questions apart.
+- TTL and a fixed capacity per namespace; a full namespace evicts its least recently used entry.
+- Pluggable embedding function: `HashingEmbedder` (feature-hashed TF-IDF of words and word pairs, with
+  lightly weighted character trigrams for spelling variants; no network or model needed) or
+  `OCIEmbedder` (OCI Generative AI embed_text).
+- Each answer reports its source, similarity, lookup latency and the latency saved (the recorded
+  cost of the agent run it replaces); `stats()` reports hit rate and saved time per query.
+- Multi-turn runs (an explicit session_id) bypass the cache: their answers depend on the conversation.
+- A miss returns the agent's own RunResponse (its session can be continued or deleted); a hit returns
+  one rebuilt from the cached answer, with an empty session_id since no session was used.
+
+Usage:
+    agent = SemanticCachedAgent(agent, SemanticCache())
+    response = agent.run("How do I reset my password?")
+    response.pretty_print()
+    print(agent.cache.stats())
+
+- python semantic_cache.py --bench --queries 400 --threshold 0.8
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".semantic_cache"))
+
+# Words that carry no meaning for matching support questions
+STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from have how i if in is it its me my of on or our"
+    " please should so that the their there this to us was we what when where which who why will with"
+    " would you your".split()
+)
+
+# Feature weights of the hashing embedder; trigrams only break ties between spelling variants; weighted
+# higher they make "upload" and "download" (or "enable" and "disable") look alike
+WORD_WEIGHT = 1.0
+PAIR_WEIGHT = 0.5
+TRIGRAM_WEIGHT = 0.05
+
+DEFAULT_THRESHOLD = 0.8
+
+# Actions that ask for opposite answers; a cached answer for one never answers the other
+OPPOSITE_ACTIONS = (
+    ("enable", "disable"), ("upload", "download"), ("start", "stop"), ("create", "delete"), ("add", "remove"),
+    ("increase", "decrease"), ("attach", "detach"), ("encrypt", "decrypt"), ("allow", "deny"), ("lock", "unlock"),
+    ("install", "uninstall"), ("import", "export"), ("grant", "revoke"), ("mount", "unmount"),
+    ("subscribe", "unsubscribe"), ("backup", "restore"),
+)
+
+
+def _stem(word: str) -> str:
+    # Crude suffix stripping so "resetting", "resets" and "reset" share features
+    for suffix in ("ing", "ed", "s"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            word = word[:-len(suffix)]
+            if suffix in ("ing", "ed") and len(word) > 2 and word[-1] == word[-2]:
+                word = word[:-1]
+            return word
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed content words of text"""
+    return [_stem(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+
+def _forms(word: str) -> frozenset:
+    # Stems of a verb's common inflections, as tokenize() produces them
+    base = word[:-1] if word.endswith("e") else word
+    return frozenset(_stem(form) for form in (word, word + "s", base + "ed", base + "ing"))
+
+
+_OPPOSITES = [(_forms(a), _forms(b)) for a, b in OPPOSITE_ACTIONS]
+
+
+def opposed(question: str, other: str) -> bool:
+    """Whether the two questions ask for opposite actions (e.g. enable vs disable), see OPPOSITE_ACTIONS"""
+    words, other_words = set(tokenize(question)), set(tokenize(other))
+    for a, b in _OPPOSITES:
+        has_a, has_b = bool(words & a), bool(words & b)
+        other_a, other_b = bool(other_words & a), bool(other_words & b)
+        if (has_a and not has_b and other_b and not other_a) or (has_b and not has_a and other_a and not other_b):
+            return True
+    return False
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dim: int) -> tuple:
+    # (index, sign): the sign bit keeps colliding features from only ever adding up
+    digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % dim, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEmbedder:
+    """Feature-hashed TF-IDF embeddings; no vocabulary, model or network needed"""
+
+    def __init__(self, dim: int = 1024, idf: Optional[np.ndarray] = None):
+        """
+        Args:
+            dim (int): Vector size
+            idf (Optional[np.ndarray]): Per-bucket inverse document frequency, see fit()
+        """
+        self.dim = dim
+        self.idf = idf if idf is not None else np.ones(dim, dtype=np.float32)
+
+    @property
+    def signature(self) -> str:
+        """Identifies the vector space; cached vectors from another signature are discarded"""
+        digest = hashlib.sha1(self.idf.tobytes()).hexdigest()[:12]
+        return f"hashing-{self.dim}-{digest}"
+
+    def features(self, text: str) -> Dict[str, float]:
+        words = tokenize(text)
+        features: Dict[str, float] = {}
+        for index, word in enumerate(words):
+            features["w:" + word] = features.get("w:" + word, 0.0) + WORD_WEIGHT
+            if index:
+                pair = "p:" + words[index - 1] + " " + word
+                features[pair] = features.get(pair, 0.0) + PAIR_WEIGHT
+            padded = f"<{word}>"
+            for start in range(len(padded) - 2):
+                trigram = "t:" + padded[start:start + 3]
+                features[trigram] = features.get(trigram, 0.0) + TRIGRAM_WEIGHT
+        return features
+
+    def fit(self, texts: Iterable[str]) -> "HashingEmbedder":
+        """Learn IDF weights from a sample of questions (e.g. the knowledge base FAQ)
+
+        Args:
+            texts (Iterable[str]): Sample questions
+
+        Returns:
+            HashingEmbedder: self
+        """
+        document_frequency = np.zeros(self.dim, dtype=np.float64)
+        count = 0
+        for text in texts:
+            count += 1
+            document_frequency[list({_bucket(feature, self.dim)[0] for feature in self.features(text)})] += 1
+        self.idf = (np.log((1 + count) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a (len(texts), dim) float32 matrix of L2-normalized embeddings"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self.features(text).items():
+                index, sign = _bucket(feature, self.dim)
+                # Sublinear term frequency: a repeated word counts, but not linearly
+                matrix[row, index] += sign * (1 + math.log(weight) if weight > 1 else weight)
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1)
+
+
+class OCIEmbedder:
+    """Embeddings from the OCI Generative AI embed_text API"""
+
+    def __init__(self, client: Any, model_id: str = "cohere.embed-english-v3.0", compartment_id: Optional[str] = None):
+        """
+        Args:
+            client (Any): A GenerativeAiInferenceClient (see client_pool.get_inference_client)
+            model_id (str): Embedding model
+            compartment_id (Optional[str]): Defaults to OCI_COMPARTMENT_ID
+        """
+        self.client = client
+        self.model_id = model_id
+        self.compartment_id = compartment_id or os.getenv("OCI_COMPARTMENT_ID")
+
+    @property
+    def signature(self) -> str:
+        return f"oci-{self.model_id}"
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        import oci
+
+        details = oci.generative_ai_inference.models.EmbedTextDetails(
+            inputs=list(texts),
+            serving_mode=oci.generative_ai_inference.models.OnDemandServingMode(model_id=self.model_id),
+            compartment_id=self.compartment_id,
+            input_type="SEARCH_QUERY",
+            truncate="END",
+        )
+        matrix = np.asarray(self.client.embed_text(details).data.embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1)
+
+
+class _Namespace:
+    """Memory-mapped vectors of one namespace plus per-slot bookkeeping mirrored from SQLite"""
+
+    def __init__(self, path: str, capacity: int, dim: int):
+        mode = "r+" if os.path.exists(path) and os.path.getsize(path) == capacity * dim * 4 else "w+"
+        self.vectors = np.memmap(path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.created = np.zeros(capacity, dtype=np.float64)
+        self.accessed = np.zeros(capacity, dtype=np.float64)
+        self.cost_s = np.zeros(capacity, dtype=np.float64)
+
+
+class SemanticCache:
+    """Similarity-keyed answer cache: NumPy memmap vectors + SQLite payloads, per namespace"""
+
+    def __init__(self, path: str = DEFAULT_SEMANTIC_CACHE_DIR, embed: Optional[Callable[[Sequence[str]], np.ndarray]] = None,
+                 threshold: float = DEFAULT_THRESHOLD, ttl_seconds: float = 24 * 3600, capacity: int = 10000):
+        """
+        Args:
+            path (str): Directory for the index database and vector files
+            embed (Optional[Callable]): Maps a list of texts to a matrix of L2-normalized rows; defaults
+                to HashingEmbedder(). Its `signature` attribute (if any) names the vector space.
+            threshold (float): Minimum cosine similarity for a hit; questions asking for opposite
+                actions never match (see OPPOSITE_ACTIONS)
+            ttl_seconds (float): Entries older than this are ignored and their slots reused
+            capacity (int): Entries per namespace; the least recently used entry is evicted beyond it
+        """
+        self.path = path
+        self.embed = embed or HashingEmbedder()
+        self.signature = getattr(self.embed, "signature", type(self.embed).__name__)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, _Namespace] = {}
+        self.counters = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "opposed": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "expired": 0,
+            "lookup_s": 0.0,
+            "saved_s": 0.0,
+        }
+        os.makedirs(path, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(path, "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS namespaces ("
+            " namespace TEXT PRIMARY KEY, file TEXT NOT NULL, signature TEXT NOT NULL, dim INTEGER NOT NULL,"
+            " capacity INTEGER NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, slot INTEGER NOT NULL, question TEXT NOT NULL, payload TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0, cost_s REAL NOT NULL,"
+            " PRIMARY KEY (namespace, slot))"
+        )
+
+    def get_or_compute(self, namespace: str, question: str, compute: Callable[[], str]) -> Dict[str, Any]:
+        """Answer question from the most similar cached question, or compute and cache it
+
+        Args:
+            namespace (str): Cache partition, e.g. the agent endpoint and knowledge base ids
+            question (str): The user question
+            compute (Callable[[], str]): Produces the payload on a miss; returning None skips caching
+
+        Returns:
+            Dict[str, Any]: payload, source ("HIT" or "MISS"), similarity, matched question,
+                lookup_s, latency_s and saved_s for this query
+        """
+        started = time.perf_counter()
+        vector = self.embed([question])[0]
+        result = self._lookup(namespace, vector, question)
+        lookup_s = time.perf_counter() - started
+        with self._lock:
+            self.counters["lookups"] += 1
+            self.counters["lookup_s"] += lookup_s
+            if result is not None:
+                self.counters["hits"] += 1
+                self.counters["saved_s"] += max(result["cost_s"] - lookup_s, 0.0)
+            else:
+                self.counters["misses"] += 1
+        if result is not None:
+            return {"payload": result["payload"], "source": "HIT", "similarity": result["similarity"],
+                    "matched": result["question"], "lookup_s": lookup_s, "latency_s": lookup_s,
+                    "saved_s": max(result["cost_s"] - lookup_s, 0.0)}
+
+        compute_started = time.perf_counter()
+        payload = compute()
+        cost_s = time.perf_counter() - compute_started
+        if payload is not None:
+            self._store(namespace, question, vector, payload, cost_s)
+        return {"payload": payload, "source": "MISS", "similarity": None, "matched": None, "lookup_s": lookup_s,
+                "latency_s": time.perf_counter() - started, "saved_s": 0.0}
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.counters["bypassed"] += 1
+
+    def clear(self, namespace: str) -> None:
+        """Drop every entry of namespace"""
+        with self._lock:
+            state = self._open(namespace, None)
+            if state is not None:
+                state.alive[:] = False
+            self._db.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            stats["entries"] = dict(self._db.execute(
+                "SELECT namespace, COUNT(*) FROM entries WHERE created >= ? GROUP BY namespace",
+                (time.time() - self.ttl_seconds,)).fetchall())
+        lookups = stats["lookups"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["avg_lookup_ms"] = stats["lookup_s"] / lookups * 1000 if lookups else 0.0
+        stats["saved_s_per_query"] = stats["saved_s"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            for state in self._namespaces.values():
+                state.vectors.flush()
+            self._namespaces.clear()
+            self._db.close()
+
+    def _lookup(self, namespace: str, vector: np.ndarray, question: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            state = self._open(namespace, len(vector))
+            if state is None:
+                return None
+            valid = state.alive & (state.created >= now - self.ttl_seconds)
+            if not valid.any():
+                return None
+            scores = state.vectors @ vector
+            scores[~valid] = -np.inf
+            slot = int(np.argmax(scores))
+            similarity = float(scores[slot])
+            if similarity < self.threshold:
+                return None
+            state.accessed[slot] = now
+            row = self._db.execute("SELECT question, payload FROM entries WHERE namespace = ? AND slot = ?",
+                                   (namespace, slot)).fetchone()
+            if row is None:
+                # Another process replaced the slot; treat as a miss and resync on the next open
+                state.alive[slot] = False
+                return None
+            if opposed(question, row[0]):
+                self.counters["opposed"] += 1
+                return None
+            self._db.execute("UPDATE entries SET accessed = ?, hits = hits + 1 WHERE namespace = ? AND slot = ?",
+                             (now, namespace, slot))
+            return {"question": row[0], "payload": row[1], "similarity": similarity, "cost_s": float(state.cost_s[slot])}
+
+    def _store(self, namespace: str, question: str, vector: np.ndarray, payload: str, cost_s: float) -> None:
+        now = time.time()
+        with self._lock:
+            state = self._open(namespace, len(vector))
+            free = np.flatnonzero(~state.alive)
+            expired = np.flatnonzero(state.alive & (state.created < now - self.ttl_seconds))
+            if len(free):
+                slot = int(free[0])
+            elif len(expired):
+                slot = int(expired[0])
+                self.counters["expired"] += 1
+            else:
+                slot = int(np.argmin(state.accessed))
+                self.counters["evictions"] += 1
+            state.vectors[slot] = vector
+            state.alive[slot] = True
+            state.created[slot] = state.accessed[slot] = now
+            state.cost_s[slot] = cost_s
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (namespace, slot, question, payload, created, accessed, hits, cost_s)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                (namespace, slot, question, payload, now, now, cost_s),
+            )
+
+    def _open(self, namespace: str, dim: Optional[int]) -> Optional[_Namespace]:
+        # Caller holds the lock; dim None only opens an existing namespace
+        state = self._namespaces.get(namespace)
+        if state is not None:
+            return state
+        row = self._db.execute("SELECT file, signature, dim, capacity FROM namespaces WHERE namespace = ?",
+                               (namespace,)).fetchone()
+        if row is not None and (row[1], row[3]) != (self.signature, self.capacity):
+            # Different embedder or capacity: the stored vectors cannot be reused
+            self._db.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self._db.execute("DELETE FROM namespaces WHERE namespace = ?", (namespace,))
+            row = None
+        if row is None:
+            if dim is None:
+                return None
+            file = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16] + ".f32"
+            self._db.execute("INSERT INTO namespaces (namespace, file, signature, dim, capacity) VALUES (?, ?, ?, ?, ?)",
+                             (namespace, file, self.signature, dim, self.capacity))
+            row = (file, self.signature, dim, self.capacity)
+        state = _Namespace(os.path.join(self.path, row[0]), row[3], row[2])
+        for slot, created, accessed, cost_s in self._db.execute(
+                "SELECT slot, created, accessed, cost_s FROM entries WHERE namespace = ?", (namespace,)):
+            state.alive[slot] = True
+            state.created[slot], state.accessed[slot], state.cost_s[slot] = created, accessed, cost_s
+        self._namespaces[namespace] = state
+        return state
+
+
+def agent_namespace(agent: Any) -> str:
+    """Cache namespace of an agent: its endpoint and the knowledge bases of its RAG tools"""
+    knowledge_bases = sorted(kb for tool in agent.tools or [] for kb in getattr(tool, "knowledge_base_ids", None) or [])
+    return f"{agent.agent_endpoint_id}|{','.join(knowledge_bases)}"
+
+
+class SemanticCachedAgent:
+    """Drop-in wrapper for Agent.run that answers single-turn questions from a SemanticCache"""
+
+    def __init__(self, agent: Any, cache: SemanticCache, namespace: Optional[str] = None):
+        """
+        Args:
+            agent (Any): An ADK Agent (set up by the caller)
+            cache (SemanticCache): The cache to use
+            namespace (Optional[str]): Defaults to agent_namespace(agent)
+        """
+        self.agent = agent
+        self.cache = cache
+        self.namespace = namespace or agent_namespace(agent)
+
+    def answer(self, input: str, **kwargs: Any) -> Dict[str, Any]:
+        """Run or look up input; returns the cache report with the RunResponse under "response"
+
+        On a miss the response is the agent's own, so its session can be continued or deleted; only
+        its answer is cached. On a hit the response is rebuilt from the cached answer and its
+        session_id is empty: no session was created.
+        """
+        from oci.addons.adk.run.response import RunResponse
+        from oci.addons.adk.run.types import RawResponse
+
+        ran: List[Any] = []
+
+        def compute() -> Optional[str]:
+            response = self.agent.run(input, **kwargs)
+            ran.append(response)
+            raw_data = response.raw_responses[-1].raw_data if response.raw_responses else None
+            # Only final answers are reusable; failed or empty runs are not cached
+            return json.dumps(raw_data) if response.final_output else None
+
+        result = self.cache.get_or_compute(self.namespace, input, compute)
+        if ran:
+            result["response"] = ran[0]
+            return result
+        raw_data = json.loads(result["payload"])
+        result["response"] = RunResponse(raw_responses=[RawResponse(raw_data=raw_data)], data=raw_data, session_id="")
+        return result
+
+    def run(self, input: str, session_id: Optional[str] = None, **kwargs: Any) -> Any:
+        """Same contract as Agent.run, except that a cached answer has an empty session_id
+
+        Runs with a session_id bypass the cache.
+        """
+        if session_id is not None:
+            self.cache.record_bypass()
+            return self.agent.run(input, session_id=session_id, **kwargs)
+        return self.answer(input, **kwargs)["response"]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.agent, name)
+
+
+# Support questions and paraphrases; the benchmark draws queries from them and never seeds the cache
+BENCH_TOPICS: List[List[str]] = [
+    ["How do I reset my password?", "I forgot my password, how can I reset it?", "Password reset steps",
+     "how to reset a forgotten password", "Can you help me reset my account password?"],
+    ["How do I change my email address?", "Change the email address on my account",
+     "How can I update my account email?", "steps to change account email address"],
+    ["What is Oracle Cloud Infrastructure?", "Tell me about Oracle Cloud Infrastructure.",
+     "What is OCI?", "Explain Oracle Cloud Infrastructure"],
+    ["How do I create a compute instance?", "Steps to create a compute instance in OCI",
+     "how can I launch a new compute instance", "Create a compute instance"],
+    ["How do I resize a block volume?", "Can I resize my block volume?", "Steps to resize a block volume",
+     "block volume resize"],
+    ["What regions does OCI support?", "Which OCI regions are available?", "List of OCI regions",
+     "what regions are available in Oracle Cloud"],
+    ["How am I billed for object storage?", "How does object storage billing work?",
+     "object storage pricing and billing", "What does object storage cost?"],
+    ["How do I enable multi-factor authentication?", "Enable MFA on my account",
+     "How can I turn on multi-factor authentication?", "multi factor authentication setup"],
+    ["How do I create a VCN?", "Steps to create a virtual cloud network", "Create a VCN in OCI",
+     "how can I set up a virtual cloud network"],
+    ["How do I increase my service limits?", "Request a service limit increase",
+     "How can I raise my tenancy service limits?", "service limit increase request"],
+    ["How do I back up an autonomous database?", "Back up my autonomous database",
+     "autonomous database backup steps", "How can I create a backup of an Autonomous Database?"],
+    ["How do I restore an autonomous database from a backup?", "Restore autonomous database backup",
+     "restore my Autonomous Database from backup", "steps to restore an autonomous database"],
+    ["How do I delete my tenancy?", "Close my OCI tenancy", "how can I terminate my tenancy",
+     "Delete my Oracle Cloud tenancy"],
+    ["How do I add a user to a group?", "Add a user to an IAM group", "How can I put a user in a group?",
+     "steps to add user to group"],
+    ["How do I write an IAM policy?", "IAM policy syntax", "How can I create an IAM policy?",
+     "Write a policy in OCI IAM"],
+    ["How do I connect to my instance with SSH?", "SSH into a compute instance",
+     "How can I ssh to my instance?", "connect to instance using ssh key"],
+    ["How do I upload files to object storage?", "Upload a file to an object storage bucket",
+     "How can I upload objects to a bucket?", "object storage upload"],
+    ["How do I set up a load balancer?", "Create a load balancer in OCI", "load balancer setup steps",
+     "How can I configure a load balancer?"],
+    ["How do I monitor CPU usage of an instance?", "Monitor instance CPU utilization",
+     "Where can I see CPU metrics for my instance?", "instance cpu usage monitoring"],
+    ["How do I stop an instance?", "Stop a compute instance", "How can I shut down my instance?",
+     "stop my compute instance"],
+]
+
+
+# (cached question, question asking for the opposite); the second must never be answered from the first
+BENCH_NEAR_MISSES: List[tuple] = [
+    ("How do I enable multi-factor authentication?", "How do I disable multi-factor authentication?"),
+    ("How do I upload files to object storage?", "How do I download files from object storage?"),
+    ("How do I stop an instance?", "How do I start an instance?"),
+    ("How do I add a user to a group?", "How do I remove a user from a group?"),
+    ("How do I increase my service limits?", "How do I decrease my service limits?"),
+    ("How do I create a VCN?", "How do I delete a VCN?"),
+    ("How do I back up an autonomous database?", "How do I restore an autonomous database?"),
+    ("Enable MFA on my account", "Disable MFA on my account"),
+    ("Upload a file to an object storage bucket", "Download a file from an object storage bucket"),
+    ("Stop a compute instance", "Start a compute instance"),
+    ("How do I attach a block volume to an instance?", "How do I detach a block volume from an instance?"),
+    ("How can I create an IAM policy?", "How can I delete an IAM policy?"),
+]
+
+
+def benchmark(queries: int = 400, threshold: float = DEFAULT_THRESHOLD, agent_latency_ms: float = 800,
+              concurrency: int = 8, seed: int = 0) -> Dict[str, Any]:
+    """Replay paraphrased support traffic through a stand-in RAG agent with and without the cache
+
+    Queries pick a topic with Zipf-like popularity and a random paraphrase. A hit is false when the
+    matched question belongs to another topic. Then the first questions of BENCH_NEAR_MISSES are
+    cached and their opposites asked; an opposite answered from a first question is a near-miss false hit.
+
+    Args:
+        queries (int): Number of questions
+        threshold (float): Similarity threshold
+        agent_latency_ms (float): Stand-in latency of each agent chat (one RAG run)
+        concurrency (int): Concurrent questions
+        seed (int): Traffic seed
+
+    Returns:
+        Dict[str, Any]: Hit rate, false hits, near-miss false hit rate, latencies and the cache stats
+    """
+    import asyncio
+    import random
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    from oci.addons.adk import Agent, AgentClient
+    from oci.addons.adk.logger import default_logger
+    from oci.addons.adk.tool.prebuilt import AgenticRagTool
+
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+    from perf_stats import summarize_latencies
+
+    default_logger.console.quiet = True
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(BENCH_TOPICS))]
+    traffic = []
+    for _ in range(queries):
+        topic = rng.choices(range(len(BENCH_TOPICS)), weights)[0]
+        traffic.append((topic, rng.choice(BENCH_TOPICS[topic])))
+    topic_of = {question: topic for topic, questions in enumerate(BENCH_TOPICS) for question in questions}
+
+    config_path = write_offline_oci_config()
+    server_config = {"latency_ms": {"agent_chat": {"mean": agent_latency_ms, "jitter": agent_latency_ms / 4}}}
+    with MockGenAIServer(config=server_config) as server:
+        client = AgentClient(auth_type="api_key", config=config_path, profile="DEFAULT",
+                             runtime_endpoint=server.url, management_endpoint=server.url)
+        agent = Agent(
+            client=client,
+            agent_endpoint_id="ocid1.genaiagentendpoint.oc1..standin",
+            instructions="Answer question using the OCI RAG tool.",
+            tools=[AgenticRagTool(name="OCI RAG tool", description="Answers questions about OCI.",
+                                  knowledge_base_ids=["ocid1.genaiagentknowledgebase.oc1..standin"])],
+        )
+        agent.setup()
+        cache = SemanticCache(tempfile.mkdtemp(prefix="semantic-cache-"), threshold=threshold)
+        cached = SemanticCachedAgent(agent, cache)
+
+        def ask(item: tuple) -> Dict[str, Any]:
+            topic, question = item
+            # Agent.run uses asyncio.get_event_loop(), which only exists by default on the main thread
+            try:
+                asyncio.get_event_loop()
+            except RuntimeError:
+                asyncio.set_event_loop(asyncio.new_event_loop())
+            result = cached.answer(question)
+            result["false_hit"] = result["source"] == "HIT" and topic_of[result["matched"]] != topic
+            return result
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(ask, traffic))
+        elapsed = time.perf_counter() - started
+        stats = cache.stats()
+
+        cache.close()
+
+        # Near misses on a fresh cache: every first question is cached, then the opposites are asked; an
+        # opposite may match another opposite (same meaning), never a first question
+        near_cache = SemanticCache(tempfile.mkdtemp(prefix="semantic-cache-"), threshold=threshold)
+        near_cached = SemanticCachedAgent(agent, near_cache)
+        firsts = {first for first, _ in BENCH_NEAR_MISSES}
+        for first in firsts:
+            near_cached.answer(first)
+        near_misses = []
+        for _, opposite in BENCH_NEAR_MISSES:
+            result = near_cached.answer(opposite)
+            near_misses.append(result["source"] == "HIT" and result["matched"] in firsts)
+        near_cache.close()
+        agent_chats = server.state.stats()["requests"].get("agent_chat", 0)
+
+    hits = [r for r in results if r["source"] == "HIT"]
+    misses = [r for r in results if r["source"] == "MISS"]
+    return {
+        "queries": queries,
+        "threshold": threshold,
+        "embedder": cache.signature,
+        "hit_rate": round(len(hits) / queries, 3),
+        "false_hits": sum(r["false_hit"] for r in results),
+        "near_miss_pairs": len(near_misses),
+        "near_miss_false_hits": sum(near_misses),
+        "near_miss_false_hit_rate": round(sum(near_misses) / len(near_misses), 3),
+        "agent_chats": agent_chats,
+        "hit_latency_s": {k: round(v, 4) for k, v in summarize_latencies([r["latency_s"] for r in hits]).items()},
+        "miss_latency_s": {k: round(v, 4) for k, v in summarize_latencies([r["latency_s"] for r in misses]).items()},
+        "avg_lookup_ms": round(stats["avg_lookup_ms"], 3),
+        "saved_s_per_query": round(stats["saved_s_per_query"], 3),
+        "uncached_estimate_s": round(queries * agent_latency_ms / 1000 / concurrency, 1),
+        "elapsed_s": round(elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic answer cache for the RAG support agent.")
+    parser.add_argument("--bench", action="store_true", help="Run the paraphrase benchmark against a stand-in agent")
+    parser.add_argument("--queries", type=int, default=400, help="Questions to replay")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Similarity threshold")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Stand-in agent chat latency")
+    parser.add_argument("--stats", action="store_true", help="Print stats of the cache in SEMANTIC_CACHE_DIR")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(json.dumps(benchmark(args.queries, args.threshold, args.latency_ms), indent=2))
+    elif args.stats:
+        cache = SemanticCache()
+        print(json.dumps(cache.stats(), indent=2))
+        cache.close()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+session_pool.py - Warm agent session pool with LRU/idle-TTL eviction and background delete_session
+
+03_product_support_agent.py and 04_calculator_multi_turns_agent.py thread `response.session_id` by hand,
+and 08_delete_sessions.py deletes a session as a one-off. At volume, remote sessions leak and every new
+conversation pays the session-creation round trip. This module maps conversation keys to sessions instead.
+
+Features:
+- Bounded capacity: the least recently used conversation is evicted when a new one needs a slot.
+- Idle TTL: conversations unused for `idle_ttl_seconds` are evicted by a background sweeper.
+- Evicted sessions are deleted with `agent.delete_session` on a background thread, off the request path.
+- Optional pre-warming: `warm_sessions` sessions are created ahead of time and refilled as they are handed out.
+- `stats()` reports occupancy, reuse rate, warm hits and eviction counts.
+
+Usage:
+    with SessionPool(agent, capacity=500, idle_ttl_seconds=900, warm_sessions=5) as sessions:
+        response = sessions.run("user_123", "What is the square root of 256?", max_steps=3)
+        response = sessions.run("user_123", "do the same thing for 81", max_steps=3)
+        print(sessions.stats())
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+EVICTED_LRU = "lru"
+EVICTED_IDLE = "idle"
+EVICTED_CLOSED = "closed"
+
+
+class _Entry:
+    """The session held for one conversation"""
+
+    def __init__(self, session_id: str, created: float):
+        self.session_id = session_id
+        self.created = created
+        self.last_used = created
+        # Runs currently using the session; such entries are never evicted
+        self.in_use = 0
+
+
+class SessionPool:
+    """Maps conversation keys to agent sessions with bounded capacity"""
+
+    def __init__(self, agent: Any, capacity: int = 100, idle_ttl_seconds: float = 600,
+                 warm_sessions: int = 0, sweep_interval_seconds: float = 30, delete_workers: int = 2):
+        """
+        Args:
+            agent (Any): An ADK Agent (setup() already done)
+            capacity (int): Maximum number of conversations holding a session
+            idle_ttl_seconds (float): Conversations idle for longer are evicted, and their session deleted
+            warm_sessions (int): Number of pre-created sessions kept ready for new conversations
+            sweep_interval_seconds (float): How often the background sweeper looks for idle conversations
+            delete_workers (int): Threads deleting evicted sessions
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.agent = agent
+        self.capacity = capacity
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.warm_sessions = warm_sessions
+        self._active: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._warm: deque = deque()
+        self._lock = threading.Lock()
+        self._warming = 0
+        self._executor = ThreadPoolExecutor(max_workers=delete_workers + 1, thread_name_prefix="session-pool")
+        self._closed = threading.Event()
+        self.counters = {
+            "acquisitions": 0,
+            "reuses": 0,
+            "warm_hits": 0,
+            "created": 0,
+            "evicted_lru": 0,
+            "evicted_idle": 0,
+            "evicted_closed": 0,
+            "deletes_pending": 0,
+            "deleted": 0,
+            "delete_errors": 0,
+            "create_errors": 0,
+        }
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(sweep_interval_seconds,), daemon=True)
+        self._sweeper.start()
+        self.prewarm()
+
+    def acquire(self, key: str) -> str:
+        """Return the session for a conversation, creating (or taking a warm) one if needed
+
+        Every acquire must be paired with release(key); run() and session() do this for you.
+
+        Args:
+            key (str): Conversation key, e.g. a user or conversation id
+
+        Returns:
+            str: The session id
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.counters["acquisitions"] += 1
+            entry = self._active.get(key)
+            if entry is not None and (entry.in_use or now - entry.last_used <= self.idle_ttl_seconds):
+                self._active.move_to_end(key)
+                entry.in_use += 1
+                entry.last_used = now
+                self.counters["reuses"] += 1
+                return entry.session_id
+            if entry is not None:
+                self._evict(key, EVICTED_IDLE)
+            session_id = self._take_warm(now)
+
+        if session_id is None:
+            session_id = self._create_session()
+        self._refill()
+
+        with self._lock:
+            existing = self._active.get(key)
+            if existing is not None:
+                # A concurrent acquire for the same key won the race; keep ours for a later conversation
+                self._warm.append((session_id, now))
+                existing.in_use += 1
+                existing.last_used = now
+                return existing.session_id
+            entry = self._active[key] = _Entry(session_id, now)
+            entry.in_use += 1
+            self._enforce_capacity()
+            return session_id
+
+    def release(self, key: str) -> None:
+        """Mark the end of a run on a conversation's session"""
+        with self._lock:
+            entry = self._active.get(key)
+            if entry is not None:
+                entry.in_use = max(entry.in_use - 1, 0)
+                entry.last_used = time.monotonic()
+
+    @contextmanager
+    def session(self, key: str) -> Iterator[str]:
+        """Context manager around acquire/release"""
+        session_id = self.acquire(key)
+        try:
+            yield session_id
+        finally:
+            self.release(key)
+
+    def run(self, key: str, input: str, **kwargs: Any) -> Any:
+        """agent.run on the conversation's session
+
+        Args:
+            key (str): Conversation key
+            input (str): The user message
+            **kwargs: Passed to agent.run, e.g. max_steps
+
+        Returns:
+            RunResponse: The agent's response
+        """
+        with self.session(key) as session_id:
+            return self.agent.run(input, session_id=session_id, **kwargs)
+
+    def end(self, key: str) -> None:
+        """Forget a finished conversation and delete its session in the background"""
+        with self._lock:
+            if key in self._active:
+                self._evict(key, EVICTED_CLOSED)
+
+    def prewarm(self, count: Optional[int] = None) -> None:
+        """Create sessions in the background until `count` (default warm_sessions) are ready"""
+        target = self.warm_sessions if count is None else count
+        with self._lock:
+            missing = target - len(self._warm) - self._warming
+            self._warming += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            self._executor.submit(self._warm_one)
+
+    def sweep(self) -> int:
+        """Evict idle conversations and expire stale warm sessions now
+
+        Returns:
+            int: Number of sessions evicted
+        """
+        now = time.monotonic()
+        evicted = 0
+        with self._lock:
+            for key, entry in list(self._active.items()):
+                if not entry.in_use and now - entry.last_used > self.idle_ttl_seconds:
+                    self._evict(key, EVICTED_IDLE)
+                    evicted += 1
+            # Warm sessions idle as long as a conversation would have expired server-side as well
+            while self._warm and now - self._warm[0][1] > self.idle_ttl_seconds:
+                session_id, _ = self._warm.popleft()
+                self._delete_in_background(session_id)
+                self.counters["evicted_idle"] += 1
+                evicted += 1
+        if evicted:
+            self._refill()
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            stats["capacity"] = self.capacity
+            stats["active"] = len(self._active)
+            stats["in_use"] = sum(1 for entry in self._active.values() if entry.in_use)
+            stats["warm"] = len(self._warm)
+        stats["occupancy"] = stats["active"] / self.capacity
+        acquisitions = stats["acquisitions"]
+        stats["reuse_rate"] = stats["reuses"] / acquisitions if acquisitions else 0.0
+        # Acquisitions that did not wait for a session to be created
+        stats["no_create_rate"] = (stats["reuses"] + stats["warm_hits"]) / acquisitions if acquisitions else 0.0
+        return stats
+
+    def close(self, delete_sessions: bool = True) -> None:
+        """Stop the sweeper and (by default) delete every session the pool holds
+
+        Args:
+            delete_sessions (bool): Delete active and warm sessions before returning
+        """
+        self._closed.set()
+        with self._lock:
+            session_ids: List[str] = [entry.session_id for entry in self._active.values()]
+            session_ids += [session_id for session_id, _ in self._warm]
+            self.counters["evicted_closed"] += len(self._active)
+            self._active.clear()
+            self._warm.clear()
+        if delete_sessions:
+            for session_id in session_ids:
+                self._delete_in_background(session_id)
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "SessionPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _create_session(self) -> str:
+        try:
+            session_id = self.agent.create_session()
+        except Exception:
+            with self._lock:
+                self.counters["create_errors"] += 1
+            raise
+        with self._lock:
+            self.counters["created"] += 1
+        return session_id
+
+    def _take_warm(self, now: float) -> Optional[str]:
+        # Caller holds the lock
+        while self._warm:
+            session_id, created = self._warm.popleft()
+            if now - created <= self.idle_ttl_seconds:
+                self.counters["warm_hits"] += 1
+                return session_id
+            self._delete_in_background(session_id)
+            self.counters["evicted_idle"] += 1
+        return None
+
+    def _refill(self) -> None:
+        if self.warm_sessions and not self._closed.is_set():
+            self.prewarm()
+
+    def _warm_one(self) -> None:
+        try:
+            session_id = self._create_session()
+        except Exception:
+            session_id = None
+        with self._lock:
+            self._warming -= 1
+            if session_id is None:
+                return
+            if self._closed.is_set():
+                self._delete_in_background(session_id)
+                return
+            self._warm.append((session_id, time.monotonic()))
+
+    def _enforce_capacity(self) -> None:
+        # Caller holds the lock; conversations with a run in flight are skipped
+        while len(self._active) > self.capacity:
+            victim = next((key for key, entry in self._active.items() if not entry.in_use), None)
+            if victim is None:
+                break
+            self._evict(victim, EVICTED_LRU)
+
+    def _evict(self, key: str, reason: str) -> None:
+        # Caller holds the lock
+        entry = self._active.pop(key)
+        self.counters[f"evicted_{reason}"] += 1
+        self._delete_in_background(entry.session_id)
+
+    def _delete_in_background(self, session_id: str) -> None:
+        # Caller holds the lock
+        self.counters["deletes_pending"] += 1
+        try:
+            self._executor.submit(self._delete, session_id)
+        except RuntimeError:
+            # Executor already shut down; delete inline
+            self.counters["deletes_pending"] -= 1
+            threading.Thread(target=self._delete, args=(session_id, False), daemon=True).start()
+
+    def _delete(self, session_id: str, pending: bool = True) -> None:
+        try:
+            self.agent.delete_session(session_id)
+            result = "deleted"
+        except Exception:
+            # The service may already have expired the session; nothing else to clean up
+            result = "delete_errors"
+        with self._lock:
+            if pending:
+                self.counters["deletes_pending"] -= 1
+            self.counters[result] += 1
+
+    def _sweep_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            try:
+                self.sweep()
+            except Exception:
+                pass
@@ -0,0 +1,475 @@
+"""
+session_registry.py - Persistent registry of agent sessions and a concurrent garbage collector for them
+
+08_delete_sessions.py deletes one session right after its run. Workers that crash or are killed never get
+that far, so their remote sessions are orphaned until they expire server-side. The registry records every
+session created through a tracked `AgentClient` in SQLite, and the collector deletes expired and orphaned
+ones in bulk.
+
+Features:
+- `SessionRegistry.track(client)`: records create_session (owner, endpoint, runtime service endpoint, worker),
+  chat (last used) and delete_session calls of an AgentClient, for every Agent using that client.
+- A tracking worker heartbeats from a background thread, so an idle worker is not taken for a dead one;
+  sessions of a worker silent for `worker_timeout_s` are orphaned, sessions unused for `idle_ttl_s` are expired.
+- `SessionCollector.collect()`: claims a backlog (safe with several collectors on one registry) and
+  deletes it through a bounded thread pool with a shared rate limit and retries on 429/5xx. Each session
+  is deleted through a client for the runtime endpoint (region) it was created on, and sessions already
+  gone there (404) count as deleted.
+- Reports deletions per second, retries, failures and the backlog before and after.
+
+Usage:
+    registry = SessionRegistry()
+    client = registry.track(AgentClient(...), owner="support-bot")
+    agent = Agent(client=client, ...)
+
+    python session_registry.py gc --idle-ttl 3600 --worker-timeout 600 --workers 8 --rate 20
+    python session_registry.py stats
+    python session_registry.py --bench --rate 200
+"""
+
+import argparse
+import functools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import oci
+
+DEFAULT_REGISTRY_PATH = os.getenv("SESSION_REGISTRY_PATH", os.path.join(os.path.dirname(__file__), ".agent_sessions.sqlite3"))
+
+STATE_ACTIVE = "active"
+STATE_DELETING = "deleting"
+STATE_DELETED = "deleted"
+STATE_FAILED = "failed"
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SessionRegistry:
+    """SQLite table of agent sessions, their owner, endpoint, worker and last use"""
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH, worker_id: Optional[str] = None,
+                 heartbeat_interval_s: float = 10):
+        """
+        Args:
+            path (str): SQLite file (":memory:" for a throwaway registry)
+            worker_id (Optional[str]): This process's id, defaults to host:pid
+            heartbeat_interval_s (float): Minimum time between heartbeats written on use, and the period of
+                the background heartbeat
+        """
+        self.path = path
+        self.worker_id = worker_id or _worker_id()
+        self.heartbeat_interval_s = heartbeat_interval_s
+        self._last_heartbeat = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, agent_endpoint_id TEXT NOT NULL, owner TEXT, worker_id TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_used_at REAL NOT NULL, state TEXT NOT NULL,"
+            " claimed_at REAL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, deleted_at REAL,"
+            " runtime_endpoint TEXT)"
+        )
+        # Registries created before runtime_endpoint was recorded
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(sessions)")}
+        if "runtime_endpoint" not in columns:
+            self._db.execute("ALTER TABLE sessions ADD COLUMN runtime_endpoint TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_state_used ON sessions (state, last_used_at)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)")
+
+    def register(self, session_id: str, agent_endpoint_id: str, owner: Optional[str] = None,
+                 runtime_endpoint: Optional[str] = None) -> None:
+        """Record a newly created session and the runtime service endpoint it lives on"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, agent_endpoint_id, owner, worker_id, created_at,"
+                " last_used_at, state, runtime_endpoint) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, agent_endpoint_id, owner, self.worker_id, now, now, STATE_ACTIVE, runtime_endpoint),
+            )
+        self.heartbeat()
+
+    def touch(self, session_id: str) -> None:
+        """Record that a session was used (and that this worker is alive)"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE sessions SET last_used_at = ?, worker_id = ? WHERE session_id = ? AND state = ?",
+                (time.time(), self.worker_id, session_id, STATE_ACTIVE),
+            )
+        self.heartbeat()
+
+    def mark_deleted(self, session_id: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE sessions SET state = ?, deleted_at = ?, claimed_at = NULL, last_error = ? WHERE session_id = ?",
+                (STATE_DELETED, time.time(), error, session_id),
+            )
+
+    def heartbeat(self, force: bool = False) -> None:
+        """Record that this worker is alive; throttled to heartbeat_interval_s unless forced"""
+        now = time.time()
+        if not force and now - self._last_heartbeat < self.heartbeat_interval_s:
+            return
+        self._last_heartbeat = now
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO workers (worker_id, heartbeat_at) VALUES (?, ?)",
+                             (self.worker_id, now))
+
+    def start_heartbeat(self) -> None:
+        """Heartbeat every heartbeat_interval_s from a daemon thread until close()"""
+        with self._lock:
+            if self._heartbeat_thread is not None:
+                return
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="session-registry-heartbeat",
+                                                      daemon=True)
+        self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopped.wait(self.heartbeat_interval_s):
+            try:
+                self.heartbeat(force=True)
+            except sqlite3.Error:
+                # Busy or locked database; the next beat retries
+                pass
+
+    def track(self, client: Any, owner: Optional[str] = None) -> Any:
+        """Record the sessions an AgentClient creates, uses and deletes
+
+        Args:
+            client (Any): An ADK AgentClient (shared clients are tracked for all their agents)
+            owner (Optional[str]): Recorded with each session, e.g. the application or tenant
+
+        Returns:
+            Any: The same client
+        """
+        create_session, chat, delete_session = client.create_session, client.chat, client.delete_session
+        runtime_endpoint = getattr(client, "runtime_endpoint", None)
+
+        def tracked_create_session(agent_endpoint_id: str, *args: Any, **kwargs: Any) -> str:
+            session_id = create_session(agent_endpoint_id, *args, **kwargs)
+            self.register(session_id, agent_endpoint_id, owner, runtime_endpoint)
+            return session_id
+
+        def tracked_chat(agent_endpoint_id: str, session_id: str, *args: Any, **kwargs: Any) -> Any:
+            self.touch(session_id)
+            return chat(agent_endpoint_id, session_id, *args, **kwargs)
+
+        def tracked_delete_session(agent_endpoint_id: str, session_id: str) -> None:
+            delete_session(agent_endpoint_id, session_id)
+            self.mark_deleted(session_id)
+
+        client.create_session = tracked_create_session
+        client.chat = tracked_chat
+        client.delete_session = tracked_delete_session
+        self.heartbeat(force=True)
+        self.start_heartbeat()
+        return client
+
+    def backlog(self, idle_ttl_s: float, worker_timeout_s: float, claim_timeout_s: float = 600) -> int:
+        """Number of sessions the collector would delete now"""
+        where, params = self._collectable(idle_ttl_s, worker_timeout_s, claim_timeout_s)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM sessions WHERE {where}", params).fetchone()[0]
+
+    def claim(self, idle_ttl_s: float, worker_timeout_s: float, limit: int = 500,
+              claim_timeout_s: float = 600) -> List[Tuple[str, str, Optional[str], int]]:
+        """Mark up to limit collectable sessions as being deleted by the caller
+
+        Claims of a collector that died are taken over after claim_timeout_s.
+
+        Returns:
+            List[Tuple[str, str, Optional[str], int]]: (session_id, agent_endpoint_id, runtime_endpoint,
+                attempts so far) per claimed session
+        """
+        where, params = self._collectable(idle_ttl_s, worker_timeout_s, claim_timeout_s)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    f"SELECT session_id, agent_endpoint_id, runtime_endpoint, attempts FROM sessions WHERE {where}"
+                    " ORDER BY last_used_at LIMIT ?", params + (limit,)
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE sessions SET state = ?, claimed_at = ? WHERE session_id = ?",
+                    [(STATE_DELETING, time.time(), row[0]) for row in rows],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return rows
+
+    def release(self, session_id: str, error: str, failed: bool) -> None:
+        """Return a claimed session after a failed delete, or give up on it"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE sessions SET state = ?, claimed_at = NULL, attempts = attempts + 1, last_error = ?"
+                " WHERE session_id = ?",
+                (STATE_FAILED if failed else STATE_ACTIVE, error[:500], session_id),
+            )
+
+    def purge(self, older_than_s: float = 7 * 24 * 3600) -> int:
+        """Drop deleted sessions and stale workers from the registry"""
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            removed = self._db.execute("DELETE FROM sessions WHERE state = ? AND deleted_at < ?",
+                                       (STATE_DELETED, cutoff)).rowcount
+            self._db.execute("DELETE FROM workers WHERE heartbeat_at < ?", (cutoff,))
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states = dict(self._db.execute("SELECT state, COUNT(*) FROM sessions GROUP BY state").fetchall())
+            workers = self._db.execute("SELECT COUNT(*) FROM workers").fetchone()[0]
+        return {"sessions": states, "workers": workers}
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+        with self._lock:
+            self._db.close()
+
+    def _collectable(self, idle_ttl_s: float, worker_timeout_s: float, claim_timeout_s: float) -> Tuple[str, tuple]:
+        now = time.time()
+        where = (
+            "((state = ? AND (last_used_at < ? OR worker_id NOT IN"
+            " (SELECT worker_id FROM workers WHERE heartbeat_at >= ?)))"
+            " OR (state = ? AND claimed_at < ?))"
+        )
+        return where, (STATE_ACTIVE, now - idle_ttl_s, now - worker_timeout_s, STATE_DELETING, now - claim_timeout_s)
+
+
+class _RateLimiter:
+    """Token bucket shared by the delete workers"""
+
+    def __init__(self, rate_per_s: float, burst: Optional[float] = None):
+        self.rate_per_s = rate_per_s
+        self.burst = burst if burst is not None else max(rate_per_s, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.tokens + (now - self.updated) * self.rate_per_s, self.burst)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate_per_s
+            time.sleep(wait)
+
+
+def _status(error: BaseException) -> Optional[int]:
+    # AgentClient wraps the SDK's ServiceError; look through the chain for the HTTP status
+    while error is not None:
+        if isinstance(error, oci.exceptions.ServiceError):
+            return error.status
+        error = error.__cause__
+    return None
+
+
+class SessionCollector:
+    """Deletes expired and orphaned sessions of a registry in bulk"""
+
+    def __init__(self, registry: SessionRegistry, client_for: Callable[[Optional[str]], Any], workers: int = 8,
+                 rate_per_s: float = 20, max_attempts: int = 3, backoff_s: float = 0.5, batch_size: int = 500):
+        """
+        Args:
+            registry (SessionRegistry): The registry to collect from
+            client_for (Callable[[Optional[str]], Any]): The AgentClient for a session's runtime endpoint (None
+                for sessions recorded without one), e.g. `lambda endpoint: get_agent_client(runtime_endpoint=endpoint)`
+            workers (int): Concurrent deletes
+            rate_per_s (float): Maximum deletes started per second across workers
+            max_attempts (int): Attempts per session across GC runs before it is marked failed
+            backoff_s (float): Backoff before retrying a throttled or failed delete, doubled per attempt
+            batch_size (int): Sessions claimed at a time
+        """
+        self.registry = registry
+        self.client_for = client_for
+        self.workers = workers
+        self.rate_per_s = rate_per_s
+        self.max_attempts = max_attempts
+        self.backoff_s = backoff_s
+        self.batch_size = batch_size
+
+    def collect(self, idle_ttl_s: float = 3600, worker_timeout_s: float = 600, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Delete collectable sessions until none are left (or limit were processed)
+
+        Args:
+            idle_ttl_s (float): Sessions unused for longer are expired
+            worker_timeout_s (float): Sessions of workers without a heartbeat for longer are orphaned
+            limit (Optional[int]): Maximum sessions to process in this run
+
+        Returns:
+            Dict[str, Any]: Deleted, already gone, retried and failed counts, deletions per second and backlog
+        """
+        report = {"backlog_before": self.registry.backlog(idle_ttl_s, worker_timeout_s),
+                  "deleted": 0, "already_gone": 0, "retries": 0, "failed": 0, "released": 0}
+        limiter = _RateLimiter(self.rate_per_s)
+        lock = threading.Lock()
+
+        def delete(row: Tuple[str, str, Optional[str], int]) -> None:
+            session_id, agent_endpoint_id, runtime_endpoint, attempts = row
+            outcome, error = "released", ""
+            while attempts < self.max_attempts:
+                limiter.acquire()
+                attempts += 1
+                try:
+                    self.client_for(runtime_endpoint).delete_session(agent_endpoint_id, session_id)
+                    outcome = "deleted"
+                    break
+                except Exception as e:
+                    status = _status(e)
+                    if status == 404:
+                        outcome = "already_gone"
+                        break
+                    error = f"{type(e).__name__}: {e}"
+                    if status is not None and status != 429 and status < 500:
+                        outcome = "failed"
+                        break
+                    if attempts < self.max_attempts:
+                        with lock:
+                            report["retries"] += 1
+                        time.sleep(self.backoff_s * 2 ** (attempts - 1))
+            else:
+                outcome = "failed"
+            if outcome in ("deleted", "already_gone"):
+                self.registry.mark_deleted(session_id, None if outcome == "deleted" else "already gone")
+            else:
+                self.registry.release(session_id, error, failed=outcome == "failed")
+            with lock:
+                report[outcome] += 1
+
+        started = time.perf_counter()
+        processed = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="session-gc") as executor:
+            while limit is None or processed < limit:
+                batch = self.batch_size if limit is None else min(self.batch_size, limit - processed)
+                rows = self.registry.claim(idle_ttl_s, worker_timeout_s, batch)
+                if not rows:
+                    break
+                list(executor.map(delete, rows))
+                processed += len(rows)
+        elapsed = time.perf_counter() - started
+        report["elapsed_s"] = round(elapsed, 3)
+        report["deletions_per_s"] = round((report["deleted"] + report["already_gone"]) / elapsed, 1) if elapsed else 0.0
+        report["backlog_after"] = self.registry.backlog(idle_ttl_s, worker_timeout_s)
+        return report
+
+
+def benchmark(sessions: int = 500, workers: int = 8, rate_per_s: float = 200, delete_latency_ms: float = 30,
+              error_rate: float = 0.05) -> Dict[str, Any]:
+    """Orphan sessions on a stand-in server and collect them
+
+    A "crashed worker" creates sessions through a tracked client and stops heartbeating; a tenth of
+    its sessions are also deleted server-side beforehand (expired), and session calls fail with 429
+    at error_rate.
+
+    Args:
+        sessions (int): Orphaned sessions
+        workers (int): Collector threads
+        rate_per_s (float): Collector rate limit
+        delete_latency_ms (float): Stand-in latency of session calls
+        error_rate (float): Fraction of session calls throttled
+
+    Returns:
+        Dict[str, Any]: Collector report, registry stats and sessions left on the server
+    """
+    import tempfile
+
+    from oci.addons.adk import AgentClient
+
+    from mock_genai_server import MockGenAIServer, write_offline_oci_config
+
+    config_path = write_offline_oci_config()
+    path = os.path.join(tempfile.mkdtemp(prefix="session-registry-"), "sessions.sqlite3")
+    endpoint_id = "ocid1.genaiagentendpoint.oc1..standin"
+    server_config = {"latency_ms": {"session": {"mean": delete_latency_ms, "jitter": delete_latency_ms / 5}}}
+    with MockGenAIServer(config=server_config) as server:
+        def new_client(runtime_endpoint: Optional[str] = None) -> Any:
+            client = AgentClient(auth_type="api_key", config=config_path, profile="DEFAULT",
+                                 runtime_endpoint=runtime_endpoint or server.url, management_endpoint=server.url)
+            # Only the collector's own retries, so its retry counter is meaningful
+            client._rt_client.retry_strategy = oci.retry.NoneRetryStrategy()
+            return client
+
+        crashed = SessionRegistry(path, worker_id="crashed-worker:1")
+        client = crashed.track(new_client(), owner="bench")
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            session_ids = list(executor.map(lambda _: client.create_session(endpoint_id), range(sessions)))
+        crashed.close()
+        # The crashed worker's last heartbeat was an hour ago
+        registry = SessionRegistry(path)
+        with registry._lock:
+            registry._db.execute("UPDATE workers SET heartbeat_at = ? WHERE worker_id = ?",
+                                 (time.time() - 3600, "crashed-worker:1"))
+        with server.state.lock:
+            for session_id in session_ids[::10]:
+                server.state.sessions.pop(session_id, None)
+        server.state.config.update({"error_rate": error_rate, "error_status": 429, "error_routes": ["session"]})
+
+        collector = SessionCollector(registry, functools.lru_cache(maxsize=None)(new_client), workers=workers,
+                                     rate_per_s=rate_per_s, backoff_s=0.05, max_attempts=5)
+        report = collector.collect(idle_ttl_s=24 * 3600, worker_timeout_s=600)
+        report["registry"] = registry.stats()
+        report["sessions_left_on_server"] = server.state.stats()["sessions_live"]
+        registry.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent session registry and garbage collector.")
+    parser.add_argument("command", nargs="?", choices=["gc", "stats", "purge"], help="What to do")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY_PATH, help="SQLite registry file")
+    parser.add_argument("--idle-ttl", type=float, default=3600, help="gc: delete sessions unused for this many seconds")
+    parser.add_argument("--worker-timeout", type=float, default=600,
+                        help="gc: delete sessions of workers silent for this many seconds")
+    parser.add_argument("--workers", type=int, default=8, help="gc: concurrent deletes")
+    parser.add_argument("--rate", type=float, default=20, help="gc: deletes per second")
+    parser.add_argument("--limit", type=int, default=None, help="gc: maximum sessions to process")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark against a stand-in server")
+    parser.add_argument("--sessions", type=int, default=500, help="bench: orphaned sessions")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(json.dumps(benchmark(args.sessions, args.workers, args.rate), indent=2))
+        return
+    if args.command is None:
+        parser.print_help()
+        return
+
+    registry = SessionRegistry(args.registry, worker_id=f"gc-{uuid.uuid4().hex[:8]}")
+    if args.command == "stats":
+        stats = registry.stats()
+        stats["backlog"] = registry.backlog(args.idle_ttl, args.worker_timeout)
+        print(json.dumps(stats, indent=2))
+    elif args.command == "purge":
+        print(json.dumps({"purged": registry.purge()}, indent=2))
+    else:
+        from client_pool import get_agent_client
+
+        # Sessions are deleted on the runtime endpoint (region) they were created on
+        collector = SessionCollector(registry, lambda endpoint: get_agent_client(runtime_endpoint=endpoint),
+                                     workers=args.workers, rate_per_s=args.rate)
+        print(json.dumps(collector.collect(args.idle_ttl, args.worker_timeout, args.limit), indent=2))
+    registry.close()
+
+
+if __name__ == "__main__":
+    main()
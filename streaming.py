@@ -0,0 +1,337 @@
+"""
+streaming.py - Streaming chat and agent runs with time-to-first-token metrics
+
+00_sample.py and `agent.run(...).pretty_print()` in 01-07 wait for the complete response before
+anything is shown. This module requests server-sent events instead and yields tokens and tool events
+as they arrive, through a plain iterator or an async iterator.
+
+Features:
+- `ChatStream`: streams a `GenerativeAiInferenceClient.chat` call (CohereChatRequest with is_stream).
+- `AgentRunStream`: streams an agent run, executing local function tools between steps like `Agent.run`.
+- `StreamMetrics`: time to first token (TTFT), inter-token latency and total time per request.
+- `time_blocking`: the same metrics for a blocking call, so streaming and blocking runs can be compared.
+
+Usage:
+- Inference:
+    stream = ChatStream(client, build_chat_details("what is oracle cloud in 1 line"))
+    for event in stream:
+        print(event.data, end="", flush=True)
+    print(stream.metrics.to_dict())
+- Agent run (sync or `async for`):
+    async for event in AgentRunStream(agent, "Is it cold in Seattle?"):
+        ...
+- python streaming.py --prompt "what is oracle cloud in 1 line" compares a streaming and a blocking chat.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from perf_stats import summarize_latencies
+
+TOKEN = "token"
+TOOL_CALL = "tool_call"
+TOOL_RESULT = "tool_result"
+DONE = "done"
+
+
+class StreamEvent:
+    """One item yielded by a stream: a text token, a tool call/result, or the final result"""
+
+    def __init__(self, type: str, data: Any):
+        self.type = type
+        self.data = data
+
+    def __repr__(self):
+        return f"StreamEvent(type={self.type!r}, data={self.data!r})"
+
+
+class StreamMetrics:
+    """Timing of one streamed (or blocking) request"""
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.token_times: List[float] = []
+        self.finished_at: Optional[float] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+
+    def mark_token(self) -> None:
+        self.token_times.append(time.perf_counter())
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from sending the request to the first token"""
+        if self.started_at is None or not self.token_times:
+            return None
+        return self.token_times[0] - self.started_at
+
+    @property
+    def inter_token_latencies(self) -> List[float]:
+        return [later - earlier for earlier, later in zip(self.token_times, self.token_times[1:])]
+
+    @property
+    def total(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ttft_s": self.ttft,
+            "total_s": self.total,
+            "tokens": len(self.token_times),
+            "inter_token_s": summarize_latencies(self.inter_token_latencies),
+        }
+
+
+class _Stream:
+    """Shared iteration plumbing; subclasses implement _events()"""
+
+    def __init__(self):
+        self.metrics = StreamMetrics()
+        self._iterator: Optional[Iterator[StreamEvent]] = None
+
+    def _events(self) -> Iterator[StreamEvent]:
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator[StreamEvent]:
+        if self._iterator is None:
+            self._iterator = self._events()
+        return self._iterator
+
+    async def __aiter__(self):
+        # The SDK is blocking, so the stream is consumed on a worker thread and handed over via a queue
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+
+        def pump():
+            try:
+                for event in self:
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        threading.Thread(target=pump, daemon=True).start()
+        while True:
+            item = await queue.get()
+            if item is finished:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+class ChatStream(_Stream):
+    """Streams one GenerativeAiInferenceClient.chat call"""
+
+    def __init__(self, client: Any, chat_details: Any, include_usage: bool = True):
+        """
+        Args:
+            client (Any): A GenerativeAiInferenceClient
+            chat_details (Any): ChatDetails, e.g. from genai_chat.build_chat_details
+            include_usage (bool): Ask the service to report token usage at the end of the stream
+        """
+        super().__init__()
+        self.client = client
+        self.chat_details = chat_details
+        self.include_usage = include_usage
+        self.text = ""
+        self.finish_reason: Optional[str] = None
+        self.total_tokens: Optional[int] = None
+
+    def _events(self) -> Iterator[StreamEvent]:
+        import oci
+
+        chat_request = self.chat_details.chat_request
+        chat_request.is_stream = True
+        if self.include_usage:
+            chat_request.stream_options = oci.generative_ai_inference.models.StreamOptions(is_include_usage=True)
+
+        self.metrics.start()
+        response = self.client.chat(self.chat_details)
+        for event in response.data.events():
+            payload = json.loads(event.data)
+            usage = payload.get("usage")
+            if usage:
+                self.total_tokens = usage.get("totalTokens")
+            if payload.get("finishReason"):
+                # The closing event repeats the full text; it is not a new token
+                self.finish_reason = payload["finishReason"]
+                continue
+            token = _event_text(payload)
+            if token:
+                self.metrics.mark_token()
+                self.text += token
+                yield StreamEvent(TOKEN, token)
+        self.metrics.finish()
+        yield StreamEvent(DONE, {"text": self.text, "finish_reason": self.finish_reason,
+                                 "total_tokens": self.total_tokens})
+
+
+def _event_text(payload: Dict[str, Any]) -> str:
+    # COHERE events carry "text"; GENERIC events carry message.content[].text
+    if "text" in payload:
+        return payload["text"] or ""
+    content = (payload.get("message") or {}).get("content") or []
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+class AgentRunStream(_Stream):
+    """Streams an agent run: tokens of each step, plus the local tool calls between steps
+
+    Mirrors `Agent.run`: creates a session unless one is given, executes required function calls with
+    the agent's local tools and sends the performed actions back until no action is required or
+    max_steps is reached. The final event carries a `RunResponse`.
+    """
+
+    def __init__(self, agent: Any, input: str, session_id: Optional[str] = None, max_steps: int = 10,
+                 on_fulfilled_required_action: Optional[Callable] = None):
+        """
+        Args:
+            agent (Any): An ADK Agent (setup() already done)
+            input (str): The user message
+            session_id (Optional[str]): Continue this session instead of creating a new one
+            max_steps (int): Maximum number of tool round trips
+            on_fulfilled_required_action (Optional[Callable]): Same hook as Agent.run
+        """
+        super().__init__()
+        self.agent = agent
+        self.input = input
+        self.session_id = session_id
+        self.max_steps = max_steps
+        self.on_fulfilled_required_action = on_fulfilled_required_action
+        self.steps = 0
+        self.response = None
+
+    def _events(self) -> Iterator[StreamEvent]:
+        from oci.addons.adk.run.response import RunResponse
+        from oci.addons.adk.run.types import RawResponse
+
+        self.metrics.start()
+        if self.session_id is None:
+            self.session_id = self.agent.create_session()
+
+        raw_responses = []
+        result = yield from self._stream_step(self.input, None)
+        raw_responses.append(RawResponse(raw_data=result))
+        while result.get("required_actions") and self.steps < self.max_steps:
+            for action in result["required_actions"]:
+                yield StreamEvent(TOOL_CALL, action.get("function_call"))
+            performed_actions = self._perform_actions(result)
+            for performed_action in performed_actions:
+                yield StreamEvent(TOOL_RESULT, performed_action.model_dump())
+            # Same placeholder user message that Agent.run sends with performed actions
+            result = yield from self._stream_step("null", performed_actions)
+            raw_responses.append(RawResponse(raw_data=result))
+            self.steps += 1
+
+        self.metrics.finish()
+        self.response = RunResponse(session_id=self.session_id, data=result, raw_responses=raw_responses)
+        yield StreamEvent(DONE, self.response)
+
+    def _perform_actions(self, result: Dict[str, Any]) -> List[Any]:
+        # Reuse the ADK's own tool dispatch so arguments and outputs are handled exactly as in Agent.run.
+        # A private loop is used so the thread's current event loop (which Agent.run relies on) is untouched.
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(
+                self.agent._handle_required_actions(result, self.on_fulfilled_required_action)
+            )
+        finally:
+            loop.close()
+
+    def _stream_step(self, user_message: str, performed_actions: Optional[List[Any]]):
+        from oci.generative_ai_agent_runtime.models import ChatDetails, FunctionCallingPerformedAction
+        from oci.util import to_dict
+
+        rt_client = self.agent.client._rt_client
+        chat_details = ChatDetails(
+            user_message=user_message,
+            session_id=self.session_id,
+            should_stream=True,
+            performed_actions=[
+                FunctionCallingPerformedAction(
+                    action_id=action.action_id,
+                    performed_action_type=action.performed_action_type,
+                    function_call_output=action.function_call_output,
+                )
+                for action in performed_actions or []
+            ],
+        )
+        response = rt_client.chat(agent_endpoint_id=self.agent.agent_endpoint_id, chat_details=chat_details)
+        if not hasattr(response.data, "events"):
+            # The service answered without streaming; treat the whole text as one token
+            result = to_dict(response.data)
+            text = ((result.get("message") or {}).get("content") or {}).get("text")
+            if text:
+                self.metrics.mark_token()
+                yield StreamEvent(TOKEN, text)
+            return result
+
+        streamed = ""
+        result: Dict[str, Any] = {}
+        for event in response.data.events():
+            data = to_dict(rt_client.base_client.deserialize_response_data(event.data.encode("utf-8"), "ChatResult"))
+            text = ((data.get("message") or {}).get("content") or {}).get("text") or ""
+            # Events may carry deltas or the cumulative text; only the unseen suffix is a new token
+            token = text[len(streamed):] if text.startswith(streamed) else text
+            if token:
+                self.metrics.mark_token()
+                streamed += token
+                yield StreamEvent(TOKEN, token)
+            for key, value in data.items():
+                if value is not None:
+                    result[key] = value
+        result["message"] = {"role": "AGENT", "content": {"text": streamed}} if streamed else result.get("message")
+        result.setdefault("required_actions", None)
+        return result
+
+
+def time_blocking(call: Callable[[], Any]) -> StreamMetrics:
+    """Measure a blocking call with the same metrics as a stream (TTFT equals total time)
+
+    Args:
+        call (Callable[[], Any]): The blocking call, e.g. lambda: agent.run(input)
+
+    Returns:
+        StreamMetrics: Metrics with a single token at completion
+    """
+    metrics = StreamMetrics()
+    metrics.start()
+    call()
+    metrics.mark_token()
+    metrics.finish()
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare streaming and blocking chat latency.")
+    parser.add_argument("--prompt", default="what is oracle cloud in 1 line")
+    args = parser.parse_args()
+
+    from genai_chat import build_chat_details, create_inference_client
+
+    client = create_inference_client(pool_size=1)
+    stream = ChatStream(client, build_chat_details(args.prompt))
+    for event in stream:
+        if event.type == TOKEN:
+            print(event.data, end="", flush=True)
+    print()
+    blocking = time_blocking(lambda: client.chat(build_chat_details(args.prompt)))
+
+    print("**************************Latency**************************")
+    print(json.dumps({"streaming": stream.metrics.to_dict(), "blocking": blocking.to_dict()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+workflow.py - Declarative DAG workflows with parallel steps and checkpoint/resume
+
+06_multi_step_workflow_agents.py chains plain-Python and agentic steps strictly in sequence, and a failure
+in a late step throws away the paid output of earlier ones. This module lets those steps be declared
+with explicit inputs and outputs and runs them as a DAG.
+
+Features:
+- Steps declare the names of their inputs; each step's output is available to later steps under its name.
+- Independent steps run concurrently on a thread pool; `map_over` fans a step out over a list input
+  (e.g. one research step per topic) and fans the results back in as a list.
+- Every step output (and every fan-out item) is checkpointed to disk keyed by a hash of its inputs,
+  so a rerun resumes after the last completed step and unchanged steps are skipped.
+
+Usage:
+    flow = Workflow("blog_post")
+    flow.step("preferences", get_user_preferences)
+    flow.step("keywords", agent_step(researcher, "Research trending keywords for: {topic}"),
+              inputs={"topic": "preferences.topics"}, map_over="topic")
+    flow.step("post", agent_step(writer, "Write a post using {keywords}"), inputs=["keywords"])
+    results = flow.run()
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Union
+
+DEFAULT_CHECKPOINT_DIR = os.getenv("WORKFLOW_CHECKPOINT_DIR", os.path.join(os.path.dirname(__file__), ".workflow_checkpoints"))
+
+
+class WorkflowError(Exception):
+    """Raised when a step fails; completed steps stay checkpointed for the next run"""
+
+    def __init__(self, step: str, error: BaseException):
+        super().__init__(f"Workflow step '{step}' failed: {error}")
+        self.step = step
+        self.error = error
+
+
+class Step:
+    """A named unit of work with explicit inputs"""
+
+    def __init__(self, name: str, fn: Callable[..., Any], inputs: Dict[str, str], map_over: Optional[str] = None,
+                 version: str = "1", checkpoint: bool = True):
+        self.name = name
+        self.fn = fn
+        # parameter name -> source, where source is "<step>" or "<step>.<key>" or a run parameter
+        self.inputs = inputs
+        self.map_over = map_over
+        self.version = version
+        self.checkpoint = checkpoint
+
+    @property
+    def dependencies(self) -> List[str]:
+        return [source.split(".", 1)[0] for source in self.inputs.values()]
+
+
+def _hash(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+class CheckpointStore:
+    """Step outputs on disk, one JSON file per (step, input hash)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, step: str, input_hash: str) -> str:
+        return os.path.join(self.directory, f"{step}-{input_hash}.json")
+
+    def load(self, step: str, input_hash: str) -> tuple:
+        """Return (found, output)"""
+        try:
+            with open(self._path(step, input_hash), "r", encoding="utf-8") as f:
+                return True, json.load(f)["output"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return False, None
+
+    def save(self, step: str, input_hash: str, output: Any) -> None:
+        path = self._path(step, input_hash)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"step": step, "output": output}, f, default=str)
+        os.replace(tmp_path, path)
+
+
+class Workflow:
+    """A DAG of steps executed concurrently with checkpointing"""
+
+    def __init__(self, name: str, checkpoint_dir: Optional[str] = DEFAULT_CHECKPOINT_DIR, max_workers: int = 4):
+        """
+        Args:
+            name (str): Workflow name, used as the checkpoint sub-directory
+            checkpoint_dir (Optional[str]): Root directory for checkpoints, None disables them
+            max_workers (int): Maximum number of steps (or fan-out items) running at once
+        """
+        self.name = name
+        self.steps: Dict[str, Step] = {}
+        self.max_workers = max_workers
+        self.store = CheckpointStore(os.path.join(checkpoint_dir, name)) if checkpoint_dir else None
+        self.executed: List[str] = []
+        self.skipped: List[str] = []
+        self._lock = threading.Lock()
+
+    def step(self, name: str, fn: Callable[..., Any], inputs: Union[None, List[str], Dict[str, str]] = None,
+             map_over: Optional[str] = None, version: str = "1", checkpoint: bool = True) -> "Workflow":
+        """Declare a step
+
+        Args:
+            name (str): Step name; its output is available to later steps under this name
+            fn (Callable[..., Any]): Called with one keyword argument per input; must return JSON-serializable data
+            inputs (Union[None, List[str], Dict[str, str]]): Sources by parameter name, e.g.
+                {"topic": "preferences.topics"}; a list uses each source's last segment as the parameter name
+            map_over (Optional[str]): Parameter holding a list; fn runs once per item, concurrently
+            version (str): Bump to invalidate checkpoints after changing fn
+            checkpoint (bool): False for cheap or volatile steps (e.g. a DB read) that must run every time
+
+        Returns:
+            Workflow: self, for chaining
+        """
+        if isinstance(inputs, list):
+            inputs = {source.split(".")[-1]: source for source in inputs}
+        self.steps[name] = Step(name, fn, inputs or {}, map_over, version, checkpoint)
+        return self
+
+    def run(self, **params: Any) -> Dict[str, Any]:
+        """Run every step whose inputs are ready, as soon as they are ready
+
+        Args:
+            **params: Run parameters that steps can use as inputs
+
+        Returns:
+            Dict[str, Any]: Output of every step by name
+
+        Raises:
+            WorkflowError: When a step fails (after in-flight steps finish)
+        """
+        self._validate(params)
+        self.executed, self.skipped = [], []
+        results: Dict[str, Any] = dict(params)
+        remaining = dict(self.steps)
+        running: Dict[Future, str] = {}
+        failure: Optional[WorkflowError] = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                if failure is None:
+                    for name, step in list(remaining.items()):
+                        if all(dep in results for dep in step.dependencies if dep in self.steps):
+                            kwargs = {param: self._resolve(source, results) for param, source in step.inputs.items()}
+                            # Steps see the caller's context variables (e.g. admission.py's priority class)
+                            context = contextvars.copy_context()
+                            running[executor.submit(context.run, self._run_step, step, kwargs)] = name
+                            del remaining[name]
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        failure = failure or WorkflowError(name, e)
+        if failure is not None:
+            raise failure
+        return {name: results[name] for name in self.steps}
+
+    def _run_step(self, step: Step, kwargs: Dict[str, Any]) -> Any:
+        if step.map_over is None:
+            return self._memoized(step, kwargs)
+        # Fan out: one call per item, each checkpointed on its own so partial progress survives
+        items = kwargs[step.map_over]
+        calls = [{**kwargs, step.map_over: item} for item in items]
+        if len(calls) <= 1:
+            return [self._memoized(step, call) for call in calls]
+        # Items run on their own threads: the shared executor may be saturated by the fan-out step itself
+        contexts = [contextvars.copy_context() for _ in calls]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls))) as item_executor:
+            return list(item_executor.map(lambda context, call: context.run(self._memoized, step, call), contexts, calls))
+
+    def _memoized(self, step: Step, kwargs: Dict[str, Any]) -> Any:
+        input_hash = _hash({"version": step.version, "inputs": kwargs})
+        store = self.store if step.checkpoint else None
+        if store is not None:
+            found, output = store.load(step.name, input_hash)
+            if found:
+                with self._lock:
+                    self.skipped.append(step.name)
+                return output
+        output = step.fn(**kwargs)
+        if store is not None:
+            store.save(step.name, input_hash, output)
+        with self._lock:
+            self.executed.append(step.name)
+        return output
+
+    @staticmethod
+    def _resolve(source: str, results: Dict[str, Any]) -> Any:
+        value = results[source.split(".", 1)[0]]
+        for key in source.split(".")[1:]:
+            value = value[key]
+        return value
+
+    def _validate(self, params: Dict[str, Any]) -> None:
+        # Every input must come from a step or a run parameter, and the graph must be acyclic
+        for step in self.steps.values():
+            for dep in step.dependencies:
+                if dep not in self.steps and dep not in params:
+                    raise ValueError(f"Step '{step.name}' depends on unknown step or parameter '{dep}'")
+        visiting, visited = set(), set()
+
+        def visit(name: str) -> None:
+            if name in visited or name not in self.steps:
+                return
+            if name in visiting:
+                raise ValueError(f"Workflow '{self.name}' has a cycle through step '{name}'")
+            visiting.add(name)
+            for dep in self.steps[name].dependencies:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+
+def _ensure_event_loop() -> None:
+    # Agent.run uses asyncio.get_event_loop(), which only exists by default on the main thread
+    try:
+        asyncio.get_event_loop()
+    except RuntimeError:
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+
+def agent_step(agent: Any, prompt_template: str, **run_kwargs: Any) -> Callable[..., Optional[str]]:
+    """Wrap an agent run as a workflow step
+
+    Args:
+        agent (Any): An ADK Agent
+        prompt_template (str): Prompt with {placeholders} filled from the step inputs
+        **run_kwargs: Extra arguments for agent.run, e.g. max_steps
+
+    Returns:
+        Callable[..., Optional[str]]: A step function returning the agent's output text
+    """
+    def run_agent(**inputs: Any) -> Optional[str]:
+        _ensure_event_loop()
+        return agent.run(prompt_template.format(**inputs), **run_kwargs).final_output
+
+    run_agent.__name__ = f"agent_step_{agent.name or 'agent'}"
+    return run_agent